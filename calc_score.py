@@ -23,14 +23,30 @@ by the user to each factor.
 
 # Copy HAZAREA_FC to TARGET_FC and run calculations on TARGET_FC, so we can repeat
 # the process with new values, keeping the HAZAREA_FC intact.
+# Every run caches the grades per TARGET_FC. With INCREMENTAL enabled and the
+# source factor values unchanged, the copy and regrade are skipped and only the
+# columns affected by new weights or breakpoints are rewritten.
+# With OUTPUT_MODE set to TABLE, TARGET_FC is a geometry-free table holding the
+# source Object ID plus the score and weight columns, and the geometry is only
+# referenced through a join layer, so each scenario costs attribute I/O only.
+# An optional ENGINE also scores the grades with TOPSIS, VIKOR or PROMETHEE II
+# and stores the engine score and its rank in ENGINESCORE and ENGINERANK.
 
 
 #Import libraries
 import logging
 import logging.handlers
 import time # For timing purposes
-from decimal import Decimal, getcontext
 import arcpy
+from mcda_engines import engine_scores, ENGINES
+from mcda_cache import (fingerprint_factors, grade_cache_path,
+                        load_grade_cache, save_grade_cache, clear_grade_cache,
+                        changed_columns)
+from mcda_scoring import (check_weights_same, read_factor_columns,
+                          grade_matrix, unweighted_scores, weighted_scores,
+                          priority_rankings, write_score_columns,
+                          write_score_table, make_score_join_layer,
+                          WEIGHT_FIELDS)
 
 
 # Functions and classes
@@ -74,182 +90,6 @@ def fieldexist(featureclass, fieldname):
     fieldcount = len(fieldlist)
     return bool(fieldcount == 1)
 
-def check_weights_same(weightslist):
-    """
-    Check for at least three unique weights assigned to the full list of factors.
-    Convert the list of factor weights to a set and back to a list and then
-    check the number of list items.
-    Ensures that the user does not assign the same value to all factors.
-    """
-    privateset = set(weightslist)
-    uniquelist = list(privateset)
-    if len(uniquelist) >= 3:
-        LOGGER.debug("Length of the unique values list: " + str(len(uniquelist)))
-        return True
-    else:
-        LOGGER.debug("Length of the unique values list: " + str(len(uniquelist)))
-        LOGGER.error("Please assign at least three different factor weights.")
-        return False
-
-# SDSS priority calculation formulas
-def landcover_calc(landcovervalue):
-    """
-    Calculate the classification of the land cover parameter based on the
-    land cover key recorded for this feature.
-    """
-    if landcovervalue == BAREAREA_CODE:
-        landcover = 1
-    else:
-        landcover = 3
-    return landcover
-
-def aspect_calc(aspectvalue):
-    """
-    Calculate the classification of the aspect parameter based on the value
-    of the aspect recorded for this feature.
-    """
-    if aspectvalue < 0:
-        asp = 0
-    elif aspectvalue == 0 and aspectvalue < 22.6:
-        asp = 3
-    elif aspectvalue > 22.5 and aspectvalue < 67.6:
-        asp = 2
-    elif aspectvalue > 67.5 and aspectvalue < 112.6:
-        asp = 1
-    elif aspectvalue > 112.5 and aspectvalue < 157.6:
-        asp = 0
-    elif aspectvalue > 157.5 and aspectvalue < 202.6:
-        asp = 0
-    elif aspectvalue > 202.5 and aspectvalue < 247.6:
-        asp = 0
-    elif aspectvalue > 247.5 and aspectvalue < 292.6:
-        asp = 0
-    elif aspectvalue > 292.5 and aspectvalue < 337.6:
-        asp = 2
-    else:
-        asp = 3
-    return asp
-
-def infrastructure_calc(infracount):
-    """
-    Calculate the classification of the infrastructure parameter based on the
-    number of infrastructure features located near this feature.
-    """
-    if infracount == 0:
-        infra = 0
-    elif infracount == 1:
-        infra = 1
-    elif infracount == 2:
-        infra = 2
-    else:
-        infra = 3
-    return infra
-
-def keyfeatures_calc(keyfeatcount):
-    """
-    Calculate the classification of the key features parameter based on the
-    number of key features located near this feature.
-    """
-    if keyfeatcount == 0:
-        keyfeature = 0
-    elif keyfeatcount == 1:
-        keyfeature = 1
-    elif keyfeatcount == 2:
-        keyfeature = 2
-    else:
-        keyfeature = 3
-    return keyfeature
-
-def accidents_calc(accidentcount):
-    """
-    Calculate the classification of the accidents parameter based on the number
-    of accidents recorded for this feature.
-    """
-    if accidentcount == 0:
-        acc = 0
-    elif accidentcount == 1:
-        acc = 1
-    elif accidentcount == 2:
-        acc = 2
-    else:
-        acc = 3
-    return acc
-
-def poi_calc(poicount):
-    """
-    Calculate the classification of the POI parameter based on the number of
-    points of interest located near this feature.
-    """
-    if poicount == 0:
-        poi = 0
-    elif poicount == 1:
-        poi = 1
-    elif poicount == 2:
-        poi = 2
-    else:
-        poi = 3
-    return poi
-
-def rivers_calc(rivercount):
-    """
-    Calculate the classification of the rivers/water basins parameter based on
-    the number of river/water basin features located near this feature.
-    """
-    if rivercount == 0:
-        rivers = 0
-    elif rivercount == 1:
-        rivers = 1
-    elif rivercount == 2:
-        rivers = 2
-    else:
-        rivers = 3
-    return rivers
-
-def slope_calc(slopevalue):
-    """
-    Calculate the classification of the slope parameter based on the value of
-    the slope recorded for this feature.
-    """
-    if slopevalue == 0:
-        slp = 0
-    elif slopevalue > 15:
-        slp = 1
-    elif slopevalue > 10 and slopevalue < 15:
-        slp = 2
-    else:
-        slp = 3
-    return slp
-
-def population_calc(populationcount):
-    """
-    Calculate the classification of the population parameter based on the
-    total population located near this feature.
-    """
-    if populationcount == 0:
-        pop = 0
-    elif populationcount > 0 and populationcount < 51:
-        pop = 1
-    elif populationcount > 50 and populationcount < 101:
-        pop = 2
-    else:
-        pop = 3
-    return pop
-
-# Accept user input to define the break points
-def sdss_priority_calc(score):
-    """
-    Calculate the overall priority of the feature based on the total score of
-    the unweighted factor values calculated for this feature.
-    """
-    if score < LOWSCORE_BREAKPOINT:
-        sdss_priority = "Low"
-    elif score >= LOWSCORE_BREAKPOINT and score < MEDIUMSCORE_BREAKPOINT:
-        sdss_priority = "Medium"
-    else:
-        sdss_priority = "High"
-    return sdss_priority
-
-
 # Global variables
 # User Input parameters
 LOGLEVEL = str(arcpy.GetParameterAsText(0)).upper()
@@ -268,15 +108,34 @@ POI_WEIGHT = int(arcpy.GetParameterAsText(12))
 RIVERS_WEIGHT = int(arcpy.GetParameterAsText(13))
 SLOPE_WEIGHT = int(arcpy.GetParameterAsText(14))
 POPULATION_WEIGHT = int(arcpy.GetParameterAsText(15))
+INCREMENTAL = arcpy.GetParameterAsText(16) # Boolean result received as text
+CACHE_DIR = arcpy.GetParameterAsText(17) # Folder for the grade cache
+OUTPUT_MODE = str(arcpy.GetParameterAsText(18)).upper() # FEATURE CLASS or TABLE
+JOIN_LAYERFILE = arcpy.GetParameterAsText(19) # Optional layer file of the join
+ENGINE = str(arcpy.GetParameterAsText(20)).upper() # Optional extra MCDA engine
+PREFERENCE_THRESHOLD = arcpy.GetParameterAsText(21) # PROMETHEE II linear threshold
 
 arcpy.env.addOutputsToMap = False # Set this with user input?
-getcontext().prec = 4 # Set decimal precision
+if not CACHE_DIR:
+    CACHE_DIR = arcpy.env.scratchFolder
+TABLE_OUTPUT = OUTPUT_MODE == 'TABLE'
+SCORE_OID_FIELD = 'DHA_OID' # Source Object ID field of a score table
+if ENGINE == 'WEIGHTED SUM':
+    ENGINE = ''
+if PREFERENCE_THRESHOLD:
+    PREFERENCE_THRESHOLD = float(PREFERENCE_THRESHOLD)
+else:
+    PREFERENCE_THRESHOLD = 0
+ENGINE_FIELDS = [('ENGINESCORE', 'DOUBLE'), ('ENGINERANK', 'LONG')]
 REQUIRED_FIELDS = ['LANDCOVER', 'ASPECT', 'INFRASTRUCTURE', 'KEYFEATURES',
                    'ACCIDENTS', 'POI', 'RIVERS', 'SLOPE', 'POPULATION',
                    'SCORE', 'RANKING', 'LANDCOVERWEIGHT', 'ASPECTWEIGHT',
                    'INFRASTRUCTUREWEIGHT', 'KEYFEATURESWEIGHT',
                    'ACCIDENTSWEIGHT', 'POIWEIGHT', 'RIVERSWEIGHT',
                    'SLOPEWEIGHT', 'POPULATIONWEIGHT', 'WEIGHTEDSCORE']
+if TABLE_OUTPUT:
+    # The score and weight fields are created in the new table instead
+    REQUIRED_FIELDS = REQUIRED_FIELDS[:9]
 
 # Tool configuration:
 # Set up the logging parameters and inform the user
@@ -310,12 +169,16 @@ try:
                    KEYFEATURES_WEIGHT, ACCIDENTS_WEIGHT, POI_WEIGHT,
                    RIVERS_WEIGHT, SLOPE_WEIGHT, POPULATION_WEIGHT]
 
-    if check_weights_same(WEIGHT_LIST):
+    if check_weights_same(WEIGHT_LIST, LOGGER):
         LOGGER.debug("Decision weights are spread over three or more values")
     else:
         LOGGER.error("Please assign more unique decision weights.")
         raise arcpy.ExecuteError
 
+    if ENGINE and ENGINE not in ENGINES:
+        LOGGER.error("Unknown MCDA engine: " + ENGINE)
+        raise arcpy.ExecuteError
+
     # Check if the source feature class has the required attribute fields.
     for checkfield in REQUIRED_FIELDS:
         if not fieldexist(HAZAREA_FC, checkfield):
@@ -323,13 +186,6 @@ try:
             LOGGER.error("The field "+ checkfield +" does not exist.")
             raise arcpy.ExecuteError
 
-    # Adjust the fields list to include the Object ID and Shape data
-    LOGGER.info("Adding OBJECTID to REQUIRED_FIELDS")
-    # Insert the fields at the start of the list to obtain the required
-    # field ordering
-    REQUIRED_FIELDS.insert(0, 'OBJECTID')
-    FIELDLIST = REQUIRED_FIELDS
-
     # We need data to work with, so let's check first if it has any content
     if int(arcpy.GetCount_management(HAZAREA_FC)[0]) == 0:
         LOGGER.error("{0} has no features. Please use a feature class \
@@ -338,103 +194,136 @@ try:
 
     # Get the total number of records
     RECORD_COUNT = int(arcpy.GetCount_management(HAZAREA_FC).getOutput(0))
-    COUNTER = 0
     LOGGER.info("Total number of hazard features: " + str(RECORD_COUNT))
 
     LOGGER.info("Starting with the SDSS Rating Analysis")
     START_TIME = time.time()
 
-    LOGGER.debug("Copying the Source FC to its new location")
-    arcpy.Copy_management(HAZAREA_FC, TARGET_FC)
+    # Read all nine factor columns of the source in a single cursor pass
+    LOGGER.info("Reading the factor values of the Source FC")
+    OIDS, FACTOR_VALUES = read_factor_columns(HAZAREA_FC)
+    LOGGER.debug("Factor values read for " + str(len(OIDS)) + " features")
+    # A blank output mode writes a feature class, so fingerprint it as one
+    FINGERPRINT = fingerprint_factors(OIDS, FACTOR_VALUES, BAREAREA_CODE,
+                                      HAZAREA_FC,
+                                      'TABLE' if TABLE_OUTPUT else
+                                      'FEATURE CLASS')
+    LOGGER.debug("Factor values fingerprint: " + FINGERPRINT)
+    BREAKPOINTS = [LOWSCORE_BREAKPOINT, MEDIUMSCORE_BREAKPOINT]
+
+    # Reuse the cached grades if the Target FC was scored from the same
+    # factor values, so that only the changed columns need to be rewritten
+    CACHE_FILE = grade_cache_path(CACHE_DIR, TARGET_FC)
+    LOGGER.debug("Grade cache file: " + CACHE_FILE)
+    CACHE = None
+    if INCREMENTAL == 'true':
+        if arcpy.Exists(TARGET_FC):
+            CACHE = load_grade_cache(CACHE_FILE)
+        if CACHE is None:
+            LOGGER.info("No grade cache found for the Target FC")
+        elif CACHE['fingerprint'] != FINGERPRINT:
+            LOGGER.info("The factor values, Source FC or output mode "
+                        "changed since the last run")
+            CACHE = None
+    # The cache describes the Target FC as last written, so drop it until
+    # this run has written all its values
+    clear_grade_cache(CACHE_FILE)
+
+    if CACHE is None:
+        if TABLE_OUTPUT:
+            # The table is written in full once the scores are known
+            if arcpy.Exists(TARGET_FC):
+                LOGGER.debug("Deleting the existing score table")
+                arcpy.Delete_management(TARGET_FC)
+        else:
+            LOGGER.debug("Copying the Source FC to its new location")
+            arcpy.Copy_management(HAZAREA_FC, TARGET_FC)
+            # A copy need not keep the Object IDs of the Source FC, e.g.
+            # of a shapefile, so read the rows back from the Target FC
+            OIDS, FACTOR_VALUES = read_factor_columns(TARGET_FC, 'OID@')
+
+        # Grade all the features at once
+        LOGGER.info("Grading the factor values")
+        GRADES = grade_matrix(FACTOR_VALUES, BAREAREA_CODE)
+    else:
+        LOGGER.info("Reusing the cached grades of the Target FC")
+        OIDS = CACHE['oids']
+        GRADES = CACHE['grades']
+    WRITE_SCORE, WRITE_RANKING, WRITE_WEIGHTS = changed_columns(
+        CACHE, WEIGHT_LIST, BREAKPOINTS)
 
     LOGGER.debug("Starting the processing of the Target FC")
 
-    with arcpy.da.UpdateCursor(TARGET_FC, FIELDLIST) as cursor:
-         #Loop through Hazard FC
-        for row in cursor:
-            # Display progress information
-            COUNTER += 1
-            # See https://docs.python.org/2.7/library/decimal.html
-            pctDone = Decimal(COUNTER)/Decimal(RECORD_COUNT) * 100
-            LOGGER.info("Processing OID " + str(row[0]) + ", with SCORE of "+
-                        str(row[10]) + ". " + str(COUNTER) + " of " +
-                        str(RECORD_COUNT) + " or " + str(pctDone) + " %")
-            #Land Cover Grade
-            gradeLandcover = landcover_calc(row[1])
-            LOGGER.debug("Land Cover grading: " + str(gradeLandcover))
-            #Aspect Grade
-            gradeAspect = aspect_calc(row[2])
-            LOGGER.debug("Aspect grading: " + str(gradeAspect))
-            #Infrastructure Grade
-            gradeInfrastructure = infrastructure_calc(row[3])
-            LOGGER.debug("Infrastructure grading: " + str(gradeInfrastructure))
-            #Key Features
-            gradeKeyFeatures = keyfeatures_calc(row[4])
-            LOGGER.debug("Key Features grading: " + str(gradeKeyFeatures))
-            #Accidents
-            gradeAccidents = accidents_calc(row[5])
-            LOGGER.debug("Accidents grading: " + str(gradeAccidents))
-            #POI
-            gradePOI = poi_calc(row[6])
-            LOGGER.debug("POI grading: " + str(gradePOI))
-            #Rivers
-            gradeRivers = rivers_calc(row[7])
-            LOGGER.debug("Rivers grading: " + str(gradeRivers))
-            #Slope
-            gradeSlope = slope_calc(row[8])
-            LOGGER.debug("Slope grading: " + str(gradeSlope))
-            #Population affected
-            gradePopulation = population_calc(row[9])
-            LOGGER.debug("Population grading: " + str(gradePopulation))
-            #Final Score and Ranking Calculation
-            finalScore = (gradeLandcover + gradeAspect + gradeInfrastructure +
-                          gradeKeyFeatures + gradeAccidents + gradePOI +
-                          gradeRivers + gradeSlope + gradePopulation)
-            finalRanking = sdss_priority_calc(finalScore)
-            LOGGER.info("The final score is: " + str(finalScore) +
-                        ", and the final ranking is: " + str(finalRanking))
-            # Assign the new values to the SCORE and RANKING fields
-            LOGGER.debug("Updating the row with the SCORE and RANKING values")
-            row[10] = finalScore
-            row[11] = finalRanking
-            # Assign the weights values supplied for all the factors
-            LOGGER.debug("Adding the WEIGHTS and WEIGHTED SCORE values")
-            row[12] = LANDCOVER_WEIGHT
-            row[13] = ASPECT_WEIGHT
-            row[14] = INFRASTRUCTURE_WEIGHT
-            row[15] = KEYFEATURES_WEIGHT
-            row[16] = ACCIDENTS_WEIGHT
-            row[17] = POI_WEIGHT
-            row[18] = RIVERS_WEIGHT
-            row[19] = SLOPE_WEIGHT
-            row[20] = POPULATION_WEIGHT
-            #Weighted Land cover
-            wLandCover = gradeLandcover * LANDCOVER_WEIGHT
-            #Weighted Aspect
-            wAspect = gradeAspect * ASPECT_WEIGHT
-            #Weighted Infrastructure
-            wInfrastructure = gradeInfrastructure * INFRASTRUCTURE_WEIGHT
-            #Weighted Key Features
-            wKeyFeatures = gradeKeyFeatures * KEYFEATURES_WEIGHT
-            #Weighted Accidents
-            wAccidents = gradeAccidents * ACCIDENTS_WEIGHT
-            #Weighted POI
-            wPOI = gradePOI * POI_WEIGHT
-            #Weighted Rivers / Water Basins
-            wRivers = gradeRivers * RIVERS_WEIGHT
-            #Weighted Slope
-            wSlope = gradeSlope * SLOPE_WEIGHT
-            #Weighted Population Potentially Affected
-            wPop = gradePopulation * POPULATION_WEIGHT
-            #Calculate Weighted Score by adding weighted aspect values
-            weigthedScore = (wLandCover + wAspect + wInfrastructure +
-                             wKeyFeatures + wAccidents + wPOI + wRivers +
-                             wSlope + wPop)
-            LOGGER.info("The weighted score is: "+ str(weigthedScore))
-            # Assign the Weighted Score
-            row[21] = weigthedScore
-            # Update the row
-            cursor.updateRow(row)
+    # Score and rank all the features at once
+    LOGGER.info("Calculating the SCORE, RANKING and WEIGHTEDSCORE values")
+    SCORES = unweighted_scores(GRADES)
+    RANKINGS = priority_rankings(SCORES, LOWSCORE_BREAKPOINT,
+                                 MEDIUMSCORE_BREAKPOINT)
+    WEIGHTED_SCORES = weighted_scores(GRADES, WEIGHT_LIST)
+    for ranking in ["Low", "Medium", "High"]:
+        LOGGER.info(ranking + " priority features: " +
+                    str(int((RANKINGS == ranking).sum())))
+
+    # Assign the changed SCORE, RANKING, weights and WEIGHTEDSCORE values in
+    # one update pass
+    SCORE_COLUMNS = []
+    if WRITE_SCORE:
+        SCORE_COLUMNS.append(('SCORE', SCORES))
+    if WRITE_RANKING:
+        SCORE_COLUMNS.append(('RANKING', RANKINGS))
+    if WRITE_WEIGHTS:
+        for weightfield, weight in zip(WEIGHT_FIELDS, WEIGHT_LIST):
+            SCORE_COLUMNS.append((weightfield, [weight] * len(OIDS)))
+        SCORE_COLUMNS.append(('WEIGHTEDSCORE', WEIGHTED_SCORES))
+    if ENGINE:
+        # The engine scores are cheap next to the I/O, so always rewrite them
+        LOGGER.info("Calculating the " + ENGINE + " scores and ranks")
+        ENGINE_SCORES, ENGINE_RANKS = engine_scores(GRADES, WEIGHT_LIST,
+                                                    ENGINE,
+                                                    PREFERENCE_THRESHOLD)
+        SCORE_COLUMNS.append(('ENGINESCORE', ENGINE_SCORES))
+        SCORE_COLUMNS.append(('ENGINERANK', ENGINE_RANKS))
+        if not TABLE_OUTPUT or CACHE is not None:
+            for enginefield, fieldtype in ENGINE_FIELDS:
+                if not fieldexist(TARGET_FC, enginefield):
+                    LOGGER.debug("Adding the field " + enginefield)
+                    arcpy.AddField_management(TARGET_FC, enginefield,
+                                              fieldtype)
+
+    if TABLE_OUTPUT and CACHE is None:
+        LOGGER.info("Writing the score table " + TARGET_FC)
+        UPDATED_COUNT = write_score_table(TARGET_FC, OIDS, SCORE_COLUMNS,
+                                          SCORE_OID_FIELD)
+        LOGGER.info("Wrote " + str(UPDATED_COUNT) + " score rows")
+    elif SCORE_COLUMNS:
+        LOGGER.debug("Updating the fields " +
+                     str([column[0] for column in SCORE_COLUMNS]))
+        if TABLE_OUTPUT:
+            UPDATED_COUNT = write_score_columns(TARGET_FC, OIDS, SCORE_COLUMNS,
+                                                SCORE_OID_FIELD)
+        else:
+            UPDATED_COUNT = write_score_columns(TARGET_FC, OIDS, SCORE_COLUMNS,
+                                                'OID@')
+        LOGGER.info("Updated " + str(UPDATED_COUNT) + " features")
+        if UPDATED_COUNT != len(OIDS):
+            LOGGER.error("Only " + str(UPDATED_COUNT) + " of " +
+                         str(len(OIDS)) + " rows of the Target FC could be "
+                         "matched. Please rerun without INCREMENTAL.")
+            raise arcpy.ExecuteError
+    else:
+        LOGGER.info("The weights and breakpoints are unchanged.")
+
+    if TABLE_OUTPUT and JOIN_LAYERFILE:
+        LOGGER.info("Saving the join to the Source FC geometry as " +
+                    JOIN_LAYERFILE)
+        make_score_join_layer(HAZAREA_FC, TARGET_FC, "ScoreJoinLayer",
+                              JOIN_LAYERFILE, SCORE_OID_FIELD)
+
+    # Always record what was written, so that a later incremental run or
+    # get_top_priorities never trusts the settings of an older run
+    save_grade_cache(CACHE_FILE, FINGERPRINT, OIDS, GRADES, WEIGHT_LIST,
+                     BREAKPOINTS)
+
     STOP_TIME = time.time()
     LOGGER.info("Total execution time in seconds = " +
                 str(int(STOP_TIME-START_TIME)) + " and in minutes = " +
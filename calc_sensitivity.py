@@ -0,0 +1,178 @@
+#------------------------------------------------------------------------------
+# Name:        calc_sensitivity
+# Purpose:     Test the stability of the priority rankings under many sets of
+#              factor weights.
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Grade the hazard areas once and score them under every weight vector listed
+in a CSV file, without copying the feature class. For each hazard area the
+tool reports its best, worst and mean rank by weighted score, the rank spread
+and how often it lands in the Low, Medium and High RANKING classes. The
+weighted score is rescaled by the mean weight before the score breakpoints
+are applied, so equal weights reproduce the RANKING of calc_score.
+"""
+
+#Import libraries
+import logging
+import logging.handlers
+import time # For timing purposes
+import arcpy
+from mcda_scoring import (check_weights_same, read_factor_columns,
+                          grade_matrix, write_score_table, FACTOR_FIELDS)
+from mcda_sensitivity import read_weight_vectors, sweep_weights
+
+# Functions and classes
+# Adapted from:
+# http://gis.stackexchange.com/questions/135920/arcpy-logging-error-messages
+class ArcPyLogHandler(logging.handlers.RotatingFileHandler):
+    """
+    Custom logging class that bounces messages to the arcpy tool window and
+    reflects back to the log file.
+    """
+    def emit(self, record):
+        """
+        Write the log message to the tool output window (stdout) and log file.
+        """
+        try:
+            msg = record.msg.format(record.args)
+        #except:
+        except Exception as inst:
+            # Log the exception type and all error messages returned
+            LOGGER.error(type(inst))
+            LOGGER.error(arcpy.GetMessages())
+            msg = record.msg
+
+        if record.levelno >= logging.ERROR:
+            arcpy.AddError(msg)
+        elif record.levelno >= logging.WARNING:
+            arcpy.AddWarning(msg)
+        elif record.levelno >= logging.INFO:
+            arcpy.AddMessage(msg)
+
+        super(ArcPyLogHandler, self).emit(record)
+
+# Adapted from:
+# http://bjorn.kuiper.nu/2011/04/21/tips-tricks-fieldexists-for-arcgis-10-python
+def fieldexist(featureclass, fieldname):
+    """
+    Test for the existence of fieldname in featureclass. Returns True if the
+    field exists and False if it does not.
+    """
+    fieldlist = arcpy.ListFields(featureclass, fieldname)
+    fieldcount = len(fieldlist)
+    return bool(fieldcount == 1)
+
+# Global variables
+# User Input parameters
+LOGLEVEL = str(arcpy.GetParameterAsText(0)).upper()
+LOGDIR = arcpy.GetParameterAsText(1)
+HAZAREA_FC = arcpy.GetParameterAsText(2) # Source of DHA polygons with their criteria data
+OUTPUT_TABLE = arcpy.GetParameterAsText(3) # New table to store the sweep results
+LOWSCORE_BREAKPOINT = int(arcpy.GetParameterAsText(4))  # Defines the low score breakpoint
+MEDIUMSCORE_BREAKPOINT = int(arcpy.GetParameterAsText(5)) # Defines the Medium score breakpoint
+BAREAREA_CODE = int(arcpy.GetParameterAsText(6)) # Defines the bare area land cover code
+WEIGHTS_FILE = arcpy.GetParameterAsText(7) # CSV file with one weight vector per row
+CHUNK_SIZE = arcpy.GetParameterAsText(8) # Weight vectors scored per matrix product
+
+arcpy.env.addOutputsToMap = False
+REQUIRED_FIELDS = FACTOR_FIELDS
+if CHUNK_SIZE:
+    CHUNK_SIZE = int(CHUNK_SIZE)
+else:
+    CHUNK_SIZE = 1000
+
+# Tool configuration:
+# Set up the logging parameters and inform the user
+DATE_STRING = time.strftime("%Y%m%d")
+LOGFILE = unicode(LOGDIR + '\\'+ DATE_STRING +
+                  '_mcdatool.log').encode('unicode-escape')
+MAXBYTES = 10485760 # 10MB
+BACKUPCOUNT = 10
+# Change this variable to a unique identifier for each script it runs in.
+# Cannot use LOGGER.findCaller(), as we're calling from an embedded script in
+# the Python toolbox.
+LOGSTAMP = "CalcSensitivity" # Identifies the source of the log entries
+LOGGER = logging.getLogger(LOGSTAMP)
+HANDLER = ArcPyLogHandler(LOGFILE, MAXBYTES, BACKUPCOUNT)
+FORMATTER = logging.Formatter("%(asctime)s %(name)-15s %(levelname)-8s %(message)s")
+HANDLER.setFormatter(FORMATTER)
+LOGGER.addHandler(HANDLER)
+LOGGER.setLevel(LOGLEVEL)
+LOGGER.debug("------- START LOGGING-----------")
+# Use the default arcpy.AddMessage method to only show this in the tool output
+# window, otherwise we will log it to the log file too.
+arcpy.AddMessage("Your Log file is: " + LOGFILE)
+
+# Put everything in a try/finally statement, so that we can close the logger
+# even if the script bombs out or we raise an execution error along the line
+try:
+    # Sanity checks:
+
+    # Check if the source feature class has the required attribute fields.
+    for checkfield in REQUIRED_FIELDS:
+        if not fieldexist(HAZAREA_FC, checkfield):
+            LOGGER.debug("Check for field: " + checkfield)
+            LOGGER.error("The field "+ checkfield +" does not exist.")
+            raise arcpy.ExecuteError
+
+    # We need data to work with, so let's check first if it has any content
+    if int(arcpy.GetCount_management(HAZAREA_FC)[0]) == 0:
+        LOGGER.error("{0} has no features. Please use a feature class \
+                       that contains data.".format(HAZAREA_FC))
+        raise arcpy.ExecuteError
+
+    # Read the weight vectors and check each one like calc_score does
+    LOGGER.info("Reading the weight vectors from " + WEIGHTS_FILE)
+    try:
+        WEIGHT_VECTORS = read_weight_vectors(WEIGHTS_FILE)
+    except ValueError as err:
+        LOGGER.error("Unable to read the weights file: " + str(err))
+        raise arcpy.ExecuteError
+    if len(WEIGHT_VECTORS) == 0:
+        LOGGER.error("The weights file does not contain any weight vectors.")
+        raise arcpy.ExecuteError
+    for vectornumber, weightvector in enumerate(WEIGHT_VECTORS.tolist(), 1):
+        if not check_weights_same(weightvector, LOGGER):
+            LOGGER.error("Weight vector " + str(vectornumber) + " " +
+                         str(weightvector) + " needs more unique weights.")
+            raise arcpy.ExecuteError
+    LOGGER.info("Number of weight vectors: " + str(len(WEIGHT_VECTORS)))
+
+    LOGGER.info("Starting with the weight sensitivity sweep")
+    START_TIME = time.time()
+
+    # Grade the hazard areas once; every weight vector reuses the matrix
+    LOGGER.info("Reading and grading the factor values")
+    OIDS, FACTOR_VALUES = read_factor_columns(HAZAREA_FC)
+    GRADES = grade_matrix(FACTOR_VALUES, BAREAREA_CODE)
+    LOGGER.info("Total number of hazard features: " + str(len(OIDS)))
+
+    LOGGER.info("Scoring the weight vectors in chunks of " + str(CHUNK_SIZE))
+    SWEEP_COLUMNS = sweep_weights(GRADES, WEIGHT_VECTORS, LOWSCORE_BREAKPOINT,
+                                  MEDIUMSCORE_BREAKPOINT, CHUNK_SIZE)
+    SPREAD = dict(SWEEP_COLUMNS)['RANKSPREAD']
+    LOGGER.info("Largest rank spread: " + str(int(SPREAD.max())))
+    LOGGER.info("Features with a stable rank: " + str(int((SPREAD == 0).sum())))
+
+    LOGGER.info("Writing the sweep results to " + OUTPUT_TABLE)
+    write_score_table(OUTPUT_TABLE, OIDS, SWEEP_COLUMNS)
+
+    STOP_TIME = time.time()
+    LOGGER.info("Total execution time in seconds = " +
+                str(int(STOP_TIME-START_TIME)) + " and in minutes = " +
+                str(int(STOP_TIME-START_TIME)/60))
+
+finally:
+    # Shut down logging after script has finished running.
+    #http://stackoverflow.com/questions/24816456/python-logging-wont-shutdown
+    LOGGER.debug("------- STOP LOGGING-----------")
+    LOGGER.removeHandler(HANDLER)
+    HANDLER.close()
+    logging.shutdown()
@@ -0,0 +1,228 @@
+#------------------------------------------------------------------------------
+# Name:        calc_uncertainty
+# Purpose:     Monte Carlo analysis of the priority rankings under uncertain
+#              factor weights.
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Sample factor weight vectors around the calc_score weights from user-defined
+distributions and report, for each hazard area, its rank percentiles and the
+probability of each RANKING class. Ranks are accumulated in per-row sketches
+in chunks, optionally across several worker processes, so no individual
+ranking is ever stored.
+"""
+
+#Import libraries
+import logging
+import logging.handlers
+import time # For timing purposes
+import arcpy
+from mcda_parallel import worker_count
+from mcda_scoring import (check_weights_same, read_factor_columns,
+                          grade_matrix, write_score_table, FACTOR_FIELDS)
+from mcda_uncertainty import (factor_distributions, simulate_weights,
+                              uncertainty_columns)
+
+# Functions and classes
+# Adapted from:
+# http://gis.stackexchange.com/questions/135920/arcpy-logging-error-messages
+class ArcPyLogHandler(logging.handlers.RotatingFileHandler):
+    """
+    Custom logging class that bounces messages to the arcpy tool window and
+    reflects back to the log file.
+    """
+    def emit(self, record):
+        """
+        Write the log message to the tool output window (stdout) and log file.
+        """
+        try:
+            msg = record.msg.format(record.args)
+        #except:
+        except Exception as inst:
+            # Log the exception type and all error messages returned
+            LOGGER.error(type(inst))
+            LOGGER.error(arcpy.GetMessages())
+            msg = record.msg
+
+        if record.levelno >= logging.ERROR:
+            arcpy.AddError(msg)
+        elif record.levelno >= logging.WARNING:
+            arcpy.AddWarning(msg)
+        elif record.levelno >= logging.INFO:
+            arcpy.AddMessage(msg)
+
+        super(ArcPyLogHandler, self).emit(record)
+
+# Adapted from:
+# http://bjorn.kuiper.nu/2011/04/21/tips-tricks-fieldexists-for-arcgis-10-python
+def fieldexist(featureclass, fieldname):
+    """
+    Test for the existence of fieldname in featureclass. Returns True if the
+    field exists and False if it does not.
+    """
+    fieldlist = arcpy.ListFields(featureclass, fieldname)
+    fieldcount = len(fieldlist)
+    return bool(fieldcount == 1)
+
+# Global variables
+# User Input parameters
+LOGLEVEL = str(arcpy.GetParameterAsText(0)).upper()
+LOGDIR = arcpy.GetParameterAsText(1)
+HAZAREA_FC = arcpy.GetParameterAsText(2) # Source of DHA polygons with their criteria data
+OUTPUT_TABLE = arcpy.GetParameterAsText(3) # New table to store the results
+LOWSCORE_BREAKPOINT = int(arcpy.GetParameterAsText(4))  # Defines the low score breakpoint
+MEDIUMSCORE_BREAKPOINT = int(arcpy.GetParameterAsText(5)) # Defines the Medium score breakpoint
+BAREAREA_CODE = int(arcpy.GetParameterAsText(6)) # Defines the bare area land cover code
+LANDCOVER_WEIGHT = int(arcpy.GetParameterAsText(7))
+ASPECT_WEIGHT = int(arcpy.GetParameterAsText(8))
+INFRASTRUCTURE_WEIGHT = int(arcpy.GetParameterAsText(9))
+KEYFEATURES_WEIGHT = int(arcpy.GetParameterAsText(10))
+ACCIDENTS_WEIGHT = int(arcpy.GetParameterAsText(11))
+POI_WEIGHT = int(arcpy.GetParameterAsText(12))
+RIVERS_WEIGHT = int(arcpy.GetParameterAsText(13))
+SLOPE_WEIGHT = int(arcpy.GetParameterAsText(14))
+POPULATION_WEIGHT = int(arcpy.GetParameterAsText(15))
+# Per-factor distributions, e.g. "ASPECT NORMAL 4 1;SLOPE UNIFORM 2 6"
+WEIGHT_DISTRIBUTIONS = arcpy.GetParameterAsText(16)
+# Distribution of the factors not listed above, e.g. "PERCENT 25"
+DEFAULT_DISTRIBUTION = arcpy.GetParameterAsText(17)
+SAMPLE_COUNT = int(arcpy.GetParameterAsText(18)) # Number of weight vectors
+CHUNK_SIZE = arcpy.GetParameterAsText(19) # Weight vectors per chunk
+WORKER_COUNT = worker_count(arcpy.GetParameterAsText(20)) # Blank runs serially
+RANDOM_SEED = arcpy.GetParameterAsText(21) # Seed to repeat a run
+
+arcpy.env.addOutputsToMap = False
+REQUIRED_FIELDS = FACTOR_FIELDS
+if CHUNK_SIZE:
+    CHUNK_SIZE = int(CHUNK_SIZE)
+else:
+    CHUNK_SIZE = 500
+if RANDOM_SEED:
+    RANDOM_SEED = int(RANDOM_SEED)
+else:
+    RANDOM_SEED = None
+
+# Tool configuration:
+# Set up the logging parameters and inform the user
+DATE_STRING = time.strftime("%Y%m%d")
+LOGFILE = unicode(LOGDIR + '\\'+ DATE_STRING +
+                  '_mcdatool.log').encode('unicode-escape')
+MAXBYTES = 10485760 # 10MB
+BACKUPCOUNT = 10
+# Change this variable to a unique identifier for each script it runs in.
+# Cannot use LOGGER.findCaller(), as we're calling from an embedded script in
+# the Python toolbox.
+LOGSTAMP = "CalcUncertainty" # Identifies the source of the log entries
+LOGGER = logging.getLogger(LOGSTAMP)
+HANDLER = ArcPyLogHandler(LOGFILE, MAXBYTES, BACKUPCOUNT)
+FORMATTER = logging.Formatter("%(asctime)s %(name)-15s %(levelname)-8s %(message)s")
+HANDLER.setFormatter(FORMATTER)
+LOGGER.addHandler(HANDLER)
+LOGGER.setLevel(LOGLEVEL)
+LOGGER.debug("------- START LOGGING-----------")
+# Use the default arcpy.AddMessage method to only show this in the tool output
+# window, otherwise we will log it to the log file too.
+arcpy.AddMessage("Your Log file is: " + LOGFILE)
+
+# Put everything in a try/finally statement, so that we can close the logger
+# even if the script bombs out or we raise an execution error along the line
+try:
+    # Sanity checks:
+
+    # Check if the central weights are not all the same value
+    WEIGHT_LIST = [LANDCOVER_WEIGHT, ASPECT_WEIGHT, INFRASTRUCTURE_WEIGHT,
+                   KEYFEATURES_WEIGHT, ACCIDENTS_WEIGHT, POI_WEIGHT,
+                   RIVERS_WEIGHT, SLOPE_WEIGHT, POPULATION_WEIGHT]
+
+    if check_weights_same(WEIGHT_LIST, LOGGER):
+        LOGGER.debug("Decision weights are spread over three or more values")
+    else:
+        LOGGER.error("Please assign more unique decision weights.")
+        raise arcpy.ExecuteError
+
+    # Parse the weight distributions, one "FACTOR DISTRIBUTION ..." entry
+    # per factor
+    DISTRIBUTION_SPECS = {}
+    for entry in WEIGHT_DISTRIBUTIONS.split(';'):
+        entry = entry.strip().strip("'\"")
+        if not entry:
+            continue
+        factor, dummy, spec = entry.partition(' ')
+        factor = factor.upper()
+        if factor not in FACTOR_FIELDS:
+            LOGGER.error("Unknown factor in weight distribution: " + entry)
+            raise arcpy.ExecuteError
+        DISTRIBUTION_SPECS[factor] = spec
+    try:
+        DISTRIBUTIONS = factor_distributions(DISTRIBUTION_SPECS, WEIGHT_LIST,
+                                             DEFAULT_DISTRIBUTION)
+    except ValueError as err:
+        LOGGER.error("Invalid weight distribution: " + str(err))
+        raise arcpy.ExecuteError
+    for factor, distribution in zip(FACTOR_FIELDS, DISTRIBUTIONS):
+        LOGGER.info(factor + " weight distribution: " + str(distribution))
+
+    # Check if the source feature class has the required attribute fields.
+    for checkfield in REQUIRED_FIELDS:
+        if not fieldexist(HAZAREA_FC, checkfield):
+            LOGGER.debug("Check for field: " + checkfield)
+            LOGGER.error("The field "+ checkfield +" does not exist.")
+            raise arcpy.ExecuteError
+
+    # We need data to work with, so let's check first if it has any content
+    if int(arcpy.GetCount_management(HAZAREA_FC)[0]) == 0:
+        LOGGER.error("{0} has no features. Please use a feature class \
+                       that contains data.".format(HAZAREA_FC))
+        raise arcpy.ExecuteError
+
+    LOGGER.info("Starting with the weight uncertainty analysis")
+    START_TIME = time.time()
+
+    LOGGER.info("Reading and grading the factor values")
+    OIDS, FACTOR_VALUES = read_factor_columns(HAZAREA_FC)
+    GRADES = grade_matrix(FACTOR_VALUES, BAREAREA_CODE)
+    LOGGER.info("Total number of hazard features: " + str(len(OIDS)))
+
+    LOGGER.info("Scoring " + str(SAMPLE_COUNT) + " weight samples in " +
+                "chunks of " + str(CHUNK_SIZE) + " using " +
+                str(WORKER_COUNT) + " process(es)")
+    SKETCH, INVERSE = simulate_weights(GRADES, DISTRIBUTIONS,
+                                       LOWSCORE_BREAKPOINT,
+                                       MEDIUMSCORE_BREAKPOINT, SAMPLE_COUNT,
+                                       CHUNK_SIZE, WORKER_COUNT, RANDOM_SEED)
+    if SKETCH.skipped:
+        LOGGER.warning("Skipped " + str(SKETCH.skipped) + " weight samples " +
+                       "in which every weight was zero")
+    if SKETCH.samples == 0:
+        LOGGER.error("Every weight sample was zero. Please widen the weight "
+                     "distributions.")
+        raise arcpy.ExecuteError
+    RESULT_COLUMNS = uncertainty_columns(SKETCH, INVERSE)
+    HIGH_PROBABILITY = dict(RESULT_COLUMNS)['HIGHPROB']
+    LOGGER.info("Features that are always High priority: " +
+                str(int((HIGH_PROBABILITY == 1).sum())))
+    LOGGER.info("Features that are sometimes High priority: " +
+                str(int(((HIGH_PROBABILITY > 0) &
+                         (HIGH_PROBABILITY < 1)).sum())))
+
+    LOGGER.info("Writing the results to " + OUTPUT_TABLE)
+    write_score_table(OUTPUT_TABLE, OIDS, RESULT_COLUMNS)
+
+    STOP_TIME = time.time()
+    LOGGER.info("Total execution time in seconds = " +
+                str(int(STOP_TIME-START_TIME)) + " and in minutes = " +
+                str(int(STOP_TIME-START_TIME)/60))
+
+finally:
+    # Shut down logging after script has finished running.
+    #http://stackoverflow.com/questions/24816456/python-logging-wont-shutdown
+    LOGGER.debug("------- STOP LOGGING-----------")
+    LOGGER.removeHandler(HANDLER)
+    HANDLER.close()
+    logging.shutdown()
@@ -22,8 +22,12 @@ based on the count:
 import logging
 import logging.handlers
 import time
-from decimal import Decimal, getcontext #For progress COUNTER
 import arcpy
+from mcda_breakpoints import ACCIDENTS_TABLE
+from mcda_buffer_cache import open_buffer_cache
+from mcda_parallel import worker_count
+from mcda_progress import ProgressReporter
+from mcda_spatial import load_sources, hazard_footprint, distance_counts
 
 # Functions and classes
 # Adapted from
@@ -116,17 +120,23 @@ ACC_FC1 = arcpy.GetParameterAsText(4)
 ACC_FC2 = arcpy.GetParameterAsText(5)
 BUFFER_DIST = arcpy.GetParameterAsText(6) # buffer distance in meters
 UPDATE_ONLY = arcpy.GetParameterAsText(7) # Boolean result received as text
+BUFFER_CACHE_DIR = arcpy.GetParameterAsText(8) # Optional buffer cache folder
+WORKERS = worker_count(arcpy.GetParameterAsText(9)) # Blank runs serially
+EXACT_COUNTS = arcpy.GetParameterAsText(10) # Boolean result received as text
 
 # Tool Parameters
 arcpy.env.addOutputsToMap = False
-getcontext().prec = 4 # Set decimal precision
 REQUIRED_FIELDS = ['ACCIDENTS', 'ACCIDENTS_BUFFER_DIST']
 FILTER_FIELD = "ACCIDENTS" # Which field must we filter on and check for?
 ACCIDENTS_LIST = [] # Empty list that will store the feature classes to process
-ACCIDENTSLIST_FEATLAYER = [] # Empty list that will store feature layers
 # Append the Meters qualifier required for the buffer distance parameter
 BUFFER_DISTM = BUFFER_DIST + " Meters"
-COUNTER = 0
+# Stop counting at the count from which the grade no longer changes, unless
+# exact counts are requested for reporting
+if EXACT_COUNTS == 'true':
+	COUNT_LIMIT = None
+else:
+	COUNT_LIMIT = ACCIDENTS_TABLE.saturation_count()
 
 # Tool configuration:
 # Set up the logging parameters and inform the user
@@ -216,11 +226,10 @@ try:
 			# Terminate the script
 			raise arcpy.ExecuteError
 
-	# Adjust the fields list to include the Object ID and Shape data
-	LOGGER.info("Adding OBJECTID and SHAPE@ fields to FIELDLIST")
-	# Insert the fields at the start of the list to obtain the required
+	# Adjust the fields list to include the Object ID
+	LOGGER.info("Adding the OBJECTID field to FIELDLIST")
+	# Insert the field at the start of the list to obtain the required
 	# field ordering
-	REQUIRED_FIELDS.insert(0,'SHAPE@')
 	REQUIRED_FIELDS.insert(0,'OBJECTID')
 	FIELDLIST = REQUIRED_FIELDS
 	LOGGER.debug("The FIELDLIST is now {0}".format(FIELDLIST))
@@ -237,68 +246,59 @@ try:
 		LOGGER.warning("The Hazard Areas FC does not contain any features.")
 		raise arcpy.ExecuteError
 
-	#Create feature layers out of Accidents FC
-	LIST_COUNT = 0
-	for item in ACCIDENTS_LIST:
-		LIST_COUNT += 1
-		# Dynamically generate a name for the Feature layer
-		itemFlayerName = "Flayer_" + str(LIST_COUNT)
-		LOGGER.debug("Adding Feature Layer: " + itemFlayerName)
-		arcpy.MakeFeatureLayer_management(item, itemFlayerName)
-		ACCIDENTSLIST_FEATLAYER.append(itemFlayerName)
-
-	LOGGER.info("Starting with the Features' processing....")
+	# Read every source feature class once into an in-memory spatial index,
+	# projected to the spatial reference of the hazard areas
+	LOGGER.info("Loading the source features into memory")
+	HAZARD_SR = arcpy.Describe(HAZAREA_FC).spatialReference
+	# Drop the source features outside the buffered hazard area envelopes
+	FOOTPRINT = hazard_footprint(HAZAREA_FC, BUFFER_DIST, QRY_FILTER,
+								 HAZARD_SR)
+	ACCIDENT_SOURCES = load_sources(ACCIDENTS_LIST, HAZARD_SR, FOOTPRINT)
+	for source in ACCIDENT_SOURCES:
+		LOGGER.debug(source.name + " features loaded: " +
+					 str(len(source)) + ", skipped outside the hazard areas: " +
+					 str(source.skipped))
+
+	# Count the source features within the buffer distance of every hazard
+	# area, summed over the source feature classes. Point sources around
+	# geographic hazard areas are measured geodesically without buffers.
+	LOGGER.info("Counting the features within " + BUFFER_DISTM)
+	PROGRESS = ProgressReporter(LOGGER, RECORD_COUNT * len(ACCIDENT_SOURCES),
+								"Accidents proximity")
+	BUFFER_CACHE = open_buffer_cache(BUFFER_CACHE_DIR)
+	try:
+		OIDS, COUNTS = distance_counts(HAZAREA_FC, ACCIDENT_SOURCES, BUFFER_DIST,
+									   QRY_FILTER, PROGRESS, BUFFER_CACHE,
+									   WORKERS, COUNT_LIMIT)
+	finally:
+		if BUFFER_CACHE is not None:
+			LOGGER.info("Buffer cache hits: " + str(BUFFER_CACHE.hits) +
+						", misses: " + str(BUFFER_CACHE.misses))
+			BUFFER_CACHE.close()
+	PROGRESS.finish()
+	ACCIDENT_COUNTS = dict(zip(OIDS.tolist(), COUNTS.tolist()))
+
+	LOGGER.info("Updating the hazard areas")
 	with arcpy.da.UpdateCursor(HAZAREA_FC, FIELDLIST, QRY_FILTER) as cursor:
 		for row in cursor:
-			#Loop through Hazard Areas FC
-			COUNTER += 1
-			pctDone = Decimal(COUNTER)/Decimal(RECORD_COUNT) *100
-			LOGGER.info("Processing OID " + str(row[0]) +
-							 ", with ACCIDENTS grading of " + str(row[2]) +
-							 ". Feature " + str(COUNTER) + " of " +
-							 str(RECORD_COUNT) + " or " + str(pctDone) + " %")
-
-			# Now loop over items in Accidents list and tally up the total
-			# Select the current feature from original Hazard FC
-			arcpy.SelectLayerByAttribute_management("inputHazard",
-													"NEW_SELECTION",
-													"OBJECTID = " + str(row[0]))
-
-			# Initialize the COUNTER, with its local scope, to zero
-			TOTAL_ACCIDENTS = 0
-			# Now loop through Accidents feature layers and get the intersection
-			for fc in ACCIDENTSLIST_FEATLAYER:
-				LOGGER.debug("Now processing Feature Layer : " + fc)
-				# Takes longer due to the buffering done as part of each query.
-				# But faster than clipping source and using that.
-				TEMP = arcpy.SelectLayerByLocation_management(fc,
-															  "WITHIN_A_DISTANCE_GEODESIC",
-															  "inputHazard",
-															  BUFFER_DISTM,
-															  "")
-				# Count the rows and add it to the COUNTER
-				TOTAL_ACCIDENTS = int(arcpy.GetCount_management(TEMP).getOutput(0))
-
-			LOGGER.debug("ROW TOTAL_ACCIDENTS is: " + str(TOTAL_ACCIDENTS))
-			# Update the row with the accidents sum
-			# Cast to integer to ensure we deal with integer values
-			TOTAL_ACCIDENTS = int(TOTAL_ACCIDENTS)
-
-			# Calculate the grading. A case statement would have been handy.
-			if TOTAL_ACCIDENTS == 0:
-				gradeAccidents = 0
-			elif TOTAL_ACCIDENTS == 1:
-				gradeAccidents = 1
-			elif TOTAL_ACCIDENTS == 2:
-				gradeAccidents = 2
-			else:
-				gradeAccidents = 3
-
-			LOGGER.info("Accidents grading: " + str(gradeAccidents))
+			TOTAL_ACCIDENTS = ACCIDENT_COUNTS.get(row[0])
+			if TOTAL_ACCIDENTS is None:
+				# No geometry, so leave the grading NULL for a later update
+				# only run to pick up
+				LOGGER.debug("Skipping OID " + str(row[0]) +
+						 " without a geometry")
+				continue
+			LOGGER.debug("Processing OID " + str(row[0]) + ", with " +
+						 str(TOTAL_ACCIDENTS) + " features in range")
+
+			# Calculate the grading from the shared breakpoint table
+			gradeAccidents = ACCIDENTS_TABLE.grade_value(TOTAL_ACCIDENTS)
+
+			LOGGER.debug("Accidents grading: " + str(gradeAccidents))
 			# Assign the new value to the Accidents field
-			row[2] = gradeAccidents
+			row[1] = gradeAccidents
 			# Assign the buffer distance to the Accidents buffer distance field
-			row[3] = BUFFER_DIST
+			row[2] = BUFFER_DIST
 			cursor.updateRow(row)
 
 	STOP_TIME = time.time()
@@ -10,16 +10,19 @@
 #------------------------------------------------------------------------------
 
 """
-Calculates the Aspect value for the Hazards Feature Class using the
-aspect raster dataset with the Get Cell Value Spatial Analysis Tool
+Calculates the Aspect value for the Hazards Feature Class by sampling the
+aspect raster dataset at the inside centroids of all the hazard areas at once,
+or with the circular mean aspect inside each hazard area in the zonal mode
 """
 
 #Import libraries
 import logging
 import logging.handlers
 import time
-from decimal import Decimal, getcontext #For progress COUNTER
 import arcpy
+from mcda_progress import ProgressReporter
+from mcda_raster import (circular_mean_aspect, inside_samples,
+                         zonal_statistics)
 
 # Functions and classes
 # Adapted from http://gis.stackexchange.com/questions/135920/arcpy-logging-error-messages
@@ -109,10 +112,10 @@ CHECK_PROJ = arcpy.GetParameterAsText(2) # Boolean result received as text
 HAZAREA_FC = arcpy.GetParameterAsText(3)
 ASPECT_RASTER = arcpy.GetParameterAsText(4)
 UPDATE_ONLY = arcpy.GetParameterAsText(5) # Boolean result received as text
+ZONAL_ASPECT = arcpy.GetParameterAsText(6) # Boolean result received as text
 
 # Tool Parameters
 arcpy.env.addOutputsToMap = False
-getcontext().prec = 4 # Set decimal precision
 REQUIRED_FIELD = "ASPECT" # Which field must we filter on and check for?
 
 # Tool configuration:
@@ -225,40 +228,42 @@ try:
         LOGGER.error("The feature class does not contain any features.")
         raise arcpy.ExecuteError
 
-    COUNTER = 0
-
+    if ZONAL_ASPECT == 'true':
+        # Take the circular mean of the aspect cells inside each hazard area
+        # polygon, so that 350 and 10 degrees average to north. Hazard areas
+        # without aspect data keep the default value of -2.0
+        LOGGER.info("Calculating the circular mean aspect inside the hazard "
+                    "areas")
+        ZONAL_PROGRESS = ProgressReporter(LOGGER, COUNT_RECORDS,
+                                          "Aspect zonal statistics")
+        CELLVALUES = zonal_statistics(HAZAREA_FC, ASPECT_RASTER,
+                                      circular_mean_aspect, -2.0, QRY_FILTER,
+                                      progress=ZONAL_PROGRESS)
+        ZONAL_PROGRESS.finish()
+    else:
+        # Sample the raster cells under all the inside centroids at once.
+        # Cells outside the raster or with NoData keep the default of -2.0
+        LOGGER.info("Sampling " + str(ASPECT_RASTER) +
+                    " at the inside centroids")
+        CELLVALUES = inside_samples(HAZAREA_FC, ASPECT_RASTER, -2.0,
+                                    QRY_FILTER)
+
+    PROGRESS = ProgressReporter(LOGGER, COUNT_RECORDS, "Aspect sampling")
     with arcpy.da.UpdateCursor(HAZAREA_FC, FIELDLIST, QRY_FILTER) as cursor:
         for row in cursor:
-            COUNTER += 1
-            # https://docs.python.org/3/library/decimal.html
-            pctDone = Decimal(COUNTER)/Decimal(COUNT_RECORDS) *100
-            LOGGER.info("Processing OID " + str(row[0]) +
-                        ", with current ASPECT value of "+ str(row[3]) +
-                        ". Feature " + str(COUNTER) + " of " +
-                        str(COUNT_RECORDS) + " or " + str(pctDone) + " %")
+            PROGRESS.update()
+            LOGGER.debug("Processing OID " + str(row[0]) +
+                         ", with current ASPECT value of "+ str(row[3]))
             # Print the coordinate tuple
             LOGGER.debug("X and Y: " + str(row[1]) + " " + str(row[2]))
-            # Set an initial default value
-            LOGGER.debug("Setting default value of -2 before row is processed")
-            cellvalue = -2.00
-            # Get the Cell Value from the Aspect Raster
-            try:
-                cellresult = arcpy.GetCellValue_management(ASPECT_RASTER,
-                                                           str(row[1]) + " " +
-                                                           str(row[2]))
-                # See http://gis.stackexchange.com/questions/55246/casting-arcpy-result-as-integer-instead-arcpy-getcount-management
-                cellvalue = float(cellresult.getOutput(0))
-                LOGGER.debug("The raster cell value is " + str(cellvalue))
-
-            except Exception as err:
-                arcpy.AddError(err.args[0])
-
-            row[3] = cellvalue
+            row[3] = CELLVALUES[row[0]]
             cursor.updateRow(row)
             LOGGER.debug("The aspect value is now: " + str(row[3]))
 
     # Calculate the execution time
     LOGGER.info("Aspect value calculation completed")
+    PROGRESS.finish()
+
     #print datetime.now()
     STOP_TIME = time.time()
     LOGGER.info("Total execution time in seconds = " +
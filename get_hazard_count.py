@@ -17,16 +17,20 @@ of three rows and three columns over the hazard polygon. Then tally the number
 of hazards intersecting with the hazard area, and locating hazard clusters
 within the extent of the hazard area. Record the number of hazards found in each
 of the nine polygons, which then represent the SW, S, SE, W, CENTER, E, NW, N
-and NE positions on the polygon.
+and NE positions on the polygon. The hazard points are read once into an
+aggregate quadtree, so each cell is counted without a selection and whole
+nodes of hazards inside the hazard area are added without visiting them.
 """
 
 #Import libraries
 import logging
 import logging.handlers
 import time # For timing purposes
-from decimal import Decimal, getcontext #For progress COUNTER
+import numpy as np
 import arcpy
-from arcpy import env
+from mcda_progress import ProgressReporter
+from mcda_quadtree import AggregateQuadtree, read_points
+from mcda_spatial import hazard_footprint, polygon_rings
 
 # Functions and classes
 # Adapted from:
@@ -121,13 +125,10 @@ UPDATE_ONLY = arcpy.GetParameterAsText(6) # Boolean result received as text
 
 # Tool Parameters
 arcpy.env.addOutputsToMap = False
-getcontext().prec = 4 # Set decimal precision
 REQUIRED_FIELDS = ['SW', 'S', 'SE', 'W', 'CENTER', 'E', 'NW', 'N', 'NE']
 FILTER_FIELD = 'SW' # Which field must we filter on and check for?
 # Use the SW field as a proxy for all nine fishnet (grid) cells
 HAZARDS_LIST = [] # Empty list that will store the feature classes to process
-HAZARDSLIST_FEATLAYER = [] # Empty list that will store the feature layers
-COUNTER = 0 # Global counter used for progress report
 
 # Tool configuration:
 # Set up the logging parameters and inform the user
@@ -160,43 +161,14 @@ else:
 LOGGER.debug("QRY_FILTER is: " + QRY_FILTER)
 
 
-# Fishnet creation parameters
-# Apply the source data projection to the fishnet feature class to ensure
-# consistent projection across the data sets
-PROJ = get_projection(HAZAREA_FC)
-# Set coordinate system of the fishnet
-env.outputCoordinateSystem = PROJ
-# In_memory storage of the fishnet, thus discarded after processing
-FISHNET_FC = "in_memory/fishnet3by3"
-# Use 0 for width and height as these values will be calculated by the tool
-# The number of rows and columns, together with origin and opposite corner, will
-# determine the size of each cell, which will vary but always provide nine cells
-CELL_SIZE_WIDTH = '0'
-CELL_SIZE_HEIGHT = '0'
-NUM_ROWS = '3'
-NUM_COLUMNS = '3'
-# Set the origin of the fishnet to a default value; update dynamically per row
-ORIGIN_COORDINATE = '0 0'
-# Set the orientation by specifying a point on the Y axis. Update in each row
-Y_AXIS_COORDINATE = '0 0'
-# Set the opposite corner of the fishnet to a default value; update in each row
-OPPOSITE_CORNER = '0 0'
-# Extent set by origin and opposite corner, no need for a template feature class
-TEMPLATE_EXTENT = '#'
-# Each output cell will be a polygon. Slower than polyline, but we're processing
-# one DHA at a time and using in_memory storage to improve performance
-GEOMETRY_TYPE = 'POLYGON'
-# Don't generate an additional feature class containing fishnet labels
-LABELS = 'NO_LABELS'
+# Number of fishnet rows and columns placed over each hazard area
+GRID_SIZE = 3
 
 # Put everything in a try/finally statement, so that we can close the logger
 # even if the script bombs out or we raise an execution error along the line
 try:
     # Sanity checks:
 
-    # Remove the in_memory fishnet in case the script was terminated unexpectedly
-    arcpy.Delete_management(FISHNET_FC)
-
     # Check if the target feature class has any features before we start
     if int(arcpy.GetCount_management(HAZAREA_FC)[0]) == 0:
         LOGGER.error("{0} has no features. Please use a feature class that \
@@ -230,6 +202,12 @@ try:
         else:
             HAZARDS_LIST.append(HAZARD_FC2)
 
+    # The hazards are counted as points
+    for item in HAZARDS_LIST:
+        if arcpy.Describe(item).shapeType != 'Point':
+            LOGGER.error("{0} is not a point feature class.".format(item))
+            raise arcpy.ExecuteError
+
     # Compare the spatial references of the input data sets, unless the user
     # actively chooses not to do so.
     LOGGER.info("Check for spatial reference mismatches? : " + CHECK_PROJ)
@@ -271,28 +249,31 @@ try:
         LOGGER.error("The Hazard Areas FC does not contain any features.")
         raise arcpy.ExecuteError
 
-    #Create feature layers out of Hazards FC
-    LIST_COUNT = 0
+    # Read the hazards of all the feature classes once into an aggregate
+    # quadtree, projected to the spatial reference of the hazard areas.
+    # Hazards outside the hazard area envelopes are never counted.
+    LOGGER.info("Loading the hazards into an aggregate quadtree")
+    HAZARD_SR = arcpy.Describe(HAZAREA_FC).spatialReference
+    FOOTPRINT = hazard_footprint(HAZAREA_FC, 0, QRY_FILTER, HAZARD_SR)
+    HAZARD_XS = []
+    HAZARD_YS = []
     for item in HAZARDS_LIST:
-        LIST_COUNT += 1
-        # Dynamically generate a name for the Feature layer
-        itemFlayerName = "Flayer_" + str(LIST_COUNT)
-        #arcpy.AddMessage("Adding Feature Layer: " + itemFlayerName)
-        arcpy.MakeFeatureLayer_management(item, itemFlayerName)
-        HAZARDSLIST_FEATLAYER.append(itemFlayerName)
+        ITEM_XS, ITEM_YS, _ = read_points(item, None, HAZARD_SR, None,
+                                          FOOTPRINT)
+        HAZARD_XS.append(ITEM_XS)
+        HAZARD_YS.append(ITEM_YS)
+    HAZARD_TREE = AggregateQuadtree(np.concatenate(HAZARD_XS),
+                                    np.concatenate(HAZARD_YS))
+    LOGGER.info("Hazards loaded: " + str(len(HAZARD_TREE)))
 
     LOGGER.info("Starting with the hazard areas processing....")
 
+    PROGRESS = ProgressReporter(LOGGER, RECORD_COUNT, "Hazard cell count")
     with arcpy.da.UpdateCursor(HAZAREA_FC, FIELDLIST, QRY_FILTER) as cursor:
         for row in cursor:
             #Loop through Hazard Areas FC
-            COUNTER += 1
-            # https://docs.python.org/2.7/library/decimal.html
-            pctDone = Decimal(COUNTER)/Decimal(RECORD_COUNT) * 100
-            LOGGER.info("Processing OID " + str(row[0]) + ". Feature " +
-                        str(COUNTER) + " of " + str(RECORD_COUNT) +
-                        " or " + str(pctDone) + " %")
-
+            PROGRESS.update()
+            LOGGER.debug("Processing OID " + str(row[0]))
             # Get the feature's extent from the @SHAPE data
             extent = row[1].extent
             # display the current values
@@ -301,27 +282,13 @@ try:
                          row[6], row[7], row[8], row[9], row[10])
             LOGGER.debug("XMin: %s, YMin: %s, XMax: %s, YMax: %s", extent.XMin,
                          extent.YMin, extent.XMax, extent.YMax)
-
-            lowerleft = str(extent.XMin) + " " + str(extent.YMin)
-            upperright = str(extent.XMax) + " " + str(extent.YMax)
-            # Add 0.1 degree on the Y axis to generate the Y axis coordinate
-            Y_AXIS_COORDINATE = str(extent.XMin)  + " " + str(extent.YMin + 0.1)
-            # Corners:
-            ORIGIN_COORDINATE = lowerleft
-            OPPOSITE_CORNER = upperright
-
-            LOGGER.info("Creating the feature's fishnet")
-            # Create 3 x 3 fishnet over the current hazard area
-            arcpy.CreateFishnet_management(FISHNET_FC, ORIGIN_COORDINATE,
-                                           Y_AXIS_COORDINATE, None, None, NUM_ROWS,
-                                           NUM_COLUMNS, OPPOSITE_CORNER, LABELS,
-                                           None, GEOMETRY_TYPE)
-
-
-            # Build dictionary of fishnet cells and hazard count per cell.
-            # The 3x3 Fishnet is generated from bottom left to top right, i.e
-            # SW, S, SE, W, CENTER, E, NW, N and lastly NE. See the grid
-            # below, generated at http://www.tablesgenerator.com/text_tables
+            rings = polygon_rings(row[1])
+            cellwidth = (extent.XMax - extent.XMin) / GRID_SIZE
+            cellheight = (extent.YMax - extent.YMin) / GRID_SIZE
+            # The fishnet cells run from bottom left to top right, i.e SW, S,
+            # SE, W, CENTER, E, NW, N and lastly NE, the order of the fields
+            # after OBJECTID and SHAPE@. See the grid below, generated at
+            # http://www.tablesgenerator.com/text_tables
             # +----+--------+----+
             # | NW |    N   | NE |
             # +----+--------+----+
@@ -329,87 +296,19 @@ try:
             # +----+--------+----+
             # | SW |    S   | SE |
             # +----+--------+----+
-            # Create a dictionary to hold the predefined keys and values
-            clusterDictionary = {'SW':0, 'S':0, 'SE':0, 'W':0, 'CENTER':0,
-                                 'E':0, 'NW':0, 'N':0, 'NE':0}
-
-            # create a counter to use for the dictionary manipulation
-            fishnetCounter = 0
-
-            LOGGER.info("Processing the fishnet")
-             # Loop through the 9 fishnet cells and intersect with the hazards
-             # feature classes to count all the hazards in each cell
-
-            with arcpy.da.SearchCursor(FISHNET_FC, "SHAPE@") as cursor2:
-                for row2 in cursor2:
-                    LOGGER.debug("Processing cell " + str(fishnetCounter))
-                    # Loop through the Hazards Feature layer list to find the
-                    # total using the locally scope variable below
-                    TOTAL_HAZARDS = 0
-                    LOGGER.debug("Starting with hazards feature list processing")
-                    for fc in HAZARDSLIST_FEATLAYER:
-                        LOGGER.debug("  Processing hazard feature class: " + str(fc))
-                        # Filter the HAZARDS FC on the current hazard area so
-                        # we only count hazards falling inside this hazard area
-                        # DOES THIS PREVENT DOUBLE COUNTING IN OVERLAPPING DHA?
-                        arcpy.SelectLayerByLocation_management(fc, "WITHIN", row[1],
-                                                               "", "NEW_SELECTION", "")
-
-                        # Filter the hazards on the current fishnet polygon
-                        arcpy.SelectLayerByLocation_management(fc, "WITHIN", row2[0])
-                        CELL_RESULT = arcpy.GetCount_management(fc)
-                        TOTAL_HAZARDS += int(CELL_RESULT.getOutput(0))
-                        LOGGER.debug("  TOTAL_HAZARDS is: " + str(TOTAL_HAZARDS))
-                        # Remove the filter on the HAZARDS FC
-                        arcpy.SelectLayerByAttribute_management(fc, "CLEAR_SELECTION", "")
-
-                    # Now we have the total hazards in this cell
-                    LOGGER.debug("TOTAL_HAZARDS is now: " + str(TOTAL_HAZARDS))
-
-                    # Assign the hazard count to the fishnet polygon that is
-                    # currently being processed
-                    if fishnetCounter == 0:
-                        clusterDictionary['SW'] = TOTAL_HAZARDS
-                    elif fishnetCounter == 1:
-                        clusterDictionary['S'] = TOTAL_HAZARDS
-                    elif fishnetCounter == 2:
-                        clusterDictionary['SE'] = TOTAL_HAZARDS
-                    elif fishnetCounter == 3:
-                        clusterDictionary['W'] = TOTAL_HAZARDS
-                    elif fishnetCounter == 4:
-                        clusterDictionary['CENTER'] = TOTAL_HAZARDS
-                    elif fishnetCounter == 5:
-                        clusterDictionary['E'] = TOTAL_HAZARDS
-                    elif fishnetCounter == 6:
-                        clusterDictionary['NW'] = TOTAL_HAZARDS
-                    elif fishnetCounter == 7:
-                        clusterDictionary['N'] = TOTAL_HAZARDS
-                    else:
-                        clusterDictionary['NE'] = TOTAL_HAZARDS
-
-                    # Increment counter
-                    fishnetCounter += 1
-
-            # Print the final cluster dictionary
-            LOGGER.debug("clusterDictionary is: " + str(clusterDictionary))
-
-            # Update the row with the new values
-            row[2] = clusterDictionary['SW']
-            row[3] = clusterDictionary['S']
-            row[4] = clusterDictionary['SE']
-            row[5] = clusterDictionary['W']
-            row[6] = clusterDictionary['CENTER']
-            row[7] = clusterDictionary['E']
-            row[8] = clusterDictionary['NW']
-            row[9] = clusterDictionary['N']
-            row[10] = clusterDictionary['NE']
-
-            LOGGER.info("Updating the feature")
+            for cell in range(GRID_SIZE * GRID_SIZE):
+                column = cell % GRID_SIZE
+                gridrow = cell // GRID_SIZE
+                cellbox = (extent.XMin + column * cellwidth,
+                           extent.YMin + gridrow * cellheight,
+                           extent.XMin + (column + 1) * cellwidth,
+                           extent.YMin + (gridrow + 1) * cellheight)
+                # Count the hazards WITHIN both the hazard area and the cell
+                row[2 + cell] = HAZARD_TREE.query(rings, cellbox)[0]
+
+            LOGGER.debug("Updating the feature")
             cursor.updateRow(row)
-
-            # Prepare for the next iteration
-            del clusterDictionary
-            arcpy.Delete_management(FISHNET_FC)
+    PROGRESS.finish()
 
     STOP_TIME = time.time()
     LOGGER.info("Total execution time in seconds = " +
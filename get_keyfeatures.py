@@ -22,8 +22,12 @@ and assign a weight based on the count:
 import logging
 import logging.handlers
 import time
-from decimal import Decimal, getcontext #For progress COUNTER
 import arcpy
+from mcda_breakpoints import KEYFEATURES_TABLE
+from mcda_buffer_cache import open_buffer_cache
+from mcda_parallel import worker_count
+from mcda_progress import ProgressReporter
+from mcda_spatial import load_sources, hazard_footprint, distance_counts
 #from arcpy import env
 
 # Functions and classes
@@ -116,17 +120,23 @@ KEYFEATURES_FC1 = arcpy.GetParameterAsText(4)
 KEYFEATURES_FC2 = arcpy.GetParameterAsText(5)
 BUFFER_DIST = arcpy.GetParameterAsText(6) # buffer distance in meters
 UPDATE_ONLY = arcpy.GetParameterAsText(7) # Boolean result received as text
+BUFFER_CACHE_DIR = arcpy.GetParameterAsText(8) # Optional buffer cache folder
+WORKERS = worker_count(arcpy.GetParameterAsText(9)) # Blank runs serially
+EXACT_COUNTS = arcpy.GetParameterAsText(10) # Boolean result received as text
 
 # Tool Parameters
 arcpy.env.addOutputsToMap = False
-getcontext().prec = 4 # Set decimal precision
 REQUIRED_FIELDS = ['KEYFEATURES', 'KEYFEATURES_BUFFER_DIST']
 FILTER_FIELD = "KEYFEATURES" # Which field must we filter on and check for?
 KEYFEATURECLASS_LIST = [] # Empty list for the feature classes to process
-KEYFEATURELAYER_LIST = [] # Empty list to store resulting feature layers
 # Append the Meters qualifier required for the buffer distance parameter
 BUFFER_DISTM = BUFFER_DIST + " Meters"
-COUNTER = 0
+# Stop counting at the count from which the grade no longer changes, unless
+# exact counts are requested for reporting
+if EXACT_COUNTS == 'true':
+    COUNT_LIMIT = None
+else:
+    COUNT_LIMIT = KEYFEATURES_TABLE.saturation_count()
 
 # Tool configuration:
 # Set up the logging parameters and inform the user
@@ -216,11 +226,10 @@ try:
             # Terminate the script
             raise arcpy.ExecuteError
 
-    # Adjust the fields list to include the Object ID and Shape data
-    LOGGER.info("Adding OBJECTID and SHAPE@ fields to FIELDLIST")
-    # Insert the fields at the start of the list to obtain the required
+    # Adjust the fields list to include the Object ID
+    LOGGER.info("Adding the OBJECTID field to FIELDLIST")
+    # Insert the field at the start of the list to obtain the required
     # field ordering
-    REQUIRED_FIELDS.insert(0, 'SHAPE@')
     REQUIRED_FIELDS.insert(0, 'OBJECTID')
     FIELDLIST = REQUIRED_FIELDS
     LOGGER.debug("The FIELDLIST is now " + str(FIELDLIST))
@@ -237,71 +246,60 @@ try:
         LOGGER.warning("The Hazard Areas FC does not contain any features.")
         raise arcpy.ExecuteError
 
-    #Create feature layers out of Key Features FCs
-    LIST_COUNT = 0
-    for item in KEYFEATURECLASS_LIST:
-        LIST_COUNT += 1
-        # Dynamically generate a name for the Feature layer
-        itemFlayerName = "Flayer_" + str(LIST_COUNT)
-        LOGGER.debug("Adding Feature Layer: " + itemFlayerName)
-        arcpy.MakeFeatureLayer_management(item, itemFlayerName)
-        KEYFEATURELAYER_LIST.append(itemFlayerName)
-
-    LOGGER.info("Starting with the hazards area processing")
+    # Read every source feature class once into an in-memory spatial index,
+    # projected to the spatial reference of the hazard areas
+    LOGGER.info("Loading the source features into memory")
+    HAZARD_SR = arcpy.Describe(HAZAREA_FC).spatialReference
+    # Drop the source features outside the buffered hazard area envelopes
+    FOOTPRINT = hazard_footprint(HAZAREA_FC, BUFFER_DIST, QRY_FILTER,
+                                 HAZARD_SR)
+    KEY_SOURCES = load_sources(KEYFEATURECLASS_LIST, HAZARD_SR, FOOTPRINT)
+    for source in KEY_SOURCES:
+        LOGGER.debug(source.name + " features loaded: " +
+                     str(len(source)) + ", skipped outside the hazard " +
+                     "areas: " + str(source.skipped))
+
+    # Count the source features within the buffer distance of every hazard
+    # area, summed over the source feature classes, in WORKERS processes
+    LOGGER.info("Counting the features within " + BUFFER_DISTM)
+    PROGRESS = ProgressReporter(LOGGER, RECORD_COUNT * len(KEY_SOURCES),
+                                "Key features proximity")
+    BUFFER_CACHE = open_buffer_cache(BUFFER_CACHE_DIR)
+    try:
+        OIDS, COUNTS = distance_counts(HAZAREA_FC, KEY_SOURCES, BUFFER_DIST,
+                                       QRY_FILTER, PROGRESS, BUFFER_CACHE,
+                                       WORKERS, COUNT_LIMIT)
+    finally:
+        if BUFFER_CACHE is not None:
+            LOGGER.info("Buffer cache hits: " + str(BUFFER_CACHE.hits) +
+                        ", misses: " + str(BUFFER_CACHE.misses))
+            BUFFER_CACHE.close()
+    PROGRESS.finish()
+    KEY_COUNTS = dict(zip(OIDS.tolist(), COUNTS.tolist()))
+
+    LOGGER.info("Updating the hazard areas")
     with arcpy.da.UpdateCursor(HAZAREA_FC, FIELDLIST, QRY_FILTER) as cursor:
         for row in cursor:
-            #Loop through Hazard Areas FC
-            COUNTER += 1
-            pctDone = Decimal(COUNTER)/Decimal(RECORD_COUNT) *100
-            LOGGER.info("Processing OID " + str(row[0]) +
-                        ", with KEYFEATURES grading of "+ str(row[2]) +
-                        ". Feature " + str(COUNTER) + " of " +
-                        str(RECORD_COUNT) + " or " + str(pctDone) + " %")
-
-            # Iterate over items in key features list and tally up the total
-            # Select the current feature from original Hazard FC
-            arcpy.SelectLayerByAttribute_management("inputHazard",
-                                                    "NEW_SELECTION",
-                                                    "OBJECTID = " + str(row[0]))
-
-            # Initialize the counter, with local scope, to zero
-            TOTAL_KEY_ITEMS = 0
-            # Now loop through INFRASTRUCTURE feature layers and intersect
-            # with the selected feature to calculate the total
-            for fc in KEYFEATURELAYER_LIST:
-                LOGGER.debug("Now processing feature Layer : " + fc)
-                # Takes longer due to the buffering done as part of each query.
-                # But faster than clipping source and using that.
-                TEMP = arcpy.SelectLayerByLocation_management(fc,
-                                                              "WITHIN_A_DISTANCE_GEODESIC",
-                                                              "inputHazard",
-                                                              BUFFER_DISTM,
-                                                              "")
-                # Count the rows and add it to the COUNTER
-                TOTAL_KEY_ITEMS += int(arcpy.GetCount_management(TEMP).getOutput(0))
-
-            LOGGER.debug("TOTAL_KEY_ITEMS is: " + str(TOTAL_KEY_ITEMS))
-            # Update the row with the key features sum
-            # Cast to integer to ensure we deal with integer values
-            TOTAL_KEY_ITEMS = int(TOTAL_KEY_ITEMS)
-            LOGGER.debug("FINAL TOTAL_KEY_ITEMS is: " + str(TOTAL_KEY_ITEMS))
-
-            # Calculate the grading. A case statement would have been nice to have.
-            if TOTAL_KEY_ITEMS == 0:
-                gradeKeyFeatures = 0
-            elif TOTAL_KEY_ITEMS == 1:
-                gradeKeyFeatures = 1
-            elif TOTAL_KEY_ITEMS == 2:
-                gradeKeyFeatures = 2
-            else:
-                gradeKeyFeatures = 3
-
-            arcpy.AddMessage("KEYFEATURES grading: " + str(gradeKeyFeatures))
+            TOTAL_KEY_ITEMS = KEY_COUNTS.get(row[0])
+            if TOTAL_KEY_ITEMS is None:
+                # No geometry, so leave the grading NULL for a later update
+                # only run to pick up
+                LOGGER.debug("Skipping OID " + str(row[0]) +
+                             " without a geometry")
+                continue
+            LOGGER.debug("Processing OID " + str(row[0]) + ", with " +
+                         str(TOTAL_KEY_ITEMS) + " features in range")
+
+            # Calculate the grading from the shared breakpoint table
+            gradeKeyFeatures = KEYFEATURES_TABLE.grade_value(TOTAL_KEY_ITEMS)
+
+            LOGGER.debug("KEYFEATURES grading: " + str(gradeKeyFeatures))
             # Assign the new value to the KeyFeatures field
-            row[2] = gradeKeyFeatures
+            row[1] = gradeKeyFeatures
             # Assign the buffer distance to the Key Features buffer distance field
-            row[3] = BUFFER_DIST
+            row[2] = BUFFER_DIST
             cursor.updateRow(row)
+
     STOP_TIME = time.time()
     LOGGER.info("Total execution time in seconds = " +
                 str(int(STOP_TIME - START_TIME)) + " and in minutes = " +
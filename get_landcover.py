@@ -10,17 +10,20 @@
 #------------------------------------------------------------------------------
 
 """
-Calculates the LandCover value for the Hazard Area Feature Class using the
-LandCover raster with the Get Cell Value Spatial Analysis Tool, based on the
-inside centroid X and Y coordinates
+Calculates the LandCover value for the Hazard Area Feature Class by sampling
+the LandCover raster at the inside centroid X and Y coordinates of all the
+hazard areas at once, or with the majority land cover inside each hazard area
+in the zonal mode
 """
 
 #Import libraries
 import logging
 import logging.handlers
 import time
-from decimal import Decimal, getcontext #For the progress counter
 import arcpy
+from mcda_progress import ProgressReporter
+from mcda_raster import (bare_area_statistic, inside_samples, majority,
+                         zonal_statistics)
 
 # Functions and classes
 # Adapted from:
@@ -110,10 +113,19 @@ CHECK_PROJ = arcpy.GetParameterAsText(2) # Boolean result received as text
 HAZAREA_FC = arcpy.GetParameterAsText(3)
 LANDCOVER_RASTER = arcpy.GetParameterAsText(4)
 UPDATE_ONLY = arcpy.GetParameterAsText(5) # Boolean result received as text
+ZONAL_LANDCOVER = arcpy.GetParameterAsText(6) # Boolean result received as text
+BAREAREA_CODE = arcpy.GetParameterAsText(7) # Optional bare area class code
+BARE_FRACTION = arcpy.GetParameterAsText(8) # Optional fraction, default 0.5
 
 # Tool Parameters
 arcpy.env.addOutputsToMap = False
-getcontext().prec = 4 # Set decimal precision
+# The zonal land cover is the majority class, or the bare area code when at
+# least BARE_FRACTION of the cells are bare area if a code is supplied
+if BAREAREA_CODE:
+    ZONAL_STATISTIC = bare_area_statistic(int(BAREAREA_CODE),
+                                          float(BARE_FRACTION or 0.5))
+else:
+    ZONAL_STATISTIC = majority
 REQUIRED_FIELD = "LANDCOVER" # Which field must we filter on and check for?
 
 # Tool configuration:
@@ -223,38 +235,41 @@ try:
         LOGGER.error("The feature class does not contain any features.")
         raise arcpy.ExecuteError
 
-    COUNTER = 0
+    # The land cover is sampled and written for every hazard area, not only
+    # the filtered ones, so report the progress against all of them
+    UPDATE_COUNT = int(arcpy.GetCount_management(HAZAREA_FC).getOutput(0))
+
+    if ZONAL_LANDCOVER == 'true':
+        # Summarise the land cover cells inside each hazard area polygon.
+        # Hazard areas without land cover data keep the default value of -2
+        LOGGER.info("Calculating the zonal land cover of the hazard areas")
+        ZONAL_PROGRESS = ProgressReporter(LOGGER, UPDATE_COUNT,
+                                          "Land cover zonal statistics")
+        CELLVALUES = zonal_statistics(HAZAREA_FC, LANDCOVER_RASTER,
+                                      ZONAL_STATISTIC, -2, None,
+                                      progress=ZONAL_PROGRESS)
+        ZONAL_PROGRESS.finish()
+    else:
+        # Sample the raster cells under all the inside centroids at once.
+        # Cells outside the raster or with NoData keep the default of -2
+        LOGGER.info("Sampling " + str(LANDCOVER_RASTER) +
+                    " at the inside centroids")
+        CELLVALUES = inside_samples(HAZAREA_FC, LANDCOVER_RASTER, -2, None)
 
+    PROGRESS = ProgressReporter(LOGGER, UPDATE_COUNT, "Land cover sampling")
     with arcpy.da.UpdateCursor(HAZAREA_FC, FIELDLIST) as cursor:
         for row in cursor:
-            COUNTER += 1
-            # https://docs.python.org/3/library/decimal.html - decimal output
-            pctDone = Decimal(COUNTER)/Decimal(COUNT_RECORDS) *100
-            LOGGER.info("Processing OID " + str(row[0]) +
-                        ", with current LANDCOVER value of "+ str(row[3]) +
-                        ". Feature " + str(COUNTER) + " of " +
-                        str(COUNT_RECORDS) + " or " + str(pctDone) + " %")
+            PROGRESS.update()
+            LOGGER.debug("Processing OID " + str(row[0]) +
+                         ", with current LANDCOVER value of "+ str(row[3]))
             # Print the coordinate tuple
             LOGGER.debug("X and Y: " + str(row[1]) + " " + str(row[2]))
-            # Set an initial default value
-            LOGGER.debug("Setting intial default value of -2")
-            cellvalue = -2
-            # Get the Cell Value from the LandCover Raster
-            try:
-                cellresult = arcpy.GetCellValue_management(LANDCOVER_RASTER,
-                                                           str(row[1]) + " " +
-                                                           str(row[2]))
-                # See http://gis.stackexchange.com/questions/55246/casting-arcpy-result-as-integer-instead-arcpy-getcount-management
-                cellvalue = int(cellresult.getOutput(0))
-                LOGGER.debug("The raster cell value is " + str(cellvalue))
-
-            except Exception as err:
-                LOGGER.error(err.args[0])
-
-            row[3] = cellvalue
+            row[3] = int(CELLVALUES[row[0]])
             cursor.updateRow(row)
             LOGGER.debug("The land cover value is now: " + str(row[3]))
 
+    PROGRESS.finish()
+
     # Calculate the execution time
     STOP_TIME = time.time()
     LOGGER.info("Total execution time in seconds = " +
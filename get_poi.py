@@ -22,8 +22,13 @@ and assign a weight based on the count:
 import logging
 import logging.handlers
 import time
-from decimal import Decimal, getcontext #For progress COUNTER
 import arcpy
+from mcda_breakpoints import POI_TABLE
+from mcda_buffer_cache import open_buffer_cache
+from mcda_neighbours import neighbour_counts, NEIGHBOUR_CHECKS
+from mcda_parallel import worker_count
+from mcda_progress import ProgressReporter
+from mcda_spatial import load_sources, hazard_footprint, distance_counts
 
 # Functions and classes
 # Adapted from
@@ -115,17 +120,27 @@ POIFC1 = arcpy.GetParameterAsText(4)
 POIFC2 = arcpy.GetParameterAsText(5)
 BUFFER_DIST = arcpy.GetParameterAsText(6) # buffer distance in meters
 UPDATE_ONLY = arcpy.GetParameterAsText(7) # Boolean result received as text
+BUFFER_CACHE_DIR = arcpy.GetParameterAsText(8) # Optional buffer cache folder
+WORKERS = worker_count(arcpy.GetParameterAsText(9)) # Blank runs serially
+NEIGHBOUR_DIR = arcpy.GetParameterAsText(10) # Optional neighbour table folder
+MAX_RADIUS = arcpy.GetParameterAsText(11) # Optional neighbour radius in meters
+EXACT_COUNTS = arcpy.GetParameterAsText(12) # Boolean result received as text
+# QUICK, FULL or REBUILD, how the neighbour table is checked for changes
+NEIGHBOUR_CHECK = str(arcpy.GetParameterAsText(13)).upper() or 'QUICK'
 
 # Tool Parameters
 arcpy.env.addOutputsToMap = False
-getcontext().prec = 4 # Set decimal precision
 REQUIRED_FIELDS = ['POI', 'POI_BUFFER_DIST']
 FILTER_FIELD = "POI" # Which field must we filter on and check for?
 POI_FEATCLASS_LIST = [] # Empty list that will store the feature classes to process
-POI_FEATLAYER_LIST = [] # Empty list that will store feature layers
 # Append the Meters qualifier required for the buffer distance parameter
 BUFFER_DISTM = BUFFER_DIST + " Meters"
-COUNTER = 0
+# Stop counting at the count from which the grade no longer changes, unless
+# exact counts are requested for reporting
+if EXACT_COUNTS == 'true':
+    COUNT_LIMIT = None
+else:
+    COUNT_LIMIT = POI_TABLE.saturation_count()
 
 # Tool configuration:
 # Set up the logging parameters and inform the user
@@ -215,11 +230,10 @@ try:
             # Terminate the script
             raise arcpy.ExecuteError
 
-    # Adjust the fields list to include the Object ID and Shape data
-    LOGGER.info("Adding OBJECTID and SHAPE@ fields to FIELDLIST")
-    # Insert the fields at the start of the list to obtain the required
+    # Adjust the fields list to include the Object ID
+    LOGGER.info("Adding the OBJECTID field to FIELDLIST")
+    # Insert the field at the start of the list to obtain the required
     # field ordering
-    REQUIRED_FIELDS.insert(0, 'SHAPE@')
     REQUIRED_FIELDS.insert(0, 'OBJECTID')
     FIELDLIST = REQUIRED_FIELDS
     LOGGER.debug("The FIELDLIST is now " + str(FIELDLIST))
@@ -236,67 +250,82 @@ try:
         LOGGER.warning("The Hazard Areas FC does not contain any features.")
         raise arcpy.ExecuteError
 
-    #Create feature layers out of POI FC
-    LIST_COUNT = 0
-    for item in POI_FEATCLASS_LIST:
-        LIST_COUNT += 1
-        # Dynamically generate a name for the Feature layer
-        itemFlayerName = "Flayer_" + str(LIST_COUNT)
-        LOGGER.debug("Adding Feature Layer: " + itemFlayerName)
-        arcpy.MakeFeatureLayer_management(item, itemFlayerName)
-        POI_FEATLAYER_LIST.append(itemFlayerName)
-
-    LOGGER.info("Starting with the hazards area processing")
+    if NEIGHBOUR_DIR:
+        if NEIGHBOUR_CHECK not in NEIGHBOUR_CHECKS:
+            LOGGER.error("Unknown neighbour table check: " + NEIGHBOUR_CHECK)
+            raise arcpy.ExecuteError
+        # Count from the sorted distances of every hazard area to the source
+        # features, measuring them first if they are missing or out of date
+        LOGGER.info("Counting the features within " + BUFFER_DISTM +
+                    " from the neighbour table")
+        HAZARD_TOTAL = int(arcpy.GetCount_management(HAZAREA_FC).getOutput(0))
+        PROGRESS = ProgressReporter(LOGGER, HAZARD_TOTAL,
+                                    "POI neighbour distances")
+        OIDS, COUNTS, REBUILT = neighbour_counts(NEIGHBOUR_DIR, HAZAREA_FC,
+                                                 'POI', POI_FEATCLASS_LIST,
+                                                 BUFFER_DIST, MAX_RADIUS,
+                                                 QRY_FILTER, PROGRESS,
+                                                 NEIGHBOUR_CHECK)
+        if REBUILT:
+            PROGRESS.finish()
+        LOGGER.info("Neighbour table rebuilt: " + str(REBUILT))
+    else:
+        # Read every source feature class once into an in-memory spatial
+        # index, projected to the spatial reference of the hazard areas
+        LOGGER.info("Loading the source features into memory")
+        HAZARD_SR = arcpy.Describe(HAZAREA_FC).spatialReference
+        # Drop the source features outside the buffered hazard area
+        # envelopes
+        FOOTPRINT = hazard_footprint(HAZAREA_FC, BUFFER_DIST, QRY_FILTER,
+                                     HAZARD_SR)
+        POI_SOURCES = load_sources(POI_FEATCLASS_LIST, HAZARD_SR, FOOTPRINT)
+        for source in POI_SOURCES:
+            LOGGER.debug(source.name + " features loaded: " +
+                         str(len(source)) + ", skipped outside the " +
+                         "hazard areas: " + str(source.skipped))
+
+        # Count the source features within the buffer distance of every
+        # hazard area, summed over the source feature classes. Point sources
+        # around geographic hazard areas are measured geodesically without
+        # buffers.
+        LOGGER.info("Counting the features within " + BUFFER_DISTM)
+        PROGRESS = ProgressReporter(LOGGER,
+                                    RECORD_COUNT * len(POI_SOURCES),
+                                    "POI proximity")
+        BUFFER_CACHE = open_buffer_cache(BUFFER_CACHE_DIR)
+        try:
+            OIDS, COUNTS = distance_counts(HAZAREA_FC, POI_SOURCES,
+                                           BUFFER_DIST, QRY_FILTER, PROGRESS,
+                                           BUFFER_CACHE, WORKERS, COUNT_LIMIT)
+        finally:
+            if BUFFER_CACHE is not None:
+                LOGGER.info("Buffer cache hits: " + str(BUFFER_CACHE.hits) +
+                            ", misses: " + str(BUFFER_CACHE.misses))
+                BUFFER_CACHE.close()
+        PROGRESS.finish()
+    POI_COUNTS = dict(zip(OIDS.tolist(), COUNTS.tolist()))
+
+    LOGGER.info("Updating the hazard areas")
     with arcpy.da.UpdateCursor(HAZAREA_FC, FIELDLIST, QRY_FILTER) as cursor:
         for row in cursor:
-            #Loop through Hazard Areas FC
-            COUNTER += 1
-            pctDone = Decimal(COUNTER)/Decimal(RECORD_COUNT) *100
-            LOGGER.info("Processing OID " + str(row[0]) +
-                        ", with POI grading of "+ str(row[2]) + ". Feature " +
-                        str(COUNTER) + " of " + str(RECORD_COUNT) +
-                        " or " + str(pctDone) + " %")
-
-            # Now loop over items in POI list and tally up the total
-            # Select the current feature from original Hazard FC
-            arcpy.SelectLayerByAttribute_management("inputHazard",
-                                                    "NEW_SELECTION",
-                                                    "OBJECTID = " + str(row[0]))
-
-            # Initialise the COUNTER, with its local scope, to zero
-            TOTAL_POI_ITEMS = 0
-            # Now loop through POI feature layers and get the intersection
-            for fc in POI_FEATLAYER_LIST:
-                LOGGER.debug("Now processing Feature Layer : " + fc)
-                # Takes longer due to the buffering done as part of each query.
-                # But faster than clipping source and using that.
-                TEMP = arcpy.SelectLayerByLocation_management(fc,
-                                                              "WITHIN_A_DISTANCE_GEODESIC",
-                                                              "inputHazard",
-                                                              BUFFER_DISTM, "")
-                # Count the rows and add it to the COUNTER
-                TOTAL_POI_ITEMS = int(arcpy.GetCount_management(TEMP).getOutput(0))
-
-            LOGGER.debug("TOTAL_POI_ITEMS is: " + str(TOTAL_POI_ITEMS))
-            # Update the row with the POI sum
-            # Cast to integer to ensure we deal with integer values
-            TOTAL_POI_ITEMS = int(TOTAL_POI_ITEMS)
-
-            # Calculate the grading. A case statement would have been handy.
-            if TOTAL_POI_ITEMS == 0:
-                gradePOI = 0
-            elif TOTAL_POI_ITEMS == 1:
-                gradePOI = 1
-            elif TOTAL_POI_ITEMS == 2:
-                gradePOI = 2
-            else:
-                gradePOI = 3
+            TOTAL_POI_ITEMS = POI_COUNTS.get(row[0])
+            if TOTAL_POI_ITEMS is None:
+                # No geometry, so leave the grading NULL for a later update
+                # only run to pick up
+                LOGGER.debug("Skipping OID " + str(row[0]) +
+                             " without a geometry")
+                continue
+            LOGGER.debug("Processing OID " + str(row[0]) + ", with " +
+                         str(TOTAL_POI_ITEMS) + " features in range")
+
+            # Calculate the grading from the shared breakpoint table
+            gradePOI = POI_TABLE.grade_value(TOTAL_POI_ITEMS)
 
             #LOGGER.info("POI grading: " + str(gradePOI))
             # Assign the new value to the POI field
-            row[2] = gradePOI
+            row[1] = gradePOI
             # Assign the buffer distance to the POI buffer distance field
-            row[3] = BUFFER_DIST
+            row[2] = BUFFER_DIST
             cursor.updateRow(row)
 
     STOP_TIME = time.time()
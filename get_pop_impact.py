@@ -14,15 +14,24 @@
 Calculate the total population potentially affected by virtue of being
 located within a predefined buffer distance from the hazard point or area.
 Uses the Population vector point feature class created from the population
-raster layer earlier.
+raster layer earlier, counting the points or summing a population value
+field of the points, or sums the population raster itself inside the buffer
+of each hazard area if a raster is given instead.
 """
 
 #Import libraries
 import logging
 import logging.handlers
 import time
-from decimal import Decimal, getcontext #For progress COUNTER
+import numpy as np
 import arcpy
+from mcda_buffer_cache import open_buffer_cache
+from mcda_parallel import worker_count
+from mcda_progress import ProgressReporter
+from mcda_quadtree import AggregateQuadtree, aggregate_sums, read_points
+from mcda_raster import is_raster, raster_sums
+from mcda_scoring import write_score_columns
+from mcda_spatial import load_sources, hazard_footprint, distance_counts
 
 # Functions and classes
 # Adapted from:
@@ -110,18 +119,19 @@ LOGLEVEL = str(arcpy.GetParameterAsText(0)).upper()
 LOGDIR = arcpy.GetParameterAsText(1)
 CHECK_PROJ = arcpy.GetParameterAsText(2) # Boolean result received as text
 HAZAREA_FC = arcpy.GetParameterAsText(3)
-POP_FC = arcpy.GetParameterAsText(4)
+POP_FC = arcpy.GetParameterAsText(4) # Point feature class or raster
 BUFFER_DIST = arcpy.GetParameterAsText(5) # buffer distance in meters
 UPDATE_ONLY = arcpy.GetParameterAsText(6) # Boolean result received as text
+BUFFER_CACHE_DIR = arcpy.GetParameterAsText(7) # Optional buffer cache folder
+WORKERS = worker_count(arcpy.GetParameterAsText(8)) # Blank runs serially
+POP_FIELD = arcpy.GetParameterAsText(9) # Optional value field to sum
 
 # Tool Parameters
 arcpy.env.addOutputsToMap = False
-getcontext().prec = 4 # Set decimal precision
 REQUIRED_FIELDS = ['POPULATION', 'POPULATION_BUFFER_DIST']
 FILTER_FIELD = "POPULATION" # Which field must we filter on and check for?
 # Append the Meters required for the buffer distance parameter
 BUFFER_DISTM = BUFFER_DIST + " Meters"
-COUNTER = 0
 
 # Tool configuration:
 # Set up the logging parameters and inform the user
@@ -173,13 +183,23 @@ try:
                              Please use the correct feature class.")
             raise arcpy.ExecuteError
 
+    # A population raster is summed directly instead of counting points
+    POP_RASTER = is_raster(POP_FC)
+    LOGGER.debug("Population input is a raster: " + str(POP_RASTER))
+
     # Check if the population feature class has any features before we start
-    if int(arcpy.GetCount_management(POP_FC)[0]) == 0:
+    if not POP_RASTER and int(arcpy.GetCount_management(POP_FC)[0]) == 0:
         LOGGER.error("{0} has no features. Please use a feature class that \
                       already contains the required features and attributes." \
                       .format(POP_FC))
         raise arcpy.ExecuteError
 
+    # Check that the population value field exists if one was given
+    if not POP_RASTER and POP_FIELD and not fieldexist(POP_FC, POP_FIELD):
+        LOGGER.error("The field " + POP_FIELD + " does not exist in " +
+                     POP_FC + ".")
+        raise arcpy.ExecuteError
+
     # Compare the spatial references of the input data sets, unless the user
     # actively chooses not to do so.
     LOGGER.debug("Check for spatial reference mismatches? : " + CHECK_PROJ)
@@ -197,15 +217,6 @@ try:
             # Terminate the script
             raise arcpy.ExecuteError
 
-    # Adjust the fields list to include the Object ID and Shape data
-    LOGGER.info("Adding OBJECTID and SHAPE@ fields to FIELDLIST")
-    # Insert the fields at the start of the list to obtain the required
-    # field ordering
-    REQUIRED_FIELDS.insert(0, 'SHAPE@')
-    REQUIRED_FIELDS.insert(0, 'OBJECTID')
-    FIELDLIST = REQUIRED_FIELDS
-    LOGGER.debug("The FIELDLIST is now " + str(FIELDLIST))
-
     LOGGER.info("Starting the Population Hazard Impact analysis")
     START_TIME = time.time()
 
@@ -220,49 +231,70 @@ try:
         LOGGER.error("The feature class does not contain any features.")
         raise arcpy.ExecuteError
 
-    # Get the total number of population features after creating feature layer
-    LOGGER.info("Creating Population Feature Layer")
-    arcpy.MakeFeatureLayer_management(POP_FC, "popFeatures")
-    COUNT_POP_RECORDS = int(arcpy.GetCount_management("popFeatures").getOutput(0))
-    LOGGER.info("Population feature count: " + str(COUNT_POP_RECORDS))
-
-    COUNTER = 0
-    LOGGER.info("Starting to iterate over DHA using UpdateCursor")
-    with arcpy.da.UpdateCursor(HAZAREA_FC, FIELDLIST, QRY_FILTER) as cursor:
-        for row in cursor:
-            TOT_POP = 0
-            #Loop through Hazard Areas FC
-            COUNTER += 1 # Start counter at 1, for human consumption
-            pctDone = Decimal(COUNTER)/Decimal(COUNT_RECORDS) * 100
-            arcpy.AddMessage("Processing OID " + str(row[0]) +
-                             " with POPULATION IMPACT of "+ str(row[2]) +
-                             ". Feature " + str(COUNTER) + " of " +
-                             str(COUNT_RECORDS) + " or " + str(pctDone) + " %")
-
-            # Select the current feature from Hazard Area FC
-            arcpy.SelectLayerByAttribute_management("inputHazard",
-                                                    "NEW_SELECTION",
-                                                    "OBJECTID = {0}".format(row[0]))
-
-            # Select all features in the population raster layer that intersects
-            # with the current hazard feature
-            # Takes longer due to the buffering done as part of each query.
-            arcpy.SelectLayerByLocation_management("popFeatures",
-                                                   "WITHIN_A_DISTANCE_GEODESIC",
-                                                   "inputHazard",
-                                                   BUFFER_DISTM, "NEW_SELECTION")
-
-            TOT_POP = int(arcpy.GetCount_management("popFeatures")[0])
-            # Round the floating number and cast as integer
-            TOT_POP = int(round(TOT_POP))
-            LOGGER.info("Potential population affected is : " + str(TOT_POP))
-
-            # Assign the new value to the POPULATION field
-            row[2] = TOT_POP
-            # Assign the buffer distance to the POPULATION buffer distance field
-            row[3] = BUFFER_DIST
-            cursor.updateRow(row)
-
+    if POP_RASTER:
+        LOGGER.info("Summing the population raster within " + BUFFER_DISTM)
+    elif POP_FIELD:
+        # Hold the population points in an aggregate quadtree, so the buffers
+        # add whole nodes of points without visiting them
+        LOGGER.info("Loading the population points into an aggregate tree")
+        HAZARD_SR = arcpy.Describe(HAZAREA_FC).spatialReference
+        FOOTPRINT = hazard_footprint(HAZAREA_FC, BUFFER_DIST, QRY_FILTER,
+                                     HAZARD_SR)
+        POP_TREE = AggregateQuadtree(*read_points(POP_FC, POP_FIELD,
+                                                  HAZARD_SR, None, FOOTPRINT))
+        LOGGER.info("Population feature count: " + str(len(POP_TREE)))
+        LOGGER.info("Summing " + POP_FIELD + " within " + BUFFER_DISTM)
+    else:
+        # Read the population features once into an in-memory spatial index,
+        # projected to the spatial reference of the hazard areas
+        LOGGER.info("Loading the population features into memory")
+        HAZARD_SR = arcpy.Describe(HAZAREA_FC).spatialReference
+        # Drop the source features outside the buffered hazard area envelopes
+        FOOTPRINT = hazard_footprint(HAZAREA_FC, BUFFER_DIST, QRY_FILTER,
+                                     HAZARD_SR)
+        POP_SOURCES = load_sources([POP_FC], HAZARD_SR, FOOTPRINT)
+        LOGGER.info("Population feature count: " + str(len(POP_SOURCES[0])) +
+                    ", skipped outside the hazard areas: " +
+                    str(POP_SOURCES[0].skipped))
+        LOGGER.info("Counting the population within " + BUFFER_DISTM)
+
+    # Count the population features within the buffer distance of every
+    # hazard area. Point features around geographic hazard areas are
+    # measured geodesically; other layers are joined to geodesic buffers.
+    # A population value field or raster is summed inside the geodesic
+    # buffers instead.
+    PROGRESS = ProgressReporter(LOGGER, COUNT_RECORDS, "Population impact")
+    BUFFER_CACHE = open_buffer_cache(BUFFER_CACHE_DIR)
+    try:
+        if POP_RASTER:
+            OIDS, POP_SUMS = raster_sums(HAZAREA_FC, POP_FC, BUFFER_DIST,
+                                         QRY_FILTER, PROGRESS, BUFFER_CACHE)
+            # The POPULATION field holds whole people
+            POP_COUNTS = np.round(POP_SUMS).astype(np.int64)
+        elif POP_FIELD:
+            OIDS, POP_SUMS = aggregate_sums(HAZAREA_FC, POP_TREE, BUFFER_DIST,
+                                            QRY_FILTER, PROGRESS,
+                                            BUFFER_CACHE)
+            POP_COUNTS = np.round(POP_SUMS).astype(np.int64)
+        else:
+            OIDS, POP_COUNTS = distance_counts(HAZAREA_FC, POP_SOURCES,
+                                               BUFFER_DIST, QRY_FILTER,
+                                               PROGRESS, BUFFER_CACHE,
+                                               WORKERS)
+    finally:
+        if BUFFER_CACHE is not None:
+            LOGGER.info("Buffer cache hits: " + str(BUFFER_CACHE.hits) +
+                        ", misses: " + str(BUFFER_CACHE.misses))
+            BUFFER_CACHE.close()
+    PROGRESS.finish()
+
+    # Write the population counts in a single update pass
+    LOGGER.info("Updating the hazard areas")
+    UPDATED_COUNT = write_score_columns(HAZAREA_FC, OIDS,
+                                        [('POPULATION', POP_COUNTS),
+                                         ('POPULATION_BUFFER_DIST',
+                                          [int(float(BUFFER_DIST))] * len(OIDS))])
+    LOGGER.info("Updated " + str(UPDATED_COUNT) + " features")
 
     STOP_TIME = time.time()
     LOGGER.info("Total execution time in seconds = " +
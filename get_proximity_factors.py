@@ -0,0 +1,337 @@
+#------------------------------------------------------------------------------
+# Name:        getProximityFactors
+# Purpose:     Calculates all the proximity factors for each feature in a
+#              single pass.
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Combined replacement for get_poi, get_accidents, get_infrastructure,
+get_keyfeatures, get_rivers and get_pop_impact. Every source feature class is
+read once into an in-memory spatial index, each distinct buffer distance is
+buffered once and the hazard areas are walked once, counting the sources of
+every factor at that factor's own buffer distance. The POI, ACCIDENTS,
+INFRASTRUCTURE, KEYFEATURES and RIVERS gradings, the POPULATION count and the
+buffer distance fields are then written in a single update pass. Factors
+without any source feature classes are left untouched.
+"""
+
+#Import libraries
+import logging
+import logging.handlers
+import time
+import arcpy
+from mcda_breakpoints import FACTOR_TABLES
+from mcda_buffer_cache import open_buffer_cache
+from mcda_progress import ProgressReporter
+from mcda_spatial import load_sources, hazard_footprint, factor_counts
+
+# Functions and classes
+# Adapted from
+# http://gis.stackexchange.com/questions/135920/arcpy-logging-error-messages
+class ArcPyLogHandler(logging.handlers.RotatingFileHandler):
+    """
+    Custom logging class that bounces messages to the arcpy tool window and
+    reflects back to the log file.
+    """
+    def emit(self, record):
+        """
+        Write the log message to the tool output window (stdout) and log file.
+        """
+        try:
+            msg = record.msg.format(record.args)
+        #except:
+        except Exception as inst:
+            # Log the exception type and all error messages returned
+            arcpy.AddError(type(inst))
+            arcpy.AddError(arcpy.GetMessages())
+            msg = record.msg
+
+        if record.levelno >= logging.ERROR:
+            arcpy.AddError(msg)
+        elif record.levelno >= logging.WARNING:
+            arcpy.AddWarning(msg)
+        elif record.levelno >= logging.INFO:
+            arcpy.AddMessage(msg)
+
+        super(ArcPyLogHandler, self).emit(record)
+
+# Adapted from:
+# http://bjorn.kuiper.nu/2011/04/21/tips-tricks-fieldexists-for-arcgis-10-python
+def fieldexist(featureclass, fieldname):
+    """
+    Test for the existence of fieldname in featureclass. Returns True if the
+    field exists and False if it does not.
+    """
+    fieldlist = arcpy.ListFields(featureclass, fieldname)
+    fieldcount = len(fieldlist)
+    return bool(fieldcount == 1)
+
+def get_projection(featureclass):
+    """
+    Find and return the full spatial reference of a feature class
+    """
+    description = arcpy.Describe(featureclass)
+    # Export the full text string to ensure a 100% match, preventing
+    # discrepancies with differing central meridians, for example.
+    proj = description.SpatialReference.Name
+    return proj
+
+def compare_list_items(checklist):
+    """
+    Loop through the list and compare the items to determine if any item
+    is a mismatch with the first item in the list. Used to check for spatial
+    reference mismatches between feature classes.
+    """
+    mismatch = False # Local variable to store match results
+    check = '' # Local variable to store the spatial projection
+    for checkitem in checklist:
+        LOGGER.debug("Processing " + str(checkitem))
+        if check == '': # Nothing captured yet, use the first item as base
+            check = checkitem
+            LOGGER.debug("The check is now " + str(checkitem))
+        else:
+            # Test if they match
+            if check == checkitem:
+                LOGGER.debug("The items match. Continue testing")
+            else:
+                mismatch = True
+                LOGGER.debug("The check and current item mismatch")
+                break # Break out of the for loop. no further testing needed
+
+    LOGGER.info("Is there a spatial reference mismatch? " + str(mismatch))
+    if mismatch:
+        LOGGER.critical("Spatial reference mismatch detected.")
+    else:
+        LOGGER.info("Spatial references of all the feature classes match.")
+
+    return mismatch
+
+def split_multivalue(parametertext):
+    """
+    Split the text of a multivalue parameter into a list of values, removing
+    the quotes around paths with spaces.
+    """
+    return [value.strip().strip("'\"") for value in parametertext.split(';')
+            if value.strip()]
+
+# User Input parameters
+LOGLEVEL = str(arcpy.GetParameterAsText(0)).upper()
+LOGDIR = arcpy.GetParameterAsText(1)
+CHECK_PROJ = arcpy.GetParameterAsText(2) # Boolean result received as text
+HAZAREA_FC = arcpy.GetParameterAsText(3)
+POI_FCS = arcpy.GetParameterAsText(4) # Multivalue list of POI FCs
+POI_DIST = arcpy.GetParameterAsText(5) # buffer distance in meters
+ACCIDENTS_FCS = arcpy.GetParameterAsText(6)
+ACCIDENTS_DIST = arcpy.GetParameterAsText(7)
+INFRASTRUCTURE_FCS = arcpy.GetParameterAsText(8)
+INFRASTRUCTURE_DIST = arcpy.GetParameterAsText(9)
+KEYFEATURES_FCS = arcpy.GetParameterAsText(10)
+KEYFEATURES_DIST = arcpy.GetParameterAsText(11)
+RIVERS_FCS = arcpy.GetParameterAsText(12)
+RIVERS_DIST = arcpy.GetParameterAsText(13)
+POPULATION_FCS = arcpy.GetParameterAsText(14)
+POPULATION_DIST = arcpy.GetParameterAsText(15)
+UPDATE_ONLY = arcpy.GetParameterAsText(16) # Boolean result received as text
+BUFFER_CACHE_DIR = arcpy.GetParameterAsText(17) # Optional buffer cache folder
+EXACT_COUNTS = arcpy.GetParameterAsText(18) # Boolean result received as text
+
+# Tool Parameters
+arcpy.env.addOutputsToMap = False
+# Factor field, source feature classes and buffer distance of each factor
+FACTOR_INPUTS = [('POI', POI_FCS, POI_DIST),
+                 ('ACCIDENTS', ACCIDENTS_FCS, ACCIDENTS_DIST),
+                 ('INFRASTRUCTURE', INFRASTRUCTURE_FCS, INFRASTRUCTURE_DIST),
+                 ('KEYFEATURES', KEYFEATURES_FCS, KEYFEATURES_DIST),
+                 ('RIVERS', RIVERS_FCS, RIVERS_DIST),
+                 ('POPULATION', POPULATION_FCS, POPULATION_DIST)]
+# Only the factors with source feature classes are processed
+FACTORS = [(field, split_multivalue(featureclasses), int(float(distance)))
+           for field, featureclasses, distance in FACTOR_INPUTS
+           if featureclasses]
+# Stop counting each graded factor at the count from which its grade no
+# longer changes, unless exact counts are requested. The population impact is
+# stored as the raw count and is always counted exactly.
+COUNT_LIMITS = {}
+if EXACT_COUNTS != 'true':
+    for factorfield, factorsources, factordistance in FACTORS:
+        if factorfield != 'POPULATION':
+            COUNT_LIMITS[factorfield] = \
+                FACTOR_TABLES[factorfield].saturation_count()
+REQUIRED_FIELDS = []
+for factorfield, factorsources, factordistance in FACTORS:
+    REQUIRED_FIELDS.append(factorfield)
+    REQUIRED_FIELDS.append(factorfield + '_BUFFER_DIST')
+
+# Tool configuration:
+# Set up the logging parameters and inform the user
+DATE_STRING = time.strftime("%Y%m%d")
+LOGFILE = unicode(LOGDIR + '\\'+ DATE_STRING +
+                  '_mcdatool.log').encode('unicode-escape')
+MAXBYTES = 10485760 # 10MB
+BACKUPCOUNT = 10
+# Change this variable to a unique identifier for each script it runs in.
+# Cannot use LOGGER.findCaller(), as we're calling from an embedded script in
+# the Python toolbox.
+LOGSTAMP = "AddProximityFactors" # Identifies the source of the log entries
+LOGGER = logging.getLogger(LOGSTAMP)
+HANDLER = ArcPyLogHandler(LOGFILE, MAXBYTES, BACKUPCOUNT)
+FORMATTER = logging.Formatter("%(asctime)s %(name)-15s %(levelname)-8s %(message)s")
+HANDLER.setFormatter(FORMATTER)
+LOGGER.addHandler(HANDLER)
+LOGGER.setLevel(LOGLEVEL)
+LOGGER.debug("------- START LOGGING-----------")
+# Use the default arcpy.AddMessage method to only show this in the tool output
+# window, otherwise we will log it to the log file too.
+arcpy.AddMessage("Your Log file is: " + LOGFILE)
+
+# Define the query filter
+# Should we only update only records with a NULL value in any of the factors?
+# Only the NULL factors of those records are then written, leaving the
+# factors and buffer distances already filled in untouched.
+if UPDATE_ONLY == 'true':
+    QRY_FILTER = " OR ".join(factor[0] + " IS NULL" for factor in FACTORS)
+else:
+    QRY_FILTER = ""
+LOGGER.debug("QRY_FILTER is: " + QRY_FILTER)
+
+# Put everything in a try/finally statement, so that we can close the logger
+# even if the script bombs out or we raise an execution error along the line
+try:
+    # Sanity checks:
+
+    if not FACTORS:
+        LOGGER.error("Please supply the source feature classes of at least \
+                      one factor.")
+        raise arcpy.ExecuteError
+
+    # Check if the target feature class has any features before we start
+    if int(arcpy.GetCount_management(HAZAREA_FC)[0]) == 0:
+        LOGGER.error("{0} has no features. Please use a feature class that \
+                      already contains the required features and attributes." \
+                      .format(HAZAREA_FC))
+        raise arcpy.ExecuteError
+
+    # Check if the target feature class has all of the required attribute fields.
+    for checkfield in REQUIRED_FIELDS:
+        if not fieldexist(HAZAREA_FC, checkfield):
+            LOGGER.debug("Check for field: " + checkfield)
+            LOGGER.error("The field "+ checkfield +" does not exist. \
+                             Please use the correct feature class.")
+            raise arcpy.ExecuteError
+
+    # Every source feature class needs content
+    for factorfield, factorsources, factordistance in FACTORS:
+        for sourcefc in factorsources:
+            if int(arcpy.GetCount_management(sourcefc)[0]) == 0:
+                LOGGER.error("{0} has no features. Please use a feature class \
+                             that contains data.".format(sourcefc))
+                raise arcpy.ExecuteError
+
+    # Compare the spatial references of the input data sets, unless the user
+    # actively chooses not to do so.
+    LOGGER.info("Check for spatial reference mismatches? : " + CHECK_PROJ)
+    if CHECK_PROJ == 'true':
+        LIST_FC = [get_projection(HAZAREA_FC)]
+        for factorfield, factorsources, factordistance in FACTORS:
+            for sourcefc in factorsources:
+                LIST_FC.append(get_projection(sourcefc))
+        LOGGER.debug("The list of spatial references to check is:")
+        LOGGER.debug(LIST_FC)
+        LOGGER.info("Comparing spatial references of the data sets")
+        # Check for mismatching spatial references
+        MISMATCHED = compare_list_items(LIST_FC)
+        if MISMATCHED:
+            # Terminate the script
+            raise arcpy.ExecuteError
+
+    FIELDLIST = ['OBJECTID'] + REQUIRED_FIELDS
+    LOGGER.debug("The FIELDLIST is now " + str(FIELDLIST))
+
+    arcpy.AddMessage("Starting with the combined Proximity Analysis")
+    START_TIME = time.time()
+
+    # Get the total number of records to process
+    arcpy.MakeFeatureLayer_management(HAZAREA_FC, "inputHazard", QRY_FILTER)
+    RECORD_COUNT = int(arcpy.GetCount_management("inputHazard").getOutput(0))
+    LOGGER.info("Total number of features: " + str(RECORD_COUNT))
+
+    if RECORD_COUNT == 0:
+        LOGGER.warning("The Hazard Areas FC does not contain any features.")
+        raise arcpy.ExecuteError
+
+    # Read every source feature class once into an in-memory spatial index,
+    # projected to the spatial reference of the hazard areas, dropping the
+    # features outside the hazard area envelopes buffered by the factor's
+    # distance
+    HAZARD_SR = arcpy.Describe(HAZAREA_FC).spatialReference
+    FACTOR_SOURCES = []
+    for factorfield, factorsources, factordistance in FACTORS:
+        LOGGER.info("Loading the " + factorfield + " features into memory")
+        FOOTPRINT = hazard_footprint(HAZAREA_FC, factordistance, QRY_FILTER,
+                                     HAZARD_SR)
+        FACTOR_SOURCES.append((factorfield,
+                               load_sources(factorsources, HAZARD_SR,
+                                            FOOTPRINT),
+                               factordistance))
+        for source in FACTOR_SOURCES[-1][1]:
+            LOGGER.debug(source.name + " features loaded: " +
+                         str(len(source)) + ", skipped outside the hazard " +
+                         "areas: " + str(source.skipped))
+        LOGGER.info(factorfield + " buffer distance: " +
+                    str(factordistance) + " Meters")
+
+    # Walk the hazard areas once, counting every factor at its own distance
+    PROGRESS = ProgressReporter(LOGGER, RECORD_COUNT, "Proximity factors")
+    BUFFER_CACHE = open_buffer_cache(BUFFER_CACHE_DIR)
+    try:
+        COUNTS = factor_counts(HAZAREA_FC, FACTOR_SOURCES, QRY_FILTER,
+                               PROGRESS, BUFFER_CACHE, COUNT_LIMITS)
+    finally:
+        if BUFFER_CACHE is not None:
+            LOGGER.info("Buffer cache hits: " + str(BUFFER_CACHE.hits) +
+                        ", misses: " + str(BUFFER_CACHE.misses))
+            BUFFER_CACHE.close()
+    PROGRESS.finish()
+
+    LOGGER.info("Updating the hazard areas")
+    with arcpy.da.UpdateCursor(HAZAREA_FC, FIELDLIST, QRY_FILTER) as cursor:
+        for row in cursor:
+            for position, factor in enumerate(FACTORS):
+                factorfield, factordistance = factor[0], factor[2]
+                if UPDATE_ONLY == 'true' and row[1 + 2 * position] is not None:
+                    continue
+                total = COUNTS[factorfield].get(row[0])
+                LOGGER.debug("OID " + str(row[0]) + " " + factorfield +
+                             " count: " + str(total))
+                if total is None:
+                    # No geometry, so leave the factor NULL for a later
+                    # update only run to pick up
+                    continue
+                if factorfield == 'POPULATION':
+                    # The population impact is stored as the raw count
+                    row[1 + 2 * position] = total
+                else:
+                    row[1 + 2 * position] = \
+                        FACTOR_TABLES[factorfield].grade_value(total)
+                row[2 + 2 * position] = factordistance
+            cursor.updateRow(row)
+
+    STOP_TIME = time.time()
+    LOGGER.info("Total execution time in seconds = " +
+                str(int(STOP_TIME-START_TIME)) + " and in minutes = " +
+                str(int(STOP_TIME-START_TIME)/60))
+
+finally:
+    # Shut down logging after script has finished running.
+    #http://stackoverflow.com/questions/24816456/python-logging-wont-shutdown
+    LOGGER.debug("------- STOP LOGGING-----------")
+    LOGGER.removeHandler(HANDLER)
+    HANDLER.close()
+    logging.shutdown()
+
@@ -0,0 +1,282 @@
+#------------------------------------------------------------------------------
+# Name:        getRasterFactors
+# Purpose:     Samples the slope, aspect and land cover rasters for each
+#              feature in a single pass.
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Combined replacement for get_slope, get_aspect and get_landcover. The inside
+centroid X and Y coordinates of the hazard areas are read once, mapped to
+raster cells once, and every supplied raster is sampled at them. The SLOPE,
+ASPECT and LANDCOVER fields are then written in a single update pass. Cells
+outside a raster or with NoData get the default value of the field, 0.0 for
+slope and -2 for aspect and land cover. Factors without a raster are left
+untouched.
+"""
+
+#Import libraries
+import logging
+import logging.handlers
+import time
+import arcpy
+from mcda_progress import ProgressReporter
+from mcda_raster import sample_rasters
+
+# Functions and classes
+# Adapted from
+# http://gis.stackexchange.com/questions/135920/arcpy-logging-error-messages
+class ArcPyLogHandler(logging.handlers.RotatingFileHandler):
+    """
+    Custom logging class that bounces messages to the arcpy tool window and
+    reflects back to the log file.
+    """
+    def emit(self, record):
+        """
+        Write the log message to the tool output window (stdout) and log file.
+        """
+        try:
+            msg = record.msg.format(record.args)
+        #except:
+        except Exception as inst:
+            # Log the exception type and all error messages returned
+            arcpy.AddError(type(inst))
+            arcpy.AddError(arcpy.GetMessages())
+            msg = record.msg
+
+        if record.levelno >= logging.ERROR:
+            arcpy.AddError(msg)
+        elif record.levelno >= logging.WARNING:
+            arcpy.AddWarning(msg)
+        elif record.levelno >= logging.INFO:
+            arcpy.AddMessage(msg)
+
+        super(ArcPyLogHandler, self).emit(record)
+
+# Adapted from:
+# http://bjorn.kuiper.nu/2011/04/21/tips-tricks-fieldexists-for-arcgis-10-python
+def fieldexist(featureclass, fieldname):
+    """
+    Test for the existence of fieldname in featureclass. Returns True if the
+    field exists and False if it does not.
+    """
+    fieldlist = arcpy.ListFields(featureclass, fieldname)
+    fieldcount = len(fieldlist)
+    return bool(fieldcount == 1)
+
+def get_projection(featureclass):
+    """
+    Find and return the full spatial reference of a feature class
+    """
+    description = arcpy.Describe(featureclass)
+    # Export the full text string to ensure a 100% match, preventing
+    # discrepancies with differing central meridians, for example.
+    proj = description.SpatialReference.Name
+    return proj
+
+def compare_list_items(checklist):
+    """
+    Loop through the list and compare the items to determine if any item
+    is a mismatch with the first item in the list. Used to check for spatial
+    reference mismatches between feature classes.
+    """
+    mismatch = False # Local variable to store match results
+    check = '' # Local variable to store the spatial projection
+    for checkitem in checklist:
+        LOGGER.debug("Processing " + str(checkitem))
+        if check == '': # Nothing captured yet, use the first item as base
+            check = checkitem
+            LOGGER.debug("The check is now " + str(checkitem))
+        else:
+            # Test if they match
+            if check == checkitem:
+                LOGGER.debug("The items match. Continue testing")
+            else:
+                mismatch = True
+                LOGGER.debug("The check and current item mismatch")
+                break # Break out of the for loop. no further testing needed
+
+    LOGGER.info("Is there a spatial reference mismatch? " + str(mismatch))
+    if mismatch:
+        LOGGER.critical("Spatial reference mismatch detected.")
+    else:
+        LOGGER.info("Spatial references of all the feature classes match.")
+
+    return mismatch
+
+# User Input parameters
+LOGLEVEL = str(arcpy.GetParameterAsText(0)).upper()
+LOGDIR = arcpy.GetParameterAsText(1)
+CHECK_PROJ = arcpy.GetParameterAsText(2) # Boolean result received as text
+HAZAREA_FC = arcpy.GetParameterAsText(3)
+SLOPE_RASTER = arcpy.GetParameterAsText(4) # Optional slope raster
+ASPECT_RASTER = arcpy.GetParameterAsText(5) # Optional aspect raster
+LANDCOVER_RASTER = arcpy.GetParameterAsText(6) # Optional land cover raster
+UPDATE_ONLY = arcpy.GetParameterAsText(7) # Boolean result received as text
+
+# Tool Parameters
+arcpy.env.addOutputsToMap = False
+# Raster, target field and NoData default of each factor
+FACTOR_INPUTS = [(SLOPE_RASTER, 'SLOPE', 0.0),
+                 (ASPECT_RASTER, 'ASPECT', -2.0),
+                 (LANDCOVER_RASTER, 'LANDCOVER', -2)]
+# Only the factors with a raster are processed
+FACTORS = [factor for factor in FACTOR_INPUTS if factor[0]]
+REQUIRED_FIELDS = [factor[1] for factor in FACTORS]
+# Land cover classes are stored as whole numbers
+INTEGER_FIELDS = ['LANDCOVER']
+
+# Tool configuration:
+# Set up the logging parameters and inform the user
+DATE_STRING = time.strftime("%Y%m%d")
+LOGFILE = unicode(LOGDIR + '\\'+ DATE_STRING +
+                  '_mcdatool.log').encode('unicode-escape')
+MAXBYTES = 10485760 # 10MB
+BACKUPCOUNT = 10
+# Change this variable to a unique identifier for each script it runs in.
+# Cannot use LOGGER.findCaller(), as we're calling from an embedded script in
+# the Python toolbox.
+LOGSTAMP = "AddRasterFactors" # Identifies the source of the log entries
+LOGGER = logging.getLogger(LOGSTAMP)
+HANDLER = ArcPyLogHandler(LOGFILE, MAXBYTES, BACKUPCOUNT)
+FORMATTER = logging.Formatter("%(asctime)s %(name)-15s %(levelname)-8s %(message)s")
+HANDLER.setFormatter(FORMATTER)
+LOGGER.addHandler(HANDLER)
+LOGGER.setLevel(LOGLEVEL)
+LOGGER.debug("------- START LOGGING-----------")
+# Use the default arcpy.AddMessage method to only show this in the tool output
+# window, otherwise we will log it to the log file too.
+arcpy.AddMessage("Your Log file is: " + LOGFILE)
+
+# Define the query filter
+# Should we only update only records with a NULL value in any of the factors?
+# Only the NULL factors of those records are then written, leaving the
+# factors already filled in untouched.
+if UPDATE_ONLY == 'true':
+    QRY_FILTER = " OR ".join(field + " IS NULL" for field in REQUIRED_FIELDS)
+else:
+    QRY_FILTER = ""
+LOGGER.debug("QRY_FILTER is: " + QRY_FILTER)
+
+# Put everything in a try/finally statement, so that we can close the logger
+# even if the script bombs out or we raise an execution error along the line
+try:
+    # Sanity checks:
+
+    if not FACTORS:
+        LOGGER.error("Please supply at least one of the slope, aspect and \
+                      land cover rasters.")
+        raise arcpy.ExecuteError
+
+    # Check if the target feature class has any features before we start
+    if int(arcpy.GetCount_management(HAZAREA_FC)[0]) == 0:
+        LOGGER.error("{0} has no features. Please use a feature class that \
+                      already contains the required features and attributes." \
+                      .format(HAZAREA_FC))
+        raise arcpy.ExecuteError
+
+    # Check if the target feature class has all of the required attribute fields.
+    for checkfield in REQUIRED_FIELDS:
+        if not fieldexist(HAZAREA_FC, checkfield):
+            LOGGER.debug("Check for field: " + checkfield)
+            LOGGER.error("The field "+ checkfield +" does not exist. \
+                             Please use the correct feature class.")
+            raise arcpy.ExecuteError
+
+    # Check if the raster layers have any data before we start
+    # Adapted from https://geonet.esri.com/message/487616#comment-520588
+    for factorraster, factorfield, factordefault in FACTORS:
+        if int(arcpy.GetRasterProperties_management(factorraster,
+                                                    "ANYNODATA").
+               getOutput(0)) == 1:
+            if int(arcpy.GetRasterProperties_management(factorraster,
+                                                        "ALLNODATA").
+                   getOutput(0)) == 1:
+                LOGGER.error("All cells are NoData in " + str(factorraster))
+                LOGGER.error("Please use a raster layer that contains data.")
+                raise arcpy.ExecuteError
+        else:
+            LOGGER.debug("The raster " + str(factorraster) +
+                         " is without NoData")
+
+    # Compare the spatial references of the input data sets, unless the user
+    # actively chooses not to do so.
+    LOGGER.info("Check for spatial reference mismatches? : " + CHECK_PROJ)
+    if CHECK_PROJ == 'true':
+        LIST_FC = [get_projection(HAZAREA_FC)]
+        for factorraster, factorfield, factordefault in FACTORS:
+            LIST_FC.append(get_projection(factorraster))
+        LOGGER.debug("The list of spatial references to check is:")
+        LOGGER.debug(LIST_FC)
+        LOGGER.info("Comparing spatial references of the data sets")
+        # Check for mismatching spatial references
+        MISMATCHED = compare_list_items(LIST_FC)
+        if MISMATCHED:
+            # Terminate the script
+            raise arcpy.ExecuteError
+
+    # The rasters are sampled at the inside centroid X and Y fields added in
+    # the first step, i.e. INSIDE_X and INSIDE_Y, of a POLYGON feature class
+    FC_DESC = arcpy.Describe(HAZAREA_FC)
+    if FC_DESC.shapeType == "Polygon":
+        LOGGER.info("POLYGON feature class detected. Proceeding.")
+        FIELDLIST = ['OBJECTID'] + REQUIRED_FIELDS
+    else:
+        LOGGER.error("Unsupported shape type detected.")
+        raise arcpy.ExecuteError
+    LOGGER.debug("The FIELDLIST is now " + str(FIELDLIST))
+
+    arcpy.AddMessage("Starting with the combined raster sampling")
+    START_TIME = time.time()
+
+    # Get the total number of records to process
+    arcpy.MakeFeatureLayer_management(HAZAREA_FC, "inputHazard", QRY_FILTER)
+    RECORD_COUNT = int(arcpy.GetCount_management("inputHazard").getOutput(0))
+    LOGGER.info("Total number of features: " + str(RECORD_COUNT))
+
+    if RECORD_COUNT == 0:
+        LOGGER.warning("The Hazard Areas FC does not contain any features.")
+        raise arcpy.ExecuteError
+
+    # Read the inside centroids once and sample every raster at them
+    LOGGER.info("Sampling the rasters at the inside centroids")
+    OIDS, SAMPLES = sample_rasters(HAZAREA_FC, FACTORS, QRY_FILTER)
+    POSITIONS = dict((oid, position)
+                     for position, oid in enumerate(OIDS.tolist()))
+
+    LOGGER.info("Updating the hazard areas")
+    PROGRESS = ProgressReporter(LOGGER, RECORD_COUNT, "Raster factors")
+    with arcpy.da.UpdateCursor(HAZAREA_FC, FIELDLIST, QRY_FILTER) as cursor:
+        for row in cursor:
+            PROGRESS.update()
+            for column, factorfield in enumerate(REQUIRED_FIELDS):
+                if UPDATE_ONLY == 'true' and row[1 + column] is not None:
+                    continue
+                cellvalue = SAMPLES[factorfield][POSITIONS[row[0]]]
+                if factorfield in INTEGER_FIELDS:
+                    cellvalue = int(cellvalue)
+                else:
+                    cellvalue = float(cellvalue)
+                row[1 + column] = cellvalue
+                LOGGER.debug("OID " + str(row[0]) + " " + factorfield +
+                             " value: " + str(cellvalue))
+            cursor.updateRow(row)
+    PROGRESS.finish()
+
+    STOP_TIME = time.time()
+    LOGGER.info("Total execution time in seconds = " +
+                str(int(STOP_TIME-START_TIME)) + " and in minutes = " +
+                str(int(STOP_TIME-START_TIME)/60))
+
+finally:
+    # Shut down logging after script has finished running.
+    #http://stackoverflow.com/questions/24816456/python-logging-wont-shutdown
+    LOGGER.debug("------- STOP LOGGING-----------")
+    LOGGER.removeHandler(HANDLER)
+    HANDLER.close()
+    logging.shutdown()
@@ -22,8 +22,14 @@ assign a weight based on the count:
 import logging
 import logging.handlers
 import time
-from decimal import Decimal, getcontext #For progress COUNTER
 import arcpy
+from mcda_breakpoints import RIVERS_TABLE
+from mcda_buffer_cache import open_buffer_cache
+from mcda_neighbours import neighbour_counts, NEIGHBOUR_CHECKS
+from mcda_parallel import worker_count
+from mcda_progress import ProgressReporter
+from mcda_scoring import write_score_columns
+from mcda_spatial import load_sources, hazard_footprint, distance_counts
 
 # Functions and classes
 # Adapted from
@@ -115,17 +121,27 @@ RIVERS_FC1 = arcpy.GetParameterAsText(4)
 RIVERS_FC2 = arcpy.GetParameterAsText(5)
 BUFFER_DIST = arcpy.GetParameterAsText(6) # buffer distance in meters
 UPDATE_ONLY = arcpy.GetParameterAsText(7) # Boolean result received as text
+BUFFER_CACHE_DIR = arcpy.GetParameterAsText(8) # Optional buffer cache folder
+WORKERS = worker_count(arcpy.GetParameterAsText(9)) # Blank runs serially
+NEIGHBOUR_DIR = arcpy.GetParameterAsText(10) # Optional neighbour table folder
+MAX_RADIUS = arcpy.GetParameterAsText(11) # Optional neighbour radius in meters
+EXACT_COUNTS = arcpy.GetParameterAsText(12) # Boolean result received as text
+# QUICK, FULL or REBUILD, how the neighbour table is checked for changes
+NEIGHBOUR_CHECK = str(arcpy.GetParameterAsText(13)).upper() or 'QUICK'
 
 # Tool Parameters
 arcpy.env.addOutputsToMap = False
-getcontext().prec = 4 # Set decimal precision
 REQUIRED_FIELDS = ['RIVERS', 'RIVERS_BUFFER_DIST']
 FILTER_FIELD = "RIVERS" # Which field must we filter on and check for?
 RIVERSFEATCLASS_LIST = [] # Empty list that will store the feature classes to process
-RIVERSFEATLAYER_LIST = [] # Empty list that will store feature layers
 # Append the Meters qualifier required for the buffer distance parameter
 BUFFER_DISTM = BUFFER_DIST + " Meters"
-COUNTER = 0
+# Stop counting at the count from which the grade no longer changes, unless
+# exact counts are requested for reporting
+if EXACT_COUNTS == 'true':
+    COUNT_LIMIT = None
+else:
+    COUNT_LIMIT = RIVERS_TABLE.saturation_count()
 
 # Tool configuration:
 # Set up the logging parameters and inform the user
@@ -215,15 +231,6 @@ try:
             # Terminate the script
             raise arcpy.ExecuteError
 
-    # Adjust the fields list to include the Object ID and Shape data
-    LOGGER.info("Adding OBJECTID and SHAPE@ fields to FIELDLIST")
-    # Insert the fields at the start of the list to obtain the required
-    # field ordering
-    REQUIRED_FIELDS.insert(0, 'SHAPE@')
-    REQUIRED_FIELDS.insert(0, 'OBJECTID')
-    FIELDLIST = REQUIRED_FIELDS
-    LOGGER.debug("The FIELDLIST is now " + str(FIELDLIST))
-
     arcpy.AddMessage("Starting with River/Water Basins Proximity Analysis")
     START_TIME = time.time()
 
@@ -236,70 +243,67 @@ try:
         LOGGER.warning("The Hazard Areas FC does not contain any features.")
         raise arcpy.ExecuteError
 
-    #Create feature layers out of Infrastructure FC
-    LIST_COUNT = 0
-    for item in RIVERSFEATCLASS_LIST:
-        LIST_COUNT += 1
-        # Dynamically generate a name for the Feature layer
-        itemFlayerName = "Flayer_" + str(LIST_COUNT)
-        LOGGER.debug("Adding Feature Layer: " + itemFlayerName)
-        arcpy.MakeFeatureLayer_management(item, itemFlayerName)
-        RIVERSFEATLAYER_LIST.append(itemFlayerName)
-
-    LOGGER.info("Starting with the hazards area processing")
-    with arcpy.da.UpdateCursor(HAZAREA_FC, FIELDLIST, QRY_FILTER) as cursor:
-        for row in cursor:
-            #Loop through Hazard Areas FC
-            COUNTER += 1
-            pctDone = Decimal(COUNTER)/Decimal(RECORD_COUNT) *100
-            LOGGER.info("Processing OID " + str(row[0]) +
-                        ", with RIVERS grading of "+ str(row[2]) +
-                        ". Feature " + str(COUNTER) + " of " +
-                        str(RECORD_COUNT) + " or " + str(pctDone) + " %")
-
-            # Now loop over items in Rivers list and tally up the total
-            # Select the current feature from original Hazard FC
-            arcpy.SelectLayerByAttribute_management("inputHazard",
-                                                    "NEW_SELECTION",
-                                                    "OBJECTID = " + str(row[0]))
-
-            # Initialise the COUNTER, with its local scope, to zero
-            TOTAL_RIVER_ITEMS = 0
-            # Now loop through RIVERS feature layers and intersect
-            # with the selected feature to calculate the total
-            for fc in RIVERSFEATLAYER_LIST:
-                LOGGER.debug("Now processing Feature Layer : " + fc)
-                # Takes longer due to the buffering done as part of each query.
-                # But faster than clipping source and using that.
-                TEMP = arcpy.SelectLayerByLocation_management(fc,
-                                                              "WITHIN_A_DISTANCE_GEODESIC",
-                                                              "inputHazard",
-                                                              BUFFER_DISTM, "")
-                # Count the rows and add it to the COUNTER
-                TOTAL_RIVER_ITEMS += int(arcpy.GetCount_management(TEMP).getOutput(0))
-
-
-            LOGGER.debug("TOTAL_RIVER_ITEMS is: " + str(TOTAL_RIVER_ITEMS))
-            # Update the row with the river/water basins sum
-            # Cast to integer to ensure we deal with integer values
-            TOTAL_RIVER_ITEMS = int(TOTAL_RIVER_ITEMS)
-
-            # Calculate the grading. A case statement would have been handy.
-            if TOTAL_RIVER_ITEMS == 0:
-                gradeRivers = 0
-            elif TOTAL_RIVER_ITEMS == 1:
-                gradeRivers = 1
-            elif TOTAL_RIVER_ITEMS == 2:
-                gradeRivers = 2
-            else:
-                gradeRivers = 3
-
-            arcpy.AddMessage("River/Water Basin grading: " + str(gradeRivers))
-            # Assign the new value to the RIVERS field
-            row[2] = gradeRivers
-            # Assign the buffer distance to the Rivers buffer distance field
-            row[3] = BUFFER_DIST
-            cursor.updateRow(row)
+    if NEIGHBOUR_DIR:
+        if NEIGHBOUR_CHECK not in NEIGHBOUR_CHECKS:
+            LOGGER.error("Unknown neighbour table check: " + NEIGHBOUR_CHECK)
+            raise arcpy.ExecuteError
+        # Count from the sorted distances of every hazard area to the source
+        # features, measuring them first if they are missing or out of date
+        LOGGER.info("Counting the features within " + BUFFER_DISTM +
+                    " from the neighbour table")
+        HAZARD_TOTAL = int(arcpy.GetCount_management(HAZAREA_FC).getOutput(0))
+        PROGRESS = ProgressReporter(LOGGER, HAZARD_TOTAL,
+                                    "Rivers neighbour distances")
+        OIDS, RIVER_COUNTS, REBUILT = neighbour_counts(
+            NEIGHBOUR_DIR, HAZAREA_FC, 'RIVERS', RIVERSFEATCLASS_LIST,
+            BUFFER_DIST, MAX_RADIUS, QRY_FILTER, PROGRESS, NEIGHBOUR_CHECK)
+        if REBUILT:
+            PROGRESS.finish()
+        LOGGER.info("Neighbour table rebuilt: " + str(REBUILT))
+    else:
+        # Read every source feature class once into an in-memory spatial
+        # index, projected to the spatial reference of the hazard areas
+        LOGGER.info("Loading the source features into memory")
+        HAZARD_SR = arcpy.Describe(HAZAREA_FC).spatialReference
+        # Drop the source features outside the buffered hazard area
+        # envelopes
+        FOOTPRINT = hazard_footprint(HAZAREA_FC, BUFFER_DIST, QRY_FILTER,
+                                     HAZARD_SR)
+        RIVER_SOURCES = load_sources(RIVERSFEATCLASS_LIST, HAZARD_SR,
+                                     FOOTPRINT)
+        for source in RIVER_SOURCES:
+            LOGGER.debug(source.name + " features loaded: " +
+                         str(len(source)) + ", skipped outside the " +
+                         "hazard areas: " + str(source.skipped))
+
+        # Buffer all the hazard areas at once and join them to the source
+        # features in one set-based count, summed over the source feature
+        # classes, in WORKERS processes
+        LOGGER.info("Counting the features within " + BUFFER_DISTM)
+        PROGRESS = ProgressReporter(LOGGER,
+                                    RECORD_COUNT * len(RIVER_SOURCES),
+                                    "Rivers proximity")
+        BUFFER_CACHE = open_buffer_cache(BUFFER_CACHE_DIR)
+        try:
+            OIDS, RIVER_COUNTS = distance_counts(HAZAREA_FC, RIVER_SOURCES,
+                                                 BUFFER_DIST, QRY_FILTER,
+                                                 PROGRESS, BUFFER_CACHE,
+                                                 WORKERS, COUNT_LIMIT)
+        finally:
+            if BUFFER_CACHE is not None:
+                LOGGER.info("Buffer cache hits: " + str(BUFFER_CACHE.hits) +
+                            ", misses: " + str(BUFFER_CACHE.misses))
+                BUFFER_CACHE.close()
+        PROGRESS.finish()
+
+    # Grade all the counts at once and write them in a single update pass
+    LOGGER.info("Updating the hazard areas")
+    RIVER_GRADES = RIVERS_TABLE.grade(RIVER_COUNTS)
+    UPDATED_COUNT = write_score_columns(HAZAREA_FC, OIDS,
+                                        [('RIVERS', RIVER_GRADES),
+                                         ('RIVERS_BUFFER_DIST',
+                                          [int(float(BUFFER_DIST))] * len(OIDS))])
+    LOGGER.info("Updated " + str(UPDATED_COUNT) + " features")
 
     STOP_TIME = time.time()
     LOGGER.info("Total execution time in seconds = " +
@@ -10,16 +10,18 @@
 #-------------------------------------------------------------------------------
 
 """
-Calculates the Slope value for the Hazards Feature Class using the
-Slope raster with the Get Cell Value Spatial Analysis Tool.
+Calculates the Slope value for the Hazards Feature Class by sampling the
+Slope raster at the inside centroids of all the hazard areas at once, or
+with the mean or maximum slope inside each hazard area in the zonal mode.
 """
 
 # Import libraries
 import logging
 import logging.handlers
 import time
-from decimal import Decimal, getcontext #For progress COUNTER
 import arcpy
+from mcda_progress import ProgressReporter
+from mcda_raster import SLOPE_STATISTICS, inside_samples, zonal_statistics
 
 # Functions and classes
 # Adapted from
@@ -109,10 +111,11 @@ CHECK_PROJ = arcpy.GetParameterAsText(2) # Boolean result received as text
 HAZAREA_FC = arcpy.GetParameterAsText(3)
 SLOPE_RASTER = arcpy.GetParameterAsText(4)
 UPDATE_ONLY = arcpy.GetParameterAsText(5) # Boolean result received as text
+# Optional zonal statistic, MEAN or MAXIMUM, instead of the centroid sample
+SLOPE_STATISTIC = str(arcpy.GetParameterAsText(6)).upper()
 
 # Tool Parameters
 arcpy.env.addOutputsToMap = False
-getcontext().prec = 4 # Set decimal precision
 REQUIRED_FIELD = "SLOPE" # Which field must we filter on and check for?
 
 # Tool configuration:
@@ -175,6 +178,12 @@ try:
     else:
         LOGGER.debug("The raster is without NoData")
 
+    # Check for a supported zonal statistic
+    if SLOPE_STATISTIC and SLOPE_STATISTIC not in SLOPE_STATISTICS:
+        LOGGER.error("Unsupported slope statistic " + SLOPE_STATISTIC +
+                     ". Please use MEAN or MAXIMUM.")
+        raise arcpy.ExecuteError
+
     # Compare the spatial references of the input data sets, unless the user
     # actively chooses not to do so.
     LOGGER.info("Check for spatial reference mismatches? : " + CHECK_PROJ)
@@ -222,37 +231,39 @@ try:
         arcpy.AddError("The Hazards FC does not contain any features.")
         raise arcpy.ExecuteError
 
-    COUNTER = 0
+    if SLOPE_STATISTIC:
+        # Summarise the slope cells inside each hazard area polygon. Hazard
+        # areas without slope data keep the default value of 0.0
+        LOGGER.info("Calculating the " + SLOPE_STATISTIC.lower() +
+                    " slope inside the hazard areas")
+        ZONAL_PROGRESS = ProgressReporter(LOGGER, COUNT_RECORDS,
+                                          "Slope zonal statistics")
+        CELLVALUES = zonal_statistics(HAZAREA_FC, SLOPE_RASTER,
+                                      SLOPE_STATISTICS[SLOPE_STATISTIC], 0.0,
+                                      QRY_FILTER, progress=ZONAL_PROGRESS)
+        ZONAL_PROGRESS.finish()
+    else:
+        # Sample the raster cells under all the inside centroids at once.
+        # Cells outside the raster or with NoData keep the default of 0.0
+        LOGGER.info("Sampling " + str(SLOPE_RASTER) +
+                    " at the inside centroids")
+        CELLVALUES = inside_samples(HAZAREA_FC, SLOPE_RASTER, 0.0,
+                                    QRY_FILTER)
 
+    PROGRESS = ProgressReporter(LOGGER, COUNT_RECORDS, "Slope sampling")
     with arcpy.da.UpdateCursor(HAZAREA_FC, FIELDLIST, QRY_FILTER) as cursor:
         for row in cursor:
-            COUNTER += 1
-            # https://docs.python.org/3/library/decimal.html
-            pctDone = Decimal(COUNTER)/Decimal(COUNT_RECORDS) *100
-            LOGGER.info("Processing OID " + str(row[0]) + ", with SLOPE of "+
-                        str(row[3]) + ". Feature " + str(COUNTER) + " of " +
-                        str(COUNT_RECORDS) + " or " + str(pctDone) + " %")
+            PROGRESS.update()
+            LOGGER.debug("Processing OID " + str(row[0]) + ", with SLOPE of "+
+                         str(row[3]))
             # Print the coordinate tuple
             LOGGER.debug("X and Y: " + str(row[1]) + " " + str(row[2]))
-            # Set an initial default value
-            LOGGER.debug("Setting initial default value of -180")
-            cellvalue = 0.00
-            # Get the Cell Value from the SLOPE Raster
-            try:
-                cellresult = arcpy.GetCellValue_management(SLOPE_RASTER,
-                                                           str(row[1]) + " " +
-                                                           str(row[2]))
-                # See http://gis.stackexchange.com/questions/55246/casting-arcpy-result-as-integer-instead-arcpy-getcount-management
-                cellvalue = float(cellresult.getOutput(0))
-                LOGGER.debug("The raster cell value is " + str(cellvalue))
-
-            except Exception as err:
-                arcpy.AddMessage(err.args[0])
-
-            row[3] = cellvalue
+            row[3] = CELLVALUES[row[0]]
             cursor.updateRow(row)
             LOGGER.debug("The slope value is now: " + str(row[3]))
 
+    PROGRESS.finish()
+
     # Calculate the execution time
     STOP_TIME = time.time()
     arcpy.AddMessage("Total execution time in seconds = " +
@@ -0,0 +1,204 @@
+#------------------------------------------------------------------------------
+# Name:        get_top_priorities
+# Purpose:     Extract the highest scoring hazard areas from the calc_score
+#              output.
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Write the K hazard areas with the highest WEIGHTEDSCORE, optionally limited to
+one RANKING class, to a new table in priority order. The calc_score output is
+streamed through a bounded heap, so neither a full sort nor a copy of the
+scores is needed. If the grade cache of an incremental calc_score run is
+available and still matches the Object IDs and weights of the output, the
+scores are rebuilt from it and selected with argpartition.
+"""
+
+#Import libraries
+import logging
+import logging.handlers
+import time # For timing purposes
+import numpy as np
+import arcpy
+from mcda_cache import grade_cache_path, load_grade_cache, cache_matches
+from mcda_scoring import (unweighted_scores, weighted_scores,
+                          priority_rankings, write_score_table,
+                          WEIGHT_FIELDS)
+from mcda_topk import top_k_array, read_top_priorities
+
+# Functions and classes
+# Adapted from:
+# http://gis.stackexchange.com/questions/135920/arcpy-logging-error-messages
+class ArcPyLogHandler(logging.handlers.RotatingFileHandler):
+    """
+    Custom logging class that bounces messages to the arcpy tool window and
+    reflects back to the log file.
+    """
+    def emit(self, record):
+        """
+        Write the log message to the tool output window (stdout) and log file.
+        """
+        try:
+            msg = record.msg.format(record.args)
+        #except:
+        except Exception as inst:
+            # Log the exception type and all error messages returned
+            LOGGER.error(type(inst))
+            LOGGER.error(arcpy.GetMessages())
+            msg = record.msg
+
+        if record.levelno >= logging.ERROR:
+            arcpy.AddError(msg)
+        elif record.levelno >= logging.WARNING:
+            arcpy.AddWarning(msg)
+        elif record.levelno >= logging.INFO:
+            arcpy.AddMessage(msg)
+
+        super(ArcPyLogHandler, self).emit(record)
+
+# Adapted from:
+# http://bjorn.kuiper.nu/2011/04/21/tips-tricks-fieldexists-for-arcgis-10-python
+def fieldexist(featureclass, fieldname):
+    """
+    Test for the existence of fieldname in featureclass. Returns True if the
+    field exists and False if it does not.
+    """
+    fieldlist = arcpy.ListFields(featureclass, fieldname)
+    fieldcount = len(fieldlist)
+    return bool(fieldcount == 1)
+
+# Global variables
+# User Input parameters
+LOGLEVEL = str(arcpy.GetParameterAsText(0)).upper()
+LOGDIR = arcpy.GetParameterAsText(1)
+SCORE_FC = arcpy.GetParameterAsText(2) # calc_score output feature class or table
+OUTPUT_TABLE = arcpy.GetParameterAsText(3) # New table to store the top K rows
+TOP_COUNT = int(arcpy.GetParameterAsText(4)) # Number of hazard areas to return
+RANKING_FILTER = arcpy.GetParameterAsText(5) # Optional Low, Medium or High
+CACHE_DIR = arcpy.GetParameterAsText(6) # Optional grade cache folder
+
+arcpy.env.addOutputsToMap = False
+REQUIRED_FIELDS = ['RANKING', 'WEIGHTEDSCORE']
+SCORE_OID_FIELD = 'DHA_OID' # Source Object ID field of a score table
+
+# Tool configuration:
+# Set up the logging parameters and inform the user
+DATE_STRING = time.strftime("%Y%m%d")
+LOGFILE = unicode(LOGDIR + '\\'+ DATE_STRING +
+                  '_mcdatool.log').encode('unicode-escape')
+MAXBYTES = 10485760 # 10MB
+BACKUPCOUNT = 10
+# Change this variable to a unique identifier for each script it runs in.
+# Cannot use LOGGER.findCaller(), as we're calling from an embedded script in
+# the Python toolbox.
+LOGSTAMP = "GetTopPriorities" # Identifies the source of the log entries
+LOGGER = logging.getLogger(LOGSTAMP)
+HANDLER = ArcPyLogHandler(LOGFILE, MAXBYTES, BACKUPCOUNT)
+FORMATTER = logging.Formatter("%(asctime)s %(name)-15s %(levelname)-8s %(message)s")
+HANDLER.setFormatter(FORMATTER)
+LOGGER.addHandler(HANDLER)
+LOGGER.setLevel(LOGLEVEL)
+LOGGER.debug("------- START LOGGING-----------")
+# Use the default arcpy.AddMessage method to only show this in the tool output
+# window, otherwise we will log it to the log file too.
+arcpy.AddMessage("Your Log file is: " + LOGFILE)
+
+# Put everything in a try/finally statement, so that we can close the logger
+# even if the script bombs out or we raise an execution error along the line
+try:
+    # Sanity checks:
+
+    # Check if the score output has the required attribute fields.
+    for checkfield in REQUIRED_FIELDS:
+        if not fieldexist(SCORE_FC, checkfield):
+            LOGGER.debug("Check for field: " + checkfield)
+            LOGGER.error("The field "+ checkfield +" does not exist.")
+            raise arcpy.ExecuteError
+
+    if TOP_COUNT < 1:
+        LOGGER.error("Please request at least one hazard area.")
+        raise arcpy.ExecuteError
+
+    if RANKING_FILTER and RANKING_FILTER not in ["Low", "Medium", "High"]:
+        LOGGER.error("Unknown RANKING class: " + RANKING_FILTER)
+        raise arcpy.ExecuteError
+
+    # Score tables refer to the source hazard areas by DHA_OID
+    if fieldexist(SCORE_FC, SCORE_OID_FIELD):
+        ID_FIELD = SCORE_OID_FIELD
+    else:
+        ID_FIELD = arcpy.Describe(SCORE_FC).OIDFieldName
+    LOGGER.debug("Identifying the hazard areas by " + ID_FIELD)
+
+    LOGGER.info("Selecting the top " + str(TOP_COUNT) + " hazard areas")
+    START_TIME = time.time()
+
+    CACHE = None
+    if CACHE_DIR:
+        CACHE = load_grade_cache(grade_cache_path(CACHE_DIR, SCORE_FC))
+        if CACHE is None:
+            LOGGER.info("No grade cache found, reading the scores instead")
+        elif not all(fieldexist(SCORE_FC, field) for field in WEIGHT_FIELDS):
+            LOGGER.info("The weight fields are missing, reading the scores "
+                        "instead")
+            CACHE = None
+        else:
+            # The output may have been edited or rewritten since the cache
+            # was saved, so compare its rows before trusting the cache
+            with arcpy.da.SearchCursor(SCORE_FC,
+                                       [ID_FIELD] + WEIGHT_FIELDS) as cursor:
+                ROWS = [row for row in cursor]
+            if not cache_matches(CACHE, [row[0] for row in ROWS],
+                                 [row[1:] for row in ROWS]):
+                LOGGER.info("The grade cache does not match " + SCORE_FC +
+                            ", reading the scores instead")
+                CACHE = None
+
+    if CACHE is not None:
+        # Rebuild the written scores from the cached grades and settings
+        LOGGER.info("Rebuilding the scores from the grade cache")
+        IDS = CACHE['oids']
+        SCORES = weighted_scores(CACHE['grades'], CACHE['weights'])
+        RANKINGS = priority_rankings(unweighted_scores(CACHE['grades']),
+                                     CACHE['breakpoints'][0],
+                                     CACHE['breakpoints'][1])
+        if RANKING_FILTER:
+            KEEP = np.nonzero(RANKINGS == RANKING_FILTER)[0]
+            IDS, SCORES, RANKINGS = IDS[KEEP], SCORES[KEEP], RANKINGS[KEEP]
+        TOP = top_k_array(IDS, SCORES, TOP_COUNT)
+        TOP_IDS, TOP_SCORES, TOP_RANKINGS = IDS[TOP], SCORES[TOP], RANKINGS[TOP]
+    else:
+        LOGGER.info("Streaming the scores of " + SCORE_FC)
+        TOP_ROWS = read_top_priorities(SCORE_FC, TOP_COUNT, ID_FIELD,
+                                       ranking=RANKING_FILTER)
+        TOP_IDS = [row[0] for row in TOP_ROWS]
+        TOP_SCORES = [row[1] for row in TOP_ROWS]
+        TOP_RANKINGS = [row[2] for row in TOP_ROWS]
+
+    if len(TOP_IDS) < TOP_COUNT:
+        LOGGER.warning("Only " + str(len(TOP_IDS)) +
+                       " hazard areas match the query.")
+
+    LOGGER.info("Writing the top hazard areas to " + OUTPUT_TABLE)
+    write_score_table(OUTPUT_TABLE, TOP_IDS,
+                      [('PRIORITY', np.arange(1, len(TOP_IDS) + 1)),
+                       ('WEIGHTEDSCORE', np.asarray(TOP_SCORES, dtype=np.int64)),
+                       ('RANKING', np.asarray(TOP_RANKINGS, dtype=object))])
+
+    STOP_TIME = time.time()
+    LOGGER.info("Total execution time in seconds = " +
+                str(int(STOP_TIME-START_TIME)) + " and in minutes = " +
+                str(int(STOP_TIME-START_TIME)/60))
+
+finally:
+    # Shut down logging after script has finished running.
+    #http://stackoverflow.com/questions/24816456/python-logging-wont-shutdown
+    LOGGER.debug("------- STOP LOGGING-----------")
+    LOGGER.removeHandler(HANDLER)
+    HANDLER.close()
+    logging.shutdown()
@@ -0,0 +1,164 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_breakpoints
+# Purpose:     Declarative breakpoint tables for grading the MCDA factors
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Breakpoint tables used to grade each location factor. Each factor is described
+by a list of (lower bound, bound is inclusive, grade) entries in ascending
+order, a grade for values below the first bound and a grade for NULL values.
+The tables are compiled once into sorted bin edges, so that a value is graded
+with a single binary search and a whole column with one np.searchsorted call.
+The tables are shared by calc_score and the per-factor get_*.py scripts.
+"""
+
+#Import libraries
+import bisect
+import math
+import numpy as np
+
+# The priority classes written to the RANKING field, from low to high
+RANKING_CLASSES = ["Low", "Medium", "High"]
+
+# Functions and classes
+class BreakpointTable(object):
+    """
+    Compiled breakpoint table for one factor. An exclusive lower bound is
+    stored as the next representable float above the bound, which turns every
+    bin into a closed-open interval that np.searchsorted can look up.
+    """
+    def __init__(self, name, breakpoints, belowgrade, nullgrade):
+        """
+        Compile the (lower bound, inclusive, grade) breakpoints of a factor.
+        """
+        self.name = name
+        self.breakpoints = list(breakpoints)
+        self.belowgrade = belowgrade
+        self.nullgrade = nullgrade
+        edges = []
+        for bound, inclusive, grade in self.breakpoints:
+            if inclusive:
+                edges.append(float(bound))
+            else:
+                edges.append(float(np.nextafter(bound, np.inf)))
+        if edges != sorted(edges):
+            raise ValueError("The breakpoints of " + name +
+                             " must be in ascending order.")
+        self.edges = np.array(edges, dtype=np.float64)
+        self.edgelist = edges
+        gradelist = [belowgrade] + [entry[2] for entry in self.breakpoints]
+        self.gradelist = gradelist
+        if all(isinstance(grade, int) for grade in gradelist + [nullgrade]):
+            self.grades = np.array(gradelist, dtype=np.int64)
+        else:
+            self.grades = np.array(gradelist, dtype=object)
+
+    def grade(self, values):
+        """
+        Grade an array of values. NaN values receive the NULL grade.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        grades = self.grades[np.searchsorted(self.edges, values, side='right')]
+        nullmask = np.isnan(values)
+        if nullmask.any():
+            grades[nullmask] = self.nullgrade
+        return grades
+
+    def grade_value(self, value):
+        """
+        Grade a single value, as used inside the row-by-row cursor loops.
+        None and NaN values receive the NULL grade.
+        """
+        if value is None or math.isnan(value):
+            return self.nullgrade
+        return self.gradelist[bisect.bisect_right(self.edgelist, value)]
+
+    def saturation_count(self):
+        """
+        Return the smallest whole count from which every larger count
+        receives the same grade, the count at which counting can stop
+        without changing the grade, or None for a table without
+        breakpoints.
+        """
+        if not self.edgelist:
+            return None
+        first = len(self.gradelist) - 1
+        while first > 1 and self.gradelist[first - 1] == self.gradelist[-1]:
+            first -= 1
+        return int(math.ceil(self.edgelist[first - 1]))
+
+def landcover_table(bareareacode):
+    """
+    Build the land cover table for the user-defined bare area land cover
+    code. Bare area scores 1 and every other land cover class scores 3.
+    """
+    return BreakpointTable('LANDCOVER', [(bareareacode, True, 1),
+                                         (bareareacode, False, 3)], 3, 3)
+
+def ranking_table(lowbreakpoint, mediumbreakpoint):
+    """
+    Build the priority classification table from the user-defined low and
+    medium score breakpoints. A medium breakpoint below the low breakpoint
+    classifies every score from the low breakpoint upwards as High.
+    """
+    mediumbreakpoint = max(lowbreakpoint, mediumbreakpoint)
+    return BreakpointTable('RANKING',
+                           [(lowbreakpoint, True, RANKING_CLASSES[1]),
+                            (mediumbreakpoint, True, RANKING_CLASSES[2])],
+                           RANKING_CLASSES[0], RANKING_CLASSES[0])
+
+# Aspect in degrees. Northern aspects score highest. NULL values grade as
+# a negative aspect, i.e. flat terrain.
+ASPECT_TABLE = BreakpointTable('ASPECT', [
+    (0, True, 3),       # 0 to 22.5 degrees
+    (22.5, False, 2),   # Above 22.5 to below 67.6 degrees
+    (67.6, True, 1),    # 67.6 to below 112.6 degrees
+    (112.6, True, 0),   # 112.6 to below 292.6 degrees
+    (292.6, True, 2),   # 292.6 to below 337.6 degrees
+    (337.6, True, 3)],  # 337.6 degrees and above
+                              0, 0)
+
+# Slope in degrees. A slope of exactly 15 degrees falls through to 3.
+SLOPE_TABLE = BreakpointTable('SLOPE', [
+    (0, True, 0),       # No slope recorded
+    (0, False, 3),      # Above 0 to 10 degrees
+    (10, False, 2),     # Above 10 to below 15 degrees
+    (15, True, 3),      # Exactly 15 degrees
+    (15, False, 1)],    # Above 15 degrees
+                              3, 3)
+
+# Total population located near the feature
+POPULATION_TABLE = BreakpointTable('POPULATION', [
+    (0, True, 0),       # Nobody affected
+    (0, False, 1),      # Above 0 to below 51 people
+    (51, True, 2),      # 51 to below 101 people
+    (101, True, 3)],    # 101 people and more
+                                   3, 3)
+
+# Number of features located near the feature. Only exact counts of 0, 1 and
+# 2 keep their value; everything else scores 3.
+COUNT_BREAKPOINTS = [
+    (0, True, 0), (0, False, 3),
+    (1, True, 1), (1, False, 3),
+    (2, True, 2), (2, False, 3)]
+INFRASTRUCTURE_TABLE = BreakpointTable('INFRASTRUCTURE', COUNT_BREAKPOINTS, 3, 3)
+KEYFEATURES_TABLE = BreakpointTable('KEYFEATURES', COUNT_BREAKPOINTS, 3, 3)
+ACCIDENTS_TABLE = BreakpointTable('ACCIDENTS', COUNT_BREAKPOINTS, 3, 3)
+POI_TABLE = BreakpointTable('POI', COUNT_BREAKPOINTS, 3, 3)
+RIVERS_TABLE = BreakpointTable('RIVERS', COUNT_BREAKPOINTS, 3, 3)
+
+# The tables that do not depend on user input, keyed by factor field
+FACTOR_TABLES = {'ASPECT': ASPECT_TABLE,
+                 'INFRASTRUCTURE': INFRASTRUCTURE_TABLE,
+                 'KEYFEATURES': KEYFEATURES_TABLE,
+                 'ACCIDENTS': ACCIDENTS_TABLE,
+                 'POI': POI_TABLE,
+                 'RIVERS': RIVERS_TABLE,
+                 'SLOPE': SLOPE_TABLE,
+                 'POPULATION': POPULATION_TABLE}
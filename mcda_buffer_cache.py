@@ -0,0 +1,145 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_buffer_cache
+# Purpose:     Keep the geodesic buffers of the hazard areas on disk between runs
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Store the geodesic buffer of every hazard area in a SQLite file, keyed by a
+hash of the hazard area geometry, the buffer distance and the spatial
+reference. The proximity tools buffer the same hazard areas at the same
+distances for several factors and on every re-run; with the cache only the
+hazard areas that are new or were edited since the buffer was stored are
+buffered again. When the cache is closed the least recently used buffers
+are evicted down to a size limit and the freed pages are returned to the
+file system, so the file itself stays near the limit.
+"""
+
+#Import libraries
+import hashlib
+import os
+import sqlite3
+import time
+
+# Name of the cache file in the cache folder
+BUFFER_CACHE_FILE = 'mcda_buffers.sqlite'
+# Default size limit of the cache file in bytes
+BUFFER_CACHE_SIZE = 536870912 # 512MB
+
+# Functions and classes
+def buffer_cache_key(geometry, distance, spatialreference):
+    """
+    Return the cache key of the buffer of geometry by distance meters: a
+    SHA-1 hex digest of the geometry's WKB, the distance and the spatial
+    reference string.
+    """
+    digest = hashlib.sha1()
+    digest.update(bytes(geometry.WKB))
+    digest.update(repr(float(distance)).encode('ascii'))
+    digest.update(spatialreference.encode('utf-8'))
+    return digest.hexdigest()
+
+class BufferCache(object):
+    """
+    Size-bounded least recently used store of buffer geometries as WKB.
+    """
+    def __init__(self, cachefile, maxbytes=BUFFER_CACHE_SIZE):
+        """
+        Open or create the cache file.
+        """
+        self.cachefile = cachefile
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(cachefile, timeout=60)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS buffers (key TEXT PRIMARY KEY, "
+            "wkb BLOB NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS buffers_used ON buffers (used)")
+        self.connection.commit()
+
+    def get(self, key):
+        """
+        Return the WKB stored under key as a bytearray, or None if there is
+        none. A hit marks the buffer as recently used.
+        """
+        row = self.connection.execute(
+            "SELECT wkb FROM buffers WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute("UPDATE buffers SET used = ? WHERE key = ?",
+                                (time.time(), key))
+        return bytearray(row[0])
+
+    def put(self, key, wkb):
+        """
+        Store the WKB of a buffer under key.
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO buffers (key, wkb, size, used) "
+            "VALUES (?, ?, ?, ?)",
+            (key, sqlite3.Binary(bytes(wkb)), len(wkb), time.time()))
+
+    def commit(self):
+        """
+        Commit the buffers stored so far.
+        """
+        self.connection.commit()
+
+    def size(self):
+        """
+        Return the total size in bytes of the stored buffers.
+        """
+        total = self.connection.execute(
+            "SELECT SUM(size) FROM buffers").fetchone()[0]
+        return total or 0
+
+    def evict(self):
+        """
+        Delete the least recently used buffers until the stored buffers fit
+        within maxbytes, commit and VACUUM the file to release the freed
+        pages. Returns the number deleted.
+        """
+        excess = self.size() - self.maxbytes
+        stale = []
+        if excess > 0:
+            for key, size in self.connection.execute(
+                    "SELECT key, size FROM buffers ORDER BY used"):
+                if excess <= 0:
+                    break
+                stale.append((key,))
+                excess -= size
+            self.connection.executemany("DELETE FROM buffers WHERE key = ?",
+                                        stale)
+        self.connection.commit()
+        if stale:
+            self.connection.execute("VACUUM")
+        return len(stale)
+
+    def close(self):
+        """
+        Evict down to the size limit, commit and close the cache file. This
+        is the only place the cache evicts, so a run does not rescan the
+        table after every buffer distance.
+        """
+        self.evict()
+        self.connection.close()
+
+def open_buffer_cache(cachedir, maxbytes=BUFFER_CACHE_SIZE):
+    """
+    Open the buffer cache in the cachedir folder, creating the folder if
+    needed. Returns None if no folder is given, which disables caching.
+    """
+    if not cachedir:
+        return None
+    if not os.path.isdir(cachedir):
+        os.makedirs(cachedir)
+    return BufferCache(os.path.join(cachedir, BUFFER_CACHE_FILE), maxbytes)
@@ -0,0 +1,113 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_cache
+# Purpose:     Cache the grade matrix of a scored feature class between runs
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Store the grade matrix that calc_score wrote to a target, together with a
+fingerprint of the source factor columns and the weights and breakpoints
+used. A later run with the same fingerprint can reuse the grades and rewrite
+only the columns whose inputs changed, instead of copying and regrading the
+whole feature class.
+"""
+
+#Import libraries
+import hashlib
+import os
+import numpy as np
+
+# Functions and classes
+def fingerprint_factors(oids, factorvalues, bareareacode, source='',
+                        outputmode=''):
+    """
+    Return a SHA-1 hex digest of the Object IDs, the factor values and the
+    bare area land cover code, which together determine the grade matrix,
+    and of the source feature class and output mode, which determine the
+    layout of the target the grades were written to. A target written from
+    another source or in another output mode never matches.
+    """
+    digest = hashlib.sha1()
+    digest.update((source.lower() + '|' + outputmode.upper() + '|')
+                  .encode('utf-8'))
+    digest.update(np.ascontiguousarray(oids, dtype=np.int64))
+    # Give every NULL the same bit pattern before hashing
+    values = np.where(np.isnan(factorvalues), -1.0e300, factorvalues)
+    digest.update(np.ascontiguousarray(values, dtype=np.float64))
+    digest.update(str(bareareacode).encode('ascii'))
+    return digest.hexdigest()
+
+def grade_cache_path(cachedir, target):
+    """
+    Return the cache file used for the target feature class or table.
+    """
+    name = hashlib.sha1(target.lower().encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cachedir, 'mcda_grades_' + name + '.npz')
+
+def load_grade_cache(cachefile):
+    """
+    Load a grade cache written by save_grade_cache. Returns a dictionary
+    with the fingerprint, oids, grades, weights and breakpoints, or None if
+    the file does not exist or cannot be read.
+    """
+    if not os.path.exists(cachefile):
+        return None
+    try:
+        archive = np.load(cachefile)
+        try:
+            return {'fingerprint': str(archive['fingerprint']),
+                    'oids': archive['oids'],
+                    'grades': archive['grades'],
+                    'weights': archive['weights'].tolist(),
+                    'breakpoints': archive['breakpoints'].tolist()}
+        finally:
+            archive.close()
+    except (IOError, KeyError, ValueError):
+        return None
+
+def save_grade_cache(cachefile, fingerprint, oids, grades, weights,
+                     breakpoints):
+    """
+    Save the grade matrix and the settings last written to the target. oids
+    are the Object IDs the score rows were written to in the target.
+    """
+    np.savez(cachefile, fingerprint=np.array(fingerprint), oids=oids,
+             grades=grades, weights=np.asarray(weights, dtype=np.int64),
+             breakpoints=np.asarray(breakpoints, dtype=np.int64))
+
+def clear_grade_cache(cachefile):
+    """
+    Delete a grade cache, before its target is rewritten, so that a run that
+    fails halfway never leaves a cache describing values it did not write.
+    """
+    if os.path.exists(cachefile):
+        os.remove(cachefile)
+
+def changed_columns(cache, weights, breakpoints):
+    """
+    Return which of the SCORE, RANKING and weight columns of a target must
+    be written, as three booleans, given the cache of the grades, weights
+    and breakpoints last written to it. Without a cache every column is.
+    """
+    if cache is None:
+        return True, True, True
+    return (False, cache['breakpoints'] != list(breakpoints),
+            cache['weights'] != list(weights))
+
+def cache_matches(cache, ids, weightrows):
+    """
+    Test whether a grade cache still describes a scored target, given the
+    Object IDs and the weight field values of its rows. The cache matches if
+    it holds the same Object IDs and every row carries the cached weights,
+    so a target rewritten or edited since the cache was saved is detected.
+    """
+    ids = np.sort(np.asarray(ids, dtype=np.int64))
+    if not np.array_equal(ids, np.sort(cache['oids'])):
+        return False
+    weights = tuple(cache['weights'])
+    return all(tuple(row) == weights for row in weightrows)
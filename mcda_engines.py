@@ -0,0 +1,133 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_engines
+# Purpose:     Alternative MCDA aggregation engines for the grade matrix
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+TOPSIS, VIKOR and PROMETHEE II aggregation of the nine-factor grade matrix, as
+alternatives to the weighted linear sum of calc_score. Every factor grade is
+treated as a benefit criterion, as a higher grade means a higher priority.
+The engines work on the distinct grade rows, weighted by the number of
+features sharing each row, and every engine returns a score where higher
+means a higher priority. PROMETHEE II compares every row with every other
+row, so its preference flows are summed one block of rows at a time and the
+full pairwise matrix is never held in memory.
+"""
+
+#Import libraries
+import numpy as np
+from mcda_scoring import unique_grade_rows, competition_ranks
+
+# Engine names accepted by calc_score, besides the weighted sum
+ENGINES = ['TOPSIS', 'VIKOR', 'PROMETHEE II']
+
+# Functions and classes
+def normalised_weights(weights):
+    """
+    Return the weights as floats that sum to one.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    return weights / weights.sum()
+
+def _unit_scale(values):
+    """
+    Scale values to the range 0..1, or to zero if they are all equal.
+    """
+    valuerange = values.max() - values.min()
+    if valuerange == 0:
+        return np.zeros(len(values))
+    return (values - values.min()) / valuerange
+
+def topsis_scores(rows, counts, weights):
+    """
+    Return the TOPSIS closeness of each row to the ideal solution, from 0
+    (the anti-ideal) to 1 (the ideal). The columns are vector normalised
+    over all the features the rows represent.
+    """
+    rows = np.asarray(rows, dtype=np.float64)
+    norms = np.sqrt(np.dot(counts, rows ** 2))
+    norms[norms == 0] = 1.0
+    weighted = rows / norms * normalised_weights(weights)
+    ideal = weighted.max(axis=0)
+    antiideal = weighted.min(axis=0)
+    toideal = np.sqrt(((weighted - ideal) ** 2).sum(axis=1))
+    toantiideal = np.sqrt(((weighted - antiideal) ** 2).sum(axis=1))
+    distance = toideal + toantiideal
+    closeness = np.zeros(len(rows))
+    np.divide(toantiideal, distance, out=closeness, where=distance > 0)
+    return closeness
+
+def vikor_scores(rows, weights, strategy=0.5):
+    """
+    Return 1 - Q for each row, where Q is the VIKOR compromise index built
+    from the group utility S and the individual regret R. strategy is the
+    weight of the majority rule (v), 0.5 for consensus.
+    """
+    rows = np.asarray(rows, dtype=np.float64)
+    best = rows.max(axis=0)
+    worst = rows.min(axis=0)
+    spread = best - worst
+    spread[spread == 0] = 1.0
+    gaps = (best - rows) / spread * normalised_weights(weights)
+    utility = gaps.sum(axis=1)
+    regret = gaps.max(axis=1)
+    compromise = (strategy * _unit_scale(utility) +
+                  (1 - strategy) * _unit_scale(regret))
+    return 1.0 - compromise
+
+def promethee_scores(rows, counts, weights, threshold=0, blocksize=1000):
+    """
+    Return the PROMETHEE II net outranking flow of each row, between -1 and
+    1. threshold is the preference threshold of the linear preference
+    function; 0 gives the usual criterion, where any grade difference is a
+    full preference. Flows are summed for blocksize rows at a time against
+    all rows, so memory grows with blocksize times the row count only.
+    """
+    rows = np.asarray(rows, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.float64)
+    weights = normalised_weights(weights)
+    others = max(counts.sum() - 1, 1)
+    netflow = np.zeros(len(rows))
+    for start in range(0, len(rows), blocksize):
+        block = rows[start:start + blocksize]
+        outflow = np.zeros((len(block), len(rows)))
+        inflow = np.zeros((len(block), len(rows)))
+        for column, weight in enumerate(weights):
+            difference = block[:, column, np.newaxis] - rows[:, column]
+            if threshold > 0:
+                preference = np.clip(difference / float(threshold), 0, 1)
+                against = np.clip(-difference / float(threshold), 0, 1)
+            else:
+                preference = (difference > 0).astype(np.float64)
+                against = (difference < 0).astype(np.float64)
+            outflow += weight * preference
+            inflow += weight * against
+        # Each distinct row stands for counts features in the comparison
+        netflow[start:start + blocksize] = np.dot(outflow - inflow,
+                                                  counts) / others
+    return netflow
+
+def engine_scores(grades, weights, engine, threshold=0, blocksize=1000):
+    """
+    Score the N x 9 grade matrix with the named engine. Returns the score of
+    every feature and its competition rank, where rank 1 is the highest
+    priority. Raises a ValueError for an unknown engine.
+    """
+    uniquerows, inverse, counts = unique_grade_rows(grades)
+    if engine == 'TOPSIS':
+        scores = topsis_scores(uniquerows, counts, weights)
+    elif engine == 'VIKOR':
+        scores = vikor_scores(uniquerows, weights)
+    elif engine == 'PROMETHEE II':
+        scores = promethee_scores(uniquerows, counts, weights, threshold,
+                                  blocksize)
+    else:
+        raise ValueError("Unknown MCDA engine: " + str(engine))
+    ranks = competition_ranks(scores, counts)
+    return scores[inverse], ranks[inverse]
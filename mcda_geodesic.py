@@ -0,0 +1,352 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_geodesic
+# Purpose:     Vectorised geodesic distance kernels with a spherical prefilter
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Distance kernels on the WGS 1984 ellipsoid for arrays of longitude and
+latitude coordinates in decimal degrees. The haversine distance on a sphere
+of the mean earth radius is cheap and lies within HAVERSINE_ERROR (0.6 %) of
+the ellipsoidal geodesic distance, so a point is within a distance for
+certain if its haversine distance is below the distance less that margin,
+and beyond it for certain if above the distance plus that margin. Only the
+points in between are passed to the exact Vincenty inverse formula.
+"""
+
+#Import libraries
+import numpy as np
+
+# WGS 1984 ellipsoid
+SEMI_MAJOR_AXIS = 6378137.0
+FLATTENING = 1 / 298.257223563
+SEMI_MINOR_AXIS = SEMI_MAJOR_AXIS * (1 - FLATTENING)
+ECCENTRICITY_SQUARED = FLATTENING * (2 - FLATTENING)
+# Mean earth radius (2a + b) / 3, used by the haversine prefilter
+MEAN_RADIUS = 6371008.7714
+# Upper bound of the relative error of the haversine distance against the
+# ellipsoidal geodesic distance, which stays below 0.56 % at the mean radius
+HAVERSINE_ERROR = 0.006
+# Shortest length of a degree of latitude and longitude at the equator, used
+# to widen envelopes in degrees by a distance in meters without shortfall
+METERS_PER_DEGREE_LATITUDE = 110574.0
+METERS_PER_DEGREE_LONGITUDE = 111319.0
+
+# Functions and classes
+def haversine_distance(lon1, lat1, lon2, lat2):
+    """
+    Return the great circle distance in meters between arrays of points on
+    a sphere of the mean earth radius.
+    """
+    lon1, lat1, lon2, lat2 = [np.radians(np.asarray(value, dtype=np.float64))
+                              for value in (lon1, lat1, lon2, lat2)]
+    halfchord = (np.sin((lat2 - lat1) / 2.0) ** 2 + np.cos(lat1) *
+                 np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2)
+    return 2 * MEAN_RADIUS * np.arcsin(np.sqrt(np.clip(halfchord, 0, 1)))
+
+def vincenty_distance(lon1, lat1, lon2, lat2, tolerance=1e-12,
+                      iterations=200):
+    """
+    Return the ellipsoidal geodesic distance in meters between arrays of
+    points with the Vincenty inverse formula, iterated for all the pairs at
+    once. The few nearly antipodal pairs where the iteration does not
+    converge fall back to the haversine distance.
+    """
+    lon1, lat1, lon2, lat2 = np.broadcast_arrays(
+        *[np.asarray(value, dtype=np.float64)
+          for value in (lon1, lat1, lon2, lat2)])
+    flattening = FLATTENING
+    longitude = np.radians(lon2 - lon1)
+    reduced1 = np.arctan((1 - flattening) * np.tan(np.radians(lat1)))
+    reduced2 = np.arctan((1 - flattening) * np.tan(np.radians(lat2)))
+    sinu1, cosu1 = np.sin(reduced1), np.cos(reduced1)
+    sinu2, cosu2 = np.sin(reduced2), np.cos(reduced2)
+
+    lamb = longitude.copy()
+    active = np.ones(lamb.shape, dtype=bool)
+    sinsigma = cossigma = sigma = cossqalpha = cos2sigmam = None
+    for _ in range(iterations):
+        sinlamb, coslamb = np.sin(lamb), np.cos(lamb)
+        sinsigma = np.sqrt((cosu2 * sinlamb) ** 2 +
+                           (cosu1 * sinu2 - sinu1 * cosu2 * coslamb) ** 2)
+        cossigma = sinu1 * sinu2 + cosu1 * cosu2 * coslamb
+        sigma = np.arctan2(sinsigma, cossigma)
+        safesin = np.where(sinsigma == 0, 1.0, sinsigma)
+        sinalpha = cosu1 * cosu2 * sinlamb / safesin
+        cossqalpha = 1 - sinalpha ** 2
+        safecos = np.where(cossqalpha == 0, 1.0, cossqalpha)
+        # Equatorial lines have cos^2(alpha) = 0 and cos(2 sigma_m) = 0
+        cos2sigmam = np.where(cossqalpha == 0, 0.0,
+                              cossigma - 2 * sinu1 * sinu2 / safecos)
+        correction = (flattening / 16 * cossqalpha *
+                      (4 + flattening * (4 - 3 * cossqalpha)))
+        previous = lamb
+        lamb = longitude + (1 - correction) * flattening * sinalpha * (
+            sigma + correction * sinsigma * (
+                cos2sigmam + correction * cossigma *
+                (-1 + 2 * cos2sigmam ** 2)))
+        lamb = np.where(active, lamb, previous)
+        active = np.abs(lamb - previous) > tolerance
+        if not active.any():
+            break
+
+    usq = cossqalpha * (SEMI_MAJOR_AXIS ** 2 - SEMI_MINOR_AXIS ** 2) / \
+        SEMI_MINOR_AXIS ** 2
+    coefa = 1 + usq / 16384 * (4096 + usq * (-768 + usq * (320 - 175 * usq)))
+    coefb = usq / 1024 * (256 + usq * (-128 + usq * (74 - 47 * usq)))
+    deltasigma = coefb * sinsigma * (cos2sigmam + coefb / 4 * (
+        cossigma * (-1 + 2 * cos2sigmam ** 2) - coefb / 6 * cos2sigmam *
+        (-3 + 4 * sinsigma ** 2) * (-3 + 4 * cos2sigmam ** 2)))
+    distance = SEMI_MINOR_AXIS * coefa * (sigma - deltasigma)
+    if active.any():
+        distance = np.where(active, haversine_distance(lon1, lat1, lon2, lat2),
+                            distance)
+    return distance
+
+def degree_lengths(lat):
+    """
+    Return the lengths in meters of a degree of longitude and of latitude
+    at the latitudes lat, from the radii of curvature of the ellipsoid.
+    """
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    factor = 1 - ECCENTRICITY_SQUARED * np.sin(lat) ** 2
+    return (np.radians(SEMI_MAJOR_AXIS * np.cos(lat) / np.sqrt(factor)),
+            np.radians(SEMI_MAJOR_AXIS * (1 - ECCENTRICITY_SQUARED) /
+                       factor ** 1.5))
+
+def plane_distance(lon1, lat1, lon2, lat2):
+    """
+    Return the distance in meters between arrays of points on the plane
+    tangent to the ellipsoid at their mean latitude. Its relative error
+    against the geodesic distance is of the order of the square of the
+    distance over the earth radius, far below that of the haversine
+    distance for the short distances it is used for.
+    """
+    lengthx, lengthy = degree_lengths((np.asarray(lat1) +
+                                       np.asarray(lat2)) / 2.0)
+    return np.hypot((np.asarray(lon2) - lon1) * lengthx,
+                    (np.asarray(lat2) - lat1) * lengthy)
+
+def _segment_fractions(lon, lat, segments, lat0):
+    """
+    Return the fractions along the segments of their points nearest to
+    (lon, lat) on the plane tangent to the ellipsoid at latitude lat0.
+    """
+    lengthx, lengthy = degree_lengths(lat0)
+    startx = (segments[:, 0] - lon) * lengthx
+    starty = (segments[:, 1] - lat) * lengthy
+    stepx = (segments[:, 2] - segments[:, 0]) * lengthx
+    stepy = (segments[:, 3] - segments[:, 1]) * lengthy
+    lengthsq = stepx ** 2 + stepy ** 2
+    safelength = np.where(lengthsq == 0, 1.0, lengthsq)
+    return np.where(lengthsq == 0, 0.0,
+                    np.clip(-(startx * stepx + starty * stepy) /
+                            safelength, 0, 1))
+
+def segment_error(distance, lat):
+    """
+    Return the bound in meters on how much the distance to the segment
+    points found by nearest_segment_points exceeds the shortest distance,
+    for points distance meters from the segments at latitude lat. It is
+    half the square of the angle the meridians converge by over the
+    distance, times the distance, plus 1e-7 of the distance for the
+    ellipsoid.
+    """
+    convergence = distance * np.tan(np.radians(np.abs(lat))) / MEAN_RADIUS
+    return distance * (convergence ** 2 / 2.0 + 1e-7)
+
+def nearest_segment_points(lon, lat, segments):
+    """
+    Find the point nearest to each (lon, lat) point on each of the M
+    segments, given as an M x 4 array of (lon1, lat1, lon2, lat2) rows. A
+    segment is the straight line between its vertices in longitude and
+    latitude. The nearest point is found on the plane tangent to the
+    ellipsoid at the latitude of the point, then again on the plane at the
+    mean latitude of the point and that first estimate. Returns the
+    longitude and latitude arrays of the nearest points, of shape M for a
+    single point and P x M for P points.
+
+    The points found lie on the segments, so the geodesic distance to them
+    is never shorter than the shortest distance d to a segment. The plane
+    does not follow the convergence of the meridians between the point and
+    the segment, so the distance is longer than d by up to segment_error(d,
+    lat): 4 cm for d of 10 km at 60 degrees latitude and 12 m for d of 50 km
+    at 70 degrees, while at 10 km from the equator it is 1 mm.
+    """
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    lon = np.asarray(lon, dtype=np.float64)[..., np.newaxis]
+    lat = np.asarray(lat, dtype=np.float64)[..., np.newaxis]
+    fraction = _segment_fractions(lon, lat, segments, lat)
+    nearestlat = segments[:, 1] + fraction * (segments[:, 3] - segments[:, 1])
+    fraction = _segment_fractions(lon, lat, segments,
+                                  (lat + nearestlat) / 2.0)
+    return (segments[:, 0] + fraction * (segments[:, 2] - segments[:, 0]),
+            segments[:, 1] + fraction * (segments[:, 3] - segments[:, 1]))
+
+def point_segment_distance(lon, lat, segments, exact=True):
+    """
+    Return the shortest distance in meters from the point (lon, lat) to a
+    set of segments, measured to the nearest segment point. The distance on
+    the tangent plane picks the nearest segment; if exact is True the
+    distance to it is recomputed with the Vincenty formula, otherwise the
+    plane distance is returned. The Vincenty distance exceeds the true
+    shortest distance by up to segment_error, see nearest_segment_points.
+    """
+    nearestlon, nearestlat = nearest_segment_points(lon, lat, segments)
+    if len(nearestlon) == 0:
+        return np.inf
+    distances = plane_distance(lon, lat, nearestlon, nearestlat)
+    closest = int(np.argmin(distances))
+    if not exact:
+        return float(distances[closest])
+    return float(vincenty_distance(lon, lat, nearestlon[closest],
+                                   nearestlat[closest]))
+
+def within_distance(lon1, lat1, lon2, lat2, distance):
+    """
+    Return a boolean array flagging the point pairs no further apart than
+    distance meters. Pairs decided by the haversine prefilter skip the exact
+    Vincenty distance.
+    """
+    spherical = haversine_distance(lon1, lat1, lon2, lat2)
+    inside = spherical <= distance * (1 - HAVERSINE_ERROR)
+    uncertain = ~inside & (spherical <= distance * (1 + HAVERSINE_ERROR))
+    if uncertain.any():
+        lon1, lat1, lon2, lat2 = np.broadcast_arrays(lon1, lat1, lon2, lat2)
+        inside[uncertain] = vincenty_distance(
+            lon1[uncertain], lat1[uncertain], lon2[uncertain],
+            lat2[uncertain]) <= distance
+    return inside
+
+def points_near_segments(lons, lats, segments, distance, blocksize=256):
+    """
+    Return a boolean array flagging the points that lie within distance
+    meters of any of the segments. The nearest segment point of every point
+    is found on the local plane for a block of points at a time and tested
+    with within_distance, so only the points close to the threshold need the
+    Vincenty distance. Points within segment_error of the distance may be
+    missed, see nearest_segment_points.
+    """
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    near = np.zeros(len(lons), dtype=bool)
+    if len(segments) == 0:
+        return near
+    for start in range(0, len(lons), blocksize):
+        blocklons = lons[start:start + blocksize]
+        blocklats = lats[start:start + blocksize]
+        nearestlons, nearestlats = nearest_segment_points(blocklons,
+                                                          blocklats, segments)
+        planar = plane_distance(blocklons[:, np.newaxis],
+                                blocklats[:, np.newaxis], nearestlons,
+                                nearestlats)
+        closest = np.argmin(planar, axis=1)
+        rows = np.arange(len(blocklons))
+        near[start:start + blocksize] = within_distance(
+            blocklons, blocklats, nearestlons[rows, closest],
+            nearestlats[rows, closest], distance)
+    return near
+
+def points_segments_distance(lons, lats, segments, blocksize=256):
+    """
+    Return the shortest distance in meters from each point to a set of
+    segments. The nearest segment point of every point is picked on the
+    local plane, for a block of points at a time, and its distance is
+    recomputed with the Vincenty formula. The distances are never too short
+    and too long by at most segment_error, see nearest_segment_points.
+    """
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    distances = np.repeat(np.inf, len(lons))
+    if len(segments) == 0:
+        return distances
+    for start in range(0, len(lons), blocksize):
+        blocklons = lons[start:start + blocksize]
+        blocklats = lats[start:start + blocksize]
+        nearestlons, nearestlats = nearest_segment_points(blocklons,
+                                                          blocklats, segments)
+        planar = plane_distance(blocklons[:, np.newaxis],
+                                blocklats[:, np.newaxis], nearestlons,
+                                nearestlats)
+        closest = np.argmin(planar, axis=1)
+        rows = np.arange(len(blocklons))
+        distances[start:start + blocksize] = vincenty_distance(
+            blocklons, blocklats, nearestlons[rows, closest],
+            nearestlats[rows, closest])
+    return distances
+
+def _segments_nearest_pairs(segments, lons, lats):
+    """
+    Return, for each of the M segments, the point of (lons, lats) that comes
+    closest to it on the local plane and the nearest point on the
+    segment to that point, as four arrays of length M.
+    """
+    nearestlons, nearestlats = nearest_segment_points(lons, lats, segments)
+    planar = plane_distance(lons[:, np.newaxis], lats[:, np.newaxis],
+                            nearestlons, nearestlats)
+    closest = np.argmin(planar, axis=0)
+    columns = np.arange(len(segments))
+    return (lons[closest], lats[closest], nearestlons[closest, columns],
+            nearestlats[closest, columns])
+
+def segments_near_points(segments, lons, lats, distance, blocksize=256):
+    """
+    Return a boolean array flagging the segments that lie within distance
+    meters of any of the points, the converse of points_near_segments. The
+    segments are taken a block at a time against all the points.
+    """
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    near = np.zeros(len(segments), dtype=bool)
+    if len(lons) == 0:
+        return near
+    for start in range(0, len(segments), blocksize):
+        lon1, lat1, lon2, lat2 = _segments_nearest_pairs(
+            segments[start:start + blocksize], lons, lats)
+        near[start:start + blocksize] = within_distance(lon1, lat1, lon2,
+                                                        lat2, distance)
+    return near
+
+def segments_points_distance(segments, lons, lats, blocksize=256):
+    """
+    Return the shortest distance in meters from each segment to a set of
+    points, the converse of points_segments_distance, with the same error
+    bound.
+    """
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    distances = np.repeat(np.inf, len(segments))
+    if len(lons) == 0:
+        return distances
+    for start in range(0, len(segments), blocksize):
+        lon1, lat1, lon2, lat2 = _segments_nearest_pairs(
+            segments[start:start + blocksize], lons, lats)
+        distances[start:start + blocksize] = vincenty_distance(lon1, lat1,
+                                                               lon2, lat2)
+    return distances
+
+def expand_box_degrees(box, distance):
+    """
+    Widen a (xmin, ymin, xmax, ymax) box in decimal degrees by distance
+    meters on every side, using the shortest degree lengths so that no point
+    within the distance falls outside it. Boxes reaching a pole span all
+    longitudes.
+    """
+    latmargin = distance / METERS_PER_DEGREE_LATITUDE
+    ymin = max(box[1] - latmargin, -90.0)
+    ymax = min(box[3] + latmargin, 90.0)
+    polar = max(abs(ymin), abs(ymax))
+    if polar >= 89.9:
+        return (-180.0, ymin, 180.0, ymax)
+    lonmargin = distance / (METERS_PER_DEGREE_LONGITUDE *
+                            np.cos(np.radians(polar)))
+    return (box[0] - lonmargin, ymin, box[2] + lonmargin, ymax)
@@ -0,0 +1,292 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_neighbours
+# Purpose:     Sorted source feature distances for regrading at any distance
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Store, for every hazard area and one proximity factor, the geodesic
+distances to all the source features within a maximum radius, sorted in
+ascending order. The distances of all the hazard areas are held in one flat
+array in compressed sparse row (CSR) layout: the distances of the hazard area
+in row i are distances[indptr[i]:indptr[i + 1]]. The count of features
+within any distance up to the maximum radius is then a binary search in the
+row of each hazard area, so trying another buffer distance needs no geometry
+work at all.
+
+A table is rebuilt when its inputs change. By default that is judged from
+the feature count and extent of the hazard areas and every source feature
+class, which a cursor need not read; the FULL check hashes every geometry
+instead, and REBUILD rebuilds the table whatever its inputs.
+"""
+
+#Import libraries
+import hashlib
+import os
+import numpy as np
+import arcpy
+from mcda_geodesic import expand_box_degrees, points_segments_distance
+from mcda_spatial import (geometry_box, geometry_distance, hazard_footprint,
+                          load_sources, points_in_rings, polygon_rings,
+                          ring_segments, segments_rings_distance)
+
+# How neighbour_counts decides whether a stored table is out of date
+NEIGHBOUR_CHECKS = ['QUICK', 'FULL', 'REBUILD']
+
+# Functions and classes
+class NeighbourTable(object):
+    """
+    Sorted distances in meters from each hazard area to the source features
+    of one factor within maxradius meters, in CSR layout.
+    """
+    def __init__(self, oids, indptr, distances, maxradius, fingerprint=''):
+        """
+        Hold the Object IDs of the hazard areas in ascending order, the row
+        pointers and the flat array of sorted distances.
+        """
+        self.oids = np.asarray(oids, dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.distances = np.asarray(distances, dtype=np.float64)
+        self.maxradius = float(maxradius)
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        """
+        Return the number of hazard areas held.
+        """
+        return len(self.oids)
+
+    def counts_within(self, distance, oids=None):
+        """
+        Return the number of source features within distance meters of each
+        hazard area in oids, or of all the hazard areas if oids is None, by
+        a binary search in each row. Raises a ValueError for a distance
+        beyond the maximum radius or an Object ID that is not held.
+        """
+        distance = float(distance)
+        if distance > self.maxradius:
+            raise ValueError("Distance " + str(distance) + " exceeds the " +
+                             "maximum radius " + str(self.maxradius))
+        if oids is None:
+            rows = np.arange(len(self.oids))
+        else:
+            oids = np.asarray(oids, dtype=np.int64)
+            rows = np.searchsorted(self.oids, oids)
+            rows = np.clip(rows, 0, max(len(self.oids) - 1, 0))
+            if len(oids) and (len(self.oids) == 0 or
+                              (self.oids[rows] != oids).any()):
+                raise ValueError("Hazard areas missing from the neighbour "
+                                 "table")
+        counts = np.zeros(len(rows), dtype=np.int64)
+        for position, row in enumerate(rows.tolist()):
+            start, end = self.indptr[row], self.indptr[row + 1]
+            counts[position] = np.searchsorted(self.distances[start:end],
+                                               distance, side='right')
+        return counts
+
+def neighbour_path(cachedir, featureclass, factor):
+    """
+    Return the neighbour table file of a factor for the hazard areas.
+    """
+    name = hashlib.sha1(featureclass.lower().encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cachedir, 'mcda_neighbours_' + factor.lower() + '_' +
+                        name + '.npz')
+
+def save_neighbours(path, table):
+    """
+    Save a NeighbourTable.
+    """
+    np.savez(path, oids=table.oids, indptr=table.indptr,
+             distances=table.distances, maxradius=np.array(table.maxradius),
+             fingerprint=np.array(table.fingerprint))
+
+def load_neighbours(path):
+    """
+    Load a NeighbourTable written by save_neighbours, or return None if the
+    file does not exist or cannot be read.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        archive = np.load(path)
+        try:
+            return NeighbourTable(archive['oids'], archive['indptr'],
+                                  archive['distances'],
+                                  float(archive['maxradius']),
+                                  str(archive['fingerprint']))
+        finally:
+            archive.close()
+    except (IOError, KeyError, ValueError):
+        return None
+
+def fingerprint_shapes(featureclass):
+    """
+    Return a SHA-1 hex digest of the Object IDs and geometries of all the
+    features of a feature class, in Object ID order whatever order the
+    cursor returns.
+    """
+    shapes = []
+    with arcpy.da.SearchCursor(featureclass, ['OID@', 'SHAPE@WKB']) as cursor:
+        for oid, wkb in cursor:
+            shapes.append((oid, hashlib.sha1(bytes(wkb or b'')).hexdigest()))
+    digest = hashlib.sha1()
+    for oid, shapehash in sorted(shapes):
+        digest.update((str(oid) + ':' + shapehash).encode('ascii'))
+    return digest.hexdigest()
+
+def describe_shapes(featureclass):
+    """
+    Return a staleness key of a feature class from its feature count, its
+    extent and, for a shapefile, the time the file was last modified. It
+    takes no cursor pass, but misses edits that keep the count and extent.
+    """
+    describe = arcpy.Describe(featureclass)
+    extent = describe.extent
+    values = [arcpy.GetCount_management(featureclass).getOutput(0)]
+    values += [repr(float(value)) for value in (extent.XMin, extent.YMin,
+                                                extent.XMax, extent.YMax)]
+    if os.path.isfile(describe.catalogPath):
+        values.append(repr(os.path.getmtime(describe.catalogPath)))
+    return '|'.join(values)
+
+def fingerprint_inputs(featureclass, featureclasses, full=False):
+    """
+    Return a SHA-1 hex digest of the hazard areas and the source feature
+    classes, so a table is rebuilt when the hazard areas or any source
+    feature is added, deleted, moved or edited. By default each feature
+    class is keyed by describe_shapes; if full is True by the Object IDs and
+    geometries of all its features, which catches every edit but reads
+    every geometry. The two never match each other.
+    """
+    digest = hashlib.sha1()
+    if full:
+        keyfunction = fingerprint_shapes
+        digest.update(b'full:')
+    else:
+        keyfunction = describe_shapes
+        digest.update(b'quick:')
+    digest.update(keyfunction(featureclass).encode('utf-8'))
+    for source in featureclasses:
+        digest.update((source.lower() + ':' +
+                       keyfunction(source)).encode('utf-8'))
+    return digest.hexdigest()
+
+def source_distances(hazard, source, maxradius):
+    """
+    Return the distances in meters from a hazard area to the features of a
+    SourceLayer within maxradius meters, both in decimal degrees. Point
+    layers are measured for all the candidate points at once and polyline
+    layers for all the candidate segments at once, keeping the nearest
+    segment of each feature.
+    """
+    if source.shapetype == 'Polyline':
+        segments = source.segment_index()
+        found = segments.query(expand_box_degrees(geometry_box(hazard),
+                                                  maxradius))
+        if len(found) == 0:
+            return np.zeros(0, dtype=np.float64)
+        # Segments are numbered feature by feature, so the owners of the
+        # sorted segment indices come in one run per feature
+        owners = segments.owners[found]
+        starts = np.nonzero(np.concatenate(([True],
+                                            owners[1:] != owners[:-1])))[0]
+        distances = np.minimum.reduceat(
+            segments_rings_distance(segments.segments[found],
+                                    polygon_rings(hazard),
+                                    hazard.type == 'polygon'), starts)
+        return distances[distances <= maxradius]
+    found = source.candidates(expand_box_degrees(geometry_box(hazard),
+                                                 maxradius))
+    if len(found) == 0:
+        return np.zeros(0, dtype=np.float64)
+    if source.shapetype == 'Point':
+        rings = polygon_rings(hazard)
+        xs = source.x[found]
+        ys = source.y[found]
+        distances = points_segments_distance(xs, ys, ring_segments(rings))
+        if hazard.type == 'polygon':
+            distances[points_in_rings(xs, ys, rings)] = 0.0
+    else:
+        distances = np.array([geometry_distance(hazard,
+                                                source.geometries[position])
+                              for position in found.tolist()])
+    return distances[distances <= maxradius]
+
+def build_neighbours(featureclass, featureclasses, maxradius, fingerprint='',
+                     progress=None):
+    """
+    Measure the distances from every hazard area to the features of the
+    source feature classes within maxradius meters and return them as a
+    NeighbourTable. All the geometries are read in the geographic
+    coordinate system of the hazard areas. progress, if given, is updated
+    once per hazard area.
+    """
+    geographic = arcpy.Describe(featureclass).spatialReference.GCS
+    sources = load_sources(featureclasses, geographic,
+                           hazard_footprint(featureclass, maxradius, None,
+                                            geographic))
+    hazards = {}
+    with arcpy.da.SearchCursor(featureclass, ['OID@', 'SHAPE@'], None,
+                               geographic) as cursor:
+        for oid, geometry in cursor:
+            hazards[oid] = geometry
+    oids = np.array(sorted(hazards), dtype=np.int64)
+    indptr = np.zeros(len(oids) + 1, dtype=np.int64)
+    rows = []
+    for row, oid in enumerate(oids.tolist()):
+        distances = np.zeros(0, dtype=np.float64)
+        if hazards[oid] is not None:
+            distances = np.concatenate(
+                [distances] + [source_distances(hazards[oid], source,
+                                                float(maxradius))
+                               for source in sources])
+        rows.append(np.sort(distances))
+        indptr[row + 1] = indptr[row] + len(distances)
+        if progress is not None:
+            progress.update()
+    flat = np.concatenate(rows) if rows else np.zeros(0, dtype=np.float64)
+    return NeighbourTable(oids, indptr, flat, maxradius, fingerprint)
+
+def neighbour_counts(cachedir, featureclass, factor, featureclasses,
+                     distance, maxradius=None, where_clause=None,
+                     progress=None, check='QUICK'):
+    """
+    Count the source features within distance meters of the hazard areas
+    selected by where_clause from the stored neighbour table of the factor.
+    The table is built first, out to maxradius or at least distance meters,
+    if it is missing, was built for other inputs or does not reach the
+    distance. check is one of NEIGHBOUR_CHECKS: QUICK compares the inputs
+    by describe_shapes, FULL by their geometries and REBUILD rebuilds the
+    table in any case. Returns the Object IDs of the hazard areas with a
+    geometry in ascending order, the aligned counts and True if the table
+    was rebuilt.
+    """
+    check = str(check or 'QUICK').upper()
+    if check not in NEIGHBOUR_CHECKS:
+        raise ValueError("Unknown neighbour table check: " + check)
+    if not os.path.isdir(cachedir):
+        os.makedirs(cachedir)
+    path = neighbour_path(cachedir, featureclass, factor)
+    fingerprint = fingerprint_inputs(featureclass, featureclasses,
+                                     check == 'FULL')
+    table = load_neighbours(path)
+    rebuilt = False
+    if (check == 'REBUILD' or table is None or
+            table.fingerprint != fingerprint or
+            table.maxradius < float(distance)):
+        radius = max(float(maxradius or 0), float(distance))
+        table = build_neighbours(featureclass, featureclasses, radius,
+                                 fingerprint, progress)
+        save_neighbours(path, table)
+        rebuilt = True
+    # Hazard areas without a geometry are left out, so they stay ungraded
+    with arcpy.da.SearchCursor(featureclass, ['OID@', 'SHAPE@'],
+                               where_clause) as cursor:
+        oids = np.array(sorted(row[0] for row in cursor
+                               if row[1] is not None), dtype=np.int64)
+    return oids, table.counts_within(distance, oids), rebuilt
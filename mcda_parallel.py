@@ -0,0 +1,127 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_parallel
+# Purpose:     Spatial tiling and a process pool for the proximity counts
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Split the hazard areas into spatial tiles and run one task per tile in a pool
+of worker processes. Every hazard area falls in exactly one tile, chosen by
+the centre of its envelope, so the results of the tiles never overlap and
+merge into the same result as a serial run. The results are collected in
+tile order, so the merge does not depend on which worker finishes first.
+"""
+
+#Import libraries
+import math
+import multiprocessing
+import os
+import sys
+import numpy as np
+import mcda_worker
+
+# Tiles made per worker process, so a slow tile does not hold up the pool
+TILES_PER_WORKER = 4
+
+# Functions and classes
+def worker_count(value):
+    """
+    Return the number of worker processes for a tool parameter: blank means
+    one, so the tool runs serially, and 0 means one per processor core.
+    """
+    if value is None or str(value).strip() == '':
+        return 1
+    workers = int(value)
+    if workers <= 0:
+        return multiprocessing.cpu_count()
+    return workers
+
+def tile_assignments(boxes, tilecount):
+    """
+    Assign each row of an N x 4 array of (xmin, ymin, xmax, ymax) boxes to a
+    cell of a square grid of about tilecount cells over the box centres.
+    Returns an array of tile numbers, counted from 0 without empty tiles.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    side = max(int(math.ceil(math.sqrt(tilecount))), 1)
+    cells = []
+    for low, high in ((0, 2), (1, 3)):
+        centres = (boxes[:, low] + boxes[:, high]) / 2.0
+        span = centres.max() - centres.min()
+        if span == 0:
+            cells.append(np.zeros(len(boxes), dtype=np.int64))
+            continue
+        cell = np.floor((centres - centres.min()) / span * side)
+        cells.append(np.clip(cell, 0, side - 1).astype(np.int64))
+    tiles = cells[1] * side + cells[0]
+    return np.unique(tiles, return_inverse=True)[1].astype(np.int64)
+
+def tile_region(boxes):
+    """
+    Return the envelope of an N x 4 array of boxes.
+    """
+    return (boxes[:, 0].min(), boxes[:, 1].min(),
+            boxes[:, 2].max(), boxes[:, 3].max())
+
+def _python_executable():
+    """
+    Return the Python interpreter to start worker processes with. Inside
+    ArcMap or ArcCatalog sys.executable is the application itself, so the
+    interpreter of the ArcGIS Python install is used instead.
+    """
+    name = os.path.basename(sys.executable).lower()
+    if name.startswith('python'):
+        return sys.executable
+    return os.path.join(sys.exec_prefix, 'pythonw.exe')
+
+def open_pool(processes, initializer=None, initargs=()):
+    """
+    Start a pool of worker processes running the ArcGIS Python interpreter,
+    with the side-effect free mcda_worker module standing in as the main
+    module. The tool scripts run at module level without a __main__ guard,
+    and a worker started on Windows imports the main module of its parent.
+    The main module is put back as soon as the pool has started, whether or
+    not starting it succeeded.
+    """
+    multiprocessing.set_executable(_python_executable())
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = mcda_worker
+    try:
+        return multiprocessing.Pool(processes, initializer, initargs)
+    finally:
+        sys.modules['__main__'] = main
+
+def run_tasks(function, tasks, workers, progress=None, sizes=None):
+    """
+    Return the list of function(task) results for the tasks, in task order,
+    computed by up to workers processes. progress, if given, is updated as
+    each result arrives by the matching entry of sizes, or by one. With one
+    worker or one task the tasks run in this process.
+    """
+    if sizes is None:
+        sizes = [1] * len(tasks)
+    results = []
+    if workers <= 1 or len(tasks) <= 1:
+        for position, task in enumerate(tasks):
+            results.append(function(task))
+            if progress is not None:
+                progress.update(sizes[position])
+        return results
+
+    pool = open_pool(min(workers, len(tasks)))
+    try:
+        for position, result in enumerate(pool.imap(function, tasks)):
+            results.append(result)
+            if progress is not None:
+                progress.update(sizes[position])
+    finally:
+        pool.close()
+        pool.join()
+    return results
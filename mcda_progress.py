@@ -0,0 +1,103 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_progress
+# Purpose:     Throttled progress reporting for the row-loop tools
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Report the progress of a processing stage through the tool's logger without
+writing a message for every feature. A message is only logged once the
+percentage done has moved on by a set step or a set number of seconds has
+passed, and it includes the processing rate and the estimated time left.
+"""
+
+#Import libraries
+import time
+
+# Functions and classes
+def format_duration(seconds):
+    """
+    Format a number of seconds as H:MM:SS.
+    """
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return "{0}:{1:02d}:{2:02d}".format(hours, minutes, seconds)
+
+class ProgressReporter(object):
+    """
+    Count the features processed in one stage and log the progress at INFO
+    level at most every percentstep percent or every interval seconds,
+    whichever comes first.
+    """
+    def __init__(self, logger, total, stage="Processing", percentstep=5.0,
+                 interval=30.0):
+        """
+        Start the clock for a stage of total features.
+        """
+        self.logger = logger
+        self.total = total
+        self.stage = stage
+        self.percentstep = percentstep
+        self.interval = interval
+        self.count = 0
+        self.starttime = time.time()
+        self.lastreport = self.starttime
+        self.nextpercent = percentstep
+
+    def update(self, count=1):
+        """
+        Add count processed features and log the progress if it is due.
+        """
+        self.count += count
+        now = time.time()
+        percent = self.percent_done()
+        if (percent >= self.nextpercent or
+                now - self.lastreport >= self.interval or
+                self.count == self.total):
+            self.report(now)
+
+    def percent_done(self):
+        """
+        Return the percentage of the features processed so far.
+        """
+        if self.total <= 0:
+            return 100.0
+        return self.count * 100.0 / self.total
+
+    def report(self, now=None):
+        """
+        Log the features processed, the rate in features per second and the
+        estimated time left.
+        """
+        if now is None:
+            now = time.time()
+        elapsed = max(now - self.starttime, 1e-6)
+        rate = self.count / elapsed
+        percent = self.percent_done()
+        message = ("{0}: feature {1} of {2} or {3:.1f} %, {4:.1f} "
+                   "features/s".format(self.stage, self.count, self.total,
+                                       percent, rate))
+        if 0 < self.count < self.total:
+            message += ", about " + format_duration(
+                (self.total - self.count) / rate) + " left"
+        self.logger.info(message)
+        self.lastreport = now
+        # Skip the steps already passed, so a burst logs one message only
+        while self.nextpercent <= percent:
+            self.nextpercent += self.percentstep
+
+    def finish(self):
+        """
+        Log the total number of features processed, the time taken and the
+        overall rate of the stage.
+        """
+        elapsed = time.time() - self.starttime
+        rate = self.count / max(elapsed, 1e-6)
+        self.logger.info("{0}: finished {1} features in {2}, {3:.1f} "
+                         "features/s".format(self.stage, self.count,
+                                             format_duration(elapsed), rate))
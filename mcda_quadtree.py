@@ -0,0 +1,268 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_quadtree
+# Purpose:     Aggregate quadtree of points for polygon count and sum queries
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Count points, and sum a value field over them, inside polygons without
+visiting every point inside. Each node of the quadtree stores the number of
+its points and the sum of their values. A query walks down from the root,
+keeping only the polygon edges that touch each node: a node touched by no
+edge lies wholly inside or wholly outside the polygon, so its count and sum
+are added, or it is skipped, without visiting its points. Only the nodes on
+the polygon boundary are opened, which makes a query grow with the length of
+the boundary rather than with the number of points inside.
+"""
+
+#Import libraries
+import numpy as np
+import arcpy
+from mcda_spatial import geodesic_buffers, polygon_rings, ring_segments
+
+# Functions and classes
+def ring_edges(rings):
+    """
+    Return the edges of the polygon rings, closing any ring that is not
+    closed, as an M x 4 array of (x1, y1, x2, y2) rows.
+    """
+    return ring_segments([np.vstack((ring, ring[:1])) for ring in rings
+                          if len(ring) >= 3])
+
+def points_in_edges(xs, ys, edges, blocksize=256):
+    """
+    Return a boolean array flagging the points inside the closed polygon
+    edges by the even-odd rule, as points_in_rings does, testing a block of
+    points against all the edges at once.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    x1, y1, x2, y2 = [edges[:, column] for column in range(4)]
+    rise = np.where(y1 == y2, 1.0, y2 - y1)
+    inside = np.zeros(len(xs), dtype=bool)
+    for start in range(0, len(xs), blocksize):
+        blockxs = xs[start:start + blocksize, np.newaxis]
+        blockys = ys[start:start + blocksize, np.newaxis]
+        crosses = (y1 > blockys) != (y2 > blockys)
+        crossx = x1 + (blockys - y1) * (x2 - x1) / rise
+        inside[start:start + blocksize] = (
+            (crosses & (blockxs < crossx)).sum(axis=1) % 2 == 1)
+    return inside
+
+def boxes_touched(boxes, edges, blocksize=256):
+    """
+    Return a boolean array flagging the (xmin, ymin, xmax, ymax) rows of
+    boxes touched by any of the edges. An edge misses a box if their
+    envelopes do not overlap or if all four corners of the box lie strictly
+    on one side of the line through the edge.
+    """
+    x1, y1, x2, y2 = [edges[:, column] for column in range(4)]
+    lowx, highx = np.minimum(x1, x2), np.maximum(x1, x2)
+    lowy, highy = np.minimum(y1, y2), np.maximum(y1, y2)
+    touched = np.zeros(len(boxes), dtype=bool)
+    for start in range(0, len(boxes), blocksize):
+        block = boxes[start:start + blocksize]
+        xmin, ymin, xmax, ymax = [block[:, column, np.newaxis]
+                                  for column in range(4)]
+        overlap = ((lowx <= xmax) & (highx >= xmin) &
+                   (lowy <= ymax) & (highy >= ymin))
+        above = np.ones(overlap.shape, dtype=bool)
+        below = np.ones(overlap.shape, dtype=bool)
+        for cornerx, cornery in ((xmin, ymin), (xmax, ymin), (xmax, ymax),
+                                 (xmin, ymax)):
+            side = (x2 - x1) * (cornery - y1) - (y2 - y1) * (cornerx - x1)
+            above &= side > 0
+            below &= side < 0
+        touched[start:start + blocksize] = (overlap &
+                                            ~(above | below)).any(axis=1)
+    return touched
+
+class AggregateQuadtree(object):
+    """
+    Quadtree of points in flat node arrays. Every node holds the envelope of
+    its points, their count and the sum of their values; a leaf holds its
+    points as a range of the reordered point arrays.
+    """
+    def __init__(self, xs, ys, values=None, leafsize=32, maxdepth=24):
+        """
+        Build the tree over the points, splitting each node into quadrants
+        at the centre of its envelope until it holds at most leafsize
+        points. values defaults to one per point, so sums are counts.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        if values is None:
+            values = np.ones(len(xs), dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        boxes = []
+        counts = []
+        sums = []
+        firstchild = []
+        childcount = []
+        starts = []
+        order = []
+        ordered = 0
+        # Nodes are numbered breadth first; the children of a node are
+        # numbered consecutively, so a node keeps its first child only
+        pending = [(np.arange(len(xs)), 0)] if len(xs) else []
+        position = 0
+        while position < len(pending):
+            members, depth = pending[position]
+            position += 1
+            memberxs = xs[members]
+            memberys = ys[members]
+            box = (memberxs.min(), memberys.min(),
+                   memberxs.max(), memberys.max())
+            boxes.append(box)
+            counts.append(len(members))
+            sums.append(values[members].sum())
+            if (len(members) <= leafsize or depth >= maxdepth or
+                    (box[0] == box[2] and box[1] == box[3])):
+                firstchild.append(-1)
+                childcount.append(0)
+                starts.append(ordered)
+                order.append(members)
+                ordered += len(members)
+                continue
+            quadrant = ((memberxs > (box[0] + box[2]) / 2.0).astype(int) +
+                        2 * (memberys > (box[1] + box[3]) / 2.0))
+            firstchild.append(len(pending))
+            children = 0
+            for number in range(4):
+                child = members[quadrant == number]
+                if len(child):
+                    pending.append((child, depth + 1))
+                    children += 1
+            childcount.append(children)
+            starts.append(-1)
+        order = (np.concatenate(order) if order else
+                 np.zeros(0, dtype=np.int64))
+        self.xs = xs[order]
+        self.ys = ys[order]
+        self.values = values[order]
+        self.boxes = np.array(boxes, dtype=np.float64).reshape(-1, 4)
+        self.counts = np.array(counts, dtype=np.int64)
+        self.sums = np.array(sums, dtype=np.float64)
+        self.firstchild = np.array(firstchild, dtype=np.int64)
+        self.childcount = np.array(childcount, dtype=np.int64)
+        self.starts = np.array(starts, dtype=np.int64)
+
+    def __len__(self):
+        """
+        Return the number of points held.
+        """
+        return len(self.xs)
+
+    def query(self, rings, box=None):
+        """
+        Return the number of points inside the polygon rings, and the sum of
+        their values, by the even-odd rule. If box is given, only the points
+        strictly inside the box count, as with a WITHIN selection. The tree
+        is walked one level at a time, testing all the nodes of a level
+        against the edges at once.
+        """
+        edges = ring_edges(rings)
+        count = 0
+        total = 0.0
+        if len(self.xs) == 0 or len(edges) == 0:
+            return count, total
+        leaves = []
+        nodes = np.zeros(1, dtype=np.int64)
+        while len(nodes):
+            boxes = self.boxes[nodes]
+            contained = np.ones(len(nodes), dtype=bool)
+            if box is not None:
+                keep = ((boxes[:, 0] < box[2]) & (boxes[:, 2] > box[0]) &
+                        (boxes[:, 1] < box[3]) & (boxes[:, 3] > box[1]))
+                nodes = nodes[keep]
+                boxes = boxes[keep]
+                contained = ((boxes[:, 0] > box[0]) & (boxes[:, 2] < box[2]) &
+                             (boxes[:, 1] > box[1]) & (boxes[:, 3] < box[3]))
+            # A node no edge touches is wholly inside or wholly outside,
+            # so one corner decides for all its points
+            quiet = ~boxes_touched(boxes, edges)
+            inside = np.zeros(len(nodes), dtype=bool)
+            inside[quiet] = points_in_edges(boxes[quiet, 0], boxes[quiet, 1],
+                                            edges)
+            whole = quiet & inside & contained
+            count += int(self.counts[nodes[whole]].sum())
+            total += float(self.sums[nodes[whole]].sum())
+            nodes = nodes[~whole & ~(quiet & ~inside)]
+            isleaf = self.firstchild[nodes] < 0
+            leaves.append(nodes[isleaf])
+            parents = nodes[~isleaf]
+            # Children are numbered consecutively from the first child
+            sizes = self.childcount[parents]
+            nodes = (np.repeat(self.firstchild[parents] -
+                               np.cumsum(sizes) + sizes, sizes) +
+                     np.arange(sizes.sum())).astype(np.int64)
+        leaves = np.concatenate(leaves)
+        sizes = self.counts[leaves]
+        points = (np.repeat(self.starts[leaves] - np.cumsum(sizes) + sizes,
+                            sizes) + np.arange(sizes.sum())).astype(np.int64)
+        xs = self.xs[points]
+        ys = self.ys[points]
+        found = points_in_edges(xs, ys, edges)
+        if box is not None:
+            found &= ((xs > box[0]) & (xs < box[2]) &
+                      (ys > box[1]) & (ys < box[3]))
+        count += int(found.sum())
+        total += float(self.values[points][found].sum())
+        return count, total
+
+def read_points(featureclass, valuefield=None, spatialreference=None,
+                where_clause=None, footprint=None):
+    """
+    Read the coordinates of a point feature class, projected to
+    spatialreference if one is given, and the values of valuefield if one
+    is given. Points without a geometry are skipped, as are points outside
+    the FootprintMask footprint if one is given, and missing values count
+    as zero. Returns the x, y and value arrays; the values are None without
+    a valuefield.
+    """
+    fields = ['SHAPE@XY']
+    if valuefield:
+        fields.append(valuefield)
+    xs = []
+    ys = []
+    values = []
+    with arcpy.da.SearchCursor(featureclass, fields, where_clause,
+                               spatialreference) as cursor:
+        for row in cursor:
+            point = row[0]
+            if point is None or point[0] is None:
+                continue
+            if (footprint is not None and
+                    not footprint.overlaps((point[0], point[1],
+                                            point[0], point[1]))):
+                continue
+            xs.append(point[0])
+            ys.append(point[1])
+            if valuefield:
+                values.append(row[1] or 0)
+    return (np.array(xs, dtype=np.float64), np.array(ys, dtype=np.float64),
+            np.array(values, dtype=np.float64) if valuefield else None)
+
+def aggregate_sums(featureclass, tree, distance, where_clause=None,
+                   progress=None, cache=None):
+    """
+    Sum the point values of an AggregateQuadtree within distance meters of
+    every hazard area, inside the geodesic buffer of each. Returns an array
+    of the Object IDs in ascending order and an aligned array of sums.
+    progress, if given, is updated once per hazard area and cache is an
+    optional BufferCache for the buffers.
+    """
+    buffers = geodesic_buffers(featureclass, distance, where_clause,
+                               cache=cache)
+    oids = np.array(sorted(buffers), dtype=np.int64)
+    sums = np.zeros(len(oids), dtype=np.float64)
+    for row, oid in enumerate(oids.tolist()):
+        sums[row] = tree.query(polygon_rings(buffers[oid]))[1]
+        if progress is not None:
+            progress.update()
+    return oids, sums
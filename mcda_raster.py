@@ -0,0 +1,438 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_raster
+# Purpose:     Windowed raster reads and polygon masks for zonal raster sums
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Sum the cell values of a raster inside polygons without converting the
+raster to points. Only the window of cells under the envelope of each
+polygon is read with RasterToNumPyArray, the polygon is rasterised to a mask
+over that window by a scanline even-odd fill, and the values of the cells
+whose centres fall inside the polygon are summed. With a population raster
+this gives the population inside each buffered hazard area directly.
+
+Sample the raster cells under the inside centroids of all the hazard areas
+at once in the same way. The coordinates are mapped to cell rows and
+columns through the origin and cell size of the raster, the points are
+grouped by tile, and each tile is read once with only the window of cells
+its points fall in.
+
+Summarise the raster cells inside each hazard area polygon for a zonal
+mode. The polygons that fit in a tile are batched by tile, so the cells
+under a whole batch are read in one call, and each polygon is rasterised
+over its own part of that window.
+"""
+
+#Import libraries
+import functools
+import math
+import numpy as np
+import arcpy
+from mcda_spatial import geodesic_buffers, geometry_box, polygon_rings
+
+# Data types reported by arcpy.Describe for a raster input
+RASTER_TYPES = ('RasterDataset', 'RasterLayer', 'RasterBand')
+# Rows and columns of cells in a sampling tile
+SAMPLE_TILE = 1024
+
+# Functions and classes
+def is_raster(dataset):
+    """
+    Return True if dataset is a raster dataset, layer or band.
+    """
+    return arcpy.Describe(dataset).dataType in RASTER_TYPES
+
+class RasterGrid(object):
+    """
+    Cell layout of a single band raster, used to read windows of cells.
+    """
+    def __init__(self, raster):
+        """
+        Read the origin, cell size, size and spatial reference of raster.
+        """
+        properties = arcpy.Raster(raster)
+        self.raster = raster
+        self.xmin = properties.extent.XMin
+        self.ymax = properties.extent.YMax
+        self.cellwidth = properties.meanCellWidth
+        self.cellheight = properties.meanCellHeight
+        self.columns = properties.width
+        self.rows = properties.height
+        self.spatialreference = properties.spatialReference
+        self.nodata = properties.noDataValue
+        self.floating = properties.pixelType in ('F32', 'F64')
+
+    def window(self, box):
+        """
+        Return the (row0, row1, col0, col1) cell window, end exclusive, that
+        covers the (xmin, ymin, xmax, ymax) box, clipped to the raster, or
+        None if the box lies outside the raster.
+        """
+        col0 = max(int(math.floor((box[0] - self.xmin) / self.cellwidth)), 0)
+        col1 = min(int(math.ceil((box[2] - self.xmin) / self.cellwidth)),
+                   self.columns)
+        row0 = max(int(math.floor((self.ymax - box[3]) / self.cellheight)), 0)
+        row1 = min(int(math.ceil((self.ymax - box[1]) / self.cellheight)),
+                   self.rows)
+        if col0 >= col1 or row0 >= row1:
+            return None
+        return (row0, row1, col0, col1)
+
+    def centres(self, window):
+        """
+        Return the x coordinates of the cell centres of the columns of a
+        window, ascending, and the y coordinates of its rows, descending.
+        """
+        row0, row1, col0, col1 = window
+        xs = self.xmin + (np.arange(col0, col1) + 0.5) * self.cellwidth
+        ys = self.ymax - (np.arange(row0, row1) + 0.5) * self.cellheight
+        return xs, ys
+
+    def read(self, window, nodata=0):
+        """
+        Return the cell values of a window as a float array of rows by
+        columns, with NoData cells set to nodata.
+        """
+        row0, row1, col0, col1 = window
+        corner = arcpy.Point(self.xmin + col0 * self.cellwidth,
+                             self.ymax - row1 * self.cellheight)
+        values = arcpy.RasterToNumPyArray(self.raster, corner, col1 - col0,
+                                          row1 - row0, nodata)
+        return np.asarray(values, dtype=np.float64).reshape(row1 - row0,
+                                                            col1 - col0)
+
+    def read_valid(self, window):
+        """
+        Return the cell values of a window as a float array of rows by
+        columns and a boolean array flagging the cells that are not NoData.
+        """
+        if self.floating:
+            values = self.read(window, np.nan)
+            return values, ~np.isnan(values)
+        if self.nodata is None:
+            values = self.read(window)
+            return values, np.ones(values.shape, dtype=bool)
+        values = self.read(window, self.nodata)
+        return values, values != float(self.nodata)
+
+    def cells(self, xs, ys):
+        """
+        Return the rows and columns of the cells holding the points, with
+        -1 for both where a point lies outside the raster or has no
+        coordinates.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            cols = np.floor((xs - self.xmin) / self.cellwidth)
+            rows = np.floor((self.ymax - ys) / self.cellheight)
+            outside = ~((cols >= 0) & (cols < self.columns) &
+                        (rows >= 0) & (rows < self.rows))
+        rows = np.where(outside, -1, rows).astype(np.int64)
+        cols = np.where(outside, -1, cols).astype(np.int64)
+        return rows, cols
+
+    def layout(self):
+        """
+        Return the origin, cell size and size of the raster, which decide
+        the cells the points fall in.
+        """
+        return (self.xmin, self.ymax, self.cellwidth, self.cellheight,
+                self.columns, self.rows)
+
+def sample_points(grid, xs, ys, default, tilesize=SAMPLE_TILE):
+    """
+    Return the cell values of the raster under the points as a float array.
+    Points outside the raster, without coordinates or on NoData cells get
+    the default value, as a failed Get Cell Value does in the tools.
+    """
+    rows, cols = grid.cells(xs, ys)
+    return sample_cells(grid, rows, cols, default, tilesize)
+
+def sample_cells(grid, rows, cols, default, tilesize=SAMPLE_TILE):
+    """
+    Return the values of the raster cells at rows and cols, as returned by
+    RasterGrid.cells, with the default value for -1 and NoData cells. The
+    cells are grouped by tile of tilesize rows and columns and each tile is
+    read once, covering only the cells wanted from it.
+    """
+    values = np.repeat(float(default), len(rows))
+    found = np.nonzero(rows >= 0)[0]
+    if len(found) == 0:
+        return values
+    tiles = ((rows[found] // tilesize) * (grid.columns // tilesize + 1) +
+             cols[found] // tilesize)
+    order = np.argsort(tiles, kind='mergesort')
+    found = found[order]
+    tiles = tiles[order]
+    starts = np.nonzero(np.concatenate(([True], tiles[1:] != tiles[:-1])))[0]
+    ends = np.append(starts[1:], len(found))
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        members = found[start:end]
+        window = (int(rows[members].min()), int(rows[members].max()) + 1,
+                  int(cols[members].min()), int(cols[members].max()) + 1)
+        cellvalues, valid = grid.read_valid(window)
+        memberrows = rows[members] - window[0]
+        membercols = cols[members] - window[2]
+        keep = valid[memberrows, membercols]
+        values[members[keep]] = cellvalues[memberrows[keep],
+                                           membercols[keep]]
+    return values
+
+def read_inside_points(featureclass, where_clause=None):
+    """
+    Read the INSIDE_X and INSIDE_Y inside centroid coordinates of the hazard
+    areas. Returns an array of the Object IDs and aligned arrays of the x
+    and y coordinates, with NaN for missing coordinates.
+    """
+    oids = []
+    xs = []
+    ys = []
+    with arcpy.da.SearchCursor(featureclass, ['OID@', 'INSIDE_X', 'INSIDE_Y'],
+                               where_clause) as cursor:
+        for oid, insidex, insidey in cursor:
+            oids.append(oid)
+            xs.append(np.nan if insidex is None else insidex)
+            ys.append(np.nan if insidey is None else insidey)
+    return (np.array(oids, dtype=np.int64), np.array(xs, dtype=np.float64),
+            np.array(ys, dtype=np.float64))
+
+def inside_samples(featureclass, raster, default, where_clause=None):
+    """
+    Sample raster at the inside centroids of the hazard areas selected by
+    where_clause. The coordinates are taken to be in the spatial reference
+    of the raster, as with Get Cell Value. Returns a dictionary of Object ID
+    to cell value, holding default where no cell value was found.
+    """
+    oids, xs, ys = read_inside_points(featureclass, where_clause)
+    values = sample_points(RasterGrid(raster), xs, ys, default)
+    return dict(zip(oids.tolist(), values.tolist()))
+
+def sample_rasters(featureclass, entries, where_clause=None):
+    """
+    Sample several rasters at the inside centroids of the hazard areas
+    selected by where_clause. entries is a list of (raster, field, default)
+    tuples. The coordinates are read once and mapped to cells once for all
+    the rasters sharing a cell layout. Returns an array of the Object IDs
+    and a dictionary of field to the aligned array of cell values.
+    """
+    oids, xs, ys = read_inside_points(featureclass, where_clause)
+    grids = [(RasterGrid(raster), field, default)
+             for raster, field, default in entries]
+    return oids, sample_grids(grids, xs, ys)
+
+def sample_grids(grids, xs, ys, tilesize=SAMPLE_TILE):
+    """
+    Sample several rasters at the points. grids is a list of (grid, field,
+    default) tuples. The points are mapped to cells once for all the grids
+    sharing a cell layout. Returns a dictionary of field to the aligned
+    array of cell values.
+    """
+    layouts = {}
+    values = {}
+    for grid, field, default in grids:
+        if grid.layout() not in layouts:
+            layouts[grid.layout()] = grid.cells(xs, ys)
+        rows, cols = layouts[grid.layout()]
+        values[field] = sample_cells(grid, rows, cols, default, tilesize)
+    return values
+
+def rasterize_rings(rings, xs, ys):
+    """
+    Return a boolean mask of len(ys) rows by len(xs) columns flagging the
+    cells whose centres lie inside the rings by the even-odd rule, as
+    points_in_rings does. Each edge is crossed with all the rows it spans
+    at once; a centre is inside when an odd number of crossings lie to its
+    right, which is a reverse cumulative sum along each row.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    width = len(xs) + 1
+    crossings = []
+    for ring in rings:
+        if len(ring) < 3:
+            continue
+        closed = np.vstack((ring, ring[:1]))
+        for (x1, y1), (x2, y2) in zip(closed[:-1], closed[1:]):
+            if y1 == y2:
+                continue
+            rows = np.nonzero((y1 > ys) != (y2 > ys))[0]
+            crossx = x1 + (ys[rows] - y1) * (x2 - x1) / (y2 - y1)
+            # Number of cell centres left of each crossing
+            crossings.append(rows * width +
+                             np.searchsorted(xs, crossx, side='left'))
+    if not crossings:
+        return np.zeros((len(ys), len(xs)), dtype=bool)
+    counts = np.bincount(np.concatenate(crossings),
+                         minlength=len(ys) * width).reshape(len(ys), width)
+    right = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+    return right[:, 1:] % 2 == 1
+
+def circular_mean_aspect(values):
+    """
+    Return the circular mean of aspect values in degrees, ignoring the
+    negative values of flat cells. Returns -1, flat, if every cell is flat
+    or the directions cancel out.
+    """
+    radians = np.radians(values[values >= 0])
+    if len(radians) == 0:
+        return -1.0
+    sine = np.sin(radians).sum()
+    cosine = np.cos(radians).sum()
+    if math.hypot(sine, cosine) < 1e-9 * len(radians):
+        return -1.0
+    # Round off the noise of north-facing means just below 360 degrees
+    return round(math.degrees(math.atan2(sine, cosine)), 6) % 360.0
+
+def majority(values):
+    """
+    Return the most frequent of the class values, the lowest class on a
+    tie.
+    """
+    classes, inverse = np.unique(values, return_inverse=True)
+    return classes[np.argmax(np.bincount(inverse))]
+
+def bare_area_majority(values, bareareacode, fraction=0.5):
+    """
+    Return the bare area land cover code if at least fraction of the cells
+    are bare area, and the majority of the other classes otherwise.
+    """
+    bare = values == bareareacode
+    if bare.all() or bare.mean() >= fraction:
+        return bareareacode
+    return majority(values[~bare])
+
+def bare_area_statistic(bareareacode, fraction=0.5):
+    """
+    Return bare_area_majority for a bare area code and fraction as a zonal
+    statistic of the cell values alone.
+    """
+    return functools.partial(bare_area_majority, bareareacode=bareareacode,
+                             fraction=fraction)
+
+# Zonal statistics of the slope in degrees, keyed by tool option
+SLOPE_STATISTICS = {'MEAN': np.mean, 'MAXIMUM': np.max}
+
+def polygon_cells(geometry, grid, window, xs, ys):
+    """
+    Return the boolean mask of the cells of the (row0, row1, col0, col1)
+    window whose centres lie inside the polygon, where xs and ys are the
+    cell centres of the window. A polygon holding no cell centre takes the
+    cell under its label point, as a sample at the inside centroid would.
+    """
+    mask = rasterize_rings(polygon_rings(geometry), xs, ys)
+    if not mask.any():
+        label = geometry.labelPoint
+        rows, cols = grid.cells([label.X], [label.Y])
+        row = rows[0] - window[0]
+        col = cols[0] - window[2]
+        if (rows[0] >= 0 and 0 <= row < mask.shape[0] and
+                0 <= col < mask.shape[1]):
+            mask[row, col] = True
+    return mask
+
+def zonal_statistics(featureclass, raster, statistic, default,
+                     where_clause=None, tilesize=SAMPLE_TILE, progress=None):
+    """
+    Summarise the raster cells inside every hazard area polygon selected by
+    where_clause with statistic, a function of the 1-D array of the values
+    of the cells that are not NoData. The polygons are read in the spatial
+    reference of the raster. Returns a dictionary of Object ID to value,
+    holding default where a polygon covers no data. progress, if given, is
+    updated once per hazard area.
+    """
+    grid = RasterGrid(raster)
+    with arcpy.da.SearchCursor(featureclass, ['OID@', 'SHAPE@'], where_clause,
+                               grid.spatialreference) as cursor:
+        polygons = [(oid, geometry) for oid, geometry in cursor]
+    return grid_statistics(grid, polygons, statistic, default, tilesize,
+                           progress)
+
+def grid_statistics(grid, polygons, statistic, default, tilesize=SAMPLE_TILE,
+                    progress=None):
+    """
+    Summarise the cells of grid inside each of the (Object ID, polygon)
+    pairs of polygons, as zonal_statistics does. Polygons whose window fits
+    in a tile of tilesize rows and columns are batched by the tile of their
+    first cell and the window under each batch is read once; larger
+    polygons are read one at a time.
+    """
+    values = {}
+    geometries = {}
+    batches = {}
+    for oid, geometry in polygons:
+        values[oid] = default
+        window = None
+        if geometry is not None:
+            window = grid.window(geometry_box(geometry))
+        if window is None:
+            if progress is not None:
+                progress.update()
+            continue
+        geometries[oid] = (geometry, window)
+        if (window[1] - window[0] > tilesize or
+                window[3] - window[2] > tilesize):
+            key = ('polygon', oid)
+        else:
+            key = (window[0] // tilesize, window[2] // tilesize)
+        batches.setdefault(key, []).append(oid)
+    for members in batches.values():
+        windows = np.array([geometries[oid][1] for oid in members])
+        batch = (int(windows[:, 0].min()), int(windows[:, 1].max()),
+                 int(windows[:, 2].min()), int(windows[:, 3].max()))
+        cellvalues, valid = grid.read_valid(batch)
+        xs, ys = grid.centres(batch)
+        for oid in members:
+            geometry, window = geometries[oid]
+            rows = slice(window[0] - batch[0], window[1] - batch[0])
+            cols = slice(window[2] - batch[2], window[3] - batch[2])
+            mask = polygon_cells(geometry, grid, window, xs[cols], ys[rows])
+            cells = cellvalues[rows, cols][mask & valid[rows, cols]]
+            if len(cells):
+                values[oid] = float(statistic(cells))
+            if progress is not None:
+                progress.update()
+    return values
+
+def polygon_sum(geometry, grid):
+    """
+    Return the sum of the raster cell values inside a polygon, reading only
+    the window under its envelope. The polygon is projected to the spatial
+    reference of the raster if needed. NoData cells count as zero.
+    """
+    if geometry.spatialReference.name != grid.spatialreference.name:
+        geometry = geometry.projectAs(grid.spatialreference)
+    window = grid.window(geometry_box(geometry))
+    if window is None:
+        return 0.0
+    xs, ys = grid.centres(window)
+    mask = rasterize_rings(polygon_rings(geometry), xs, ys)
+    if not mask.any():
+        return 0.0
+    return float(grid.read(window)[mask].sum())
+
+def raster_sums(featureclass, raster, distance, where_clause=None,
+                progress=None, cache=None):
+    """
+    Sum the cells of raster within distance meters of every hazard area,
+    summing inside the geodesic buffer of each. Returns an array of the
+    Object IDs in ascending order and an aligned array of sums. progress, if
+    given, is updated once per hazard area and cache is an optional
+    BufferCache for the buffers.
+    """
+    grid = RasterGrid(raster)
+    buffers = geodesic_buffers(featureclass, distance, where_clause,
+                               cache=cache)
+    oids = np.array(sorted(buffers), dtype=np.int64)
+    sums = np.zeros(len(oids), dtype=np.float64)
+    for row, oid in enumerate(oids.tolist()):
+        sums[row] = polygon_sum(buffers[oid], grid)
+        if progress is not None:
+            progress.update()
+    return oids, sums
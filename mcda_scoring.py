@@ -0,0 +1,254 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_scoring
+# Purpose:     Vectorised grading, scoring and ranking of the MCDA factors
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Batch scoring engine for the MCDA toolset. Reads all nine factor columns of a
+hazard area feature class in a single cursor pass, grades and weights them as
+NumPy arrays and writes the results back in one update pass. The grading
+rules come from the breakpoint tables in mcda_breakpoints.
+"""
+
+#Import libraries
+import logging
+import numpy as np
+import arcpy
+from mcda_breakpoints import (landcover_table, ranking_table, FACTOR_TABLES,
+                              ASPECT_TABLE, INFRASTRUCTURE_TABLE, SLOPE_TABLE,
+                              POPULATION_TABLE)
+
+# The nine location factors, in the order used throughout the toolset
+FACTOR_FIELDS = ['LANDCOVER', 'ASPECT', 'INFRASTRUCTURE', 'KEYFEATURES',
+                 'ACCIDENTS', 'POI', 'RIVERS', 'SLOPE', 'POPULATION']
+# The matching weight fields, e.g. LANDCOVERWEIGHT
+WEIGHT_FIELDS = [factor + 'WEIGHT' for factor in FACTOR_FIELDS]
+
+# Default logger, used when the calling tool does not supply its own
+LOGGER = logging.getLogger("MCDAScoring")
+
+# Functions and classes
+def check_weights_same(weightslist, logger=LOGGER):
+    """
+    Check for at least three unique weights assigned to the full list of factors.
+    Convert the list of factor weights to a set and back to a list and then
+    check the number of list items.
+    Ensures that the user does not assign the same value to all factors.
+    """
+    privateset = set(weightslist)
+    uniquelist = list(privateset)
+    if len(uniquelist) >= 3:
+        logger.debug("Length of the unique values list: " + str(len(uniquelist)))
+        return True
+    else:
+        logger.debug("Length of the unique values list: " + str(len(uniquelist)))
+        logger.error("Please assign at least three different factor weights.")
+        return False
+
+def read_factor_columns(featureclass, oid_field='OBJECTID', where_clause=None):
+    """
+    Read the Object IDs and the nine factor fields of featureclass in one
+    SearchCursor pass. Returns a tuple of the Object ID array and an N x 9
+    float array of factor values, with NULL values stored as NaN.
+    """
+    fieldlist = [oid_field] + FACTOR_FIELDS
+    with arcpy.da.SearchCursor(featureclass, fieldlist, where_clause) as cursor:
+        rows = [row for row in cursor]
+    if not rows:
+        return (np.zeros(0, dtype=np.int64),
+                np.zeros((0, len(FACTOR_FIELDS)), dtype=np.float64))
+    oids = np.array([row[0] for row in rows], dtype=np.int64)
+    # NumPy converts None to NaN when casting to a float array
+    values = np.array([row[1:] for row in rows], dtype=np.float64)
+    return oids, values
+
+def landcover_grades(landcovervalues, bareareacode):
+    """
+    Grade an array of land cover keys. Bare area scores 1 and all other land
+    cover classes, including NULL, score 3.
+    """
+    return landcover_table(bareareacode).grade(landcovervalues)
+
+def aspect_grades(aspectvalues):
+    """
+    Grade an array of aspect values. NULL values grade as a negative aspect,
+    matching the Python 2 comparison of None in the per-row function.
+    """
+    return ASPECT_TABLE.grade(aspectvalues)
+
+def count_grades(countvalues):
+    """
+    Grade an array of feature counts, as used for the infrastructure, key
+    features, accidents, POI and rivers factors. A count of 0, 1 or 2 keeps
+    its value; anything else, including NULL, scores 3.
+    """
+    return INFRASTRUCTURE_TABLE.grade(countvalues)
+
+def slope_grades(slopevalues):
+    """
+    Grade an array of slope values. NULL values score 3.
+    """
+    return SLOPE_TABLE.grade(slopevalues)
+
+def population_grades(populationvalues):
+    """
+    Grade an array of population counts. NULL values score 3.
+    """
+    return POPULATION_TABLE.grade(populationvalues)
+
+def grade_matrix(factorvalues, bareareacode):
+    """
+    Grade the N x 9 factor value array column by column and return the
+    N x 9 integer grade matrix, in FACTOR_FIELDS order.
+    """
+    factorvalues = np.asarray(factorvalues, dtype=np.float64)
+    grades = np.empty(factorvalues.shape, dtype=np.int64)
+    grades[:, 0] = landcover_grades(factorvalues[:, 0], bareareacode)
+    for column, factor in enumerate(FACTOR_FIELDS[1:], 1):
+        grades[:, column] = FACTOR_TABLES[factor].grade(factorvalues[:, column])
+    return grades
+
+def unweighted_scores(grades):
+    """
+    Return the unweighted SCORE of each feature, i.e. the sum of its grades.
+    """
+    return np.asarray(grades).sum(axis=1)
+
+def weighted_scores(grades, weights):
+    """
+    Return the WEIGHTEDSCORE of each feature, i.e. the sum of its grades
+    multiplied by the matching factor weights.
+    """
+    return np.dot(np.asarray(grades), np.asarray(weights, dtype=np.int64))
+
+def priority_rankings(scores, lowbreakpoint, mediumbreakpoint):
+    """
+    Classify an array of scores into the Low, Medium and High priority
+    classes using the user-defined breakpoints.
+    """
+    return ranking_table(lowbreakpoint, mediumbreakpoint).grade(scores)
+
+def unique_grade_rows(grades):
+    """
+    Collapse the grade matrix to its distinct grade rows. With nine factors
+    graded 0 to 3 there are far fewer distinct rows than features, and every
+    feature sharing a row shares its scores and ranks. Returns the unique
+    rows, the index of each feature's row and the number of features per row.
+    """
+    grades = np.ascontiguousarray(grades, dtype=np.int64)
+    # Encode each row as one base-4 number, as every grade lies in 0..3
+    codes = np.dot(grades, 4 ** np.arange(grades.shape[1], dtype=np.int64))
+    uniquecodes, firstrow, inverse = np.unique(codes, return_index=True,
+                                               return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(uniquecodes))
+    return grades[firstrow], inverse, counts
+
+def competition_ranks(scores, counts=None):
+    """
+    Rank the scores from highest (rank 1) to lowest. Tied scores share the
+    best rank of their group, so the rank of a score is one more than the
+    number of features with a strictly higher score. counts holds the
+    number of features represented by each score when ranking unique rows.
+    """
+    scores = np.asarray(scores)
+    if counts is None:
+        counts = np.ones(len(scores), dtype=np.int64)
+    order = np.argsort(scores, kind='mergesort')
+    sortedscores = scores[order]
+    cumulative = np.concatenate(([0], np.cumsum(np.asarray(counts)[order])))
+    notgreater = cumulative[np.searchsorted(sortedscores, scores, side='right')]
+    return cumulative[-1] - notgreater + 1
+
+def weighted_ranking_classes(weightedscores, weights, lowbreakpoint,
+                             mediumbreakpoint):
+    """
+    Classify weighted scores into the RANKING classes (0 = Low, 1 = Medium,
+    2 = High). The weighted score is rescaled to the SCORE range by dividing
+    by the mean weight, so equal weights reproduce the unweighted RANKING.
+    Integer scores and weights are compared exactly, avoiding any rounding
+    at the breakpoints. weightedscores may hold one column per weight vector
+    in weights.
+    """
+    weightedscores = np.asarray(weightedscores)
+    weights = np.asarray(weights)
+    weightsums = weights.sum(axis=-1)
+    scaled = weightedscores * weights.shape[-1]
+    mediumbreakpoint = max(lowbreakpoint, mediumbreakpoint)
+    return ((scaled >= lowbreakpoint * weightsums).astype(np.int64) +
+            (scaled >= mediumbreakpoint * weightsums))
+
+def write_score_columns(featureclass, oids, columns, oid_field='OBJECTID'):
+    """
+    Write the result columns back to featureclass in one UpdateCursor pass.
+    columns is a list of (field name, array) tuples, each array aligned with
+    oids. Rows whose Object ID is not in oids are left untouched. Returns the
+    number of rows updated.
+    """
+    fieldlist = [oid_field] + [column[0] for column in columns]
+    # Convert to plain Python values, which the da cursors accept
+    valuelists = [np.asarray(column[1]).tolist() for column in columns]
+    index = dict(zip(np.asarray(oids).tolist(), range(len(oids))))
+    updated = 0
+    with arcpy.da.UpdateCursor(featureclass, fieldlist) as cursor:
+        for row in cursor:
+            position = index.get(row[0])
+            if position is None:
+                continue
+            cursor.updateRow([row[0]] + [values[position] for values in valuelists])
+            updated += 1
+    return updated
+
+def score_table_array(oids, columns, oid_field='DHA_OID'):
+    """
+    Return the structured array write_score_table writes, with the source
+    Object IDs in oid_field followed by the result columns. Integer columns
+    become int32, text columns fixed-width unicode of length 50 and other
+    columns keep their type.
+    """
+    fieldtypes = [(oid_field, np.int32)]
+    valuearrays = [np.asarray(oids)]
+    for name, values in columns:
+        values = np.asarray(values)
+        if values.dtype == object or values.dtype.kind in 'SU':
+            values = values.astype('U50')
+        elif values.dtype.kind in 'iub':
+            values = values.astype(np.int32)
+        fieldtypes.append((name, values.dtype))
+        valuearrays.append(values)
+    output = np.empty(len(valuearrays[0]), dtype=fieldtypes)
+    for (name, fieldtype), values in zip(fieldtypes, valuearrays):
+        output[name] = values
+    return output
+
+def write_score_table(table, oids, columns, oid_field='DHA_OID'):
+    """
+    Write the result columns to a new geometry-free table in one
+    NumPyArrayToTable call. Integer columns are stored as LONG, floating
+    point columns as DOUBLE and text columns as TEXT of length 50. The
+    source Object IDs are stored in oid_field.
+    """
+    output = score_table_array(oids, columns, oid_field)
+    arcpy.da.NumPyArrayToTable(output, table)
+    return len(output)
+
+def make_score_join_layer(featureclass, table, layername, layerfile=None,
+                          oid_field='DHA_OID'):
+    """
+    Join a score table written by write_score_table back to the geometry of
+    its source feature class in a feature layer, keeping only the features
+    that have a score row. The layer is saved to layerfile if one is given.
+    Returns the layer name.
+    """
+    sourceoid = arcpy.Describe(featureclass).OIDFieldName
+    arcpy.MakeFeatureLayer_management(featureclass, layername)
+    arcpy.AddJoin_management(layername, sourceoid, table, oid_field,
+                             'KEEP_COMMON')
+    if layerfile:
+        arcpy.SaveToLayerFile_management(layername, layerfile, 'RELATIVE')
+    return layername
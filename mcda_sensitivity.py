@@ -0,0 +1,92 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_sensitivity
+# Purpose:     Weight sensitivity sweep over a cached grade matrix
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Score many weight vectors against one grade matrix. The matrix is collapsed to
+its distinct grade rows and each chunk of weight vectors is scored with a
+single matrix product, from which the rank and RANKING class of every hazard
+area under every weight vector are derived and summarised.
+"""
+
+#Import libraries
+import csv
+import numpy as np
+from mcda_breakpoints import RANKING_CLASSES
+from mcda_scoring import (unique_grade_rows, competition_ranks,
+                          weighted_ranking_classes, FACTOR_FIELDS)
+
+# Fields written to the sensitivity table, in output order
+SWEEP_FIELDS = ['MINRANK', 'MAXRANK', 'RANKSPREAD', 'MEANRANK'] + \
+               [ranking.upper() + 'PCT' for ranking in RANKING_CLASSES]
+
+# Functions and classes
+def read_weight_vectors(csvfile):
+    """
+    Read the weight vectors from a CSV file with a header row and one column
+    per factor, named either after the factor (LANDCOVER) or its weight
+    field (LANDCOVERWEIGHT). Returns a K x 9 integer array in FACTOR_FIELDS
+    order. Raises a ValueError if a factor column is missing.
+    """
+    with open(csvfile, 'r') as source:
+        reader = csv.reader(source)
+        header = [name.strip().upper() for name in next(reader)]
+        columns = []
+        for factor in FACTOR_FIELDS:
+            if factor in header:
+                columns.append(header.index(factor))
+            elif factor + 'WEIGHT' in header:
+                columns.append(header.index(factor + 'WEIGHT'))
+            else:
+                raise ValueError("The weights file has no column for " + factor)
+        vectors = [[int(row[column]) for column in columns]
+                   for row in reader if row]
+    return np.array(vectors, dtype=np.int64).reshape(-1, len(FACTOR_FIELDS))
+
+def sweep_weights(grades, weightvectors, lowbreakpoint, mediumbreakpoint,
+                  chunksize=1000):
+    """
+    Score the N x 9 grade matrix under each of the K weight vectors. Returns
+    a list of (field name, array) tuples holding, for every feature, the
+    best, worst and mean rank by weighted score, the rank spread and the
+    percentage of weight vectors placing it in each RANKING class.
+    """
+    weightvectors = np.asarray(weightvectors, dtype=np.int64)
+    uniquerows, inverse, counts = unique_grade_rows(grades)
+    minrank = np.empty(len(counts), dtype=np.int64)
+    minrank.fill(np.iinfo(np.int64).max)
+    maxrank = np.zeros(len(counts), dtype=np.int64)
+    ranksum = np.zeros(len(counts), dtype=np.float64)
+    classcounts = np.zeros((len(counts), len(RANKING_CLASSES)), dtype=np.int64)
+
+    for start in range(0, len(weightvectors), chunksize):
+        chunk = weightvectors[start:start + chunksize]
+        # One matrix product scores every distinct row under the whole chunk
+        scores = np.dot(uniquerows, chunk.T)
+        for column in range(scores.shape[1]):
+            ranks = competition_ranks(scores[:, column], counts)
+            np.minimum(minrank, ranks, out=minrank)
+            np.maximum(maxrank, ranks, out=maxrank)
+            ranksum += ranks
+        classes = weighted_ranking_classes(scores, chunk, lowbreakpoint,
+                                           mediumbreakpoint)
+        for ranking in range(len(RANKING_CLASSES)):
+            classcounts[:, ranking] += (classes == ranking).sum(axis=1)
+
+    # Expand the statistics of the distinct rows back to every feature
+    vectorcount = float(len(weightvectors))
+    columns = [('MINRANK', minrank[inverse]),
+               ('MAXRANK', maxrank[inverse]),
+               ('RANKSPREAD', (maxrank - minrank)[inverse]),
+               ('MEANRANK', (ranksum / vectorcount)[inverse])]
+    for ranking, name in enumerate(SWEEP_FIELDS[4:]):
+        columns.append((name, (classcounts[:, ranking] * 100.0 /
+                               vectorcount)[inverse]))
+    return columns
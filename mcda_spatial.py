@@ -0,0 +1,1146 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_spatial
+# Purpose:     In-memory spatial index for the proximity count factors
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Count the source features within a geodesic distance of every hazard area
+without a geoprocessing round-trip per hazard area. Each source layer is read
+once into memory and packed into a Sort-Tile-Recursive (STR) tree of feature
+envelopes, or for point layers into a uniform grid of their coordinates with
+no geometry objects kept. Polyline layers are also broken into flat arrays
+of segments with a tree over the segment envelopes. All the hazard areas are
+buffered geodesically in one Buffer call, the tree returns the features
+whose envelopes overlap a buffer's envelope and an exact geometry test keeps
+those that touch the buffer. A feature is counted when it lies within the
+distance of the hazard area, as with the WITHIN_A_DISTANCE_GEODESIC
+selection the tools used before. Point and polyline sources around hazard
+areas in a geographic coordinate system skip the buffers: the points and
+segments are tested against the polygon rings with the geodesic distance
+kernels of mcda_geodesic instead. Buffers can be kept in a BufferCache so
+that later factors and runs reuse them. With more than one worker the hazard
+areas are split into spatial tiles that are counted in parallel processes.
+Source features whose envelopes fall outside the buffered hazard area
+envelopes are dropped as they are read, so national layers shrink to the
+features near the hazard areas before they are indexed.
+A count can stop at a saturation limit, the count above which the grade of
+the factor no longer changes, so a dense hazard area costs no more than a
+sparse one.
+"""
+
+#Import libraries
+import math
+import numpy as np
+import arcpy
+from mcda_buffer_cache import buffer_cache_key
+from mcda_geodesic import (expand_box_degrees, points_near_segments,
+                           points_segments_distance, segments_near_points,
+                           segments_points_distance)
+from mcda_parallel import (TILES_PER_WORKER, tile_assignments, tile_region,
+                           run_tasks)
+
+# Candidates tested in the first block of a count with a saturation limit;
+# every further block doubles in size
+SATURATION_BLOCK = 64
+
+# Functions and classes
+def boxes_overlap(boxes, box):
+    """
+    Return a boolean array flagging the (xmin, ymin, xmax, ymax) rows of
+    boxes that overlap box. Boxes that only touch count as overlapping.
+    """
+    return ((boxes[:, 0] <= box[2]) & (boxes[:, 2] >= box[0]) &
+            (boxes[:, 1] <= box[3]) & (boxes[:, 3] >= box[1]))
+
+def geometry_box(geometry):
+    """
+    Return the (xmin, ymin, xmax, ymax) envelope of an arcpy geometry.
+    """
+    extent = geometry.extent
+    return (extent.XMin, extent.YMin, extent.XMax, extent.YMax)
+
+def count_slices(count, limit=None):
+    """
+    Return the slices to test count candidates in. Without a saturation
+    limit that is one slice over all of them; with a limit the blocks start
+    at SATURATION_BLOCK and double, so a count that reaches the limit early
+    tests few candidates and one that does not makes few extra calls.
+    """
+    if limit is None:
+        return [slice(0, count)]
+    slices = []
+    start = 0
+    size = SATURATION_BLOCK
+    while start < count:
+        slices.append(slice(start, start + size))
+        start += size
+        size *= 2
+    return slices
+
+class STRTree(object):
+    """
+    Static R-tree of envelopes packed with the Sort-Tile-Recursive method.
+    The leaf entries are sorted into vertical slices by x and by y within
+    each slice, and every nodecapacity consecutive entries of a level form a
+    node of the level above. Each level is kept as a flat array of node
+    envelopes, so a query is a few vectorised overlap tests per level.
+    """
+    def __init__(self, boxes, nodecapacity=16):
+        """
+        Build the tree over an N x 4 array of (xmin, ymin, xmax, ymax) boxes.
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.nodecapacity = nodecapacity
+        self.items = self._str_order(boxes)
+        self.boxes = boxes[self.items]
+        # levels[0] holds the leaf boxes, the last level the root nodes
+        self.levels = [self.boxes]
+        while len(self.levels[-1]) > nodecapacity:
+            self.levels.append(self._parent_boxes(self.levels[-1]))
+
+    def __len__(self):
+        """
+        Return the number of indexed boxes.
+        """
+        return len(self.items)
+
+    def _str_order(self, boxes):
+        """
+        Return the order of the boxes after Sort-Tile-Recursive packing.
+        """
+        count = len(boxes)
+        if count == 0:
+            return np.zeros(0, dtype=np.int64)
+        centrex = (boxes[:, 0] + boxes[:, 2]) / 2.0
+        centrey = (boxes[:, 1] + boxes[:, 3]) / 2.0
+        nodecount = int(math.ceil(count / float(self.nodecapacity)))
+        slicecount = int(math.ceil(math.sqrt(nodecount)))
+        slicesize = slicecount * self.nodecapacity
+        byx = np.argsort(centrex, kind='mergesort')
+        # Sort by slice number first and by y inside each slice
+        slicenumber = np.empty(count, dtype=np.int64)
+        slicenumber[byx] = np.arange(count) // slicesize
+        return np.lexsort((centrey, slicenumber))
+
+    def _parent_boxes(self, boxes):
+        """
+        Return the envelopes of each group of nodecapacity consecutive boxes.
+        """
+        starts = np.arange(0, len(boxes), self.nodecapacity)
+        return np.column_stack((np.minimum.reduceat(boxes[:, 0], starts),
+                                np.minimum.reduceat(boxes[:, 1], starts),
+                                np.maximum.reduceat(boxes[:, 2], starts),
+                                np.maximum.reduceat(boxes[:, 3], starts)))
+
+    def query(self, box):
+        """
+        Return the indices of the input boxes that overlap box, in ascending
+        order.
+        """
+        if len(self.items) == 0:
+            return np.zeros(0, dtype=np.int64)
+        top = self.levels[-1]
+        nodes = np.nonzero(boxes_overlap(top, box))[0]
+        for level in reversed(self.levels[:-1]):
+            if len(nodes) == 0:
+                break
+            # Expand every overlapping node to the entries of the level below
+            children = (nodes[:, np.newaxis] * self.nodecapacity +
+                        np.arange(self.nodecapacity)).ravel()
+            children = children[children < len(level)]
+            nodes = children[boxes_overlap(level[children], box)]
+        return np.sort(self.items[nodes])
+
+class GridPointIndex(object):
+    """
+    Uniform grid index of points. The points are sorted by grid cell, row by
+    row, into flat coordinate arrays, and offsets[c] gives the start of cell
+    c in them (compressed sparse row layout). The cells of one grid row are
+    contiguous, so the points in a box are one array slice per grid row the
+    box spans, refined by a vectorised coordinate test.
+    """
+    def __init__(self, xs, ys, pointspercell=8):
+        """
+        Index the points, with a cell size giving about pointspercell points
+        per cell over the extent of the points. The cells are at least the
+        longer side of the extent over the number of cells, so a long thin
+        extent gets a single row or column of cells rather than a grid with
+        far more cells than points.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        self.count = len(xs)
+        if self.count == 0:
+            return
+        self.xmin, self.ymin = xs.min(), ys.min()
+        width = xs.max() - self.xmin
+        height = ys.max() - self.ymin
+        area = max(width * height, 0.0)
+        cells = max(self.count // pointspercell, 1)
+        # At most cells + 1 columns and rows, and 3 * cells + 1 cells in all
+        self.cellsize = max(math.sqrt(area / cells),
+                            max(width, height) / float(cells)) or 1.0
+        self.columns = int(width // self.cellsize) + 1
+        self.rows = int(height // self.cellsize) + 1
+        cell = self._row(ys) * self.columns + self._column(xs)
+        # Positions of the input points in cell order
+        self.items = np.argsort(cell, kind='mergesort').astype(np.int32)
+        self.xs = xs[self.items]
+        self.ys = ys[self.items]
+        self.offsets = np.zeros(self.rows * self.columns + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cell, minlength=self.rows * self.columns),
+                  out=self.offsets[1:])
+
+    def _column(self, xs):
+        """
+        Return the grid column of x coordinates, clipped to the grid.
+        """
+        return np.clip(((np.asarray(xs) - self.xmin) //
+                        self.cellsize).astype(np.int64), 0, self.columns - 1)
+
+    def _row(self, ys):
+        """
+        Return the grid row of y coordinates, clipped to the grid.
+        """
+        return np.clip(((np.asarray(ys) - self.ymin) //
+                        self.cellsize).astype(np.int64), 0, self.rows - 1)
+
+    def __len__(self):
+        """
+        Return the number of indexed points.
+        """
+        return self.count
+
+    def query(self, box):
+        """
+        Return the indices of the input points inside box, edges included,
+        in ascending order.
+        """
+        if self.count == 0:
+            return np.zeros(0, dtype=np.int64)
+        col0, col1 = self._column([box[0], box[2]]).tolist()
+        row0, row1 = self._row([box[1], box[3]]).tolist()
+        found = []
+        for row in range(row0, row1 + 1):
+            start = self.offsets[row * self.columns + col0]
+            end = self.offsets[row * self.columns + col1 + 1]
+            if start == end:
+                continue
+            xs = self.xs[start:end]
+            ys = self.ys[start:end]
+            inside = ((xs >= box[0]) & (xs <= box[2]) &
+                      (ys >= box[1]) & (ys <= box[3]))
+            found.append(self.items[start:end][inside])
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate(found)).astype(np.int64)
+
+class SegmentIndex(object):
+    """
+    Segments of a polyline layer in flat arrays, with an STR-tree over the
+    segment envelopes. A long river or road has a large envelope that
+    overlaps many hazard areas it never comes near, while its segments have
+    small envelopes, so only the segments near a hazard area are tested.
+    owners holds the position of the feature each segment belongs to, so
+    the tests can be counted per feature again.
+    """
+    def __init__(self, geometries):
+        """
+        Break the geometries into an M x 4 array of (x1, y1, x2, y2) rows.
+        """
+        segments = [np.zeros((0, 4), dtype=np.float64)]
+        owners = [np.zeros(0, dtype=np.int64)]
+        for position, geometry in enumerate(geometries):
+            rows = ring_segments(polygon_rings(geometry))
+            segments.append(rows)
+            owners.append(np.repeat(position, len(rows)).astype(np.int64))
+        self.segments = np.concatenate(segments)
+        self.owners = np.concatenate(owners)
+        self.index = STRTree(np.column_stack((
+            np.minimum(self.segments[:, 0], self.segments[:, 2]),
+            np.minimum(self.segments[:, 1], self.segments[:, 3]),
+            np.maximum(self.segments[:, 0], self.segments[:, 2]),
+            np.maximum(self.segments[:, 1], self.segments[:, 3]))))
+
+    def __len__(self):
+        """
+        Return the number of segments.
+        """
+        return len(self.segments)
+
+    def query(self, box):
+        """
+        Return the indices of the segments whose envelopes overlap box, in
+        ascending order.
+        """
+        return self.index.query(box)
+
+def pack_geometries(geometries):
+    """
+    Return the spatial reference string and the WKB of a list of geometries
+    that share a spatial reference, which unlike the geometries themselves
+    can be passed to a worker process.
+    """
+    if not geometries:
+        return '', []
+    srtext = geometries[0].spatialReference.exportToString()
+    return srtext, [bytes(geometry.WKB) for geometry in geometries]
+
+def unpack_geometries(packed):
+    """
+    Rebuild the list of geometries packed by pack_geometries.
+    """
+    srtext, wkbs = packed
+    if not wkbs:
+        return []
+    spatialreference = arcpy.SpatialReference()
+    spatialreference.loadFromString(srtext)
+    return [arcpy.FromWKB(bytearray(wkb), spatialreference) for wkb in wkbs]
+
+class FootprintMask(object):
+    """
+    Coarse grid of the cells covered by a set of envelopes, with a
+    summed-area table, so testing whether a box overlaps any of the
+    envelopes takes four lookups whatever the number of envelopes. The test
+    is conservative: a box sharing a grid cell with an envelope passes.
+    """
+    def __init__(self, boxes, cells=1024):
+        """
+        Mark the cells of a grid of up to cells x cells over the union of
+        the N x 4 boxes that each box covers.
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.empty = len(boxes) == 0
+        if self.empty:
+            return
+        self.extent = tile_region(boxes)
+        span = max(self.extent[2] - self.extent[0],
+                   self.extent[3] - self.extent[1])
+        self.cellsize = span / float(cells) if span > 0 else 1.0
+        self.columns = int(math.floor((self.extent[2] - self.extent[0]) /
+                                      self.cellsize)) + 1
+        self.rows = int(math.floor((self.extent[3] - self.extent[1]) /
+                                   self.cellsize)) + 1
+        covered = np.zeros((self.rows, self.columns), dtype=np.int64)
+        for box in boxes:
+            col0, row0, col1, row1 = self._cells(box)
+            covered[row0:row1 + 1, col0:col1 + 1] = 1
+        # table[r, c] holds the number of covered cells above and left of
+        # cell (r, c)
+        self.table = np.zeros((self.rows + 1, self.columns + 1),
+                              dtype=np.int64)
+        self.table[1:, 1:] = covered.cumsum(axis=0).cumsum(axis=1)
+
+    def _cells(self, box):
+        """
+        Return the (column, row) range of the grid cells a box covers,
+        clipped to the grid.
+        """
+        col0 = int(math.floor((box[0] - self.extent[0]) / self.cellsize))
+        row0 = int(math.floor((box[1] - self.extent[1]) / self.cellsize))
+        col1 = int(math.floor((box[2] - self.extent[0]) / self.cellsize))
+        row1 = int(math.floor((box[3] - self.extent[1]) / self.cellsize))
+        return (max(col0, 0), max(row0, 0), min(col1, self.columns - 1),
+                min(row1, self.rows - 1))
+
+    def overlaps(self, box):
+        """
+        Return False if box certainly overlaps none of the envelopes.
+        """
+        if self.empty or not boxes_overlap(np.array([self.extent]), box)[0]:
+            return False
+        col0, row0, col1, row1 = self._cells(box)
+        table = self.table
+        return (table[row1 + 1, col1 + 1] - table[row0, col1 + 1] -
+                table[row1 + 1, col0] + table[row0, col0]) > 0
+
+def footprint_boxes(featureclass, distance, where_clause=None,
+                    spatialreference=None):
+    """
+    Return the envelopes of the hazard areas widened by distance meters, in
+    spatialreference or else the spatial reference of the hazard areas, as
+    an N x 4 array. The envelopes are widened in decimal degrees, which
+    always covers the geodesic buffer, and then projected with their edges
+    densified, so a curved edge in the projection is covered as well.
+    """
+    if spatialreference is None:
+        spatialreference = arcpy.Describe(featureclass).spatialReference
+    geographic = spatialreference
+    if spatialreference.type == 'Projected':
+        geographic = spatialreference.GCS
+    boxes = []
+    with arcpy.da.SearchCursor(featureclass, ['SHAPE@'], where_clause,
+                               geographic) as cursor:
+        for (geometry,) in cursor:
+            if geometry is None:
+                continue
+            box = expand_box_degrees(geometry_box(geometry), float(distance))
+            if spatialreference.type != 'Projected':
+                boxes.append(box)
+                continue
+            corners = arcpy.Array([arcpy.Point(box[0], box[1]),
+                                   arcpy.Point(box[0], box[3]),
+                                   arcpy.Point(box[2], box[3]),
+                                   arcpy.Point(box[2], box[1]),
+                                   arcpy.Point(box[0], box[1])])
+            outline = arcpy.Polygon(corners, geographic).densify(
+                'DISTANCE', max(box[2] - box[0], box[3] - box[1]) / 16.0, 0)
+            boxes.append(geometry_box(outline.projectAs(spatialreference)))
+    return np.array(boxes, dtype=np.float64).reshape(-1, 4)
+
+def hazard_footprint(featureclass, distance, where_clause=None,
+                     spatialreference=None):
+    """
+    Return a FootprintMask of the hazard areas widened by distance meters,
+    or None if the spatial reference has no known units, so that nothing
+    is dropped.
+    """
+    if spatialreference is None:
+        spatialreference = arcpy.Describe(featureclass).spatialReference
+    if spatialreference.type not in ('Geographic', 'Projected'):
+        return None
+    return FootprintMask(footprint_boxes(featureclass, distance, where_clause,
+                                         spatialreference))
+
+class SourceLayer(object):
+    """
+    Source features of one proximity factor held in memory with an STR-tree
+    over their envelopes.
+    """
+    def __init__(self, featureclass, spatialreference=None, where_clause=None,
+                 footprint=None):
+        """
+        Read the Object IDs and geometries of featureclass in one cursor
+        pass, projected to spatialreference if one is given. Features without
+        a geometry are skipped, as a location query never selects them, and
+        so are features outside the FootprintMask of the buffered hazard
+        areas if one is given.
+        """
+        shapetype = arcpy.Describe(featureclass).shapeType
+        # Point layers keep their coordinates only, not a geometry per point
+        points = shapetype == 'Point'
+        oids = []
+        geometries = []
+        boxes = []
+        skipped = 0
+        shapefield = 'SHAPE@XY' if points else 'SHAPE@'
+        with arcpy.da.SearchCursor(featureclass, ['OID@', shapefield],
+                                   where_clause, spatialreference) as cursor:
+            for oid, geometry in cursor:
+                if points:
+                    if geometry is None or geometry[0] is None:
+                        continue
+                    box = (geometry[0], geometry[1], geometry[0], geometry[1])
+                else:
+                    if geometry is None:
+                        continue
+                    box = geometry_box(geometry)
+                if footprint is not None and not footprint.overlaps(box):
+                    skipped += 1
+                    continue
+                oids.append(oid)
+                if not points:
+                    geometries.append(geometry)
+                boxes.append(box)
+        self._build(featureclass, shapetype, oids,
+                    None if points else geometries, boxes)
+        self.skipped = skipped
+
+    def _build(self, name, shapetype, oids, geometries, boxes):
+        """
+        Hold the features and index their envelopes: points in a grid index
+        and other shapes in an STR-tree. geometries is None for points.
+        """
+        self.name = name
+        self.shapetype = shapetype
+        self.skipped = 0
+        self.oids = np.array(oids, dtype=np.int64)
+        self.geometries = geometries
+        boxes = np.array(boxes, dtype=np.float64).reshape(-1, 4)
+        self.boxes = boxes
+        # The envelope of a point is the point itself
+        self.x = boxes[:, 0]
+        self.y = boxes[:, 1]
+        if geometries is None:
+            self.index = GridPointIndex(self.x, self.y)
+        else:
+            self.index = STRTree(boxes)
+        # Built on first use by segment_index
+        self.segments = None
+
+    def __getstate__(self):
+        """
+        Pickle the features as WKB, rebuilding the index on unpickling.
+        """
+        packed = None
+        if self.geometries is not None:
+            packed = pack_geometries(self.geometries)
+        return (self.name, self.shapetype, self.oids.tolist(), packed,
+                self.boxes)
+
+    def __setstate__(self, state):
+        """
+        Restore the features pickled by __getstate__.
+        """
+        name, shapetype, oids, packed, boxes = state
+        geometries = None
+        if packed is not None:
+            geometries = unpack_geometries(packed)
+        self._build(name, shapetype, oids, geometries, boxes)
+
+    def subset(self, positions):
+        """
+        Return a new SourceLayer holding the features at positions.
+        """
+        layer = SourceLayer.__new__(SourceLayer)
+        positions = np.asarray(positions, dtype=np.int64)
+        geometries = None
+        if self.geometries is not None:
+            geometries = [self.geometries[position]
+                          for position in positions.tolist()]
+        layer._build(self.name, self.shapetype, self.oids[positions],
+                     geometries, self.boxes[positions])
+        return layer
+
+    def __len__(self):
+        """
+        Return the number of source features held.
+        """
+        return len(self.oids)
+
+    def candidates(self, box):
+        """
+        Return the positions of the features whose envelopes overlap box.
+        """
+        return self.index.query(box)
+
+    def segment_index(self):
+        """
+        Return the SegmentIndex of a polyline layer, building it on the
+        first call.
+        """
+        if self.segments is None:
+            self.segments = SegmentIndex(self.geometries)
+        return self.segments
+
+    def touching(self, buffergeometry, positions):
+        """
+        Return a boolean array flagging the features at positions that touch
+        the buffer polygon. Points are tested against its rings all at once
+        and polylines by their segments near the buffer all at once.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        if self.geometries is None:
+            return points_in_rings(self.x[positions], self.y[positions],
+                                   polygon_rings(buffergeometry))
+        if self.shapetype == 'Polyline':
+            segments = self.segment_index()
+            wanted = np.zeros(len(self.oids), dtype=bool)
+            wanted[positions] = True
+            found = segments.query(geometry_box(buffergeometry))
+            found = found[wanted[segments.owners[found]]]
+            touched = segments_touch_rings(segments.segments[found],
+                                           polygon_rings(buffergeometry))
+            flags = np.zeros(len(self.oids), dtype=bool)
+            flags[segments.owners[found[touched]]] = True
+            return flags[positions]
+        return np.array([not buffergeometry.disjoint(self.geometries[position])
+                         for position in positions.tolist()], dtype=bool)
+
+    def features_within(self, buffergeometry):
+        """
+        Return the positions of the features that touch the buffer polygon.
+        """
+        found = self.candidates(geometry_box(buffergeometry))
+        return found[self.touching(buffergeometry, found)].tolist()
+
+    def count_touching(self, buffergeometry, positions, limit=None):
+        """
+        Return the number of the features at positions that touch the
+        buffer polygon. With a saturation limit the features are tested a
+        block at a time and the count stops at the limit.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        count = 0
+        for block in count_slices(len(positions), limit):
+            count += int(self.touching(buffergeometry,
+                                       positions[block]).sum())
+            if limit is not None and count >= limit:
+                return limit
+        return count
+
+    def count_within(self, buffergeometry, limit=None):
+        """
+        Return the number of features that touch the buffer polygon, up to
+        the saturation limit if one is given.
+        """
+        return self.count_touching(
+            buffergeometry, self.candidates(geometry_box(buffergeometry)),
+            limit)
+
+def buffer_geometries(geometries, distance, workspace='in_memory'):
+    """
+    Buffer a list of geometries by distance meters with a single geodesic
+    Buffer call. Returns the buffers in the order of the geometries.
+    """
+    copy = workspace + "\\mcda_dha_copy"
+    output = workspace + "\\mcda_dha_buffers"
+    try:
+        arcpy.CopyFeatures_management(geometries, copy)
+        # The copied features are numbered in the order of the list
+        with arcpy.da.SearchCursor(copy, ['OID@']) as cursor:
+            positions = dict((row[0], position)
+                             for position, row in enumerate(cursor))
+        arcpy.Buffer_analysis(copy, output, str(distance) + " Meters", "FULL",
+                              "ROUND", "NONE", None, "GEODESIC")
+        buffers = [None] * len(geometries)
+        with arcpy.da.SearchCursor(output, ['ORIG_FID', 'SHAPE@']) as cursor:
+            for oid, geometry in cursor:
+                buffers[positions[oid]] = geometry
+    finally:
+        for dataset in (copy, output):
+            if arcpy.Exists(dataset):
+                arcpy.Delete_management(dataset)
+    return buffers
+
+def cached_buffers(featureclass, distance, cache, where_clause=None,
+                   workspace='in_memory'):
+    """
+    Return a dictionary of Object ID to the geodesic buffer of each hazard
+    area, taking the buffers found in the cache and buffering the rest in
+    one call. New buffers are added to the cache.
+    """
+    spatialreference = arcpy.Describe(featureclass).spatialReference
+    srtext = spatialreference.exportToString()
+    buffers = {}
+    missing = []
+    with arcpy.da.SearchCursor(featureclass, ['OID@', 'SHAPE@'],
+                               where_clause) as cursor:
+        for oid, geometry in cursor:
+            if geometry is None:
+                continue
+            key = buffer_cache_key(geometry, distance, srtext)
+            wkb = cache.get(key)
+            if wkb is None:
+                missing.append((oid, key, geometry))
+            else:
+                buffers[oid] = arcpy.FromWKB(wkb, spatialreference)
+    if missing:
+        newbuffers = buffer_geometries([entry[2] for entry in missing],
+                                       distance, workspace)
+        for (oid, key, _), buffergeometry in zip(missing, newbuffers):
+            if buffergeometry is None:
+                continue
+            buffers[oid] = buffergeometry
+            cache.put(key, buffergeometry.WKB)
+    cache.commit()
+    return buffers
+
+def geodesic_buffers(featureclass, distance, where_clause=None,
+                     workspace='in_memory', cache=None):
+    """
+    Buffer the hazard areas of featureclass by distance meters with a single
+    geodesic Buffer call. Returns a dictionary of Object ID to buffer
+    polygon. With a distance of zero the hazard areas themselves are used.
+    Hazard areas without a geometry get no buffer. If a BufferCache is
+    given, only the hazard areas without a cached buffer are buffered.
+    """
+    buffers = {}
+    if float(distance) <= 0:
+        with arcpy.da.SearchCursor(featureclass, ['OID@', 'SHAPE@'],
+                                   where_clause) as cursor:
+            for oid, geometry in cursor:
+                if geometry is None:
+                    continue
+                buffers[oid] = geometry
+        return buffers
+    if cache is not None:
+        return cached_buffers(featureclass, distance, cache, where_clause,
+                              workspace)
+
+    layer = "mcdaBufferInput"
+    output = workspace + "\\mcda_dha_buffers"
+    arcpy.MakeFeatureLayer_management(featureclass, layer, where_clause)
+    try:
+        arcpy.Buffer_analysis(layer, output, str(distance) + " Meters", "FULL",
+                              "ROUND", "NONE", None, "GEODESIC")
+        with arcpy.da.SearchCursor(output, ['ORIG_FID', 'SHAPE@']) as cursor:
+            for oid, geometry in cursor:
+                buffers[oid] = geometry
+    finally:
+        arcpy.Delete_management(layer)
+        if arcpy.Exists(output):
+            arcpy.Delete_management(output)
+    return buffers
+
+def load_sources(featureclasses, spatialreference=None, footprint=None):
+    """
+    Read each source feature class into a SourceLayer, keeping only the
+    features inside the FootprintMask if one is given.
+    """
+    return [SourceLayer(featureclass, spatialreference, footprint=footprint)
+            for featureclass in featureclasses]
+
+def proximity_counts(buffers, sources, progress=None):
+    """
+    Count the features of all the source layers that lie within each buffer.
+    Returns a dictionary of hazard area Object ID to the total count over
+    the source layers. progress, if given, is updated once per hazard area.
+    """
+    counts = {}
+    for oid, buffergeometry in buffers.items():
+        counts[oid] = sum(source.count_within(buffergeometry)
+                          for source in sources)
+        if progress is not None:
+            progress.update()
+    return counts
+
+def factor_counts(featureclass, factors, where_clause=None, progress=None,
+                  cache=None, limits=None):
+    """
+    Count the source features of several factors around every hazard area
+    in one walk over the hazard areas. factors is a list of (name, source
+    layers, distance) tuples; each distinct distance is buffered once and
+    shared by the factors using it. Returns a dictionary of factor name to a
+    dictionary of hazard area Object ID to count. progress, if given, is
+    updated once per hazard area. cache is an optional BufferCache and
+    limits an optional dictionary of factor name to saturation limit; the
+    factors without a limit are counted exactly.
+    """
+    buffersets = {}
+    for name, sources, distance in factors:
+        if float(distance) not in buffersets:
+            buffersets[float(distance)] = geodesic_buffers(
+                featureclass, distance, where_clause, cache=cache)
+    return buffer_set_counts(buffersets, factors, progress, limits)
+
+def buffer_set_counts(buffersets, factors, progress=None, limits=None):
+    """
+    Count the source features of every factor within the buffers of its
+    distance. buffersets is a dictionary of distance to a dictionary of
+    hazard area Object ID to buffer polygon, as geodesic_buffers returns.
+    A hazard area missing from the buffers of a distance, such as one whose
+    buffer could not be built, gets no count for the factors at that
+    distance. Takes and returns the other arguments as factor_counts does.
+    """
+    if limits is None:
+        limits = {}
+    counts = dict((name, {}) for name, sources, distance in factors)
+    oids = set()
+    for name, sources, distance in factors:
+        oids.update(buffersets[float(distance)])
+    for oid in sorted(oids):
+        for name, sources, distance in factors:
+            buffergeometry = buffersets[float(distance)].get(oid)
+            if buffergeometry is None:
+                continue
+            limit = limits.get(name)
+            total = 0
+            for source in sources:
+                if limit is not None and total >= limit:
+                    break
+                total += source.count_within(
+                    buffergeometry, None if limit is None else limit - total)
+            counts[name][oid] = total
+        if progress is not None:
+            progress.update()
+    return counts
+
+def candidate_pairs(boxes, source, progress=None):
+    """
+    Join an N x 4 array of query boxes to the envelopes of a source layer
+    with an index nested loop. Returns two aligned arrays: the row of the
+    query box and the position of the source feature of every overlapping
+    pair. progress, if given, is updated once per query box.
+    """
+    rows = []
+    positions = []
+    for row, box in enumerate(boxes):
+        found = source.candidates(box)
+        rows.append(np.repeat(row, len(found)))
+        positions.append(found)
+        if progress is not None:
+            progress.update()
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return (np.concatenate(rows).astype(np.int64),
+            np.concatenate(positions).astype(np.int64))
+
+def count_within_distance(buffers, sources, progress=None, limit=None):
+    """
+    Count the source features within every hazard area buffer as one
+    set-based join: the candidate pairs of all buffers are gathered from
+    the spatial index, refined with an exact disjoint test and summed per
+    hazard area. With a saturation limit the candidates of each buffer are
+    refined a block at a time until the count reaches the limit. Returns an
+    array of the Object IDs in ascending order and an aligned array of
+    counts, summed over the source layers.
+    """
+    oids = np.array(sorted(buffers), dtype=np.int64)
+    geometries = [buffers[oid] for oid in oids.tolist()]
+    boxes = np.array([geometry_box(geometry) for geometry in geometries],
+                     dtype=np.float64).reshape(-1, 4)
+    counts = np.zeros(len(oids), dtype=np.int64)
+    for source in sources:
+        rows, positions = candidate_pairs(boxes, source, progress)
+        touching = np.zeros(len(rows), dtype=bool)
+        # The pairs come in query box order, one run of pairs per box
+        starts = np.searchsorted(rows, np.arange(len(oids) + 1))
+        for row in np.unique(rows).tolist():
+            pairs = slice(starts[row], starts[row + 1])
+            if limit is None:
+                touching[pairs] = source.touching(geometries[row],
+                                                  positions[pairs])
+            elif counts[row] < limit:
+                counts[row] += source.count_touching(geometries[row],
+                                                     positions[pairs],
+                                                     limit - counts[row])
+        counts += np.bincount(rows[touching], minlength=len(oids))
+    return oids, counts
+
+def polygon_rings(geometry):
+    """
+    Return the rings of a polygon, or the paths of a polyline, as a list of
+    N x 2 coordinate arrays. A point geometry gives a single ring of one
+    point and a multipoint one such ring per point.
+    """
+    if geometry.type == 'point':
+        point = geometry.firstPoint
+        return [np.array([[point.X, point.Y]], dtype=np.float64)]
+    if geometry.type == 'multipoint':
+        return [np.array([[point.X, point.Y]], dtype=np.float64)
+                for point in geometry]
+    rings = []
+    for part in geometry:
+        ring = []
+        # Interior rings follow the exterior ring after a None separator
+        for point in part:
+            if point is None:
+                if ring:
+                    rings.append(np.array(ring, dtype=np.float64))
+                ring = []
+            else:
+                ring.append((point.X, point.Y))
+        if ring:
+            rings.append(np.array(ring, dtype=np.float64))
+    return rings
+
+def ring_segments(rings):
+    """
+    Return the edges of the rings as an M x 4 array of (x1, y1, x2, y2)
+    rows. A ring of one point gives a segment of zero length.
+    """
+    segments = [np.column_stack((ring[:-1], ring[1:])) if len(ring) > 1
+                else np.column_stack((ring, ring)) for ring in rings]
+    if not segments:
+        return np.zeros((0, 4), dtype=np.float64)
+    return np.concatenate(segments)
+
+def points_in_rings(xs, ys, rings):
+    """
+    Return a boolean array flagging the points inside the rings by the
+    even-odd rule, so points in a hole are outside. Each edge is tested
+    against all the points at once.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    inside = np.zeros(len(xs), dtype=bool)
+    for ring in rings:
+        if len(ring) < 3:
+            continue
+        closed = np.vstack((ring, ring[:1]))
+        for (x1, y1), (x2, y2) in zip(closed[:-1], closed[1:]):
+            if y1 == y2:
+                continue
+            crosses = (y1 > ys) != (y2 > ys)
+            crossx = x1 + (ys - y1) * (x2 - x1) / (y2 - y1)
+            inside ^= crosses & (xs < crossx)
+    return inside
+
+def _orientation(x1, y1, x2, y2, xs, ys):
+    """
+    Return the sign of the turn from the segment (x1, y1)-(x2, y2) to the
+    points: 1 to the left, -1 to the right and 0 on its line.
+    """
+    return np.sign((x2 - x1) * (ys - y1) - (y2 - y1) * (xs - x1))
+
+def segments_cross(segments, edges, blocksize=256):
+    """
+    Return a boolean array flagging the segments of an M x 4 array that
+    intersect any of the edges, touching included, by the orientation test
+    of a block of segments against all the edges at once.
+    """
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    edges = np.asarray(edges, dtype=np.float64).reshape(-1, 4)
+    crosses = np.zeros(len(segments), dtype=bool)
+    if len(edges) == 0:
+        return crosses
+    ex1, ey1, ex2, ey2 = [edges[:, column] for column in range(4)]
+    for start in range(0, len(segments), blocksize):
+        block = segments[start:start + blocksize]
+        sx1, sy1, sx2, sy2 = [block[:, column, np.newaxis]
+                              for column in range(4)]
+        # Both ends of each on opposite sides of, or on, the other's line
+        straddle = ((_orientation(sx1, sy1, sx2, sy2, ex1, ey1) *
+                     _orientation(sx1, sy1, sx2, sy2, ex2, ey2) <= 0) &
+                    (_orientation(ex1, ey1, ex2, ey2, sx1, sy1) *
+                     _orientation(ex1, ey1, ex2, ey2, sx2, sy2) <= 0))
+        # Collinear segments straddle everywhere, so their envelopes must
+        # overlap too
+        overlap = ((np.minimum(sx1, sx2) <= np.maximum(ex1, ex2)) &
+                   (np.maximum(sx1, sx2) >= np.minimum(ex1, ex2)) &
+                   (np.minimum(sy1, sy2) <= np.maximum(ey1, ey2)) &
+                   (np.maximum(sy1, sy2) >= np.minimum(ey1, ey2)))
+        crosses[start:start + blocksize] = (straddle & overlap).any(axis=1)
+    return crosses
+
+def segments_touch_rings(segments, rings, polygon=True):
+    """
+    Return a boolean array flagging the segments that touch the rings: those
+    that cross an edge and, if the rings are a polygon, those that start
+    inside it, which covers the segments lying wholly inside.
+    """
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    touching = segments_cross(segments, ring_segments(rings))
+    if polygon:
+        touching |= points_in_rings(segments[:, 0], segments[:, 1], rings)
+    return touching
+
+def segments_near_rings(segments, rings, distance, polygon=True):
+    """
+    Return a boolean array flagging the segments, in decimal degrees, within
+    distance meters of the rings. Segments that do not touch the rings come
+    closest to them at an end point of a segment or at a ring vertex, so the
+    rest are tested from both end points to the ring edges and from the ring
+    vertices to the segments.
+    """
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    near = segments_touch_rings(segments, rings, polygon)
+    edges = ring_segments(rings)
+    vertices = np.concatenate(rings)
+    for xcolumn, ycolumn in ((0, 1), (2, 3)):
+        rest = np.nonzero(~near)[0]
+        if len(rest) == 0:
+            return near
+        near[rest] = points_near_segments(segments[rest, xcolumn],
+                                          segments[rest, ycolumn], edges,
+                                          distance)
+    rest = np.nonzero(~near)[0]
+    if len(rest):
+        near[rest] = segments_near_points(segments[rest], vertices[:, 0],
+                                          vertices[:, 1], distance)
+    return near
+
+def segments_rings_distance(segments, rings, polygon=True):
+    """
+    Return the distance in meters from each segment, in decimal degrees, to
+    the rings, zero for the segments that touch them, by the same end point
+    and vertex tests as segments_near_rings.
+    """
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    edges = ring_segments(rings)
+    vertices = np.concatenate(rings)
+    distances = np.minimum(
+        np.minimum(points_segments_distance(segments[:, 0], segments[:, 1],
+                                            edges),
+                   points_segments_distance(segments[:, 2], segments[:, 3],
+                                            edges)),
+        segments_points_distance(segments, vertices[:, 0], vertices[:, 1]))
+    distances[segments_touch_rings(segments, rings, polygon)] = 0.0
+    return distances
+
+def geometry_distance(hazard, feature):
+    """
+    Return the geodesic distance in meters between a hazard area and a
+    source feature in decimal degrees: zero if they touch, otherwise the
+    shortest distance from the vertices of either one to the edges of the
+    other, which is where two disjoint sets of segments come closest.
+    """
+    if not hazard.disjoint(feature):
+        return 0.0
+    hazardrings = polygon_rings(hazard)
+    featurerings = polygon_rings(feature)
+    distances = []
+    for rings, segments in ((featurerings, ring_segments(hazardrings)),
+                            (hazardrings, ring_segments(featurerings))):
+        vertices = np.concatenate(rings)
+        distances.append(points_segments_distance(vertices[:, 0],
+                                                  vertices[:, 1],
+                                                  segments).min())
+    return float(min(distances))
+
+def count_points_near(geometry, source, distance, limit=None):
+    """
+    Count the points of a point source layer within distance meters of a
+    hazard area in decimal degrees. Points inside the hazard area count
+    without a distance test and the rest are tested against its edges.
+    With a saturation limit the points are tested a block at a time and the
+    count stops at the limit.
+    """
+    box = expand_box_degrees(geometry_box(geometry), float(distance))
+    found = source.candidates(box)
+    rings = polygon_rings(geometry)
+    segments = ring_segments(rings)
+    count = 0
+    for block in count_slices(len(found), limit):
+        xs = source.x[found[block]]
+        ys = source.y[found[block]]
+        near = np.zeros(len(xs), dtype=bool)
+        if geometry.type == 'polygon':
+            near = points_in_rings(xs, ys, rings)
+        outside = ~near
+        if outside.any():
+            near[outside] = points_near_segments(xs[outside], ys[outside],
+                                                 segments, float(distance))
+        count += int(near.sum())
+        if limit is not None and count >= limit:
+            return limit
+    return count
+
+def count_lines_near(geometry, source, distance, limit=None):
+    """
+    Count the features of a polyline source layer within distance meters of
+    a hazard area in decimal degrees. The segments near the hazard area are
+    tested all at once and a feature counts once if any of its segments is
+    within the distance. With a saturation limit the segments are tested a
+    block at a time and the count stops at the limit.
+    """
+    segments = source.segment_index()
+    box = expand_box_degrees(geometry_box(geometry), float(distance))
+    found = segments.query(box)
+    rings = polygon_rings(geometry)
+    owners = [np.zeros(0, dtype=np.int64)]
+    count = 0
+    for block in count_slices(len(found), limit):
+        near = segments_near_rings(segments.segments[found[block]], rings,
+                                   float(distance),
+                                   geometry.type == 'polygon')
+        owners.append(segments.owners[found[block]][near])
+        count = len(np.unique(np.concatenate(owners)))
+        if limit is not None and count >= limit:
+            return limit
+    return count
+
+def read_hazards(featureclass, where_clause=None):
+    """
+    Return a dictionary of Object ID to geometry of the hazard areas.
+    Hazard areas without a geometry are skipped.
+    """
+    hazards = {}
+    with arcpy.da.SearchCursor(featureclass, ['OID@', 'SHAPE@'],
+                               where_clause) as cursor:
+        for oid, geometry in cursor:
+            if geometry is not None:
+                hazards[oid] = geometry
+    return hazards
+
+def kernel_counts(hazards, sources, distance, progress=None, limit=None):
+    """
+    Count the features of the point and polyline source layers within
+    distance meters of each hazard area in a dictionary of Object ID to
+    geometry in decimal degrees, up to the saturation limit if one is
+    given. Returns an array of the Object IDs in ascending order and an
+    aligned array of counts, summed over the source layers.
+    """
+    oids = np.array(sorted(hazards), dtype=np.int64)
+    counts = np.zeros(len(oids), dtype=np.int64)
+    for source in sources:
+        if source.shapetype == 'Polyline':
+            counter = count_lines_near
+        else:
+            counter = count_points_near
+        for row, oid in enumerate(oids.tolist()):
+            if limit is None:
+                counts[row] += counter(hazards[oid], source, distance)
+            elif counts[row] < limit:
+                counts[row] += counter(hazards[oid], source, distance,
+                                       limit - counts[row])
+            if progress is not None:
+                progress.update()
+    return oids, counts
+
+def count_tile(task):
+    """
+    Count the source features around the hazard areas of one tile. This
+    runs in a worker process, so the task holds the hazard area geometries
+    packed as WKB and the source layers cut down to the tile.
+    """
+    kernel, distance, oids, packed, sources, limit = task
+    hazards = dict(zip(oids, unpack_geometries(packed)))
+    if kernel:
+        return kernel_counts(hazards, sources, distance, limit=limit)
+    return count_within_distance(hazards, sources, limit=limit)
+
+def tiled_counts(hazards, sources, distance, kernel, workers, progress=None,
+                 limit=None):
+    """
+    Split the hazard areas, or their buffers, into spatial tiles and count
+    each tile in a pool of workers processes. A tile takes the source
+    features whose envelopes overlap the envelope of its hazard areas
+    widened by a halo of the buffer distance, which buffers already
+    include, so every tile counts exactly what a serial run counts. Returns
+    the Object IDs in ascending order and the aligned counts, saturated at
+    limit if one is given.
+    """
+    oids = np.array(sorted(hazards), dtype=np.int64)
+    boxes = np.array([geometry_box(hazards[oid]) for oid in oids.tolist()],
+                     dtype=np.float64).reshape(-1, 4)
+    tiles = tile_assignments(boxes, workers * TILES_PER_WORKER)
+    tasks = []
+    for tile in range(int(tiles.max()) + 1 if len(tiles) else 0):
+        rows = np.nonzero(tiles == tile)[0]
+        region = tile_region(boxes[rows])
+        if kernel:
+            region = expand_box_degrees(region, float(distance))
+        tileoids = oids[rows].tolist()
+        tasks.append((kernel, distance, tileoids,
+                      pack_geometries([hazards[oid] for oid in tileoids]),
+                      [source.subset(source.candidates(region))
+                       for source in sources], limit))
+    results = run_tasks(count_tile, tasks, workers, progress,
+                        [len(task[2]) * len(sources) for task in tasks])
+    if not results:
+        return oids, np.zeros(0, dtype=np.int64)
+    tileoids = np.concatenate([result[0] for result in results])
+    tilecounts = np.concatenate([result[1] for result in results])
+    order = np.argsort(tileoids, kind='mergesort')
+    return tileoids[order], tilecounts[order]
+
+def distance_counts(featureclass, sources, distance, where_clause=None,
+                    progress=None, cache=None, workers=1, limit=None):
+    """
+    Count the source features within distance meters of every hazard area.
+    If the hazard areas are in a geographic coordinate system and all the
+    sources are point or polyline layers, the features are counted with the
+    geodesic distance kernels and no buffers are made; otherwise the hazard
+    areas are buffered and joined with count_within_distance. Returns an
+    array of the Object IDs in ascending order and an aligned array of
+    counts, summed over the source layers. progress, if given, is updated
+    once per hazard area and source layer. cache is an optional BufferCache
+    for the buffers and workers the number of processes to count with.
+    limit is an optional saturation limit: the counting of a hazard area
+    stops once it is reached and the count is the limit, which suffices
+    for a grade that no longer changes above it. Without a limit the
+    counts are exact.
+    """
+    spatialreference = arcpy.Describe(featureclass).spatialReference
+    kernel = (spatialreference.type == 'Geographic' and
+              all(source.shapetype in ('Point', 'Polyline')
+                  for source in sources))
+    if kernel:
+        hazards = read_hazards(featureclass, where_clause)
+    else:
+        hazards = geodesic_buffers(featureclass, distance, where_clause,
+                                   cache=cache)
+    if workers > 1:
+        return tiled_counts(hazards, sources, distance, kernel, workers,
+                            progress, limit)
+    if kernel:
+        return kernel_counts(hazards, sources, distance, progress, limit)
+    return count_within_distance(hazards, sources, progress, limit)
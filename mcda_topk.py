@@ -0,0 +1,81 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_topk
+# Purpose:     Select the highest scoring hazard areas without a full sort
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Top-K queries over the calc_score outputs. Rows streamed from a cursor are
+kept in a bounded min-heap of K entries, taking O(N log K) time and O(K)
+memory. Score arrays already in memory, such as those rebuilt from the grade
+cache, are reduced with argpartition instead. Both methods break ties on the
+lowest ID, so they return the same rows in the same order.
+"""
+
+#Import libraries
+import heapq
+import numpy as np
+import arcpy
+
+# Functions and classes
+def top_k_stream(rows, k):
+    """
+    Return the k rows with the highest score from an iterable of
+    (id, score, ...) rows, highest score first. Rows with a NULL score are
+    skipped and equal scores are ordered by ascending id.
+    """
+    heap = []
+    for row in rows:
+        if k <= 0:
+            break
+        if row[1] is None:
+            continue
+        # The heap root is the weakest entry: lowest score, then highest id
+        entry = (row[1], -row[0], row)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    return [entry[2] for entry in sorted(heap, reverse=True)]
+
+def top_k_array(ids, scores, k):
+    """
+    Return the positions of the k highest scores in the scores array,
+    highest score first, with equal scores ordered by ascending id. Uses
+    argpartition, so only the selected positions are sorted.
+    """
+    ids = np.asarray(ids)
+    scores = np.asarray(scores)
+    k = max(0, min(k, len(scores)))
+    if k == 0:
+        return np.zeros(0, dtype=np.int64)
+    # The k-th highest score; every score above it is selected and the ties
+    # at the threshold are filled by ascending id
+    threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    above = np.nonzero(scores > threshold)[0]
+    ties = np.nonzero(scores == threshold)[0]
+    ties = ties[np.argsort(ids[ties], kind='mergesort')][:k - len(above)]
+    selected = np.concatenate((above, ties))
+    order = np.lexsort((ids[selected], -scores[selected]))
+    return selected[order]
+
+def read_top_priorities(table, k, id_field='OBJECTID',
+                        score_field='WEIGHTEDSCORE', ranking=None):
+    """
+    Stream the rows of a calc_score output feature class or table and return
+    the k rows with the highest score_field as (id, score, ranking) tuples,
+    highest first. If ranking is given, only rows of that RANKING class are
+    read.
+    """
+    where_clause = None
+    if ranking:
+        where_clause = "{0} = '{1}'".format(
+            arcpy.AddFieldDelimiters(table, 'RANKING'), ranking)
+    fieldlist = [id_field, score_field, 'RANKING']
+    with arcpy.da.SearchCursor(table, fieldlist, where_clause) as cursor:
+        return top_k_stream(cursor, k)
@@ -0,0 +1,245 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_uncertainty
+# Purpose:     Monte Carlo weight-uncertainty analysis with streaming rank
+#              statistics
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Sample factor weight vectors from user-defined distributions and accumulate
+the rank and RANKING class of every hazard area without storing any ranking.
+Each chunk of samples is scored with one matrix product over the distinct
+grade rows and folded into a RankSketch: a fixed-bin histogram of the rank of
+every row, which can be merged across chunks and worker processes. Rank
+percentiles read from the sketch are accurate to within one bin width.
+"""
+
+#Import libraries
+import numpy as np
+from mcda_breakpoints import RANKING_CLASSES
+from mcda_parallel import open_pool
+from mcda_scoring import (unique_grade_rows, competition_ranks,
+                          weighted_ranking_classes, FACTOR_FIELDS)
+
+# Supported weight distributions and the number of parameters each needs
+DISTRIBUTIONS = {'FIXED': 0, 'PERCENT': 1, 'UNIFORM': 2, 'NORMAL': 2,
+                 'TRIANGULAR': 3}
+
+# Grade rows shared with the worker processes by _init_worker
+_WORKER_DATA = {}
+
+# Functions and classes
+def parse_distribution(spec, weight):
+    """
+    Parse a weight distribution such as "UNIFORM 2 6", "NORMAL 4 0.5",
+    "TRIANGULAR 2 4 7" or "PERCENT 25" (uniform within 25% of weight). An
+    empty spec keeps the weight fixed. Returns a (name, parameters) tuple.
+    Raises a ValueError for unknown names or a wrong number of parameters.
+    """
+    parts = spec.split()
+    if not parts:
+        return ('FIXED', (float(weight),))
+    name = parts[0].upper()
+    if name not in DISTRIBUTIONS:
+        raise ValueError("Unknown weight distribution: " + parts[0])
+    if len(parts) - 1 != DISTRIBUTIONS[name]:
+        raise ValueError(name + " needs " + str(DISTRIBUTIONS[name]) +
+                         " parameters: " + spec)
+    parameters = tuple(float(part) for part in parts[1:])
+    if name == 'FIXED':
+        return (name, (float(weight),))
+    if name == 'PERCENT':
+        spread = weight * parameters[0] / 100.0
+        return ('UNIFORM', (weight - spread, weight + spread))
+    return (name, parameters)
+
+def sample_weights(distributions, size, randomstate):
+    """
+    Draw size weight vectors from the nine (name, parameters) distributions.
+    Negative draws are clipped to zero. Returns a size x 9 float array.
+    """
+    samples = np.empty((size, len(distributions)), dtype=np.float64)
+    for column, (name, parameters) in enumerate(distributions):
+        if name == 'FIXED':
+            samples[:, column] = parameters[0]
+        elif name == 'UNIFORM':
+            samples[:, column] = randomstate.uniform(parameters[0],
+                                                     parameters[1], size)
+        elif name == 'NORMAL':
+            samples[:, column] = randomstate.normal(parameters[0],
+                                                    parameters[1], size)
+        else:
+            samples[:, column] = randomstate.triangular(parameters[0],
+                                                        parameters[1],
+                                                        parameters[2], size)
+    return np.clip(samples, 0, None)
+
+class RankSketch(object):
+    """
+    Mergeable per-row summary of ranks 1..totalcount. Ranks are counted in
+    a fixed number of equal-width bins per row, alongside the exact minimum,
+    maximum and sum of the ranks and the RANKING class counts. Weight
+    vectors skipped because every weight was zero are counted in skipped.
+    """
+    def __init__(self, rowcount, totalcount, bins=100):
+        """
+        Create an empty sketch for rowcount rows ranked among totalcount
+        features.
+        """
+        self.totalcount = totalcount
+        self.bins = bins
+        self.samples = 0
+        self.skipped = 0
+        self.histogram = np.zeros((rowcount, bins), dtype=np.uint32)
+        self.minrank = np.empty(rowcount, dtype=np.int64)
+        self.minrank.fill(np.iinfo(np.int64).max)
+        self.maxrank = np.zeros(rowcount, dtype=np.int64)
+        self.ranksum = np.zeros(rowcount, dtype=np.float64)
+        self.classcounts = np.zeros((rowcount, len(RANKING_CLASSES)),
+                                    dtype=np.int64)
+
+    def update(self, ranks, classes):
+        """
+        Add a chunk of rows x samples ranks and RANKING classes.
+        """
+        rowcount = ranks.shape[0]
+        binindex = (ranks - 1) * self.bins // self.totalcount
+        flatindex = (np.arange(rowcount)[:, np.newaxis] * self.bins +
+                     binindex).ravel()
+        bincounts = np.bincount(flatindex, minlength=rowcount * self.bins)
+        self.histogram += bincounts.reshape(rowcount,
+                                            self.bins).astype(np.uint32)
+        np.minimum(self.minrank, ranks.min(axis=1), out=self.minrank)
+        np.maximum(self.maxrank, ranks.max(axis=1), out=self.maxrank)
+        self.ranksum += ranks.sum(axis=1)
+        for ranking in range(len(RANKING_CLASSES)):
+            self.classcounts[:, ranking] += (classes == ranking).sum(axis=1)
+        self.samples += ranks.shape[1]
+
+    def merge(self, other):
+        """
+        Fold another sketch of the same rows into this one.
+        """
+        self.histogram += other.histogram
+        np.minimum(self.minrank, other.minrank, out=self.minrank)
+        np.maximum(self.maxrank, other.maxrank, out=self.maxrank)
+        self.ranksum += other.ranksum
+        self.classcounts += other.classcounts
+        self.samples += other.samples
+        self.skipped += other.skipped
+
+    def quantile(self, fraction):
+        """
+        Estimate the rank at the given fraction (0 to 1) of every row's rank
+        distribution, interpolating linearly inside the bin that holds it.
+        """
+        cumulative = np.cumsum(self.histogram, axis=1, dtype=np.int64)
+        target = fraction * self.samples
+        binindex = np.minimum((cumulative < target).sum(axis=1), self.bins - 1)
+        rows = np.arange(len(binindex))
+        below = np.where(binindex > 0,
+                         cumulative[rows, np.maximum(binindex - 1, 0)], 0)
+        inbin = np.maximum(self.histogram[rows, binindex], 1)
+        position = binindex + np.clip((target - below) / inbin.astype(float),
+                                      0.0, 1.0)
+        ranks = 1 + position * self.totalcount / float(self.bins)
+        return np.clip(ranks, self.minrank, self.maxrank)
+
+def _init_worker(uniquerows, counts):
+    """
+    Store the distinct grade rows and their feature counts in the worker.
+    """
+    _WORKER_DATA['rows'] = uniquerows
+    _WORKER_DATA['counts'] = counts
+
+def _run_chunk(job):
+    """
+    Sample, score and rank one chunk of weight vectors and return its sketch.
+    Each chunk has its own seed, so the result does not depend on which
+    worker process runs it. A weight vector of all zeros gives no weighted
+    score to rank or classify, so it is skipped and counted in the sketch.
+    """
+    (distributions, lowbreakpoint, mediumbreakpoint, samples, seed,
+     chunknumber, bins) = job
+    uniquerows = _WORKER_DATA['rows']
+    counts = _WORKER_DATA['counts']
+    randomstate = np.random.RandomState([seed, chunknumber])
+    weights = sample_weights(distributions, samples, randomstate)
+    valid = weights.sum(axis=1) > 0
+    weights = weights[valid]
+    sketch = RankSketch(len(counts), int(counts.sum()), bins)
+    sketch.skipped = int(samples - valid.sum())
+    if len(weights) == 0:
+        return sketch
+    scores = np.dot(uniquerows, weights.T)
+    ranks = np.empty(scores.shape, dtype=np.int64)
+    for column in range(scores.shape[1]):
+        ranks[:, column] = competition_ranks(scores[:, column], counts)
+    classes = weighted_ranking_classes(scores, weights, lowbreakpoint,
+                                       mediumbreakpoint)
+    sketch.update(ranks, classes)
+    return sketch
+
+def simulate_weights(grades, distributions, lowbreakpoint, mediumbreakpoint,
+                     samples, chunksize=500, workers=1, seed=None, bins=100):
+    """
+    Run the Monte Carlo analysis over the N x 9 grade matrix. Chunks of
+    chunksize samples are processed by a pool of worker processes and their
+    sketches merged as they arrive. Returns the merged RankSketch of the
+    distinct grade rows and the index of each feature's row.
+    """
+    uniquerows, inverse, counts = unique_grade_rows(grades)
+    if seed is None:
+        seed = np.random.randint(0, 2 ** 31 - 1)
+    jobs = []
+    for chunknumber, start in enumerate(range(0, samples, chunksize)):
+        jobs.append((distributions, lowbreakpoint, mediumbreakpoint,
+                     min(chunksize, samples - start), seed, chunknumber, bins))
+
+    sketch = RankSketch(len(counts), len(inverse), bins)
+    if workers > 1:
+        pool = open_pool(min(workers, len(jobs)), _init_worker,
+                         (uniquerows, counts))
+        try:
+            for chunksketch in pool.imap_unordered(_run_chunk, jobs):
+                sketch.merge(chunksketch)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        _init_worker(uniquerows, counts)
+        for job in jobs:
+            sketch.merge(_run_chunk(job))
+    return sketch, inverse
+
+def uncertainty_columns(sketch, inverse, percentiles=(5, 50, 95)):
+    """
+    Expand the sketch to one value per feature. Returns a list of (field
+    name, array) tuples with the rank range, mean rank, the requested rank
+    percentiles and the probability of each RANKING class.
+    """
+    samples = float(sketch.samples)
+    columns = [('MINRANK', sketch.minrank[inverse]),
+               ('MAXRANK', sketch.maxrank[inverse]),
+               ('MEANRANK', (sketch.ranksum / samples)[inverse])]
+    for percentile in percentiles:
+        columns.append(('P' + str(percentile).zfill(2) + 'RANK',
+                        sketch.quantile(percentile / 100.0)[inverse]))
+    for ranking, name in enumerate(RANKING_CLASSES):
+        columns.append((name.upper() + 'PROB',
+                        (sketch.classcounts[:, ranking] / samples)[inverse]))
+    return columns
+
+def factor_distributions(specs, weights, defaultspec=''):
+    """
+    Build the nine distributions from a {factor: spec} dictionary and the
+    calc_score weights, in FACTOR_FIELDS order. Factors without a spec use
+    defaultspec, with the weight as its centre.
+    """
+    return [parse_distribution(specs.get(factor, defaultspec), weight)
+            for factor, weight in zip(FACTOR_FIELDS, weights)]
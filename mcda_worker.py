@@ -0,0 +1,19 @@
+#------------------------------------------------------------------------------
+# Name:        mcda_worker
+# Purpose:     Side-effect free main module for the worker processes
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Entry module of the worker processes started by mcda_parallel. On Windows a
+new worker process imports the main module of its parent before it runs any
+task. The tool scripts run at module level, so importing one would run the
+whole tool again. While the workers start, this module stands in as the
+main module instead; importing it does nothing, and the tasks themselves
+are functions of the importable mcda modules.
+"""
@@ -0,0 +1,114 @@
+#------------------------------------------------------------------------------
+# Name:        test_mcda_breakpoints
+# Purpose:     Tests of the compiled breakpoint tables
+#
+# Author:      Arie Claassens
+#
+# Created:     17-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Checks every breakpoint table, graded one value at a time and as an array,
+against the original per-row grading functions kept in test_mcda_grading.
+The values cover every breakpoint, a dense sweep of each factor range and
+NULL. Run with: python -m unittest test_mcda_breakpoints
+"""
+
+#Import libraries
+import functools
+import unittest
+import numpy as np
+from mcda_breakpoints import (landcover_table, ranking_table, ASPECT_TABLE,
+                              FACTOR_TABLES, COUNT_BREAKPOINTS,
+                              POPULATION_TABLE, SLOPE_TABLE, BreakpointTable)
+from test_mcda_grading import (py2_value, landcover_calc, sdss_priority_calc,
+                               REFERENCE, BOUNDARY_VALUES, COUNT_FACTORS,
+                               BAREAREA_CODE)
+
+# Functions and classes
+def boundary_values(factor):
+    """
+    Return the boundary values of a factor followed by a dense sweep of its
+    range and None.
+    """
+    if factor in COUNT_FACTORS:
+        values = BOUNDARY_VALUES['COUNT'] + list(np.arange(-2, 10, 0.25))
+    elif factor == 'ASPECT':
+        values = BOUNDARY_VALUES['ASPECT'] + list(np.arange(-5, 365, 0.05))
+    elif factor == 'SLOPE':
+        values = BOUNDARY_VALUES['SLOPE'] + list(np.arange(-1, 91, 0.05))
+    else:
+        values = BOUNDARY_VALUES['POPULATION'] + list(np.arange(-1, 150, 0.5))
+    return [round(float(value), 6) for value in values] + [None]
+
+class BreakpointTableTest(unittest.TestCase):
+    """
+    The breakpoint tables against the original per-row functions.
+    """
+    def check_table(self, table, reference, values):
+        """
+        Grade the values with the table, one at a time and as an array, and
+        compare both with the reference function.
+        """
+        expected = [reference(py2_value(value)) for value in values]
+        scalar = [table.grade_value(value) for value in values]
+        vector = table.grade(np.array(values, dtype=np.float64)).tolist()
+        for value, want, single, whole in zip(values, expected, scalar,
+                                              vector):
+            self.assertEqual(single, want, "{0} {1}: {2} != {3}".format(
+                table.name, value, single, want))
+            self.assertEqual(whole, want, "{0} {1}: {2} != {3}".format(
+                table.name, value, whole, want))
+
+    def test_factor_tables(self):
+        for factor, table in sorted(FACTOR_TABLES.items()):
+            self.check_table(table, REFERENCE[factor],
+                             boundary_values(factor))
+
+    def test_landcover_table(self):
+        for bareareacode in (0, 1, BAREAREA_CODE, 255):
+            values = [None, bareareacode - 1, bareareacode - 0.5,
+                      bareareacode, bareareacode + 0.5, bareareacode + 1]
+            values += list(range(0, 20))
+            reference = functools.partial(landcover_calc,
+                                          bareareacode=bareareacode)
+            self.check_table(landcover_table(bareareacode), reference,
+                             values)
+
+    def test_ranking_table(self):
+        # Includes medium breakpoints equal to and below the low breakpoint
+        for lowbreakpoint, mediumbreakpoint in ((10, 18), (0, 27), (5, 5),
+                                                (18, 10), (12, 11), (27, 0)):
+            scores = list(range(-1, 29)) + [9.5, 10.5, 17.5, 18.5]
+            reference = functools.partial(sdss_priority_calc,
+                                          lowbreakpoint=lowbreakpoint,
+                                          mediumbreakpoint=mediumbreakpoint)
+            table = ranking_table(lowbreakpoint, mediumbreakpoint)
+            self.check_table(table, reference, scores)
+
+    def test_unsorted_breakpoints(self):
+        self.assertRaises(ValueError, BreakpointTable, 'BAD',
+                          list(reversed(COUNT_BREAKPOINTS)), 3, 3)
+
+    def test_aspect_nan(self):
+        self.assertEqual(ASPECT_TABLE.grade([np.nan]).tolist(), [0])
+
+    def test_saturation_count(self):
+        # Every count from the saturation count on shares one grade, and
+        # the count below it does not
+        for table in (FACTOR_TABLES['POI'], POPULATION_TABLE, SLOPE_TABLE):
+            limit = table.saturation_count()
+            counts = np.arange(limit, limit + 1000)
+            grades = table.grade(counts)
+            self.assertTrue((grades == grades[0]).all(), table.name)
+            self.assertNotEqual(table.grade_value(limit - 1), grades[0],
+                                table.name)
+        self.assertEqual(FACTOR_TABLES['POI'].saturation_count(), 3)
+        self.assertEqual(POPULATION_TABLE.saturation_count(), 101)
+        self.assertIsNone(BreakpointTable('EMPTY', [], 0, 0)
+                          .saturation_count())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#------------------------------------------------------------------------------
+# Name:        test_mcda_buffer_cache
+# Purpose:     Tests of the on-disk buffer cache
+#
+# Author:      Arie Claassens
+#
+# Created:     17-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Checks that the buffer cache keys change with the geometry, distance and
+spatial reference, that it keeps the most recently used buffers when it is
+closed over its size limit and that eviction shrinks the cache file.
+Run with: python -m unittest test_mcda_buffer_cache
+"""
+
+#Import libraries
+import os
+import shutil
+import tempfile
+import unittest
+from mcda_buffer_cache import (buffer_cache_key, open_buffer_cache,
+                               BufferCache, BUFFER_CACHE_FILE)
+
+# Functions and classes
+class Buffer(object):
+    """
+    Geometry with the WKB of an arcpy geometry.
+    """
+    def __init__(self, wkb):
+        self.WKB = bytearray(wkb)
+
+def age(cache, key, used):
+    """
+    Set the time the buffer under key was last used, so that the order of
+    use does not depend on the clock resolution.
+    """
+    cache.connection.execute("UPDATE buffers SET used = ? WHERE key = ?",
+                             (used, key))
+
+class BufferCacheTest(unittest.TestCase):
+    """
+    The buffer cache file.
+    """
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cachefile = os.path.join(self.folder, BUFFER_CACHE_FILE)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_buffer_cache_key(self):
+        key = buffer_cache_key(Buffer(b'\x01\x03abc'), 500, 'WGS 1984')
+        self.assertEqual(key, buffer_cache_key(Buffer(b'\x01\x03abc'),
+                                               500.0, 'WGS 1984'))
+        self.assertNotIn(key, [
+            buffer_cache_key(Buffer(b'\x01\x03abd'), 500, 'WGS 1984'),
+            buffer_cache_key(Buffer(b'\x01\x03abc'), 501, 'WGS 1984'),
+            buffer_cache_key(Buffer(b'\x01\x03abc'), 500, 'Hartebeesthoek')])
+
+    def test_get_and_put(self):
+        cache = BufferCache(self.cachefile)
+        self.assertIsNone(cache.get('missing'))
+        cache.put('first', bytearray(b'\x00\x01\x02'))
+        cache.commit()
+        self.assertEqual(cache.get('first'), bytearray(b'\x00\x01\x02'))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.size(), 3)
+        cache.close()
+        # Committed buffers survive the cache being reopened
+        cache = BufferCache(self.cachefile)
+        self.assertEqual(cache.get('first'), bytearray(b'\x00\x01\x02'))
+        cache.close()
+
+    def test_evict_least_recently_used(self):
+        cache = BufferCache(self.cachefile, maxbytes=3000)
+        for position in range(5):
+            cache.put(str(position), bytearray(1000))
+            age(cache, str(position), float(position + 1))
+        # Using the oldest buffer keeps it
+        self.assertIsNotNone(cache.get('0'))
+        cache.commit()
+        # Nothing is evicted until the cache is closed
+        self.assertEqual(cache.size(), 5000)
+        cache.close()
+        cache = BufferCache(self.cachefile, maxbytes=3000)
+        self.assertEqual(cache.size(), 3000)
+        kept = [key for key in '01234' if cache.get(key) is not None]
+        self.assertEqual(kept, ['0', '3', '4'])
+        self.assertEqual(cache.evict(), 0)
+        cache.close()
+
+    def test_eviction_shrinks_file(self):
+        cache = BufferCache(self.cachefile, maxbytes=100000)
+        for position in range(40):
+            cache.put(str(position), bytearray(50000))
+        cache.commit()
+        fullsize = os.path.getsize(self.cachefile)
+        cache.close()
+        self.assertTrue(fullsize > 2000000)
+        self.assertTrue(os.path.getsize(self.cachefile) < 300000)
+
+    def test_open_buffer_cache(self):
+        self.assertIsNone(open_buffer_cache(''))
+        folder = os.path.join(self.folder, 'buffers')
+        cache = open_buffer_cache(folder, 1000)
+        self.assertEqual(cache.maxbytes, 1000)
+        cache.close()
+        self.assertTrue(os.path.exists(os.path.join(folder,
+                                                    BUFFER_CACHE_FILE)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#------------------------------------------------------------------------------
+# Name:        test_mcda_cache
+# Purpose:     Tests of the calc_score grade cache
+#
+# Author:      Arie Claassens
+#
+# Created:     17-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Checks that the grade cache round-trips through its file, that any change to
+the inputs of the grades changes the fingerprint, that an incremental run
+rewrites exactly the columns whose settings changed and that a cache no
+longer matching its target is detected.
+Run with: python -m unittest test_mcda_cache
+"""
+
+#Import libraries
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from mcda_cache import (fingerprint_factors, grade_cache_path,
+                        load_grade_cache, save_grade_cache, clear_grade_cache,
+                        changed_columns, cache_matches)
+
+# Functions and classes
+class GradeCacheTest(unittest.TestCase):
+    """
+    The cache file and the fingerprint of the factor values.
+    """
+    def setUp(self):
+        randomstate = np.random.RandomState(5)
+        self.oids = np.arange(1, 101, dtype=np.int64)
+        self.values = randomstate.randint(0, 50, (100, 9)).astype(float)
+        self.values[3, 4] = np.nan
+        self.grades = randomstate.randint(0, 4, (100, 9))
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_round_trip(self):
+        cachefile = grade_cache_path(self.folder, 'C:/Data/MCDA.gdb/Score')
+        self.assertIsNone(load_grade_cache(cachefile))
+        fingerprint = fingerprint_factors(self.oids, self.values, 7)
+        save_grade_cache(cachefile, fingerprint, self.oids, self.grades,
+                         [1, 2, 3, 4, 5, 6, 7, 8, 9], [10, 18])
+        cache = load_grade_cache(cachefile)
+        self.assertEqual(cache['fingerprint'], fingerprint)
+        self.assertEqual(cache['oids'].tolist(), self.oids.tolist())
+        self.assertEqual(cache['grades'].tolist(), self.grades.tolist())
+        self.assertEqual(cache['weights'], [1, 2, 3, 4, 5, 6, 7, 8, 9])
+        self.assertEqual(cache['breakpoints'], [10, 18])
+        clear_grade_cache(cachefile)
+        self.assertFalse(os.path.exists(cachefile))
+        self.assertIsNone(load_grade_cache(cachefile))
+        # Clearing a missing cache is not an error
+        clear_grade_cache(cachefile)
+
+    def test_unreadable_cache(self):
+        cachefile = grade_cache_path(self.folder, 'Score')
+        with open(cachefile, 'wb') as damaged:
+            damaged.write(b'not a cache')
+        self.assertIsNone(load_grade_cache(cachefile))
+
+    def test_cache_path(self):
+        self.assertEqual(grade_cache_path(self.folder, 'C:/A.gdb/Score'),
+                         grade_cache_path(self.folder, 'c:/a.gdb/SCORE'))
+        self.assertNotEqual(grade_cache_path(self.folder, 'C:/A.gdb/Score'),
+                            grade_cache_path(self.folder, 'C:/A.gdb/Other'))
+
+    def test_fingerprint(self):
+        fingerprint = fingerprint_factors(self.oids, self.values, 7, 'Src',
+                                          'TABLE')
+        self.assertEqual(fingerprint, fingerprint_factors(
+            self.oids.copy(), self.values.copy(), 7, 'SRC', 'table'))
+        changed = self.values.copy()
+        changed[50, 2] += 1
+        others = [fingerprint_factors(self.oids, changed, 7, 'Src', 'TABLE'),
+                  fingerprint_factors(self.oids[::-1], self.values, 7, 'Src',
+                                      'TABLE'),
+                  fingerprint_factors(self.oids, self.values, 8, 'Src',
+                                      'TABLE'),
+                  fingerprint_factors(self.oids, self.values, 7, 'Other',
+                                      'TABLE'),
+                  fingerprint_factors(self.oids, self.values, 7, 'Src',
+                                      'FEATURE CLASS')]
+        self.assertNotIn(fingerprint, others)
+
+class ChangedColumnsTest(unittest.TestCase):
+    """
+    The columns an incremental run rewrites.
+    """
+    def test_changed_columns(self):
+        weights = [1, 2, 3, 4, 5, 6, 7, 8, 9]
+        cache = {'weights': list(weights), 'breakpoints': [10, 18]}
+        self.assertEqual(changed_columns(None, weights, [10, 18]),
+                         (True, True, True))
+        self.assertEqual(changed_columns(cache, weights, [10, 18]),
+                         (False, False, False))
+        self.assertEqual(changed_columns(cache, weights, [11, 18]),
+                         (False, True, False))
+        self.assertEqual(changed_columns(cache, weights[::-1], (10, 18)),
+                         (False, False, True))
+
+class CacheMatchesTest(unittest.TestCase):
+    """
+    A cache against the rows of the target it was saved for.
+    """
+    def test_cache_matches(self):
+        weights = [1, 2, 3, 4, 5, 6, 7, 8, 9]
+        cache = {'oids': np.array([3, 1, 2]), 'weights': weights}
+        rows = [tuple(weights)] * 3
+        self.assertTrue(cache_matches(cache, [1, 2, 3], rows))
+        # Rows, Object IDs or weights changed since the cache was saved
+        self.assertFalse(cache_matches(cache, [1, 2], rows[:2]))
+        self.assertFalse(cache_matches(cache, [1, 2, 3, 4], rows + rows[:1]))
+        self.assertFalse(cache_matches(cache, [1, 2, 5], rows))
+        edited = rows[:2] + [(9, 2, 3, 4, 5, 6, 7, 8, 9)]
+        self.assertFalse(cache_matches(cache, [1, 2, 3], edited))
+        nulls = rows[:2] + [(None,) * 9]
+        self.assertFalse(cache_matches(cache, [1, 2, 3], nulls))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+#------------------------------------------------------------------------------
+# Name:        test_mcda_engines
+# Purpose:     Brute-force tests of the engine functions
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Checks the TOPSIS, VIKOR and PROMETHEE II engines against straightforward
+implementations over every feature. The module imports arcpy, so the tests
+are skipped without it.
+Run with: python -m unittest test_mcda_engines
+"""
+
+#Import libraries
+import unittest
+import numpy as np
+try:
+    from mcda_engines import engine_scores
+    HAVE_ARCPY = True
+except ImportError:
+    HAVE_ARCPY = False
+
+# Functions and classes
+def random_grades(randomstate, count):
+    """
+    Return a count x 9 grade matrix with many repeated rows.
+    """
+    return randomstate.randint(0, 4, (count, 9)) * (
+        randomstate.rand(count, 9) < 0.6)
+
+def brute_force_ranks(scores):
+    """
+    Return the competition rank of each score, one more than the number of
+    strictly higher scores.
+    """
+    return np.array([1 + sum(1 for other in scores if other > score)
+                     for score in scores])
+
+def brute_force_topsis(grades, weights):
+    """
+    Return the TOPSIS closeness of every feature.
+    """
+    grades = grades.astype(float)
+    weights = np.asarray(weights, dtype=float) / np.sum(weights)
+    closeness = []
+    norms = [np.sqrt((grades[:, column] ** 2).sum()) or 1.0
+             for column in range(grades.shape[1])]
+    weighted = [[value / norm * weight for value, norm, weight
+                 in zip(row, norms, weights)] for row in grades]
+    ideal = [max(column) for column in zip(*weighted)]
+    antiideal = [min(column) for column in zip(*weighted)]
+    for row in weighted:
+        toideal = np.sqrt(sum((value - best) ** 2
+                              for value, best in zip(row, ideal)))
+        toanti = np.sqrt(sum((value - worst) ** 2
+                             for value, worst in zip(row, antiideal)))
+        total = toideal + toanti
+        closeness.append(toanti / total if total > 0 else 0.0)
+    return np.array(closeness)
+
+def brute_force_vikor(grades, weights, strategy=0.5):
+    """
+    Return 1 - Q of every feature.
+    """
+    grades = grades.astype(float)
+    weights = np.asarray(weights, dtype=float) / np.sum(weights)
+    best = grades.max(axis=0)
+    worst = grades.min(axis=0)
+    utility = []
+    regret = []
+    for row in grades:
+        gaps = [weight * (high - value) / ((high - low) or 1.0)
+                for value, high, low, weight
+                in zip(row, best, worst, weights)]
+        utility.append(sum(gaps))
+        regret.append(max(gaps))
+    utility = np.array(utility)
+    regret = np.array(regret)
+    compromise = np.zeros(len(grades))
+    for values, share in ((utility, strategy), (regret, 1 - strategy)):
+        spread = values.max() - values.min()
+        if spread > 0:
+            compromise += share * (values - values.min()) / spread
+    return 1.0 - compromise
+
+def brute_force_promethee(grades, weights, threshold=0):
+    """
+    Return the PROMETHEE II net flow of every feature, comparing every pair.
+    """
+    weights = np.asarray(weights, dtype=float) / np.sum(weights)
+    flows = []
+    for first in grades:
+        flow = 0.0
+        for second in grades:
+            for weight, a, b in zip(weights, first, second):
+                difference = float(a - b)
+                if threshold > 0:
+                    preference = min(max(difference / threshold, 0), 1)
+                    against = min(max(-difference / threshold, 0), 1)
+                else:
+                    preference = float(difference > 0)
+                    against = float(difference < 0)
+                flow += weight * (preference - against)
+        flows.append(flow / (len(grades) - 1))
+    return np.array(flows)
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_engines needs arcpy")
+class EngineTest(unittest.TestCase):
+    """
+    The engines on distinct grade rows against scoring every feature.
+    """
+    def setUp(self):
+        randomstate = np.random.RandomState(14)
+        self.grades = random_grades(randomstate, 150)
+        self.weights = randomstate.randint(1, 10, 9)
+
+    def check_engine(self, engine, expected, threshold=0):
+        """
+        Compare the scores and ranks of an engine with the expected scores.
+        """
+        scores, ranks = engine_scores(self.grades, self.weights, engine,
+                                      threshold, blocksize=7)
+        np.testing.assert_allclose(scores, expected, atol=1e-12)
+        self.assertEqual(ranks.tolist(), brute_force_ranks(scores).tolist())
+
+    def test_topsis(self):
+        self.check_engine('TOPSIS', brute_force_topsis(self.grades,
+                                                       self.weights))
+
+    def test_vikor(self):
+        self.check_engine('VIKOR', brute_force_vikor(self.grades,
+                                                     self.weights))
+
+    def test_promethee(self):
+        for threshold in (0, 2):
+            self.check_engine('PROMETHEE II', brute_force_promethee(
+                self.grades, self.weights, threshold), threshold)
+
+    def test_constant_column(self):
+        self.grades[:, 3] = 2
+        self.check_engine('TOPSIS', brute_force_topsis(self.grades,
+                                                       self.weights))
+        self.check_engine('VIKOR', brute_force_vikor(self.grades,
+                                                     self.weights))
+
+    def test_unknown_engine(self):
+        self.assertRaises(ValueError, engine_scores, self.grades,
+                          self.weights, 'ELECTRE')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,275 @@
+#------------------------------------------------------------------------------
+# Name:        test_mcda_geodesic
+# Purpose:     Tests of the geodesic distance functions
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Checks the Vincenty distance against a published value and the vectorised
+point and segment distance functions against a brute-force search over
+densely sampled segments, and against the refined minimum of the Vincenty
+distance along long segments for their error bound.
+Run with: python -m unittest test_mcda_geodesic
+"""
+
+#Import libraries
+import unittest
+from functools import partial
+import numpy as np
+from mcda_geodesic import (haversine_distance, vincenty_distance,
+                           within_distance, point_segment_distance,
+                           points_near_segments, points_segments_distance,
+                           segments_near_points, segments_points_distance,
+                           expand_box_degrees, segment_error,
+                           HAVERSINE_ERROR)
+
+# Samples per segment of the brute-force search
+SEGMENT_SAMPLES = 1001
+# Samples per segment and golden section steps of the refined search
+BRACKET_SAMPLES = 101
+GOLDEN_STEPS = 40
+
+# Functions and classes
+def brute_force_distances(lons, lats, segments):
+    """
+    Return the Vincenty distance from each point to the nearest of the
+    points sampled along the segments. The samples lie on the straight
+    lines in longitude and latitude that the functions measure to.
+    """
+    fractions = np.linspace(0, 1, SEGMENT_SAMPLES)[:, np.newaxis]
+    samplelons = (segments[:, 0] + fractions *
+                  (segments[:, 2] - segments[:, 0])).ravel()
+    samplelats = (segments[:, 1] + fractions *
+                  (segments[:, 3] - segments[:, 1])).ravel()
+    return np.array([vincenty_distance(lon, lat, samplelons,
+                                       samplelats).min()
+                     for lon, lat in zip(lons, lats)])
+
+def refined_distances(lons, lats, segments):
+    """
+    Return the Vincenty distance from each point to the nearest point of
+    the segments, bracketing the minimum along each segment between the
+    samples next to the nearest of BRACKET_SAMPLES samples and narrowing
+    it down by golden section search.
+    """
+    golden = (np.sqrt(5) - 1) / 2.0
+    fractions = np.linspace(0, 1, BRACKET_SAMPLES)
+    steplons = segments[:, 2] - segments[:, 0]
+    steplats = segments[:, 3] - segments[:, 1]
+    distances = []
+    for lon, lat in zip(lons, lats):
+        along = partial(distance_along, lon, lat, segments)
+        nearest = np.argmin(along(fractions[:, np.newaxis]), axis=0)
+        low = fractions[np.maximum(nearest - 1, 0)]
+        high = fractions[np.minimum(nearest + 1, BRACKET_SAMPLES - 1)]
+        for _ in range(GOLDEN_STEPS):
+            first = high - golden * (high - low)
+            second = low + golden * (high - low)
+            lower = along(first) < along(second)
+            low = np.where(lower, low, first)
+            high = np.where(lower, second, high)
+        distances.append(along((low + high) / 2.0).min())
+    return np.array(distances)
+
+def distance_along(lon, lat, segments, fractions):
+    """
+    Return the Vincenty distance from (lon, lat) to the points at fractions
+    along the segments.
+    """
+    return vincenty_distance(
+        lon, lat, segments[:, 0] + fractions * (segments[:, 2] -
+                                                segments[:, 0]),
+        segments[:, 1] + fractions * (segments[:, 3] - segments[:, 1]))
+
+def random_segments(randomstate, count, centre, size):
+    """
+    Return count random segments of up to size degrees near the centre.
+    """
+    starts = centre + randomstate.uniform(-size, size, (count, 2))
+    ends = starts + randomstate.uniform(-size, size, (count, 2))
+    return np.column_stack((starts, ends))
+
+def offset_distance(lon, lat, dlon, dlat, distance):
+    """
+    Return the multiple of (dlon, dlat) degrees at which a point moved from
+    (lon, lat) lies distance meters away, by bisection.
+    """
+    low, high = 0.0, 1.0
+    while vincenty_distance(lon, lat, lon + high * dlon,
+                            lat + high * dlat) < distance:
+        high *= 2
+    for _ in range(60):
+        middle = (low + high) / 2.0
+        if vincenty_distance(lon, lat, lon + middle * dlon,
+                             lat + middle * dlat) < distance:
+            low = middle
+        else:
+            high = middle
+    return low
+
+class DistanceTest(unittest.TestCase):
+    """
+    The point to point distances.
+    """
+    def test_vincenty_reference(self):
+        # Flinders Peak to Buninyong, from Vincenty (1975)
+        distance = vincenty_distance(144.42486788889, -37.95103341667,
+                                     143.92649552778, -37.65282113889)
+        self.assertAlmostEqual(float(distance), 54972.271, places=3)
+
+    def test_vincenty_degenerate(self):
+        self.assertEqual(float(vincenty_distance(25, -30, 25, -30)), 0.0)
+        # Equatorial pairs have cos^2(alpha) = 0
+        self.assertAlmostEqual(float(vincenty_distance(0, 0, 1, 0)),
+                               111319.491, places=3)
+        # Nearly antipodal pairs fall back to the haversine distance
+        self.assertTrue(np.isfinite(vincenty_distance(0, 0, 179.7, 0.3)))
+
+    def test_haversine_error(self):
+        # within_distance relies on this bound to skip Vincenty
+        randomstate = np.random.RandomState(1)
+        lons = randomstate.uniform(-180, 180, (2, 5000))
+        lats = randomstate.uniform(-80, 80, (2, 5000))
+        exact = vincenty_distance(lons[0], lats[0], lons[1], lats[1])
+        spherical = haversine_distance(lons[0], lats[0], lons[1], lats[1])
+        keep = exact > 0
+        error = np.abs(spherical[keep] - exact[keep]) / exact[keep]
+        self.assertTrue((error < HAVERSINE_ERROR).all())
+
+    def test_within_distance(self):
+        randomstate = np.random.RandomState(2)
+        lons = randomstate.uniform(27, 29, (2, 5000))
+        lats = randomstate.uniform(-27, -25, (2, 5000))
+        exact = vincenty_distance(lons[0], lats[0], lons[1], lats[1])
+        for distance in (1000.0, 50000.0, float(np.median(exact))):
+            within = within_distance(lons[0], lats[0], lons[1], lats[1],
+                                     distance)
+            self.assertEqual(within.tolist(), (exact <= distance).tolist())
+
+class SegmentDistanceTest(unittest.TestCase):
+    """
+    The point to segment distances against a brute-force search.
+    """
+    @classmethod
+    def setUpClass(cls):
+        randomstate = np.random.RandomState(3)
+        centre = np.array([28.0, -26.0])
+        cls.segments = random_segments(randomstate, 20, centre, 0.05)
+        points = centre + randomstate.uniform(-0.2, 0.2, (150, 2))
+        cls.lons, cls.lats = points[:, 0], points[:, 1]
+        cls.expected = brute_force_distances(cls.lons, cls.lats,
+                                             cls.segments)
+        # The samples miss the nearest point by up to half their spacing,
+        # and the local plane finds it to within segment_error
+        lengths = vincenty_distance(cls.segments[:, 0], cls.segments[:, 1],
+                                    cls.segments[:, 2], cls.segments[:, 3])
+        cls.spacing = lengths.max() / (SEGMENT_SAMPLES - 1)
+
+    def tolerance(self, expected):
+        """
+        Return the allowed difference from the brute-force distances.
+        """
+        return self.spacing / 2.0 + segment_error(expected, 27.0)
+
+    def test_points_segments_distance(self):
+        distances = points_segments_distance(self.lons, self.lats,
+                                             self.segments, blocksize=64)
+        self.assertTrue((np.abs(distances - self.expected) <=
+                         self.tolerance(self.expected)).all())
+        for position in range(0, len(self.lons), 50):
+            single = point_segment_distance(self.lons[position],
+                                            self.lats[position],
+                                            self.segments)
+            self.assertAlmostEqual(single, distances[position], places=6)
+
+    def test_points_near_segments(self):
+        for distance in (500.0, 2000.0, float(np.median(self.expected))):
+            near = points_near_segments(self.lons, self.lats, self.segments,
+                                        distance, blocksize=64)
+            clear = (np.abs(self.expected - distance) >
+                     self.tolerance(self.expected))
+            self.assertEqual(near[clear].tolist(),
+                             (self.expected <= distance)[clear].tolist())
+
+    def test_segments_to_points(self):
+        # Every point against one segment at a time is the brute force for
+        # the converse functions
+        expected = np.array([
+            brute_force_distances(self.lons, self.lats,
+                                  self.segments[position:position + 1]).min()
+            for position in range(len(self.segments))])
+        distances = segments_points_distance(self.segments, self.lons,
+                                             self.lats, blocksize=16)
+        self.assertTrue((np.abs(distances - expected) <=
+                         self.tolerance(expected)).all())
+        distance = float(np.median(expected))
+        near = segments_near_points(self.segments, self.lons, self.lats,
+                                    distance, blocksize=16)
+        clear = np.abs(expected - distance) > self.tolerance(expected)
+        self.assertEqual(near[clear].tolist(),
+                         (expected <= distance)[clear].tolist())
+
+    def test_no_segments(self):
+        empty = np.zeros((0, 4))
+        self.assertFalse(points_near_segments(self.lons, self.lats, empty,
+                                              1000.0).any())
+        self.assertTrue(np.isinf(points_segments_distance(
+            self.lons, self.lats, empty)).all())
+
+class SegmentErrorTest(unittest.TestCase):
+    """
+    The distances to long segments against their refined minimum.
+    """
+    def test_error_bound(self):
+        randomstate = np.random.RandomState(12)
+        for latitude in (-75, -60, -26, 0, 20, 45, 60, 70):
+            centre = np.array([randomstate.uniform(-170, 170), latitude])
+            for size, spread in ((0.05, 0.2), (1.5, 2.0)):
+                segments = random_segments(randomstate, 12, centre, size)
+                points = centre + randomstate.uniform(-spread, spread,
+                                                      (15, 2))
+                lons, lats = points[:, 0], points[:, 1]
+                expected = refined_distances(lons, lats, segments)
+                distances = points_segments_distance(lons, lats, segments)
+                # Never short, and long by no more than the bound, give
+                # or take the 0.1 mm the search finds the minimum to
+                self.assertTrue((distances >= expected - 1e-4).all())
+                self.assertTrue((distances - expected <=
+                                 segment_error(expected, lats) +
+                                 1e-4).all())
+
+class ExpandBoxTest(unittest.TestCase):
+    """
+    Points distance meters from a box corner lie inside the expanded box.
+    """
+    def test_expand_box_degrees(self):
+        randomstate = np.random.RandomState(4)
+        for _ in range(20):
+            lon = randomstate.uniform(-170, 170)
+            lat = randomstate.uniform(-70, 70)
+            box = (lon, lat, lon + randomstate.uniform(0, 0.5),
+                   lat + randomstate.uniform(0, 0.5))
+            distance = randomstate.uniform(100, 20000)
+            expanded = expand_box_degrees(box, distance)
+            for cornerlon, cornerlat in ((box[0], box[1]), (box[2], box[1]),
+                                         (box[2], box[3]), (box[0], box[3])):
+                for dlon, dlat in ((1, 0), (-1, 0), (0, 1), (0, -1),
+                                   (1, 1), (-1, -1)):
+                    scale = offset_distance(cornerlon, cornerlat, dlon, dlat,
+                                            distance)
+                    self.assertTrue(expanded[0] <= cornerlon + scale * dlon
+                                    <= expanded[2])
+                    self.assertTrue(expanded[1] <= cornerlat + scale * dlat
+                                    <= expanded[3])
+
+    def test_polar_box(self):
+        self.assertEqual(expand_box_degrees((10, 89.5, 11, 89.8), 50000),
+                         (-180.0, 89.5 - 50000 / 110574.0, 180.0, 90.0))
+
+if __name__ == '__main__':
+    unittest.main()
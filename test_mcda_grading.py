@@ -0,0 +1,222 @@
+#------------------------------------------------------------------------------
+# Name:        test_mcda_grading
+# Purpose:     Tests of the vectorised calc_score grading and output
+#
+# Author:      Arie Claassens
+#
+# Created:     16-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Checks the vectorised grading of calc_score against the per-row grading
+functions it used before. The original functions are kept below as the
+reference, which test_mcda_breakpoints shares. Python 2 ordered None below
+every number, which is how the original functions graded NULL factors, so
+None is passed to them as minus infinity. The TABLE output mode is checked
+on the array it hands to NumPyArrayToTable.
+
+mcda_scoring imports arcpy, so the tests are skipped without it.
+Run with: python -m unittest test_mcda_grading
+"""
+
+#Import libraries
+import unittest
+import numpy as np
+try:
+    from mcda_scoring import (grade_matrix, priority_rankings,
+                              score_table_array, FACTOR_FIELDS)
+    HAVE_ARCPY = True
+except ImportError:
+    HAVE_ARCPY = False
+
+BAREAREA_CODE = 7
+COUNT_FACTORS = ['INFRASTRUCTURE', 'KEYFEATURES', 'ACCIDENTS', 'POI',
+                 'RIVERS']
+
+# Functions and classes
+def py2_value(value):
+    """
+    Return the value as the original functions compared it under Python 2,
+    where None is smaller than any number.
+    """
+    if value is None:
+        return float('-inf')
+    return value
+
+# The per-row grading functions of the original calc_score
+def landcover_calc(landcovervalue, bareareacode=BAREAREA_CODE):
+    if landcovervalue == bareareacode:
+        landcover = 1
+    else:
+        landcover = 3
+    return landcover
+
+def aspect_calc(aspectvalue):
+    if aspectvalue < 0:
+        asp = 0
+    elif aspectvalue == 0 and aspectvalue < 22.6:
+        asp = 3
+    elif aspectvalue > 22.5 and aspectvalue < 67.6:
+        asp = 2
+    elif aspectvalue > 67.5 and aspectvalue < 112.6:
+        asp = 1
+    elif aspectvalue > 112.5 and aspectvalue < 157.6:
+        asp = 0
+    elif aspectvalue > 157.5 and aspectvalue < 202.6:
+        asp = 0
+    elif aspectvalue > 202.5 and aspectvalue < 247.6:
+        asp = 0
+    elif aspectvalue > 247.5 and aspectvalue < 292.6:
+        asp = 0
+    elif aspectvalue > 292.5 and aspectvalue < 337.6:
+        asp = 2
+    else:
+        asp = 3
+    return asp
+
+def count_calc(count):
+    if count == 0:
+        grade = 0
+    elif count == 1:
+        grade = 1
+    elif count == 2:
+        grade = 2
+    else:
+        grade = 3
+    return grade
+
+def slope_calc(slopevalue):
+    if slopevalue == 0:
+        slp = 0
+    elif slopevalue > 15:
+        slp = 1
+    elif slopevalue > 10 and slopevalue < 15:
+        slp = 2
+    else:
+        slp = 3
+    return slp
+
+def population_calc(populationcount):
+    if populationcount == 0:
+        pop = 0
+    elif populationcount > 0 and populationcount < 51:
+        pop = 1
+    elif populationcount > 50 and populationcount < 101:
+        pop = 2
+    else:
+        pop = 3
+    return pop
+
+def sdss_priority_calc(score, lowbreakpoint, mediumbreakpoint):
+    if score < lowbreakpoint:
+        sdss_priority = "Low"
+    elif score >= lowbreakpoint and score < mediumbreakpoint:
+        sdss_priority = "Medium"
+    else:
+        sdss_priority = "High"
+    return sdss_priority
+
+REFERENCE = {'ASPECT': aspect_calc, 'SLOPE': slope_calc,
+             'POPULATION': population_calc}
+REFERENCE.update((factor, count_calc) for factor in COUNT_FACTORS)
+
+# Values on and around every breakpoint of the original functions
+BOUNDARY_VALUES = {
+    'ASPECT': [-1, -0.01, 0, 0.01, 22.5, 22.55, 22.6, 67.5, 67.55, 67.6,
+               112.5, 112.55, 112.6, 157.5, 157.55, 157.6, 202.5, 202.6,
+               247.5, 247.6, 292.5, 292.55, 292.6, 337.5, 337.55, 337.6,
+               359.99, 360],
+    'SLOPE': [-1, 0, 0.01, 9.99, 10, 10.01, 14.99, 15, 15.01, 45, 90],
+    'POPULATION': [-1, 0, 0.5, 1, 50, 50.5, 51, 100, 100.5, 101, 102,
+                   1000000],
+    'COUNT': [-1, 0, 0.5, 1, 1.5, 2, 2.5, 3, 4, 100]}
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_scoring needs arcpy")
+class GradeMatrixTest(unittest.TestCase):
+    """
+    The vectorised calc_score grading against the original per-row loop.
+    """
+    def setUp(self):
+        randomstate = np.random.RandomState(16102026)
+        rows = []
+        for _ in range(2000):
+            row = [int(randomstate.randint(0, 12)),
+                   round(randomstate.uniform(-1, 360), 1)]
+            row += [int(randomstate.randint(0, 6)) for _ in COUNT_FACTORS]
+            row += [round(randomstate.uniform(0, 30), 1),
+                    int(randomstate.randint(0, 150))]
+            # NULL factors, as read from features not yet processed
+            for column in np.nonzero(randomstate.rand(len(row)) < 0.05)[0]:
+                row[column] = None
+            rows.append(row)
+        # The exact breakpoint values, row by row
+        for factor in ('ASPECT', 'SLOPE', 'POPULATION'):
+            column = FACTOR_FIELDS.index(factor)
+            for value in BOUNDARY_VALUES[factor]:
+                row = list(rows[0])
+                row[column] = value
+                rows.append(row)
+        self.rows = rows
+
+    def reference_grades(self, row):
+        """
+        Grade one row with the original functions, in FACTOR_FIELDS order.
+        """
+        grades = [landcover_calc(py2_value(row[0]))]
+        for factor, value in zip(FACTOR_FIELDS[1:], row[1:]):
+            grades.append(REFERENCE[factor](py2_value(value)))
+        return grades
+
+    def test_grade_matrix(self):
+        grades = grade_matrix(np.array(self.rows, dtype=np.float64),
+                              BAREAREA_CODE)
+        for row, graded in zip(self.rows, grades.tolist()):
+            self.assertEqual(graded, self.reference_grades(row), str(row))
+
+    def test_priority_rankings(self):
+        scores = np.arange(0, 28)
+        for lowbreakpoint, mediumbreakpoint in ((10, 18), (18, 10), (9, 9)):
+            rankings = priority_rankings(scores, lowbreakpoint,
+                                         mediumbreakpoint).tolist()
+            expected = [sdss_priority_calc(score, lowbreakpoint,
+                                           mediumbreakpoint)
+                        for score in scores]
+            self.assertEqual(rankings, expected)
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_scoring needs arcpy")
+class ScoreTableTest(unittest.TestCase):
+    """
+    The rows and field types of a TABLE mode score table.
+    """
+    def test_score_table_array(self):
+        oids = np.array([4, 9, 2], dtype=np.int64)
+        scores = np.array([12, 27, 0], dtype=np.int64)
+        rankings = priority_rankings(scores, 10, 18)
+        closeness = np.array([0.5, 1.0, 0.0])
+        output = score_table_array(oids, [('SCORE', scores),
+                                          ('RANKING', rankings),
+                                          ('CLOSENESS', closeness),
+                                          ('W_SLOPE', [3, 3, 3])])
+        self.assertEqual(output.dtype.names, ('DHA_OID', 'SCORE', 'RANKING',
+                                              'CLOSENESS', 'W_SLOPE'))
+        self.assertEqual(output['DHA_OID'].tolist(), [4, 9, 2])
+        self.assertEqual(output['SCORE'].tolist(), [12, 27, 0])
+        self.assertEqual(output['RANKING'].tolist(),
+                         ['Medium', 'High', 'Low'])
+        self.assertEqual(output['CLOSENESS'].tolist(), [0.5, 1.0, 0.0])
+        for name in ('DHA_OID', 'SCORE', 'W_SLOPE'):
+            self.assertEqual(output.dtype[name], np.dtype(np.int32))
+        self.assertEqual(output.dtype['RANKING'], np.dtype('U50'))
+        self.assertEqual(output.dtype['CLOSENESS'], np.dtype(np.float64))
+
+    def test_empty_table(self):
+        output = score_table_array(np.zeros(0, dtype=np.int64),
+                                   [('SCORE', np.zeros(0, dtype=np.int64))],
+                                   'SOURCE_OID')
+        self.assertEqual(output.dtype.names, ('SOURCE_OID', 'SCORE'))
+        self.assertEqual(len(output), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+#------------------------------------------------------------------------------
+# Name:        test_mcda_neighbours
+# Purpose:     Tests of the stored neighbour tables
+#
+# Author:      Arie Claassens
+#
+# Created:     17-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Checks the counts of a neighbour table against counting every distance and
+that a table round-trips through its file. mcda_neighbours imports arcpy, so
+the tests are skipped without it.
+Run with: python -m unittest test_mcda_neighbours
+"""
+
+#Import libraries
+import shutil
+import tempfile
+import unittest
+import numpy as np
+try:
+    from mcda_neighbours import (NeighbourTable, neighbour_path,
+                                 save_neighbours, load_neighbours,
+                                 neighbour_counts)
+    HAVE_ARCPY = True
+except ImportError:
+    HAVE_ARCPY = False
+
+# Functions and classes
+def random_table(randomstate, count, maxradius):
+    """
+    Return a NeighbourTable of count hazard areas with up to 30 random
+    distances each, some of them repeated, and the unsorted rows.
+    """
+    oids = np.sort(randomstate.choice(np.arange(1, 10 * count), count,
+                                      replace=False))
+    rows = []
+    for _ in range(count):
+        distances = np.round(randomstate.uniform(
+            0, maxradius, randomstate.randint(0, 30)), -1)
+        rows.append(distances)
+    indptr = np.concatenate(([0], np.cumsum([len(row) for row in rows])))
+    flat = (np.concatenate([np.sort(row) for row in rows]) if rows
+            else np.zeros(0))
+    return NeighbourTable(oids, indptr, flat, maxradius, 'inputs'), rows
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_neighbours needs arcpy")
+class NeighbourTableTest(unittest.TestCase):
+    """
+    The counts of a neighbour table and its file.
+    """
+    def setUp(self):
+        self.randomstate = np.random.RandomState(17)
+        self.table, self.rows = random_table(self.randomstate, 200, 5000.0)
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_counts_within(self):
+        # Distances on the stored values count the features at them
+        for distance in (0, 10, 1234.5, 2500, 4990, 5000):
+            expected = [int((row <= distance).sum()) for row in self.rows]
+            self.assertEqual(self.table.counts_within(distance).tolist(),
+                             expected)
+            picked = self.randomstate.permutation(len(self.rows))[:50]
+            self.assertEqual(
+                self.table.counts_within(distance,
+                                         self.table.oids[picked]).tolist(),
+                [expected[row] for row in picked.tolist()])
+
+    def test_counts_within_errors(self):
+        self.assertRaises(ValueError, self.table.counts_within, 5000.5)
+        missing = np.setdiff1d(np.arange(1, 2001), self.table.oids)[:1]
+        self.assertRaises(ValueError, self.table.counts_within, 100,
+                          np.concatenate((self.table.oids[:3], missing)))
+        empty = NeighbourTable([], [0], [], 100.0)
+        self.assertEqual(len(empty.counts_within(50)), 0)
+        self.assertRaises(ValueError, empty.counts_within, 50, [1])
+
+    def test_round_trip(self):
+        path = neighbour_path(self.folder, 'C:/Data/MCDA.gdb/DHA', 'POI')
+        self.assertNotEqual(path, neighbour_path(
+            self.folder, 'C:/Data/MCDA.gdb/DHA', 'RIVERS'))
+        self.assertIsNone(load_neighbours(path))
+        save_neighbours(path, self.table)
+        table = load_neighbours(path)
+        self.assertEqual(len(table), len(self.table))
+        self.assertEqual(table.oids.tolist(), self.table.oids.tolist())
+        self.assertEqual(table.indptr.tolist(), self.table.indptr.tolist())
+        self.assertEqual(table.distances.tolist(),
+                         self.table.distances.tolist())
+        self.assertEqual(table.maxradius, 5000.0)
+        self.assertEqual(table.fingerprint, 'inputs')
+        self.assertEqual(table.counts_within(2500).tolist(),
+                         self.table.counts_within(2500).tolist())
+
+    def test_unreadable_table(self):
+        path = neighbour_path(self.folder, 'DHA', 'POI')
+        with open(path, 'wb') as damaged:
+            damaged.write(b'not a table')
+        self.assertIsNone(load_neighbours(path))
+
+    def test_unknown_check(self):
+        self.assertRaises(ValueError, neighbour_counts, self.folder, 'DHA',
+                          'POI', [], 100, check='SOMETIMES')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+#------------------------------------------------------------------------------
+# Name:        test_mcda_quadtree
+# Purpose:     Brute-force tests of the aggregate quadtree
+#
+# Author:      Arie Claassens
+#
+# Created:     17-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Checks the counts and sums of the aggregate quadtree against testing every
+point, on clustered points, duplicate points and polygons with holes.
+mcda_quadtree imports arcpy, so the tests are skipped without it.
+Run with: python -m unittest test_mcda_quadtree
+"""
+
+#Import libraries
+import unittest
+import numpy as np
+try:
+    from mcda_spatial import points_in_rings
+    from mcda_quadtree import AggregateQuadtree
+    HAVE_ARCPY = True
+except ImportError:
+    HAVE_ARCPY = False
+
+# Functions and classes
+def inside_rings(x, y, rings):
+    """
+    Return True if the point lies inside the rings by the even-odd rule,
+    counting the ring edges crossed by a ray to the right of the point.
+    """
+    inside = False
+    for ring in rings:
+        count = len(ring)
+        for position in range(count):
+            x1, y1 = ring[position]
+            x2, y2 = ring[(position + 1) % count]
+            if (y1 > y) != (y2 > y):
+                if x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                    inside = not inside
+    return inside
+
+def random_box(randomstate, low, high):
+    """
+    Return a random (xmin, ymin, xmax, ymax) box inside low..high.
+    """
+    x, y = randomstate.uniform(low, high, 2)
+    width, height = randomstate.uniform(0, (high - low) / 4.0, 2)
+    return (x, y, x + width, y + height)
+
+def star_ring(randomstate, centrex, centrey, radius, vertices):
+    """
+    Return a random star-shaped ring, which is concave and may have edges
+    that run horizontally.
+    """
+    angles = np.sort(randomstate.uniform(0, 2 * np.pi, vertices))
+    radii = radius * randomstate.uniform(0.3, 1.0, vertices)
+    ring = np.column_stack((centrex + radii * np.cos(angles),
+                            centrey + radii * np.sin(angles)))
+    ring[1, 1] = ring[0, 1]
+    return ring
+
+def clustered_points(randomstate, count):
+    """
+    Return points in dense clusters, a uniform background and a stack of
+    duplicates, the cases that drive a tree to its maximum depth.
+    """
+    centres = randomstate.uniform(0, 100, (5, 2))
+    clusters = (centres[randomstate.randint(0, 5, count // 2)] +
+                randomstate.normal(0, 1.0, (count // 2, 2)))
+    background = randomstate.uniform(-10, 110, (count - count // 2 - 50, 2))
+    duplicates = np.repeat([[50.5, 50.5]], 50, axis=0)
+    points = np.vstack((clusters, background, duplicates))
+    return points[:, 0], points[:, 1]
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_quadtree needs arcpy")
+class AggregateQuadtreeTest(unittest.TestCase):
+    """
+    The quadtree counts and sums against testing every point.
+    """
+    @classmethod
+    def setUpClass(cls):
+        randomstate = np.random.RandomState(9)
+        cls.xs, cls.ys = clustered_points(randomstate, 2000)
+        cls.values = randomstate.randint(0, 500, len(cls.xs)).astype(float)
+        cls.polygons = []
+        for _ in range(30):
+            centre = randomstate.uniform(0, 100, 2)
+            radius = randomstate.uniform(1, 40)
+            rings = [star_ring(randomstate, centre[0], centre[1], radius,
+                               randomstate.randint(3, 30))]
+            if randomstate.rand() < 0.3:
+                # A hole, whose points are outside by the even-odd rule
+                rings.append(star_ring(randomstate, centre[0], centre[1],
+                                       radius / 4.0, 6))
+            cls.polygons.append(rings)
+        # A polygon around the stack of duplicate points
+        cls.polygons.append([np.array([[50.0, 50.0], [51.0, 50.0],
+                                       [51.0, 51.0], [50.0, 51.0]])])
+        cls.inside = [np.array([inside_rings(x, y, rings)
+                                for x, y in zip(cls.xs, cls.ys)])
+                      for rings in cls.polygons]
+
+    def brute_force(self, position, box=None):
+        """
+        Return the count and value sum of the points inside polygon
+        position, and strictly inside box if one is given.
+        """
+        found = self.inside[position]
+        if box is not None:
+            found = found & ((self.xs > box[0]) & (self.xs < box[2]) &
+                             (self.ys > box[1]) & (self.ys < box[3]))
+        return int(found.sum()), float(self.values[found].sum())
+
+    def test_query(self):
+        for leafsize in (1, 32):
+            tree = AggregateQuadtree(self.xs, self.ys, self.values,
+                                     leafsize=leafsize)
+            self.assertEqual(len(tree), len(self.xs))
+            for position, rings in enumerate(self.polygons):
+                count, total = tree.query(rings)
+                expected = self.brute_force(position)
+                self.assertEqual(count, expected[0])
+                self.assertAlmostEqual(total, expected[1], places=6)
+
+    def test_query_box(self):
+        randomstate = np.random.RandomState(10)
+        tree = AggregateQuadtree(self.xs, self.ys, self.values, leafsize=8)
+        for position, rings in enumerate(self.polygons):
+            box = random_box(randomstate, 0, 100)
+            count, total = tree.query(rings, box)
+            expected = self.brute_force(position, box)
+            self.assertEqual(count, expected[0])
+            self.assertAlmostEqual(total, expected[1], places=6)
+
+    def test_counts_and_points_in_rings(self):
+        # Without values the sums are counts, as points_in_rings finds them
+        tree = AggregateQuadtree(self.xs, self.ys, maxdepth=4)
+        for rings in self.polygons:
+            count, total = tree.query(rings)
+            self.assertEqual(count, int(points_in_rings(self.xs, self.ys,
+                                                        rings).sum()))
+            self.assertEqual(total, count)
+
+    def test_empty(self):
+        tree = AggregateQuadtree(np.zeros(0), np.zeros(0))
+        self.assertEqual(tree.query(self.polygons[0]), (0, 0.0))
+        tree = AggregateQuadtree(self.xs, self.ys)
+        self.assertEqual(tree.query([]), (0, 0.0))
+
+if __name__ == '__main__':
+    unittest.main()
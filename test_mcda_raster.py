@@ -0,0 +1,409 @@
+#------------------------------------------------------------------------------
+# Name:        test_mcda_raster
+# Purpose:     Tests of the windowed raster reads and polygon masks
+#
+# Author:      Arie Claassens
+#
+# Created:     17-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Checks the ring rasterizer against testing every cell centre, and the
+polygon sums, tiled cell samples and zonal statistics against reading every
+cell of a raster held in memory, along with the aspect and land cover zonal
+statistics themselves. mcda_raster imports arcpy, so the tests are skipped
+without it.
+Run with: python -m unittest test_mcda_raster
+"""
+
+#Import libraries
+import unittest
+import numpy as np
+try:
+    from mcda_raster import (RasterGrid, rasterize_rings, polygon_sum,
+                             sample_points, sample_cells, sample_grids,
+                             grid_statistics, circular_mean_aspect,
+                             majority, bare_area_majority,
+                             bare_area_statistic)
+    HAVE_ARCPY = True
+except ImportError:
+    HAVE_ARCPY = False
+    RasterGrid = object
+
+# Functions and classes
+def inside_rings(x, y, rings):
+    """
+    Return True if the point lies inside the rings by the even-odd rule,
+    counting the ring edges crossed by a ray to the right of the point.
+    """
+    inside = False
+    for ring in rings:
+        count = len(ring)
+        for position in range(count):
+            x1, y1 = ring[position]
+            x2, y2 = ring[(position + 1) % count]
+            if (y1 > y) != (y2 > y):
+                if x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                    inside = not inside
+    return inside
+
+def star_ring(randomstate, centrex, centrey, radius, vertices):
+    """
+    Return a random star-shaped ring, which is concave and may have edges
+    that run horizontally.
+    """
+    angles = np.sort(randomstate.uniform(0, 2 * np.pi, vertices))
+    radii = radius * randomstate.uniform(0.3, 1.0, vertices)
+    ring = np.column_stack((centrex + radii * np.cos(angles),
+                            centrey + radii * np.sin(angles)))
+    ring[1, 1] = ring[0, 1]
+    return ring
+
+class Named(object):
+    """
+    Spatial reference with the name of an arcpy SpatialReference.
+    """
+    def __init__(self, name):
+        self.name = name
+
+class Vertex(object):
+    """
+    Vertex of a Polygon, with the X and Y of an arcpy Point.
+    """
+    def __init__(self, x, y):
+        self.X = x
+        self.Y = y
+
+class Extent(object):
+    """
+    Envelope with the bounds of an arcpy Extent.
+    """
+    def __init__(self, xs, ys):
+        self.XMin = min(xs)
+        self.YMin = min(ys)
+        self.XMax = max(xs)
+        self.YMax = max(ys)
+
+class Polygon(object):
+    """
+    Polygon of rings that iterates over its single part like an arcpy
+    geometry, None separating the rings.
+    """
+    def __init__(self, rings, label=None, spatialreference='Grid'):
+        self.type = 'polygon'
+        self.part = []
+        for ring in rings:
+            if self.part:
+                self.part.append(None)
+            self.part.extend(Vertex(x, y) for x, y in ring.tolist())
+        points = np.vstack(rings)
+        self.extent = Extent(points[:, 0], points[:, 1])
+        if label is None:
+            label = points[0]
+        self.labelPoint = Vertex(*label)
+        self.spatialReference = Named(spatialreference)
+
+    def __iter__(self):
+        return iter([self.part])
+
+class Progress(object):
+    """
+    Counts the updates of a progress bar.
+    """
+    def __init__(self):
+        self.count = 0
+
+    def update(self):
+        self.count += 1
+
+class ArrayGrid(RasterGrid):
+    """
+    RasterGrid over an array of cell values held in memory, NaN marking
+    NoData, that records the windows read.
+    """
+    def __init__(self, values, xmin, ymax, cellsize, nodata=None):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.raster = 'memory'
+        self.xmin = xmin
+        self.ymax = ymax
+        self.cellwidth = cellsize
+        self.cellheight = cellsize
+        self.rows, self.columns = self.values.shape
+        self.spatialreference = Named('Grid')
+        self.nodata = nodata
+        self.floating = nodata is None
+        self.reads = []
+        self.mapped = 0
+
+    def cells(self, xs, ys):
+        self.mapped += 1
+        return RasterGrid.cells(self, xs, ys)
+
+    def read(self, window, nodata=0):
+        row0, row1, col0, col1 = window
+        self.reads.append(window)
+        values = self.values[row0:row1, col0:col1].copy()
+        values[np.isnan(values)] = nodata
+        return values
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_raster needs arcpy")
+class RasterizeRingsTest(unittest.TestCase):
+    """
+    The rasterized rings against testing every cell centre.
+    """
+    def test_rasterize_rings(self):
+        randomstate = np.random.RandomState(11)
+        # Raster rows run from north to south
+        xs = np.arange(0.5, 60)
+        ys = np.arange(39.5, 0, -1)
+        for _ in range(30):
+            centre = randomstate.uniform(10, 50, 2)
+            rings = [star_ring(randomstate, centre[0], centre[1],
+                               randomstate.uniform(2, 30),
+                               randomstate.randint(3, 25))]
+            if randomstate.rand() < 0.5:
+                rings.append(star_ring(randomstate, centre[0], centre[1],
+                                       2.0, 5))
+            # Vertices on the cell centres, where the rules must agree
+            if randomstate.rand() < 0.5:
+                rings = [np.round(ring - 0.5) + 0.5 for ring in rings]
+            mask = rasterize_rings(rings, xs, ys)
+            expected = [[inside_rings(x, y, rings) for x in xs] for y in ys]
+            self.assertEqual(mask.tolist(), expected)
+
+    def test_outside(self):
+        xs = np.arange(0.5, 10)
+        ys = np.arange(9.5, 0, -1)
+        ring = np.array([[20.0, 20.0], [30.0, 20.0], [30.0, 30.0]])
+        self.assertFalse(rasterize_rings([ring], xs, ys).any())
+        self.assertFalse(rasterize_rings([], xs, ys).any())
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_raster needs arcpy")
+class PolygonSumTest(unittest.TestCase):
+    """
+    The polygon sums against summing every cell centre inside the polygon.
+    """
+    def setUp(self):
+        randomstate = np.random.RandomState(12)
+        self.values = randomstate.randint(0, 100, (50, 80)).astype(float)
+        self.values[randomstate.rand(50, 80) < 0.1] = np.nan
+        # Cells of 2 units with the raster corner at 100, 300
+        self.grid = ArrayGrid(self.values, 100.0, 300.0, 2.0)
+        xs, ys = self.grid.centres((0, 50, 0, 80))
+        self.xs, self.ys = np.meshgrid(xs, ys)
+        self.randomstate = randomstate
+
+    def brute_force(self, rings):
+        """
+        Return the sum of the cells whose centres lie inside the rings, with
+        NoData cells as zero.
+        """
+        total = 0.0
+        for x, y, value in zip(self.xs.ravel(), self.ys.ravel(),
+                               self.values.ravel()):
+            if not np.isnan(value) and inside_rings(x, y, rings):
+                total += value
+        return total
+
+    def test_polygon_sum(self):
+        for _ in range(20):
+            centre = self.randomstate.uniform(90, 270, 2)
+            centre[1] = self.randomstate.uniform(190, 310)
+            rings = [star_ring(self.randomstate, centre[0], centre[1],
+                               self.randomstate.uniform(1, 40),
+                               self.randomstate.randint(3, 20))]
+            self.grid.reads = []
+            self.assertAlmostEqual(polygon_sum(Polygon(rings), self.grid),
+                                   self.brute_force(rings), places=6)
+            # Only the window under the polygon is read
+            for window in self.grid.reads:
+                self.assertTrue(window[1] - window[0] <= 41)
+                self.assertTrue(window[3] - window[2] <= 41)
+
+    def test_outside(self):
+        ring = np.array([[0.0, 0.0], [50.0, 0.0], [50.0, 50.0]])
+        self.assertEqual(polygon_sum(Polygon([ring]), self.grid), 0.0)
+        self.assertEqual(self.grid.reads, [])
+
+    def test_window(self):
+        self.assertEqual(self.grid.window((101.0, 297.0, 104.5, 299.0)),
+                         (0, 2, 0, 3))
+        # Clipped to the raster, and None outside it
+        self.assertEqual(self.grid.window((0.0, 0.0, 1000.0, 1000.0)),
+                         (0, 50, 0, 80))
+        self.assertIsNone(self.grid.window((0.0, 0.0, 50.0, 50.0)))
+        xs, ys = self.grid.centres((1, 3, 2, 4))
+        self.assertEqual(xs.tolist(), [105.0, 107.0])
+        self.assertEqual(ys.tolist(), [297.0, 295.0])
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_raster needs arcpy")
+class SampleCellsTest(unittest.TestCase):
+    """
+    The tiled cell samples against indexing every cell.
+    """
+    def setUp(self):
+        randomstate = np.random.RandomState(14)
+        self.values = randomstate.randint(1, 100, (70, 90)).astype(float)
+        self.values[randomstate.rand(70, 90) < 0.1] = np.nan
+        self.xs = randomstate.uniform(-20, 200, 3000)
+        self.ys = randomstate.uniform(-20, 160, 3000)
+        self.xs[:10] = np.nan
+
+    def expected(self, default):
+        """
+        Return the values of the cells under the points by indexing the
+        whole raster, with default outside it and on NoData cells.
+        """
+        values = []
+        for x, y in zip(self.xs, self.ys):
+            col = np.floor(x / 2.0)
+            row = np.floor((140.0 - y) / 2.0)
+            if not (0 <= row < 70 and 0 <= col < 90):
+                values.append(default)
+                continue
+            value = self.values[int(row), int(col)]
+            values.append(default if np.isnan(value) else value)
+        return values
+
+    def test_sample_points(self):
+        for tilesize in (7, 32, 1024):
+            grid = ArrayGrid(self.values, 0.0, 140.0, 2.0)
+            values = sample_points(grid, self.xs, self.ys, -1, tilesize)
+            self.assertEqual(values.tolist(), self.expected(-1))
+            # Each tile is read at most once
+            self.assertTrue(len(grid.reads) <=
+                            (70 // tilesize + 1) * (90 // tilesize + 1))
+
+    def test_integer_nodata(self):
+        # An integer raster marks NoData with its NoData value
+        grid = ArrayGrid(self.values, 0.0, 140.0, 2.0, nodata=-9999)
+        self.assertEqual(sample_points(grid, self.xs, self.ys, 0, 16)
+                         .tolist(), self.expected(0))
+
+    def test_cells(self):
+        grid = ArrayGrid(self.values, 0.0, 140.0, 2.0)
+        rows, cols = grid.cells([1.0, 179.9, 180.0, -0.1, np.nan, 5.0],
+                                [139.0, 0.1, 50.0, 50.0, 50.0, 140.0])
+        self.assertEqual(rows.tolist(), [0, 69, -1, -1, -1, 0])
+        self.assertEqual(cols.tolist(), [0, 89, -1, -1, -1, 2])
+
+    def test_nothing_found(self):
+        grid = ArrayGrid(self.values, 0.0, 140.0, 2.0)
+        rows = np.array([-1, -1], dtype=np.int64)
+        self.assertEqual(sample_cells(grid, rows, rows, 3.5).tolist(),
+                         [3.5, 3.5])
+        self.assertEqual(len(sample_cells(grid, rows[:0], rows[:0], 0)), 0)
+        self.assertEqual(grid.reads, [])
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_raster needs arcpy")
+class SampleGridsTest(unittest.TestCase):
+    """
+    Several rasters sampled at once against sampling each alone.
+    """
+    def test_sample_grids(self):
+        randomstate = np.random.RandomState(15)
+        xs = randomstate.uniform(-10, 110, 500)
+        ys = randomstate.uniform(-10, 110, 500)
+        slope = randomstate.uniform(0, 45, (50, 50))
+        aspect = randomstate.uniform(0, 360, (50, 50))
+        aspect[randomstate.rand(50, 50) < 0.2] = np.nan
+        landcover = randomstate.randint(1, 12, (25, 25)).astype(float)
+        grids = [(ArrayGrid(slope, 0.0, 100.0, 2.0), 'SLOPE', 0.0),
+                 (ArrayGrid(aspect, 0.0, 100.0, 2.0), 'ASPECT', -1.0),
+                 (ArrayGrid(landcover, 0.0, 100.0, 4.0, nodata=0),
+                  'LANDCOVER', 0)]
+        values = sample_grids(grids, xs, ys, tilesize=16)
+        self.assertEqual(sorted(values), ['ASPECT', 'LANDCOVER', 'SLOPE'])
+        for grid, field, default in grids:
+            alone = ArrayGrid(grid.values, grid.xmin, grid.ymax,
+                              grid.cellwidth, grid.nodata)
+            self.assertEqual(values[field].tolist(),
+                             sample_points(alone, xs, ys, default).tolist())
+        # The slope and aspect rasters share a cell layout
+        self.assertEqual([grid.mapped for grid, _, _ in grids], [1, 0, 1])
+        self.assertEqual(sample_grids([], xs, ys), {})
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_raster needs arcpy")
+class ZonalStatisticsTest(unittest.TestCase):
+    """
+    The zonal statistics of the aspect, land cover and slope modes.
+    """
+    def test_circular_mean_aspect(self):
+        self.assertAlmostEqual(circular_mean_aspect(np.array([350.0, 10.0])),
+                               0.0)
+        self.assertAlmostEqual(circular_mean_aspect(np.array([80.0, 100.0,
+                                                              -1.0])), 90.0)
+        self.assertAlmostEqual(circular_mean_aspect(np.array([340.0,
+                                                              350.0])),
+                               345.0)
+        # Flat cells alone, or directions that cancel out, are flat
+        self.assertEqual(circular_mean_aspect(np.array([-1.0, -1.0])), -1.0)
+        self.assertEqual(circular_mean_aspect(np.array([90.0, 270.0])), -1.0)
+        self.assertEqual(circular_mean_aspect(np.zeros(0)), -1.0)
+        # A north-facing mean just below 360 degrees rounds to north
+        self.assertEqual(circular_mean_aspect(np.array([359.9999999,
+                                                        0.0000001])), 0.0)
+
+    def test_majority(self):
+        self.assertEqual(majority(np.array([3, 5, 5, 2, 3, 5])), 5)
+        # The lowest class wins a tie
+        self.assertEqual(majority(np.array([9, 4, 9, 4])), 4)
+        self.assertEqual(majority(np.array([7.0])), 7.0)
+
+    def test_bare_area_majority(self):
+        values = np.array([7, 7, 2, 2, 3])
+        self.assertEqual(bare_area_majority(values, 7), 2)
+        self.assertEqual(bare_area_majority(values, 7, 0.4), 7)
+        self.assertEqual(bare_area_majority(np.array([7, 7, 3, 3]), 7), 7)
+        self.assertEqual(bare_area_majority(np.array([7, 7]), 7, 1.0), 7)
+        statistic = bare_area_statistic(7, 0.4)
+        self.assertEqual(statistic(values), 7)
+        self.assertEqual(bare_area_statistic(7)(values), 2)
+
+    def test_grid_statistics(self):
+        randomstate = np.random.RandomState(16)
+        values = randomstate.randint(1, 9, (60, 60)).astype(float)
+        values[randomstate.rand(60, 60) < 0.1] = np.nan
+        xs, ys = np.meshgrid(np.arange(0.5, 60), np.arange(59.5, 0, -1))
+        polygons = []
+        for oid in range(1, 41):
+            centre = randomstate.uniform(-5, 65, 2)
+            rings = [star_ring(randomstate, centre[0], centre[1],
+                               randomstate.uniform(0.3, 25),
+                               randomstate.randint(3, 15))]
+            polygons.append((oid, Polygon(rings)))
+        # A missing shape and a polygon off the raster keep the default
+        polygons.append((41, None))
+        polygons.append((42, Polygon([np.array([[80.0, 80.0], [90.0, 80.0],
+                                                [90.0, 90.0]])])))
+        # A sliver between the cell centres takes the cell under its label
+        polygons.append((43, Polygon([np.array([[10.1, 10.1], [10.4, 10.1],
+                                                [10.4, 10.4]])],
+                                     label=(10.3, 10.2))))
+        for tilesize in (8, 1024):
+            grid = ArrayGrid(values, 0.0, 60.0, 1.0)
+            progress = Progress()
+            found = grid_statistics(grid, polygons, np.max, -1.0, tilesize,
+                                    progress)
+            self.assertEqual(progress.count, len(polygons))
+            self.assertEqual(sorted(found), list(range(1, 44)))
+            for oid, geometry in polygons[:40]:
+                rings = [np.array([[vertex.X, vertex.Y]
+                                   for vertex in geometry.part])]
+                inside = np.array([[inside_rings(x, y, rings)
+                                    for x, y in zip(rowx, rowy)]
+                                   for rowx, rowy in zip(xs, ys)])
+                if not inside.any():
+                    continue
+                cells = values[inside & ~np.isnan(values)]
+                expected = cells.max() if len(cells) else -1.0
+                self.assertEqual(found[oid], expected, str(oid))
+            self.assertEqual(found[41], -1.0)
+            self.assertEqual(found[42], -1.0)
+            cell = values[49, 10]
+            self.assertEqual(found[43], -1.0 if np.isnan(cell) else cell)
+
+if __name__ == '__main__':
+    unittest.main()
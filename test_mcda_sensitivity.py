@@ -0,0 +1,178 @@
+#------------------------------------------------------------------------------
+# Name:        test_mcda_sensitivity
+# Purpose:     Tests of the ranking of distinct grade rows and the weight sweep
+#
+# Author:      Arie Claassens
+#
+# Created:     17-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Checks the ranking of distinct grade rows, the weighted RANKING classes and
+the weight sensitivity sweep against ranking and classifying every feature
+under every weight vector. The modules import arcpy, so the tests are
+skipped without it. Run with: python -m unittest test_mcda_sensitivity
+"""
+
+#Import libraries
+import os
+import shutil
+import tempfile
+import unittest
+from fractions import Fraction
+import numpy as np
+try:
+    from mcda_scoring import (unique_grade_rows, competition_ranks,
+                              weighted_ranking_classes, priority_rankings,
+                              FACTOR_FIELDS)
+    from mcda_sensitivity import read_weight_vectors, sweep_weights
+    HAVE_ARCPY = True
+except ImportError:
+    HAVE_ARCPY = False
+
+# Functions and classes
+def random_grades(randomstate, count):
+    """
+    Return a count x 9 grade matrix with many repeated rows.
+    """
+    return randomstate.randint(0, 4, (count, 9)) * (
+        randomstate.rand(count, 9) < 0.6)
+
+def brute_force_ranks(scores):
+    """
+    Return the competition rank of each score, one more than the number of
+    strictly higher scores.
+    """
+    return np.array([1 + sum(1 for other in scores if other > score)
+                     for score in scores])
+
+def brute_force_class(weightedscore, weights, lowbreakpoint,
+                      mediumbreakpoint):
+    """
+    Return the RANKING class (0 = Low, 1 = Medium, 2 = High) of a weighted
+    score rescaled by the mean weight, in exact fractions.
+    """
+    scaled = Fraction(int(weightedscore) * len(weights), int(sum(weights)))
+    if scaled < lowbreakpoint:
+        return 0
+    if scaled < mediumbreakpoint:
+        return 1
+    return 2
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_scoring needs arcpy")
+class RankingTest(unittest.TestCase):
+    """
+    Ranking distinct grade rows against ranking every feature.
+    """
+    def test_unique_grade_rows(self):
+        grades = random_grades(np.random.RandomState(12), 3000)
+        uniquerows, inverse, counts = unique_grade_rows(grades)
+        self.assertEqual(uniquerows[inverse].tolist(), grades.tolist())
+        self.assertEqual(len(set(map(tuple, uniquerows.tolist()))),
+                         len(uniquerows))
+        self.assertEqual(counts.tolist(),
+                         np.bincount(inverse).tolist())
+
+    def test_competition_ranks(self):
+        randomstate = np.random.RandomState(13)
+        scores = randomstate.randint(0, 20, 500)
+        self.assertEqual(competition_ranks(scores).tolist(),
+                         brute_force_ranks(scores).tolist())
+        # Ranking distinct rows with their counts ranks every feature
+        grades = random_grades(randomstate, 2000)
+        weights = randomstate.randint(1, 10, 9)
+        uniquerows, inverse, counts = unique_grade_rows(grades)
+        ranks = competition_ranks(np.dot(uniquerows, weights), counts)
+        self.assertEqual(ranks[inverse].tolist(),
+                         brute_force_ranks(np.dot(grades,
+                                                  weights)).tolist())
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_scoring needs arcpy")
+class RankingClassesTest(unittest.TestCase):
+    """
+    The weighted RANKING classes against classifying every score.
+    """
+    def test_weighted_ranking_classes(self):
+        randomstate = np.random.RandomState(21)
+        grades = random_grades(randomstate, 500)
+        for _ in range(20):
+            weights = randomstate.randint(0, 10, 9)
+            weights[0] += 1
+            scores = np.dot(grades, weights)
+            for lowbreakpoint, mediumbreakpoint in ((10, 18), (18, 10),
+                                                    (7, 7)):
+                classes = weighted_ranking_classes(scores, weights,
+                                                   lowbreakpoint,
+                                                   mediumbreakpoint)
+                expected = [brute_force_class(score, weights, lowbreakpoint,
+                                              mediumbreakpoint)
+                            for score in scores]
+                self.assertEqual(classes.tolist(), expected)
+
+    def test_equal_weights(self):
+        # Equal weights reproduce the RANKING of the unweighted score
+        grades = random_grades(np.random.RandomState(22), 500)
+        scores = grades.sum(axis=1)
+        for weight in (1, 3):
+            weights = np.repeat(weight, len(FACTOR_FIELDS))
+            for lowbreakpoint, mediumbreakpoint in ((10, 18), (18, 10)):
+                classes = weighted_ranking_classes(np.dot(grades, weights),
+                                                   weights, lowbreakpoint,
+                                                   mediumbreakpoint)
+                expected = priority_rankings(scores, lowbreakpoint,
+                                             mediumbreakpoint)
+                names = np.array(["Low", "Medium", "High"])[classes]
+                self.assertEqual(names.tolist(), expected.tolist())
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_sensitivity needs arcpy")
+class SweepWeightsTest(unittest.TestCase):
+    """
+    The weight sweep against ranking every feature under every vector.
+    """
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_sweep_weights(self):
+        randomstate = np.random.RandomState(23)
+        grades = random_grades(randomstate, 300)
+        vectors = randomstate.randint(1, 10, (25, 9))
+        columns = dict(sweep_weights(grades, vectors, 10, 18, chunksize=7))
+        ranks = np.column_stack([brute_force_ranks(np.dot(grades, vector))
+                                 for vector in vectors])
+        self.assertEqual(columns['MINRANK'].tolist(),
+                         ranks.min(axis=1).tolist())
+        self.assertEqual(columns['MAXRANK'].tolist(),
+                         ranks.max(axis=1).tolist())
+        self.assertEqual(columns['RANKSPREAD'].tolist(),
+                         (ranks.max(axis=1) - ranks.min(axis=1)).tolist())
+        np.testing.assert_allclose(columns['MEANRANK'], ranks.mean(axis=1))
+        classes = np.array([[brute_force_class(score, vector, 10, 18)
+                             for score in np.dot(grades, vector)]
+                            for vector in vectors]).T
+        for ranking, name in enumerate(['LOWPCT', 'MEDIUMPCT', 'HIGHPCT']):
+            np.testing.assert_allclose(
+                columns[name], (classes == ranking).mean(axis=1) * 100.0)
+
+    def test_read_weight_vectors(self):
+        # Columns named after the factor or its weight field, in any order
+        csvfile = os.path.join(self.folder, 'weights.csv')
+        header = [factor + 'WEIGHT' if position % 2 else factor.lower()
+                  for position, factor in enumerate(FACTOR_FIELDS)]
+        with open(csvfile, 'w') as target:
+            target.write(','.join(reversed(header)) + '\n')
+            target.write(','.join(str(value) for value in range(9, 0, -1)) +
+                         '\n')
+            target.write('\n')
+        vectors = read_weight_vectors(csvfile)
+        self.assertEqual(vectors.tolist(), [list(range(1, 10))])
+        with open(csvfile, 'w') as target:
+            target.write(','.join(header[1:]) + '\n')
+        self.assertRaises(ValueError, read_weight_vectors, csvfile)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,333 @@
+#------------------------------------------------------------------------------
+# Name:        test_mcda_spatial
+# Purpose:     Brute-force tests of the spatial indexes and proximity counts
+#
+# Author:      Arie Claassens
+#
+# Created:     17-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Checks the spatial indexes of mcda_spatial against brute-force searches over
+every box, point and segment, the candidate slices of a saturating count,
+the multi-factor counts on buffer sets with missing buffers and the tiled
+counts of a pool of workers against a serial count.
+mcda_spatial imports arcpy, so the tests are skipped without it.
+Run with: python -m unittest test_mcda_spatial
+"""
+
+#Import libraries
+import unittest
+import numpy as np
+try:
+    import arcpy
+    from mcda_spatial import (STRTree, GridPointIndex, SegmentIndex,
+                              SourceLayer, buffer_set_counts, kernel_counts,
+                              tiled_counts, count_slices)
+    HAVE_ARCPY = True
+except ImportError:
+    HAVE_ARCPY = False
+
+# Functions and classes
+class Vertex(object):
+    """
+    Vertex of a Shape, with the X and Y of an arcpy Point.
+    """
+    def __init__(self, x, y):
+        self.X = x
+        self.Y = y
+
+class Shape(object):
+    """
+    Polyline or polygon that iterates over its parts like an arcpy geometry,
+    None separating the rings of a part.
+    """
+    def __init__(self, geometrytype, parts):
+        self.type = geometrytype
+        self.parts = [[None if vertex is None else Vertex(*vertex)
+                       for vertex in part] for part in parts]
+
+    def __iter__(self):
+        return iter(self.parts)
+
+def overlapping(boxes, box):
+    """
+    Return the positions of the boxes that overlap box, edges included.
+    """
+    return [position for position, other in enumerate(boxes.tolist())
+            if other[0] <= box[2] and other[2] >= box[0] and
+            other[1] <= box[3] and other[3] >= box[1]]
+
+def random_box(randomstate, low, high):
+    """
+    Return a random (xmin, ymin, xmax, ymax) box inside low..high.
+    """
+    x, y = randomstate.uniform(low, high, 2)
+    width, height = randomstate.uniform(0, (high - low) / 4.0, 2)
+    return (x, y, x + width, y + height)
+
+def clustered_points(randomstate, count):
+    """
+    Return points in dense clusters, a uniform background and a stack of
+    duplicates, the cases that drive a tree to its maximum depth.
+    """
+    centres = randomstate.uniform(0, 100, (5, 2))
+    clusters = (centres[randomstate.randint(0, 5, count // 2)] +
+                randomstate.normal(0, 1.0, (count // 2, 2)))
+    background = randomstate.uniform(-10, 110, (count - count // 2 - 50, 2))
+    duplicates = np.repeat([[50.5, 50.5]], 50, axis=0)
+    points = np.vstack((clusters, background, duplicates))
+    return points[:, 0], points[:, 1]
+
+class SetSource(object):
+    """
+    Source layer whose buffers are sets of feature numbers, counting the
+    features of the layer in a buffer like SourceLayer.count_within.
+    """
+    def __init__(self, features):
+        self.features = set(features)
+        self.calls = 0
+
+    def count_within(self, buffergeometry, limit=None):
+        self.calls += 1
+        count = len(self.features & buffergeometry)
+        if limit is not None:
+            count = min(count, limit)
+        return count
+
+class Progress(object):
+    """
+    Progress reporter that adds up its updates.
+    """
+    def __init__(self):
+        self.count = 0
+
+    def update(self, count=1):
+        self.count += count
+
+def point_layer(name, xs, ys):
+    """
+    Return a point SourceLayer of the coordinates, built as the constructor
+    builds one from the rows of a feature class.
+    """
+    layer = SourceLayer.__new__(SourceLayer)
+    layer._build(name, 'Point', range(len(xs)), None,
+                 np.column_stack((xs, ys, xs, ys)))
+    return layer
+
+def square(x, y, size):
+    """
+    Return a square polygon in WGS 1984 with its lower left corner at x, y.
+    """
+    corners = [(x, y), (x + size, y), (x + size, y + size), (x, y + size),
+               (x, y)]
+    return arcpy.Polygon(arcpy.Array([arcpy.Point(*corner)
+                                      for corner in corners]),
+                         arcpy.SpatialReference(4326))
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_spatial needs arcpy")
+class STRTreeTest(unittest.TestCase):
+    """
+    The STR-tree queries against testing every box.
+    """
+    def test_query(self):
+        randomstate = np.random.RandomState(5)
+        for count, capacity in ((0, 16), (1, 16), (15, 4), (16, 16),
+                                (17, 16), (3000, 16), (3000, 4)):
+            corners = randomstate.uniform(0, 1000, (count, 2))
+            sizes = randomstate.exponential(10, (count, 2))
+            boxes = np.column_stack((corners, corners + sizes))
+            tree = STRTree(boxes, capacity)
+            self.assertEqual(len(tree), count)
+            for _ in range(100):
+                box = random_box(randomstate, -50, 1050)
+                self.assertEqual(tree.query(box).tolist(),
+                                 overlapping(boxes, box))
+
+    def test_degenerate_boxes(self):
+        # Point boxes and a query box that only touches them
+        points = np.array([[1.0, 1.0], [2.0, 2.0], [2.0, 2.0], [3.0, 1.0]])
+        tree = STRTree(np.column_stack((points, points)), 2)
+        self.assertEqual(tree.query((2.0, 2.0, 2.0, 2.0)).tolist(), [1, 2])
+        self.assertEqual(tree.query((0.0, 0.0, 1.0, 1.0)).tolist(), [0])
+        self.assertEqual(tree.query((4.0, 4.0, 5.0, 5.0)).tolist(), [])
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_spatial needs arcpy")
+class GridPointIndexTest(unittest.TestCase):
+    """
+    The grid point index queries against testing every point.
+    """
+    def check_queries(self, xs, ys, boxes):
+        """
+        Query the boxes and compare with the points found by brute force.
+        """
+        index = GridPointIndex(xs, ys)
+        self.assertEqual(len(index), len(xs))
+        for box in boxes:
+            expected = np.nonzero((xs >= box[0]) & (xs <= box[2]) &
+                                  (ys >= box[1]) & (ys <= box[3]))[0]
+            self.assertEqual(index.query(box).tolist(), expected.tolist())
+
+    def test_query(self):
+        randomstate = np.random.RandomState(6)
+        xs, ys = clustered_points(randomstate, 5000)
+        boxes = [random_box(randomstate, -20, 120) for _ in range(200)]
+        # Boxes on points, on the extent and beyond it
+        boxes += [(xs[0], ys[0], xs[0], ys[0]), (50.5, 50.5, 50.5, 50.5),
+                  (xs.min(), ys.min(), xs.max(), ys.max()),
+                  (-1000, -1000, -500, -500), (500, 500, 1000, 1000)]
+        self.check_queries(xs, ys, boxes)
+
+    def test_degenerate_extents(self):
+        randomstate = np.random.RandomState(7)
+        # Points on one vertical line, on a single spot and none at all
+        for xs, ys in ((np.repeat(3.0, 100), randomstate.uniform(0, 9, 100)),
+                       (np.repeat(3.0, 20), np.repeat(4.0, 20)),
+                       (np.zeros(0), np.zeros(0))):
+            boxes = [random_box(randomstate, -1, 10) for _ in range(50)]
+            boxes.append((3.0, 4.0, 3.0, 4.0))
+            self.check_queries(xs, ys, boxes)
+
+    def test_thin_extent(self):
+        # A road of points 1000 units long and a millionth of a unit wide
+        randomstate = np.random.RandomState(18)
+        xs = randomstate.uniform(0, 1000, 5000)
+        ys = randomstate.uniform(0, 1e-6, 5000)
+        for points in ((xs, ys), (ys, xs)):
+            index = GridPointIndex(*points)
+            self.assertTrue(len(index.offsets) <= 3 * (5000 // 8) + 2)
+            boxes = [random_box(randomstate, -10, 1010) for _ in range(50)]
+            boxes += [(100, 0, 200, 5e-7), (0, 100, 5e-7, 200)]
+            self.check_queries(points[0], points[1], boxes)
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_spatial needs arcpy")
+class SegmentIndexTest(unittest.TestCase):
+    """
+    The segment index queries against testing every segment.
+    """
+    def test_query(self):
+        randomstate = np.random.RandomState(8)
+        geometries = []
+        expected = []
+        for position in range(200):
+            parts = []
+            for _ in range(randomstate.randint(1, 3)):
+                start = randomstate.uniform(0, 1000, 2)
+                steps = randomstate.normal(0, 5, (randomstate.randint(2, 30),
+                                                  2))
+                vertices = start + np.cumsum(steps, axis=0)
+                parts.append([tuple(vertex) for vertex in vertices])
+                expected.extend((tuple(first) + tuple(second), position)
+                                for first, second in zip(vertices[:-1],
+                                                         vertices[1:]))
+            geometries.append(Shape('polyline', parts))
+        index = SegmentIndex(geometries)
+        self.assertEqual(len(index), len(expected))
+        self.assertEqual([tuple(row) for row in index.segments.tolist()],
+                         [row for row, _ in expected])
+        self.assertEqual(index.owners.tolist(),
+                         [owner for _, owner in expected])
+        segments = np.array([row for row, _ in expected])
+        boxes = np.column_stack((
+            np.minimum(segments[:, 0], segments[:, 2]),
+            np.minimum(segments[:, 1], segments[:, 3]),
+            np.maximum(segments[:, 0], segments[:, 2]),
+            np.maximum(segments[:, 1], segments[:, 3])))
+        for _ in range(200):
+            box = random_box(randomstate, -50, 1050)
+            self.assertEqual(index.query(box).tolist(),
+                             overlapping(boxes, box))
+
+    def test_polygon_rings(self):
+        # The interior ring of a polygon follows a None separator
+        polygon = Shape('polygon', [[
+            (0, 0), (4, 0), (4, 4), (0, 4), (0, 0), None,
+            (1, 1), (2, 1), (2, 2), (1, 1)]])
+        index = SegmentIndex([polygon])
+        self.assertEqual(len(index), 7)
+        self.assertEqual(index.query((1.5, 0.5, 2.5, 1.6)).tolist(),
+                         [4, 5, 6])
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_spatial needs arcpy")
+class CountSlicesTest(unittest.TestCase):
+    """
+    The candidate slices cover every candidate once.
+    """
+    def test_count_slices(self):
+        for count in (0, 1, 63, 64, 65, 1000, 5000):
+            for limit in (None, 3):
+                covered = []
+                for block in count_slices(count, limit):
+                    covered.extend(range(count)[block])
+                self.assertEqual(covered, list(range(count)))
+        self.assertEqual(count_slices(1000, None), [slice(0, 1000)])
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_spatial needs arcpy")
+class BufferSetCountsTest(unittest.TestCase):
+    """
+    The factor counts over buffer sets of several distances.
+    """
+    def test_missing_buffers(self):
+        # Hazard area 2 has no 500 m buffer and hazard area 4 no 0 m one
+        buffersets = {0.0: {1: set([1]), 2: set([1, 2]), 3: set()},
+                      500.0: {1: set([1, 2, 3]), 3: set([3]),
+                              4: set([2, 4])}}
+        roads = SetSource([1, 2, 3])
+        rivers = SetSource([2, 4])
+        factors = [('ROADS', [roads], 0), ('RIVERS', [rivers], 500),
+                   ('BOTH', [roads, rivers], 500.0)]
+        counts = buffer_set_counts(buffersets, factors)
+        self.assertEqual(counts, {'ROADS': {1: 1, 2: 2, 3: 0},
+                                  'RIVERS': {1: 1, 3: 0, 4: 2},
+                                  'BOTH': {1: 4, 3: 1, 4: 3}})
+
+    def test_limits(self):
+        buffersets = {100.0: {1: set([1, 2, 3]), 2: set([4])}}
+        first = SetSource([1, 2, 3])
+        second = SetSource([3, 4])
+        counts = buffer_set_counts(
+            buffersets, [('POI', [first, second], 100)], limits={'POI': 3})
+        self.assertEqual(counts, {'POI': {1: 3, 2: 1}})
+        # The limit was reached in the first layer of hazard area 1
+        self.assertEqual(second.calls, 1)
+        self.assertEqual(buffer_set_counts({}, []), {})
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_spatial needs arcpy")
+class TiledCountsTest(unittest.TestCase):
+    """
+    The tiled counts of several workers against a serial count.
+    """
+    def test_tiled_counts(self):
+        randomstate = np.random.RandomState(13)
+        # Hazard areas with Object IDs that do not start at one
+        hazards = {}
+        for oid in range(3, 603, 3):
+            corner = randomstate.uniform((20.0, -30.0), (22.0, -28.0))
+            hazards[oid] = square(corner[0], corner[1], 0.01)
+        sources = [point_layer('Source' + str(number),
+                               randomstate.uniform(19.9, 22.1, 2000),
+                               randomstate.uniform(-30.1, -27.9, 2000))
+                   for number in range(2)]
+        for distance, limit in ((500, None), (3000, None), (3000, 3)):
+            expected = kernel_counts(hazards, sources, distance,
+                                     limit=limit)
+            self.assertTrue(expected[1].any())
+            for workers in (1, 3):
+                progress = Progress()
+                oids, counts = tiled_counts(hazards, sources, distance, True,
+                                            workers, progress, limit)
+                self.assertEqual(oids.tolist(), expected[0].tolist())
+                self.assertEqual(counts.tolist(), expected[1].tolist())
+                self.assertEqual(progress.count,
+                                 len(hazards) * len(sources))
+
+    def test_no_hazards(self):
+        oids, counts = tiled_counts({}, [point_layer('Source', [20.0],
+                                                     [-29.0])],
+                                    500, True, 2)
+        self.assertEqual((len(oids), len(counts)), (0, 0))
+
+if __name__ == '__main__':
+    unittest.main()
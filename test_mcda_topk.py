@@ -0,0 +1,54 @@
+#------------------------------------------------------------------------------
+# Name:        test_mcda_topk
+# Purpose:     Tests of the top-k selection
+#
+# Author:      Arie Claassens
+#
+# Created:     17-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Checks the streaming and array top-k selection against sorting every row.
+mcda_topk imports arcpy, so the tests are skipped without it.
+Run with: python -m unittest test_mcda_topk
+"""
+
+#Import libraries
+import unittest
+import numpy as np
+try:
+    from mcda_topk import top_k_stream, top_k_array
+    HAVE_ARCPY = True
+except ImportError:
+    HAVE_ARCPY = False
+
+# Functions and classes
+@unittest.skipUnless(HAVE_ARCPY, "mcda_topk needs arcpy")
+class TopKTest(unittest.TestCase):
+    """
+    The top-k selection against sorting every row.
+    """
+    def test_top_k(self):
+        randomstate = np.random.RandomState(15)
+        ids = randomstate.permutation(1000) + 1
+        scores = randomstate.randint(0, 30, 1000)
+        rows = [(int(oid), int(score), 'High') for oid, score
+                in zip(ids, scores)]
+        expected = sorted(rows, key=lambda row: (-row[1], row[0]))
+        for k in (0, 1, 5, 37, 999, 1000, 1500):
+            self.assertEqual(top_k_stream(iter(rows), k), expected[:k])
+            positions = top_k_array(ids, scores, k)
+            self.assertEqual([rows[position] for position in positions],
+                             expected[:k])
+
+    def test_null_scores(self):
+        rows = [(1, None, 'Low'), (2, 5, 'Low'), (3, None, 'Low'),
+                (4, 5, 'Low'), (5, 1, 'Low')]
+        self.assertEqual([row[0] for row in top_k_stream(rows, 2)], [2, 4])
+        self.assertEqual([row[0] for row in top_k_stream(rows, 9)],
+                         [2, 4, 5])
+
+if __name__ == '__main__':
+    unittest.main()
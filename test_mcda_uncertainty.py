@@ -0,0 +1,194 @@
+#------------------------------------------------------------------------------
+# Name:        test_mcda_uncertainty
+# Purpose:     Tests of the Monte Carlo weight uncertainty analysis
+#
+# Author:      Arie Claassens
+#
+# Created:     17-10-2026
+# Copyright:   (c) Arie Claassens 2026
+# License:     GNU GPL. View the LICENSE file.
+#------------------------------------------------------------------------------
+
+"""
+Checks the rank sketch against the exact rank statistics and the Monte Carlo
+run against ranking every feature for every weight draw, serially and in a
+pool of worker processes. The modules import arcpy, so the tests are skipped
+without it. Run with: python -m unittest test_mcda_uncertainty
+"""
+
+#Import libraries
+import unittest
+import numpy as np
+try:
+    from mcda_scoring import weighted_ranking_classes
+    from mcda_uncertainty import (RankSketch, simulate_weights,
+                                  sample_weights, parse_distribution)
+    HAVE_ARCPY = True
+except ImportError:
+    HAVE_ARCPY = False
+
+# Functions and classes
+def random_grades(randomstate, count):
+    """
+    Return a count x 9 grade matrix with many repeated rows.
+    """
+    return randomstate.randint(0, 4, (count, 9)) * (
+        randomstate.rand(count, 9) < 0.6)
+
+def brute_force_ranks(scores):
+    """
+    Return the competition rank of each score, one more than the number of
+    strictly higher scores.
+    """
+    return np.array([1 + sum(1 for other in scores if other > score)
+                     for score in scores])
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_uncertainty needs arcpy")
+class ParseDistributionTest(unittest.TestCase):
+    """
+    The weight distribution specs.
+    """
+    def test_parse_distribution(self):
+        self.assertEqual(parse_distribution('', 4), ('FIXED', (4.0,)))
+        self.assertEqual(parse_distribution('fixed', 4), ('FIXED', (4.0,)))
+        self.assertEqual(parse_distribution('PERCENT 25', 4),
+                         ('UNIFORM', (3.0, 5.0)))
+        self.assertEqual(parse_distribution('TRIANGULAR 2 4 7', 4),
+                         ('TRIANGULAR', (2.0, 4.0, 7.0)))
+        self.assertRaises(ValueError, parse_distribution, 'GAMMA 2', 4)
+        self.assertRaises(ValueError, parse_distribution, 'NORMAL 4', 4)
+
+    def test_sample_weights(self):
+        distributions = [parse_distribution('NORMAL 0 5', 1),
+                         parse_distribution('', 3)]
+        weights = sample_weights(distributions, 1000,
+                                 np.random.RandomState(19))
+        self.assertEqual(weights.shape, (1000, 2))
+        self.assertTrue((weights[:, 0] >= 0).all())
+        self.assertTrue((weights[:, 0] == 0).any())
+        self.assertTrue((weights[:, 1] == 3).all())
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_uncertainty needs arcpy")
+class RankSketchTest(unittest.TestCase):
+    """
+    The rank sketch against the exact rank statistics.
+    """
+    def setUp(self):
+        randomstate = np.random.RandomState(16)
+        self.totalcount = 1000
+        self.ranks = randomstate.randint(1, self.totalcount + 1, (50, 900))
+        self.classes = randomstate.randint(0, 3, self.ranks.shape)
+
+    def sketch(self, start, end, bins=100):
+        """
+        Return a sketch of samples start to end, added in chunks.
+        """
+        sketch = RankSketch(len(self.ranks), self.totalcount, bins)
+        for chunk in range(start, end, 64):
+            stop = min(chunk + 64, end)
+            sketch.update(self.ranks[:, chunk:stop],
+                          self.classes[:, chunk:stop])
+        return sketch
+
+    def test_statistics(self):
+        sketch = self.sketch(0, self.ranks.shape[1])
+        self.assertEqual(sketch.samples, self.ranks.shape[1])
+        self.assertEqual(sketch.minrank.tolist(),
+                         self.ranks.min(axis=1).tolist())
+        self.assertEqual(sketch.maxrank.tolist(),
+                         self.ranks.max(axis=1).tolist())
+        np.testing.assert_allclose(sketch.ranksum, self.ranks.sum(axis=1))
+        for ranking in range(3):
+            self.assertEqual(sketch.classcounts[:, ranking].tolist(),
+                             (self.classes == ranking).sum(axis=1).tolist())
+
+    def test_quantile(self):
+        # An estimate lies in the bin of the exact quantile
+        for bins in (10, 100):
+            sketch = self.sketch(0, self.ranks.shape[1], bins)
+            width = self.totalcount / float(bins)
+            for percentile in (0, 5, 50, 95, 100):
+                estimate = sketch.quantile(percentile / 100.0)
+                exact = np.percentile(self.ranks, percentile, axis=1)
+                self.assertTrue((np.abs(estimate - exact) <= width + 1).all())
+
+    def test_merge(self):
+        whole = self.sketch(0, self.ranks.shape[1])
+        merged = self.sketch(0, 300)
+        merged.skipped = 2
+        other = self.sketch(300, self.ranks.shape[1])
+        other.skipped = 3
+        merged.merge(other)
+        self.assertEqual(merged.samples, whole.samples)
+        self.assertEqual(merged.skipped, 5)
+        self.assertEqual(merged.histogram.tolist(), whole.histogram.tolist())
+        self.assertEqual(merged.minrank.tolist(), whole.minrank.tolist())
+        self.assertEqual(merged.maxrank.tolist(), whole.maxrank.tolist())
+        self.assertEqual(merged.classcounts.tolist(),
+                         whole.classcounts.tolist())
+
+@unittest.skipUnless(HAVE_ARCPY, "mcda_uncertainty needs arcpy")
+class SimulateWeightsTest(unittest.TestCase):
+    """
+    The Monte Carlo run against ranking every feature for every draw.
+    """
+    def test_simulate_weights(self):
+        randomstate = np.random.RandomState(17)
+        grades = random_grades(randomstate, 300)
+        weights = randomstate.randint(1, 10, 9)
+        distributions = [parse_distribution('PERCENT 50', weight)
+                         for weight in weights]
+        distributions[0] = parse_distribution('UNIFORM 0 0', weights[0])
+        sketch, inverse = simulate_weights(grades, distributions, 10, 18,
+                                           samples=45, chunksize=20, seed=5)
+        ranks = []
+        classes = []
+        for chunknumber, size in enumerate((20, 20, 5)):
+            draws = sample_weights(distributions, size,
+                                   np.random.RandomState([5, chunknumber]))
+            for draw in draws:
+                scores = np.dot(grades, draw)
+                ranks.append(brute_force_ranks(scores))
+                classes.append(weighted_ranking_classes(scores, draw, 10, 18))
+        ranks = np.column_stack(ranks)
+        classes = np.column_stack(classes)
+        self.assertEqual(sketch.samples, 45)
+        self.assertEqual(sketch.minrank[inverse].tolist(),
+                         ranks.min(axis=1).tolist())
+        self.assertEqual(sketch.maxrank[inverse].tolist(),
+                         ranks.max(axis=1).tolist())
+        np.testing.assert_allclose(sketch.ranksum[inverse],
+                                   ranks.sum(axis=1))
+        for ranking in range(3):
+            self.assertEqual(sketch.classcounts[inverse, ranking].tolist(),
+                             (classes == ranking).sum(axis=1).tolist())
+
+    def test_workers(self):
+        # Every chunk has its own seed, so a pool gives the same result
+        randomstate = np.random.RandomState(20)
+        grades = random_grades(randomstate, 300)
+        distributions = [parse_distribution('PERCENT 50', weight)
+                         for weight in randomstate.randint(1, 10, 9)]
+        serial, inverse = simulate_weights(grades, distributions, 10, 18,
+                                           samples=90, chunksize=20, seed=7)
+        pooled, inverse = simulate_weights(grades, distributions, 10, 18,
+                                           samples=90, chunksize=20,
+                                           workers=2, seed=7)
+        self.assertEqual(pooled.samples, serial.samples)
+        self.assertEqual(pooled.histogram.tolist(),
+                         serial.histogram.tolist())
+        self.assertEqual(pooled.minrank.tolist(), serial.minrank.tolist())
+        self.assertEqual(pooled.maxrank.tolist(), serial.maxrank.tolist())
+        self.assertEqual(pooled.classcounts.tolist(),
+                         serial.classcounts.tolist())
+
+    def test_zero_weights_skipped(self):
+        grades = random_grades(np.random.RandomState(18), 50)
+        distributions = [parse_distribution('UNIFORM 0 0', 1)] * 9
+        sketch, inverse = simulate_weights(grades, distributions, 10, 18,
+                                           samples=30, chunksize=20, seed=1)
+        self.assertEqual(sketch.samples, 0)
+        self.assertEqual(sketch.skipped, 30)
+
+if __name__ == '__main__':
+    unittest.main()